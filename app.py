@@ -1,13 +1,35 @@
 """Interface gráfica web com Streamlit para o Agente de Escala."""
 from __future__ import annotations
 
+import os
 import sys
+import tempfile
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 import streamlit as st
 import pandas as pd
 
 from services.data_loader import preprocess_data
+from models.fleet import vehicle_timelines
 from models.scheduler import create_schedule
 from services.exceptions_handler import apply_manual_assignments
+from services.cache import ResultCache, cache_key
+from services.jobs import CANCELADA, CONCLUIDA, BackgroundJob
+from services.metrics import RunMetrics
+from services.scenarios import Scenario, run_scenarios
+from services.snapshot import content_hash, read_snapshot, write_snapshot
+from services.sweep import penalty_grid, sweep_penalties
+
+# Snapshots dos arquivos enviados, um por conteúdo: um novo envio dos mesmos arquivos não é pré-processado de novo
+PASTA_SNAPSHOT = os.path.join(tempfile.gettempdir(), 'agente_escala_snapshot')
+# Entradas dos caches em memória: conjuntos de arquivos (lidos e pré-processados) e escalas geradas
+MAX_ENTRADAS_CACHE = 4
+MAX_ESCALAS_CACHE = 16
+# Intervalo, em segundos, entre as atualizações da barra de progresso
+INTERVALO_PROGRESSO = 0.3
 
 st.set_page_config(layout="wide")
 
@@ -28,15 +50,44 @@ new_driver_penalty = st.sidebar.number_input(
     step=100.0,
     help="Custo artificialmente alto para desincentivar o uso de um novo motorista. Valores mais altos priorizam a reutilização dos motoristas já em rota."
 )
+improve_seconds = st.sidebar.number_input(
+    "Tempo de Melhoria Local (segundos)",
+    min_value=0.0,
+    value=0.0,
+    step=1.0,
+    help="Após a escala inicial, tenta trocar e realocar linhas entre motoristas durante este tempo, mantendo sempre a melhor escala encontrada. 0 desativa."
+)
+reaproveitar_veiculos = st.sidebar.checkbox(
+    "Reaproveitar Veículos",
+    value=False,
+    help="Depois de cada viagem, o veículo pode fazer outras linhas do dia, se chegar à origem a tempo. Desmarcado, cada veículo faz uma única linha."
+)
+medir_desempenho = st.sidebar.checkbox(
+    "Medir Desempenho",
+    value=False,
+    help="Registra o tempo de cada fase e quantos motoristas candidatos foram avaliados e descartados por linha."
+)
 
-# --- 2. Lógica de Geração da Escala (Função permanece a mesma) ---
+@st.cache_resource
+def obter_caches() -> Tuple[ResultCache, ResultCache]:
+    """Caches compartilhados entre as reexecuções do script: dados de entrada e escalas."""
+    return ResultCache(2 * MAX_ENTRADAS_CACHE), ResultCache(MAX_ESCALAS_CACHE)
+
+
+# --- 2. Lógica de Geração da Escala ---
 def gerar_escala_completa(
     motoristas: pd.DataFrame,
     veiculos: pd.DataFrame,
     linhas: pd.DataFrame,
     excecoes_df: pd.DataFrame,
-    penalty: float
-) -> pd.DataFrame:
+    penalty: float,
+    improve_seconds: float = 0.0,
+    metrics: Optional[RunMetrics] = None,
+    hash_entrada: Optional[str] = None,
+    cache: Optional[ResultCache] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    reuse_vehicles: bool = False
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Executa o fluxo completo de geração de escala a partir dos dados de entrada.
 
@@ -46,18 +97,59 @@ def gerar_escala_completa(
         linhas: DataFrame com os dados das linhas.
         excecoes_df: DataFrame com as alocações manuais.
         penalty: Penalidade a ser aplicada para novos motoristas.
+        improve_seconds: Orçamento de tempo da busca local (0 desativa).
+        metrics: Se informado, recebe as métricas de cada fase da execução.
+        hash_entrada: Hash do conteúdo dos arquivos enviados; se informado, os
+            dados pré-processados vêm do snapshot quando ele corresponde a
+            esse conteúdo e, caso contrário, o snapshot é regravado.
+        cache: Cache em memória dos dados pré-processados, consultado (pelo
+            hash_entrada) antes do snapshot.
+        progress: Callback de progresso do motor (ver ``create_schedule``).
+        reuse_vehicles: Reaproveita os veículos entre viagens (ver ``create_schedule``).
 
     Returns:
-        Um DataFrame do pandas contendo a escala final gerada.
+        Um DataFrame do pandas contendo a escala final gerada e o relatório
+        de conflitos das exceções manuais.
     """
-    motoristas_proc, veiculos_proc, linhas_proc = preprocess_data(motoristas.copy(), veiculos.copy(), linhas.copy())
+    motoristas_proc, veiculos_proc, linhas_proc = preprocessar(motoristas, veiculos, linhas, metrics, hash_entrada,
+                                                               cache)
     excecoes = excecoes_df.to_dict('records')
 
-    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados = \
-        apply_manual_assignments(motoristas_proc, veiculos_proc, linhas_proc, excecoes)
-    escala_otimizada = create_schedule(motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, new_driver_penalty=penalty)
-    escala_final = {**escala_manual, **escala_otimizada}
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, conflitos = \
+        apply_manual_assignments(motoristas_proc, veiculos_proc, linhas_proc, excecoes, metrics, reuse_vehicles)
+    veiculos_agendados = vehicle_timelines(escala_manual, linhas_proc) if reuse_vehicles else None
+    escala_otimizada = create_schedule(motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, new_driver_penalty=penalty, improve_seconds=improve_seconds, metrics=metrics, progress=progress, reuse_vehicles=reuse_vehicles, veiculos_agendados=veiculos_agendados)
+    return escala_para_dataframe({**escala_manual, **escala_otimizada}), conflitos
+
+def preprocessar(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    metrics: Optional[RunMetrics] = None,
+    hash_entrada: Optional[str] = None,
+    cache: Optional[ResultCache] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Pré-processa os dados enviados, reaproveitando o cache em memória e o snapshot (ver gerar_escala_completa)."""
+    chave_tabelas = cache_key('preprocessado', hash_entrada)
+    tabelas = cache.get(chave_tabelas) if cache is not None and hash_entrada else None
+    # Uma pasta por conteúdo: sessões com outros arquivos nunca regravam o snapshot que esta lê. As colunas são
+    # lidas para a memória (sem mmap), pois as tabelas ficam no cache compartilhado enquanto o app estiver no ar
+    pasta = os.path.join(PASTA_SNAPSHOT, hash_entrada) if hash_entrada else None
+    if tabelas is None and pasta:
+        tabelas = read_snapshot(pasta, hash_entrada, mmap=False)
+    if tabelas is None:
+        tabelas = preprocess_data(motoristas.copy(), veiculos.copy(), linhas.copy(), metrics)
+        if pasta:
+            try:
+                write_snapshot(pasta, tabelas, hash_entrada)
+            except (OSError, ValueError) as e:
+                print(f"Aviso: Não foi possível gravar o snapshot dos dados: {e}", file=sys.stderr)
+    if cache is not None and hash_entrada:
+        cache.put(chave_tabelas, tabelas)
+    return tabelas
 
+def escala_para_dataframe(escala_final: Dict[Any, Dict[str, Any]]) -> pd.DataFrame:
+    """Converte a escala no formato de exibição e de download (uma linha por linha de ônibus)."""
     escala_lista = []
     for linha_id, info in sorted(escala_final.items()):
         escala_lista.append({
@@ -68,20 +160,132 @@ def gerar_escala_completa(
         })
     return pd.DataFrame(escala_lista)
 
+def varrer_penalidades(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    excecoes_df: pd.DataFrame,
+    penalidades: List[float],
+    improve_seconds: float = 0.0,
+    workers: Optional[int] = None,
+    hash_entrada: Optional[str] = None,
+    cache: Optional[ResultCache] = None
+) -> Tuple[pd.DataFrame, Dict[float, pd.DataFrame]]:
+    """
+    Resolve os dados enviados para cada penalidade, em paralelo, e monta as escalas da fronteira de Pareto.
+
+    Returns:
+        O DataFrame da varredura (ver ``sweep_penalties``) e a escala final
+        (com as exceções manuais) de cada penalidade da fronteira.
+    """
+    motoristas_proc, veiculos_proc, linhas_proc = preprocessar(motoristas, veiculos, linhas, None, hash_entrada, cache)
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, _ = \
+        apply_manual_assignments(motoristas_proc, veiculos_proc, linhas_proc, excecoes_df.to_dict('records'))
+    varredura, escalas = sweep_penalties(motoristas_restantes, veiculos_restantes, linhas_restantes, penalidades,
+                                         motoristas_agendados, improve_seconds=improve_seconds, workers=workers)
+    da_fronteira = {
+        penalidade: escala_para_dataframe({**escala_manual, **escalas[penalidade]})
+        for penalidade in varredura.loc[varredura['na_fronteira'], 'penalidade']
+    }
+    return varredura, da_fronteira
+
+def comparar_cenarios(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    excecoes_df: pd.DataFrame,
+    cenarios: List[Scenario],
+    penalty: float,
+    improve_seconds: float = 0.0,
+    workers: Optional[int] = None,
+    hash_entrada: Optional[str] = None,
+    cache: Optional[ResultCache] = None
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Resolve os cenários sobre os dados enviados, pré-processados uma única vez, em paralelo.
+
+    Returns:
+        O DataFrame da comparação (ver ``run_scenarios``) e a escala final de cada cenário.
+    """
+    motoristas_proc, veiculos_proc, linhas_proc = preprocessar(motoristas, veiculos, linhas, None, hash_entrada, cache)
+    comparacao, escalas = run_scenarios(motoristas_proc, veiculos_proc, linhas_proc, cenarios,
+                                        excecoes_df.to_dict('records'), penalty, improve_seconds=improve_seconds,
+                                        workers=workers)
+    return comparacao, {nome: escala_para_dataframe(escala) for nome, escala in escalas.items()}
+
+def exibir_metricas(metrics: RunMetrics) -> None:
+    """Mostra tempos por fase, contadores e o histograma de candidatos de uma execução."""
+    with st.expander("📊 Métricas da Execução"):
+        tempos = pd.DataFrame(sorted(metrics.tempos.items()), columns=['Fase', 'Segundos']).set_index('Fase')
+        st.subheader("Tempo por Fase")
+        st.bar_chart(tempos)
+        col1, col2 = st.columns(2)
+        col1.subheader("Contadores")
+        col1.dataframe(
+            pd.DataFrame(sorted(metrics.contadores.items()), columns=['Contador', 'Valor']),
+            use_container_width=True, hide_index=True
+        )
+        col2.subheader("Candidatos Avaliados por Linha")
+        histograma = metrics.histogram()
+        if histograma:
+            col2.bar_chart(pd.DataFrame(histograma, columns=['Candidatos', 'Linhas']).set_index('Candidatos'))
+        else:
+            col2.info("Nenhuma linha passou pelo motor de otimização.")
+
+def acompanhar_tarefa() -> None:
+    """Mostra o progresso da geração em segundo plano e, quando ela termina, guarda o resultado."""
+    job = st.session_state.job
+    if not job.done:
+        st.progress(job.progresso, text=f"O agente de IA está trabalhando... 🧠 {job.progresso:.0%}")
+        if st.button("Cancelar"):
+            job.cancel()
+        time.sleep(INTERVALO_PROGRESSO)
+        st.rerun()
+    st.session_state.job = None
+    if job.status == CONCLUIDA:
+        st.session_state.df_escala, st.session_state.conflitos = job.resultado
+        cache_escalas.put(st.session_state.chave_job, (*job.resultado, st.session_state.metricas))
+    elif job.status == CANCELADA:
+        st.session_state.metricas = None
+        st.info("Geração da escala cancelada.")
+    else:
+        st.session_state.metricas = None
+        st.error(f"Erro ao gerar a escala: {job.erro}")
+
 # --- 3. Lógica Principal da Interface ---
 if 'df_escala' not in st.session_state:
     st.session_state.df_escala = None
+if 'metricas' not in st.session_state:
+    st.session_state.metricas = None
+if 'conflitos' not in st.session_state:
+    st.session_state.conflitos = None
+if 'job' not in st.session_state:
+    st.session_state.job = None
+if 'varredura' not in st.session_state:
+    st.session_state.varredura = None
+if 'cenarios' not in st.session_state:
+    st.session_state.cenarios = []
+if 'comparacao' not in st.session_state:
+    st.session_state.comparacao = None
+
+cache_entradas, cache_escalas = obter_caches()
 
 if motoristas_upload and veiculos_upload and linhas_upload:
-    # Carrega os dados dos arquivos enviados
-    motoristas_df = pd.read_csv(motoristas_upload)
-    veiculos_df = pd.read_csv(veiculos_upload)
-    linhas_df = pd.read_csv(linhas_upload)
+    # Os arquivos só são lidos de novo quando o conteúdo muda (o hash é a chave do cache)
+    hash_entrada = content_hash(upload.getvalue() for upload in (motoristas_upload, veiculos_upload, linhas_upload))
+    chave_brutos = cache_key('brutos', hash_entrada)
+    brutos = cache_entradas.get(chave_brutos)
+    if brutos is None:
+        brutos = tuple(pd.read_csv(upload) for upload in (motoristas_upload, veiculos_upload, linhas_upload))
+        cache_entradas.put(chave_brutos, brutos)
+    motoristas_df, veiculos_df, linhas_df = brutos
 
     if excecoes_upload:
         excecoes_df = pd.read_csv(excecoes_upload)
+        hash_excecoes = content_hash([excecoes_upload.getvalue()])
     else:
         excecoes_df = pd.DataFrame(columns=['linha', 'motorista', 'veiculo'])
+        hash_excecoes = None
 
     # Exibe os dados de entrada em abas
     st.header("Dados Carregados")
@@ -93,13 +297,34 @@ if motoristas_upload and veiculos_upload and linhas_upload:
 
     # Botão para gerar a escala
     st.header("Geração da Escala")
-    if st.button("Gerar Escala Otimizada", type="primary"):
-        with st.spinner("O agente de IA está trabalhando... 🧠"):
-            st.session_state.df_escala = gerar_escala_completa(motoristas_df, veiculos_df, linhas_df, excecoes_df, new_driver_penalty)
+    if st.session_state.job is not None:
+        acompanhar_tarefa()
+    elif st.button("Gerar Escala Otimizada", type="primary"):
+        chave_escala = cache_key('escala', hash_entrada, hash_excecoes, new_driver_penalty, improve_seconds,
+                                 reaproveitar_veiculos)
+        guardada = cache_escalas.get(chave_escala)
+        # Resultado já calculado com os mesmos arquivos e parâmetros (e com métricas, se pedidas)
+        if guardada is not None and (not medir_desempenho or guardada[2] is not None):
+            st.session_state.df_escala, st.session_state.conflitos, st.session_state.metricas = guardada
+            st.caption("Resultado reaproveitado do cache (mesmos arquivos e parâmetros).")
+        else:
+            st.session_state.metricas = RunMetrics() if medir_desempenho else None
+            st.session_state.chave_job = chave_escala
+            st.session_state.job = BackgroundJob(partial(
+                gerar_escala_completa, motoristas_df, veiculos_df, linhas_df, excecoes_df, new_driver_penalty,
+                improve_seconds, st.session_state.metricas, hash_entrada, cache_entradas,
+                reuse_vehicles=reaproveitar_veiculos
+            )).start()
+            acompanhar_tarefa()
 
     # Exibe o resultado e o botão de download se a escala foi gerada
     if st.session_state.df_escala is not None:
         df_escala = st.session_state.df_escala
+        conflitos = st.session_state.conflitos
+        if conflitos is not None and not conflitos.empty:
+            st.warning(f"{len(conflitos)} conflito(s) nas exceções manuais. As exceções conflitantes foram aplicadas; "
+                       "as de linhas inexistentes e as repetidas (exceto a última) foram ignoradas.")
+            st.dataframe(conflitos, use_container_width=True, hide_index=True)
         if not df_escala.empty:
             st.success("Escala gerada com sucesso!")
             st.dataframe(df_escala, use_container_width=True)
@@ -113,5 +338,111 @@ if motoristas_upload and veiculos_upload and linhas_upload:
                file_name='escala_agente.csv',
                mime='text/csv',
             )
+        if st.session_state.metricas is not None:
+            exibir_metricas(st.session_state.metricas)
+
+    # Varredura da penalidade: uma escala por penalidade e a fronteira custo de deslocamento x motoristas
+    with st.expander("📈 Varredura da Penalidade por Novo Motorista"):
+        col1, col2, col3, col4 = st.columns(4)
+        penalidade_min = col1.number_input("Penalidade mínima", min_value=0.0, value=0.0, step=500.0)
+        penalidade_max = col2.number_input("Penalidade máxima", min_value=0.0, value=20000.0, step=500.0)
+        passos = col3.number_input("Pontos da grade", min_value=2, max_value=50, value=9, step=1)
+        processos = col4.number_input("Processos", min_value=1, value=min(4, os.cpu_count() or 1), step=1)
+        if st.button("Varrer Penalidades"):
+            try:
+                penalidades = penalty_grid(penalidade_min, penalidade_max, int(passos))
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                chave_varredura = cache_key('varredura', hash_entrada, hash_excecoes, penalidades, improve_seconds)
+                resultado = cache_escalas.get(chave_varredura)
+                if resultado is None:
+                    with st.spinner(f"Resolvendo {len(penalidades)} penalidades em {int(processos)} processo(s)..."):
+                        resultado = varrer_penalidades(motoristas_df, veiculos_df, linhas_df, excecoes_df, penalidades,
+                                                       improve_seconds, int(processos), hash_entrada, cache_entradas)
+                    cache_escalas.put(chave_varredura, resultado)
+                st.session_state.varredura = (hash_entrada, hash_excecoes, resultado)
+
+        # Só exibe a varredura dos arquivos carregados no momento
+        if st.session_state.varredura is not None and st.session_state.varredura[:2] == (hash_entrada, hash_excecoes):
+            varredura, escalas_fronteira = st.session_state.varredura[2]
+            st.scatter_chart(
+                varredura.assign(ponto=np.where(varredura['na_fronteira'], 'Fronteira', 'Dominado')),
+                x='motoristas', y='custo_deslocamento', color='ponto'
+            )
+            fronteira = varredura[varredura['na_fronteira']].sort_values('motoristas').reset_index(drop=True)
+            st.dataframe(fronteira.drop(columns='na_fronteira'), use_container_width=True)
+            ponto = st.selectbox(
+                "Ponto da fronteira para exportar", fronteira.index,
+                format_func=lambda i: (f"Ponto {i}: penalidade {fronteira.loc[i, 'penalidade']:g}, "
+                                       f"{fronteira.loc[i, 'motoristas']} motoristas, "
+                                       f"custo {fronteira.loc[i, 'custo_deslocamento']:.2f}")
+            )
+            penalidade_escolhida = fronteira.loc[ponto, 'penalidade']
+            st.download_button(
+                label="📥 Baixar Escala do Ponto como CSV",
+                data=escalas_fronteira[penalidade_escolhida].to_csv(index=False).encode('utf-8'),
+                file_name=f'escala_penalidade_{penalidade_escolhida:g}.csv',
+                mime='text/csv',
+            )
+
+    # Cenários hipotéticos: variações da mesma instância (exceções, motoristas indisponíveis, veículos em manutenção)
+    with st.expander("🧪 Cenários Hipotéticos"):
+        with st.form("novo_cenario", clear_on_submit=True):
+            nome_cenario = st.text_input("Nome do cenário")
+            indisponiveis = st.multiselect("Motoristas indisponíveis", motoristas_df['nome'].tolist())
+            em_manutencao = st.multiselect("Veículos em manutenção", veiculos_df['numero_carro'].tolist())
+            excecoes_cenario = st.file_uploader("Exceções do cenário (opcional; sem arquivo, valem as exceções carregadas)",
+                                                type="csv")
+            if st.form_submit_button("Adicionar Cenário"):
+                nomes = {'base'} | {cenario.nome for cenario in st.session_state.cenarios}
+                if not nome_cenario or nome_cenario in nomes:
+                    st.error("Informe um nome de cenário novo (diferente de 'base').")
+                else:
+                    st.session_state.cenarios.append(Scenario(
+                        nome_cenario,
+                        excecoes=pd.read_csv(excecoes_cenario).to_dict('records') if excecoes_cenario else None,
+                        motoristas_indisponiveis=tuple(indisponiveis),
+                        veiculos_manutencao=tuple(em_manutencao),
+                    ))
+
+        if st.session_state.cenarios:
+            st.dataframe(pd.DataFrame([{
+                'Cenário': cenario.nome,
+                'Exceções': 'carregadas' if cenario.excecoes is None else f"{len(cenario.excecoes)} próprias",
+                'Motoristas indisponíveis': ', '.join(map(str, cenario.motoristas_indisponiveis)),
+                'Veículos em manutenção': ', '.join(map(str, cenario.veiculos_manutencao)),
+            } for cenario in st.session_state.cenarios]), use_container_width=True, hide_index=True)
+            col1, col2, col3 = st.columns(3)
+            processos_cenarios = col1.number_input("Processos dos cenários", min_value=1,
+                                                   value=min(4, os.cpu_count() or 1), step=1)
+            if col3.button("Limpar Cenários"):
+                st.session_state.cenarios = []
+                st.session_state.comparacao = None
+                st.rerun()
+            if col2.button("Comparar Cenários"):
+                cenarios = [Scenario('base'), *st.session_state.cenarios]
+                chave_cenarios = cache_key('cenarios', hash_entrada, hash_excecoes, cenarios, new_driver_penalty,
+                                           improve_seconds)
+                resultado = cache_escalas.get(chave_cenarios)
+                if resultado is None:
+                    with st.spinner(f"Resolvendo {len(cenarios)} cenários em {int(processos_cenarios)} processo(s)..."):
+                        resultado = comparar_cenarios(motoristas_df, veiculos_df, linhas_df, excecoes_df, cenarios,
+                                                      new_driver_penalty, improve_seconds, int(processos_cenarios),
+                                                      hash_entrada, cache_entradas)
+                    cache_escalas.put(chave_cenarios, resultado)
+                st.session_state.comparacao = (hash_entrada, hash_excecoes, resultado)
+
+        # Só exibe a comparação dos arquivos carregados no momento
+        if st.session_state.comparacao is not None and st.session_state.comparacao[:2] == (hash_entrada, hash_excecoes):
+            comparacao, escalas_cenarios = st.session_state.comparacao[2]
+            st.dataframe(comparacao, use_container_width=True, hide_index=True)
+            cenario_escolhido = st.selectbox("Cenário para exportar", comparacao['cenario'])
+            st.download_button(
+                label="📥 Baixar Escala do Cenário como CSV",
+                data=escalas_cenarios[cenario_escolhido].to_csv(index=False).encode('utf-8'),
+                file_name=f'escala_cenario_{cenario_escolhido}.csv',
+                mime='text/csv',
+            )
 else:
     st.info("⬅️ Por favor, carregue os arquivos CSV necessários na barra lateral para começar.")
\ No newline at end of file
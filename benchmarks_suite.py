@@ -0,0 +1,214 @@
+"""Benchmark de escalabilidade do pipeline de escala e comparação com uma linha de base.
+
+Uso:
+    python -m benchmarks.suite run --scales 100 1000 5000 --output bench.json
+    python -m benchmarks.suite compare baseline.json bench.json --tolerance 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SCALES, generate_instance
+from models.scheduler import ENGINES, create_schedule
+from services.data_loader import preprocess_data
+from services.exceptions_handler import apply_manual_assignments
+
+PHASES = ('preprocess_data', 'apply_manual_assignments', 'create_schedule')
+
+
+def run_pipeline(instancia, engine: str = 'python') -> Dict[str, Any]:
+    """
+    Executa o pipeline completo uma vez, cronometrando cada fase.
+
+    Args:
+        instancia: Instância gerada por generate_instance. Não é modificada.
+        engine: Motor de agendamento.
+
+    Returns:
+        Um dicionário com o tempo de cada fase (em segundos), o número de
+        linhas alocadas e o de motoristas usados.
+    """
+    motoristas, veiculos, linhas = (df.copy() for df in instancia[:3])
+    tempos = {}
+
+    inicio = perf_counter()
+    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
+    tempos['preprocess_data'] = perf_counter() - inicio
+
+    inicio = perf_counter()
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, _ = \
+        apply_manual_assignments(motoristas, veiculos, linhas, instancia.excecoes)
+    tempos['apply_manual_assignments'] = perf_counter() - inicio
+
+    inicio = perf_counter()
+    escala_otimizada = create_schedule(motoristas_restantes, veiculos_restantes, linhas_restantes,
+                                       motoristas_agendados, engine=engine)
+    tempos['create_schedule'] = perf_counter() - inicio
+
+    escala_final = {**escala_manual, **escala_otimizada}
+    return {
+        'fases': tempos,
+        'linhas_alocadas': len(escala_final),
+        'motoristas_usados': len({info['motorista'] for info in escala_final.values()}),
+    }
+
+
+def run_benchmark(
+    scales: Sequence[int] = SCALES,
+    seed: int = 0,
+    engine: str = 'python',
+    repeat: int = 1,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Mede o pipeline em várias escalas.
+
+    Cada escala é executada ``repeat`` vezes sobre a mesma instância; o
+    tempo registrado de cada fase é o menor entre as repetições, que é o
+    menos sujeito a ruído da máquina.
+
+    Args:
+        scales: Números de linhas das instâncias.
+        seed: Semente do gerador de instâncias.
+        engine: Motor de agendamento.
+        repeat: Repetições por escala.
+        verbose: Se True, imprime o progresso.
+
+    Returns:
+        Um dicionário serializável em JSON com 'meta' (ambiente e parâmetros)
+        e 'resultados' (um item por escala).
+    """
+    resultados = []
+    for n_linhas in scales:
+        instancia = generate_instance(n_linhas, seed)
+        execucoes = [run_pipeline(instancia, engine) for _ in range(max(1, repeat))]
+        fases = {fase: min(e['fases'][fase] for e in execucoes) for fase in PHASES}
+        resultado = {
+            'linhas': n_linhas,
+            'motoristas': len(instancia.motoristas),
+            'veiculos': len(instancia.veiculos),
+            'excecoes': len(instancia.excecoes),
+            'fases': fases,
+            'total': min(sum(e['fases'].values()) for e in execucoes),
+            'linhas_alocadas': execucoes[0]['linhas_alocadas'],
+            'motoristas_usados': execucoes[0]['motoristas_usados'],
+        }
+        resultados.append(resultado)
+        if verbose:
+            print(f"{n_linhas:>6} linhas: total {resultado['total']:.3f}s "
+                  + ' '.join(f"{fase}={tempo:.3f}s" for fase, tempo in fases.items()))
+
+    return {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'seed': seed,
+            'engine': engine,
+            'repeat': repeat,
+        },
+        'resultados': resultados,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    atual: Dict[str, Any],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.05
+) -> List[Dict[str, Any]]:
+    """
+    Compara dois resultados de benchmark, fase a fase e escala a escala.
+
+    Uma medição é regressão quando fica mais de ``tolerance`` (fração) acima
+    da linha de base e a diferença absoluta passa de ``min_seconds``, o que
+    evita alarmes em fases de poucos milissegundos. Escalas presentes em só
+    um dos arquivos são ignoradas.
+
+    Args:
+        baseline: Resultado de referência (run_benchmark).
+        atual: Resultado a verificar.
+        tolerance: Aumento relativo tolerado (0.25 = 25%).
+        min_seconds: Aumento absoluto mínimo para contar como regressão.
+
+    Returns:
+        Uma lista com uma entrada por (escala, fase), com as chaves 'linhas',
+        'fase', 'baseline', 'atual', 'razao' e 'regressao'.
+    """
+    base_por_escala = {r['linhas']: r for r in baseline['resultados']}
+    comparacoes = []
+    for resultado in atual['resultados']:
+        base = base_por_escala.get(resultado['linhas'])
+        if base is None:
+            continue
+        medidas = [(fase, base['fases'].get(fase), resultado['fases'].get(fase)) for fase in PHASES]
+        medidas.append(('total', base['total'], resultado['total']))
+        for fase, tempo_base, tempo_atual in medidas:
+            if tempo_base is None or tempo_atual is None:
+                continue
+            razao = tempo_atual / tempo_base if tempo_base > 0 else float('inf')
+            comparacoes.append({
+                'linhas': resultado['linhas'],
+                'fase': fase,
+                'baseline': tempo_base,
+                'atual': tempo_atual,
+                'razao': razao,
+                'regressao': tempo_atual > tempo_base * (1 + tolerance) and tempo_atual - tempo_base > min_seconds,
+            })
+    return comparacoes
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Ponto de entrada da linha de comando. Retorna 1 se houver regressão."""
+    parser = argparse.ArgumentParser(description="Benchmark de escalabilidade do agente de escala.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    run = comandos.add_parser('run', help="Executa o benchmark e grava o resultado em JSON.")
+    run.add_argument('--scales', type=int, nargs='+', default=list(SCALES), help="Números de linhas a medir.")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--engine', choices=ENGINES, default='python')
+    run.add_argument('--repeat', type=int, default=1, help="Repetições por escala (vale o menor tempo).")
+    run.add_argument('--output', default='benchmark.json', help="Arquivo JSON de saída.")
+
+    compare = comandos.add_parser('compare', help="Compara um resultado com uma linha de base.")
+    compare.add_argument('baseline', help="JSON de referência.")
+    compare.add_argument('atual', help="JSON a verificar.")
+    compare.add_argument('--tolerance', type=float, default=0.25, help="Aumento relativo tolerado (0.25 = 25%%).")
+    compare.add_argument('--min-seconds', type=float, default=0.05, help="Aumento absoluto mínimo para acusar regressão.")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == 'run':
+        resultado = run_benchmark(args.scales, args.seed, args.engine, args.repeat, verbose=True)
+        with open(args.output, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n[SUCESSO] Resultado salvo em '{args.output}'")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as arquivo:
+        baseline = json.load(arquivo)
+    with open(args.atual, encoding='utf-8') as arquivo:
+        atual = json.load(arquivo)
+    comparacoes = compare_results(baseline, atual, args.tolerance, args.min_seconds)
+    print(pd.DataFrame(comparacoes).to_string(index=False) if comparacoes else "Nenhuma escala em comum.")
+    regressoes = [c for c in comparacoes if c['regressao']]
+    if regressoes:
+        print(f"\n[REGRESSÃO] {len(regressoes)} medição(ões) acima da tolerância de {args.tolerance:.0%}.")
+        return 1
+    print("\n[SUCESSO] Nenhuma regressão encontrada.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
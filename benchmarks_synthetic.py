@@ -0,0 +1,155 @@
+"""Gerador de instâncias sintéticas (motoristas, veículos, linhas e exceções) para benchmarks."""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Escalas padrão (número de linhas) usadas pelos benchmarks
+SCALES = (100, 1000, 5000, 20000)
+
+TIPOS_VEICULO = ('simples', 'articulado')
+# Garagens: nome da região e coordenada central, em unidades de distância do otimizador
+GARAGENS = {
+    'Zona Norte': (6.0, 10.0),
+    'Zona Sul': (6.0, 2.0),
+    'Zona Leste': (10.0, 6.0),
+    'Zona Oeste': (2.0, 6.0),
+}
+
+
+class InstanciaSintetica(NamedTuple):
+    """Instância no mesmo formato dos CSVs de entrada (antes de preprocess_data)."""
+    motoristas: pd.DataFrame
+    veiculos: pd.DataFrame
+    linhas: pd.DataFrame
+    excecoes: List[Dict[str, Any]]
+
+
+def _coordenadas(pontos: np.ndarray) -> np.ndarray:
+    """Formata um array (n, 2) como strings "lat,lon"."""
+    return np.char.add(np.char.add(np.char.mod('%.2f', pontos[:, 0]), ','), np.char.mod('%.2f', pontos[:, 1]))
+
+
+def _horarios(minutos: np.ndarray) -> np.ndarray:
+    """Formata minutos desde a meia-noite como strings 'HH:MM'."""
+    return np.char.add(np.char.add(np.char.zfill((minutos // 60).astype(str), 2), ':'),
+                       np.char.zfill((minutos % 60).astype(str), 2))
+
+
+def generate_instance(
+    n_linhas: int,
+    seed: int = 0,
+    motoristas_por_linha: float = 0.35,
+    veiculos_por_linha: float = 1.1,
+    taxa_excecoes: float = 0.02
+) -> InstanciaSintetica:
+    """
+    Gera uma instância sintética realista e reprodutível.
+
+    Motoristas moram perto de uma das garagens (coluna 'regiao'), 30% sabem
+    dirigir os dois tipos de veículo e alguns estão indisponíveis. As linhas
+    saem de terminais próximos às garagens, com picos de partidas de manhã
+    e no fim da tarde. Como cada veículo atende uma linha por dia, a frota é
+    proporcional ao número de linhas. As exceções fixam linhas a motoristas
+    habilitados e veículos do tipo certo, sem repetir motoristas ou veículos.
+
+    Args:
+        n_linhas: Número de linhas.
+        seed: Semente do gerador; a mesma semente produz a mesma instância.
+        motoristas_por_linha: Proporção de motoristas em relação às linhas.
+        veiculos_por_linha: Proporção de veículos em relação às linhas.
+        taxa_excecoes: Proporção de linhas com alocação manual.
+
+    Returns:
+        A instância gerada.
+    """
+    rng = np.random.default_rng(seed)
+    regioes = np.array(list(GARAGENS))
+    centros = np.array(list(GARAGENS.values()))
+
+    # --- Motoristas ---
+    n_motoristas = max(2, int(round(n_linhas * motoristas_por_linha)))
+    regiao_motorista = rng.integers(len(regioes), size=n_motoristas)
+    casas = centros[regiao_motorista] + rng.normal(0, 1.2, size=(n_motoristas, 2))
+    tipo_principal = rng.choice(len(TIPOS_VEICULO), size=n_motoristas, p=[0.7, 0.3])
+    habilidades = np.where(rng.random(n_motoristas) < 0.3, ','.join(TIPOS_VEICULO),
+                           np.array(TIPOS_VEICULO)[tipo_principal])
+    motoristas = pd.DataFrame({
+        'nome': [f'Motorista {i:05d}' for i in range(n_motoristas)],
+        'localizacao': _coordenadas(casas),
+        'regiao': regioes[regiao_motorista],
+        'habilidades': habilidades,
+        'disponibilidade': np.where(rng.random(n_motoristas) < 0.05, 'indisponivel', 'disponivel'),
+        'jornada_maxima_horas': rng.choice([6, 8, 10], size=n_motoristas, p=[0.2, 0.6, 0.2]),
+    })
+
+    # --- Veículos ---
+    n_veiculos = max(1, int(round(n_linhas * veiculos_por_linha)))
+    veiculos = pd.DataFrame({
+        'numero_carro': 10000 + np.arange(n_veiculos),
+        'tipo': np.array(TIPOS_VEICULO)[rng.choice(len(TIPOS_VEICULO), size=n_veiculos, p=[0.7, 0.3])],
+        'consumo_km_l': rng.choice([1.8, 2.2, 2.5, 3.0, 3.5], size=n_veiculos),
+        'disponibilidade': np.where(rng.random(n_veiculos) < 0.05, 'manutencao', 'disponivel'),
+    })
+
+    # --- Linhas: partidas com picos às 7h e às 17h30 sobre uma base uniforme ---
+    turno = rng.choice(3, size=n_linhas, p=[0.35, 0.35, 0.3])
+    inicio = np.select(
+        [turno == 0, turno == 1],
+        [rng.normal(7 * 60, 50, n_linhas), rng.normal(17.5 * 60, 60, n_linhas)],
+        rng.uniform(5 * 60, 23 * 60, n_linhas),
+    )
+    inicio = (np.clip(inicio, 4 * 60, 23 * 60 + 45) // 5 * 5).astype(int)
+    terminal = rng.integers(len(regioes), size=n_linhas)
+    origens = centros[terminal] + rng.normal(0, 1.5, size=(n_linhas, 2))
+    destinos = rng.uniform(0, 12, size=(n_linhas, 2))
+    linhas = pd.DataFrame({
+        'id': np.arange(1, n_linhas + 1),
+        'origem': _coordenadas(origens),
+        'destino': _coordenadas(destinos),
+        'horario_inicio': _horarios(inicio),
+        'duracao_minutos': rng.choice([30, 45, 60, 90, 120, 150], size=n_linhas, p=[0.15, 0.25, 0.3, 0.15, 0.1, 0.05]),
+        'tipo_veiculo_necessario': np.array(TIPOS_VEICULO)[rng.choice(len(TIPOS_VEICULO), size=n_linhas, p=[0.7, 0.3])],
+    })
+
+    # --- Exceções: linha -> motorista habilitado e veículo do tipo certo, sem repetições ---
+    excecoes = []
+    motoristas_livres = {tipo: list(rng.permutation(np.flatnonzero(motoristas['habilidades'].str.contains(tipo))))
+                         for tipo in TIPOS_VEICULO}
+    veiculos_livres = {tipo: list(rng.permutation(np.flatnonzero(veiculos['tipo'] == tipo))) for tipo in TIPOS_VEICULO}
+    usados = set()
+    for j in rng.choice(n_linhas, size=int(n_linhas * taxa_excecoes), replace=False):
+        tipo = linhas.at[j, 'tipo_veiculo_necessario']
+        while motoristas_livres[tipo] and motoristas_livres[tipo][-1] in usados:
+            motoristas_livres[tipo].pop()
+        if not motoristas_livres[tipo] or not veiculos_livres[tipo]:
+            continue
+        i = motoristas_livres[tipo].pop()
+        usados.add(i)
+        excecoes.append({
+            'linha': int(linhas.at[j, 'id']),
+            'motorista': motoristas.at[i, 'nome'],
+            'veiculo': int(veiculos.at[veiculos_livres[tipo].pop(), 'numero_carro']),
+        })
+
+    return InstanciaSintetica(motoristas, veiculos, linhas, excecoes)
+
+
+def write_instance(instancia: InstanciaSintetica, pasta: str) -> None:
+    """
+    Grava a instância como os CSVs de entrada da aplicação.
+
+    Args:
+        instancia: Instância gerada por generate_instance.
+        pasta: Pasta de destino (ex: 'data'), criada se não existir.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    instancia.motoristas.to_csv(os.path.join(pasta, 'motoristas.csv'), index=False)
+    instancia.veiculos.to_csv(os.path.join(pasta, 'veiculos.csv'), index=False)
+    instancia.linhas.to_csv(os.path.join(pasta, 'linhas.csv'), index=False)
+    pd.DataFrame(instancia.excecoes, columns=['linha', 'motorista', 'veiculo']).to_csv(
+        os.path.join(pasta, 'excecoes.csv'), index=False
+    )
@@ -0,0 +1,28 @@
+"""Fixtures compartilhadas pelos testes."""
+from __future__ import annotations
+
+from typing import Callable, Tuple
+
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_instance
+from services.data_loader import preprocess_data
+
+Instancia = Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+
+
+def _gerar_instancia(seed: int, n_motoristas: int = 25, n_veiculos: int = 15, n_linhas: int = 60) -> Instancia:
+    """Gera uma instância sintética (benchmarks/synthetic.py) já pré-processada, sem exceções manuais."""
+    instancia = generate_instance(n_linhas, seed, motoristas_por_linha=n_motoristas / n_linhas,
+                                  veiculos_por_linha=n_veiculos / n_linhas, taxa_excecoes=0.0)
+    return preprocess_data(instancia.motoristas, instancia.veiculos, instancia.linhas)
+
+
+@pytest.fixture
+def instancia_aleatoria() -> Callable[..., Instancia]:
+    """
+    Fábrica de instâncias aleatórias: ``instancia_aleatoria(seed, n_motoristas=25, n_veiculos=15, n_linhas=60)``.
+
+    A mesma semente gera sempre a mesma instância, nova a cada chamada.
+    """
+    return _gerar_instancia
@@ -1,57 +1,480 @@
-"""Ponto de entrada principal para executar o agente de escala via linha de comando."""
-import pandas as pd
+"""Ponto de entrada principal para executar o agente de escala via linha de comando.
 
-from services.data_loader import load_data, preprocess_data
-from models.scheduler import create_schedule
-from services.exceptions_handler import apply_manual_assignments
+Cada modo de uso é um subcomando, com as próprias opções (``python main.py
+<subcomando> --help``); sem subcomando, ``schedule`` gera a escala do dia,
+de modo que as opções da linha de comando antiga (``--engine flow``,
+``--workers 2``, ``--profile``...) continuam valendo. Os módulos de cada subcomando só são importados
+quando ele é executado, de modo que a ajuda e os erros de uso respondem sem
+carregar os motores.
+"""
+import argparse
+import sys
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Motores aceitos por --engine (models.scheduler.ENGINES), declarados aqui para montar a ajuda sem importar os motores
+MOTORES = ('python', 'numpy', 'flow')
+
+# Opções de modo da linha de comando antiga (sem subcomandos) e o subcomando que as substituiu
+MODOS_ANTIGOS = {'--start': 'batch', '--repair': 'repair', '--sweep': 'sweep', '--scenarios': 'scenarios',
+                 '--serve': 'serve', '--compile-snapshot': 'compile-snapshot'}
+
+# CSVs de entrada de motoristas, veículos e linhas
+FONTES = ('data/motoristas.csv', 'data/veiculos.csv', 'data/linhas.csv')
+
+
+def _relatorio(metrics: Any) -> None:
+    """Imprime o relatório de --profile, se a execução foi medida."""
+    if metrics is not None:
+        print("\n" + metrics.report())
+
+
+def _medicao(args: argparse.Namespace) -> Any:
+    """Métricas da execução com --profile; sem a opção, nenhuma medição é feita nos laços do agendador."""
+    if not args.profile:
+        return None
+    from services.metrics import RunMetrics
+    return RunMetrics()
+
+
+def _carregar_dados(args: argparse.Namespace, metrics: Any) -> Tuple[Any, Any, Any]:
+    """Carrega e pré-processa motoristas, veículos e linhas (pelo snapshot, se estiver atualizado)."""
+    from services.snapshot import load_preprocessed
+
+    motoristas, veiculos, linhas, do_snapshot = load_preprocessed(FONTES, args.snapshot, metrics)
+    if do_snapshot:
+        print(f"Info: Dados carregados do snapshot '{args.snapshot}'.")
+    return motoristas, veiculos, linhas
+
+
+def _carregar_excecoes() -> List[Dict[str, Any]]:
+    """Carrega as exceções manuais de data/excecoes.csv (nenhuma se o arquivo não existir)."""
+    import pandas as pd
 
-if __name__ == "__main__":
-    # 1. Carregar e pré-processar os dados
-    motoristas = load_data('data/motoristas.csv')
-    veiculos = load_data('data/veiculos.csv')
-    linhas = load_data('data/linhas.csv')
-    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
-
-    # 2. Carregar exceções de um arquivo CSV
-    excecoes = []
     try:
         # Usamos o pandas para carregar o CSV e convertê-lo para o formato de lista de dicionários
-        df_excecoes = pd.read_csv('data/excecoes.csv')
-        excecoes = df_excecoes.to_dict('records')
+        return pd.read_csv('data/excecoes.csv').to_dict('records')
     except FileNotFoundError:
         print("Info: Arquivo 'data/excecoes.csv' não encontrado. A escala será gerada sem exceções manuais.")
     except Exception as e:
         print(f"Aviso: Ocorreu um erro ao ler o arquivo de exceções: {e}")
-        
-    # 3. Aplicar as exceções primeiro, separando os recursos já alocados
-    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados = \
-        apply_manual_assignments(motoristas, veiculos, linhas, excecoes)
+    return []
+
+
+def _aplicar_excecoes(motoristas: Any, veiculos: Any, linhas: Any, metrics: Any, reuse_vehicles: bool = False) -> tuple:
+    """Aplica as exceções manuais primeiro, separando os recursos já alocados, e avisa dos conflitos."""
+    from services.exceptions_handler import apply_manual_assignments, format_conflicts
+
+    *resultado, conflitos = apply_manual_assignments(motoristas, veiculos, linhas, _carregar_excecoes(), metrics,
+                                                     reuse_vehicles=reuse_vehicles)
+    for mensagem in format_conflicts(conflitos):
+        print(f"Aviso: {mensagem}")
+    return tuple(resultado)
+
+
+def _salvar(tabela: Any, caminho: str, sucesso: str, arquivo: str, **opcoes: Any) -> None:
+    """Salva uma tabela em CSV, informando o sucesso ou o erro sem interromper a execução."""
+    try:
+        tabela.to_csv(caminho, **{'index': False, **opcoes})
+        print(f"\n[SUCESSO] {sucesso} em '{caminho}'")
+    except Exception as e:
+        print(f"\n[ERRO] Não foi possível salvar o arquivo {arquivo}: {e}")
+
+
+def _escala_em_tabela(escala: Dict[Any, Dict[str, Any]]) -> Any:
+    """Converte uma escala no DataFrame do arquivo de saída, uma linha por linha de ônibus."""
+    import pandas as pd
 
-    # 4. Rodar o otimizador apenas com os recursos restantes
-    escala_otimizada = create_schedule(motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados)
+    return pd.DataFrame([{
+        'Linha_ID': linha_id,
+        'Horario': info.get('horario', 'N/A'),
+        'Motorista_Alocado': info.get('motorista', 'Nao Alocado'),
+        'Veiculo_Alocado': 'Nao Alocado' if info.get('veiculo') is None else info['veiculo'],
+    } for linha_id, info in sorted(escala.items())])
 
-    # 5. Combinar as escalas manual e otimizada para o resultado final
-    escala_final = {**escala_manual, **escala_otimizada}
-    
+
+def _finalizar(escala_final: Dict[Any, Dict[str, Any]], metrics: Any) -> None:
+    """Imprime a escala final, salva-a em data/escala_final.csv para o analista e imprime as métricas."""
     print("\n--- Escala Final Gerada ---")
     if escala_final:
         for linha_id, info in sorted(escala_final.items()):
-            print(f"Linha {linha_id} ({info.get('horario', 'N/A')}): Motorista {info.get('motorista', 'N/A')} - Veículo {info.get('veiculo', 'N/A')}")
+            print(f"Linha {linha_id} ({info.get('horario', 'N/A')}): Motorista {info.get('motorista', 'N/A')} - "
+                  f"Veículo {info.get('veiculo', 'N/A')}")
     else:
         print("Nenhuma linha foi alocada na escala final.")
+    _salvar(_escala_em_tabela(escala_final), 'data/escala_final.csv', "A escala foi salva", "da escala final")
+    _relatorio(metrics)
+
+
+# --- schedule ---
+
+def _regras(args: argparse.Namespace, parser: argparse.ArgumentParser) -> list:
+    """Regras adicionais de --trip-rest e --same-region, validando as combinações com as demais opções."""
+    from services.rule_engine import MinimumRestRule, RegionRule
+
+    regras = []
+    if args.trip_rest is not None:
+        try:
+            regras.append(MinimumRestRule(args.trip_rest))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.same_region:
+        regras.append(RegionRule())
+    # As regras adicionais valem na escala do dia e nas linhas despachadas depois dela
+    if regras and (args.engine == 'flow' or args.improve > 0 or args.workers > 1 or args.by_region):
+        parser.error("--trip-rest/--same-region só valem para os motores 'python' e 'numpy' em uma execução serial, "
+                     "sem --improve, --workers nem --by-region.")
+    return regras
+
+
+def _validar_agendamento(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Recusa as combinações de opções de ``schedule`` que os motores não suportam."""
+    paralelo = args.workers > 1 or args.by_region
+    # O despacho online usa cada veículo uma única vez por dia (ver models/dispatch.py)
+    if args.reuse_vehicles and (args.engine == 'flow' or paralelo or args.dispatch or args.dispatch_port is not None):
+        parser.error("--reuse-vehicles só vale para os motores 'python' e 'numpy' em uma execução serial, "
+                     "sem --dispatch nem --dispatch-port.")
+    if args.flow_exact and ((args.engine != 'flow' and not args.compare) or paralelo):
+        parser.error("--flow-exact só vale com --engine flow ou --compare, em uma execução serial.")
+    if (args.distance_cache or args.road_times) and (args.engine != 'python' or args.improve > 0 or paralelo):
+        parser.error("--distance-cache/--road-times só valem para o motor 'python' em uma execução serial, sem --improve.")
+
+
+def _poda_flow(args: argparse.Namespace) -> Dict[str, Any]:
+    """Com --flow-exact, o motor 'flow' usa o grafo completo; sem a opção, a poda padrão do motor."""
+    return {'flow_candidates': None} if args.flow_exact else {}
+
+
+def _otimizar(args: argparse.Namespace, restantes: tuple, escala_manual: Dict[Any, Dict[str, Any]], linhas: Any,
+              regras: list, metrics: Any) -> Dict[Any, Dict[str, Any]]:
+    """Roda o otimizador apenas com os recursos restantes (motoristas, veículos, linhas e agendados)."""
+    if args.workers > 1 or args.by_region:
+        from models.decomposition import create_schedule_parallel
+        return create_schedule_parallel(*restantes, engine=args.engine, improve_seconds=args.improve,
+                                        workers=args.workers, by_region=args.by_region, metrics=metrics)
+
+    from models.fleet import vehicle_timelines
+    from models.scheduler import create_schedule
+
+    distance_cache = None
+    if args.distance_cache or args.road_times:
+        import pandas as pd
+        from models.deadhead_cache import DeadheadCache
+        distance_cache = DeadheadCache(args.distance_cache)
+        if args.road_times:
+            distance_cache.load_road_times(pd.read_csv(args.road_times))
+    escala = create_schedule(*restantes, engine=args.engine, improve_seconds=args.improve, metrics=metrics,
+                             distance_cache=distance_cache, reuse_vehicles=args.reuse_vehicles,
+                             veiculos_agendados=vehicle_timelines(escala_manual, linhas) if args.reuse_vehicles else None,
+                             extra_rules=regras, **_poda_flow(args))
+    if distance_cache is not None:
+        distance_cache.flush()
+        estatisticas = distance_cache.estatisticas
+        print(f"Info: Cache de deslocamentos com {len(distance_cache)} pontos: {estatisticas['memoria']} consultas "
+              f"em memória, {estatisticas['disco']} em disco e {estatisticas['calculados']} calculadas.")
+    return escala
+
+
+def _despachar(args: argparse.Namespace, dados: tuple, escala: Dict[Any, Dict[str, Any]], regras: list,
+               saida: Any, metrics: Any) -> Dict[Any, Dict[str, Any]]:
+    """Despacho online: linhas reservadas no mesmo dia são alocadas sobre a escala gerada, sem nova rodada."""
+    from models.dispatch import DispatchEngine
+    from services.dispatch import serve_socket, serve_stream
+    from services.metrics import LatencyWindow
+
+    motor_despacho = DispatchEngine(*dados, escala, extra_rules=regras)
+    latencias = LatencyWindow()
+    if args.dispatch_port is not None:
+        print(f"Info: Despacho online em {args.dispatch_port} (127.0.0.1). Ctrl+C encerra.")
+        serve_socket(motor_despacho, args.dispatch_port, latencias, metrics)
+    else:
+        print("Info: Despacho online lendo eventos do stdin até o fim da entrada.")
+        serve_stream(motor_despacho, sys.stdin, saida, latencias, metrics)
+    resumo = latencias.summary()
+    print(f"Info: {resumo['decisoes']} decisões de despacho; latência p50 {resumo['p50_ms']} ms, "
+          f"p99 {resumo['p99_ms']} ms, máxima {resumo['max_ms']} ms.")
+    return motor_despacho.escala
+
+
+def _comando_agendar(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Gera a escala do dia: exceções manuais, otimização e, opcionalmente, despacho online."""
+    _validar_agendamento(args, parser)
+    regras = _regras(args, parser)
+    saida_despacho = sys.stdout
+    if args.dispatch:
+        # O stdout fica reservado às respostas do despacho; as demais mensagens vão para o stderr
+        sys.stdout = sys.stderr
+    metrics = _medicao(args)
+    motoristas, veiculos, linhas = _carregar_dados(args, metrics)
+    escala_manual, *restantes = _aplicar_excecoes(motoristas, veiculos, linhas, metrics, args.reuse_vehicles)
+
+    if args.compare:
+        from models.scheduler import compare_engines
+        print("\n--- Comparação de Motores ---")
+        comparacao = compare_engines(*restantes, **_poda_flow(args))
+        print(comparacao.to_string(index=False))
+        if comparacao['pior_que_guloso'].any():
+            print("Aviso: o motor 'flow' usou mais motoristas que o guloso nesta instância.")
+
+    escala_final = {**escala_manual, **_otimizar(args, tuple(restantes), escala_manual, linhas, regras, metrics)}
+    if args.dispatch or args.dispatch_port is not None:
+        escala_final = _despachar(args, (motoristas, veiculos, linhas), escala_final, regras, saida_despacho, metrics)
+    _finalizar(escala_final, metrics)
+
+
+# --- batch ---
+
+def _comando_lote(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Gera uma escala por dia do período; os dados carregados e pré-processados servem para todos os dias."""
+    from services.batch import date_range, schedule_range, schedules_to_frame
 
-    # 6. Salvar a escala final em um arquivo CSV para o analista
     try:
-        escala_para_salvar = []
-        for linha_id, info in sorted(escala_final.items()):
-            escala_para_salvar.append({
-                'Linha_ID': linha_id,
-                'Horario': info.get('horario', 'N/A'),
-                'Motorista_Alocado': info.get('motorista', 'Nao Alocado'),
-                'Veiculo_Alocado': info.get('veiculo', 'Nao Alocado')
-            })
-        df_final = pd.DataFrame(escala_para_salvar)
-        df_final.to_csv('data/escala_final.csv', index=False)
-        print("\n[SUCESSO] A escala foi salva em 'data/escala_final.csv'")
-    except Exception as e:
-        print(f"\n[ERRO] Não foi possível salvar o arquivo da escala final: {e}")
\ No newline at end of file
+        dias = date_range(args.start, args.end or args.start)
+    except ValueError as e:
+        parser.error(str(e))
+    metrics = _medicao(args)
+    motoristas, veiculos, linhas = _carregar_dados(args, metrics)
+    escalas = schedule_range(motoristas, veiculos, linhas, dias, _carregar_excecoes(), engine=args.engine,
+                             improve_seconds=args.improve, min_rest_hours=args.min_rest,
+                             workers=args.workers, metrics=metrics)
+    print("\n--- Escalas do Período ---")
+    for dia, escala_dia in escalas.items():
+        print(f"{dia.isoformat()}: {len(escala_dia)} linhas alocadas, "
+              f"{len({info['motorista'] for info in escala_dia.values()})} motoristas")
+    _salvar(schedules_to_frame(escalas), 'data/escala_periodo.csv', "As escalas foram salvas", "das escalas")
+    _relatorio(metrics)
+
+
+# --- repair ---
+
+def _comando_reparar(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Repara uma escala já gerada: só as linhas afetadas (e uma vizinhança limitada) mudam de motorista ou veículo."""
+    import pandas as pd
+    from models.repair import repair_schedule, schedule_from_frame
+
+    metrics = _medicao(args)
+    motoristas, veiculos, linhas = _carregar_dados(args, metrics)
+    excecoes = _carregar_excecoes()
+    escala_atual = schedule_from_frame(pd.read_csv(args.escala))
+    disrupcoes = pd.read_csv(args.disruptions).to_dict('records')
+    resultado = repair_schedule(escala_atual, motoristas, veiculos, linhas, disrupcoes,
+                                fixas=[excecao['linha'] for excecao in excecoes], metrics=metrics)
+    print(f"\n--- Reparo da Escala ---\n{len(resultado.afetadas)} linhas afetadas, "
+          f"{len(resultado.alteradas)} alocações alteradas, {len(resultado.sem_alocacao)} linhas sem alocação.")
+    for linha_id in resultado.alteradas:
+        antes, depois = escala_atual[linha_id], resultado.escala.get(linha_id)
+        novo = f"Motorista {depois['motorista']} - Veículo {depois['veiculo']}" if depois else "SEM ALOCAÇÃO"
+        print(f"Linha {linha_id} ({antes.get('horario', 'N/A')}): Motorista {antes['motorista']} - "
+              f"Veículo {antes['veiculo']} -> {novo}")
+    _salvar(_escala_em_tabela(resultado.escala), 'data/escala_reparada.csv', "A escala reparada foi salva",
+            "da escala reparada")
+    _relatorio(metrics)
+
+
+# --- sweep ---
+
+def _comando_varrer(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Varredura da penalidade por novo motorista: a escala final é o ponto da fronteira escolhido pelo analista."""
+    from services.sweep import penalty_grid, sweep_penalties
+
+    try:
+        penalidades = penalty_grid(args.minimo, args.maximo, args.passos)
+    except ValueError as e:
+        parser.error(str(e))
+    metrics = _medicao(args)
+    motoristas, veiculos, linhas = _carregar_dados(args, metrics)
+    escala_manual, *restantes = _aplicar_excecoes(motoristas, veiculos, linhas, metrics)
+    motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados = restantes
+    varredura, escalas_varredura = sweep_penalties(
+        motoristas_restantes, veiculos_restantes, linhas_restantes, penalidades, motoristas_agendados,
+        engine=args.engine, improve_seconds=args.improve, workers=args.workers
+    )
+    fronteira = varredura[varredura['na_fronteira']].sort_values('motoristas').reset_index(drop=True)
+    print("\n--- Varredura da Penalidade por Novo Motorista ---")
+    print(varredura.to_string(index=False))
+    print("\n--- Fronteira de Pareto (custo de deslocamento x motoristas) ---")
+    print(fronteira.drop(columns='na_fronteira').to_string())
+    _salvar(fronteira.drop(columns='na_fronteira'), 'data/fronteira_penalidades.csv', "A fronteira foi salva",
+            "da fronteira", index=True, index_label='ponto')
+    if args.pick is None:
+        print("Info: Use --pick PONTO para gerar a escala final de um ponto da fronteira.")
+        _relatorio(metrics)
+        return
+    if not 0 <= args.pick < len(fronteira):
+        parser.error(f"--pick deve estar entre 0 e {len(fronteira) - 1}.")
+    penalidade_escolhida = fronteira.loc[args.pick, 'penalidade']
+    print(f"Info: Escala final do ponto {args.pick} da fronteira (penalidade {penalidade_escolhida:g}).")
+    _finalizar({**escala_manual, **escalas_varredura[penalidade_escolhida]}, metrics)
+
+
+# --- scenarios ---
+
+def _comando_cenarios(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Cenários hipotéticos: os dados pré-processados servem para todos; a base (data/excecoes.csv) vem primeiro."""
+    from services.scenarios import Scenario, load_scenarios, run_scenarios
+
+    metrics = _medicao(args)
+    motoristas, veiculos, linhas = _carregar_dados(args, metrics)
+    excecoes = _carregar_excecoes()
+    try:
+        cenarios = load_scenarios(args.arquivo)
+        if 'base' not in {cenario.nome for cenario in cenarios}:
+            cenarios.insert(0, Scenario('base'))
+        comparacao, _ = run_scenarios(motoristas, veiculos, linhas, cenarios, excecoes, engine=args.engine,
+                                      improve_seconds=args.improve, workers=args.workers)
+    except (OSError, ValueError) as e:
+        parser.error(f"Cenários inválidos: {e}")
+    print("\n--- Comparação dos Cenários ---")
+    print(comparacao.to_string(index=False))
+    _salvar(comparacao, 'data/comparacao_cenarios.csv', "A comparação foi salva", "da comparação")
+    _relatorio(metrics)
+
+
+# --- serve e compile-snapshot ---
+
+def _comando_servir(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Modo serviço: os dados chegam em cada pedido, e não dos CSVs de data/."""
+    from services.server import SchedulingService, serve
+
+    try:
+        servico = SchedulingService(workers=args.workers, max_fila=args.queue_size)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Info: Serviço de escalas em http://127.0.0.1:{args.porta} com {args.workers} processo(s). Ctrl+C encerra.")
+    serve(servico, args.porta)
+
+
+def _comando_snapshot(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Pré-processa os CSVs de data/ e grava o snapshot colunar."""
+    from services.snapshot import compile_snapshot
+
+    metrics = _medicao(args)
+    hash_conteudo = compile_snapshot(FONTES, args.snapshot, metrics)
+    print(f"[SUCESSO] Snapshot salvo em '{args.snapshot}' (conteúdo {hash_conteudo[:12]}).")
+    _relatorio(metrics)
+
+
+def _criar_parser() -> Tuple[argparse.ArgumentParser, Dict[str, argparse.ArgumentParser]]:
+    """Monta o parser com um subparser por subcomando (devolvidos por nome, para as mensagens de erro de uso)."""
+    dados = argparse.ArgumentParser(add_help=False)
+    dados.add_argument('--snapshot', default='data/snapshot', metavar='PASTA',
+                       help="Pasta do snapshot colunar dos dados pré-processados, usado quando está atualizado em relação "
+                            "aos CSVs.")
+    dados.add_argument('--profile', action='store_true',
+                       help="Mede cada fase (tempos, candidatos avaliados e podados) e imprime um relatório ao final.")
+    motor = argparse.ArgumentParser(add_help=False)
+    motor.add_argument('--engine', choices=MOTORES, default='python',
+                       help="Motor de agendamento: guloso ('python'/'numpy') ou atribuição de custo mínimo ('flow').")
+    motor.add_argument('--improve', type=float, default=0.0, metavar='SEGUNDOS',
+                       help="Orçamento de tempo da busca local executada após o motor (0 desativa).")
+
+    parser = argparse.ArgumentParser(description="Gera a escala otimizada de motoristas.")
+    comandos = parser.add_subparsers(dest='comando', metavar='SUBCOMANDO')
+
+    schedule = comandos.add_parser('schedule', parents=[dados, motor], help="Gera a escala do dia (padrão).")
+    schedule.add_argument('--workers', type=int, default=1,
+                          help="Processos usados, um por tipo de veículo (1 mantém a execução serial).")
+    schedule.add_argument('--by-region', action='store_true',
+                          help="Divide os subproblemas paralelos também pela coluna 'regiao' dos motoristas.")
+    schedule.add_argument('--compare', action='store_true',
+                          help="Compara tempo e custo do motor guloso com o motor 'flow' antes de gerar a escala.")
+    schedule.add_argument('--flow-exact', action='store_true',
+                          help="Resolve a atribuição do motor 'flow' sobre o grafo completo, sem poda (mais lento; vale "
+                               "com --engine flow e --compare).")
+    schedule.add_argument('--distance-cache', metavar='PASTA',
+                          help="Pasta do cache persistente de deslocamentos entre pontos, reaproveitado entre execuções.")
+    schedule.add_argument('--road-times', metavar='CSV',
+                          help="Tempos de deslocamento da rede viária (colunas origem, destino, minutos) que substituem "
+                               "a estimativa.")
+    schedule.add_argument('--reuse-vehicles', action='store_true',
+                          help="Reaproveita cada veículo em outras linhas depois de cada viagem, se ele chegar à origem a "
+                               "tempo (motores 'python' e 'numpy', execução serial, sem despacho online).")
+    schedule.add_argument('--trip-rest', type=float, metavar='MINUTOS',
+                          help="Exige este descanso mínimo entre as viagens de cada motorista (motores 'python' e "
+                               "'numpy', execução serial, sem --improve).")
+    schedule.add_argument('--same-region', action='store_true',
+                          help="Restringe cada linha com a coluna 'regiao' aos motoristas da mesma região (motores "
+                               "'python' e 'numpy', execução serial, sem --improve).")
+    despacho = schedule.add_mutually_exclusive_group()
+    despacho.add_argument('--dispatch', action='store_true',
+                          help="Após gerar a escala, fica em modo de despacho online: lê eventos JSON (um por linha) do "
+                               "stdin e responde no stdout.")
+    despacho.add_argument('--dispatch-port', type=int, metavar='PORTA',
+                          help="Como --dispatch, mas recebe os eventos por um socket TCP local (127.0.0.1) nesta porta.")
+    schedule.set_defaults(executar=_comando_agendar)
+
+    batch = comandos.add_parser('batch', parents=[dados, motor],
+                                help="Gera uma escala por dia de um período, em um único arquivo.")
+    batch.add_argument('--start', type=date.fromisoformat, required=True, metavar='AAAA-MM-DD', help="Data inicial.")
+    batch.add_argument('--end', type=date.fromisoformat, metavar='AAAA-MM-DD', help="Data final (padrão: igual a --start).")
+    batch.add_argument('--min-rest', type=float, default=0.0, metavar='HORAS',
+                       help="Descanso mínimo entre jornadas. Se positivo, os dias são encadeados em vez de paralelos.")
+    batch.add_argument('--workers', type=int, default=1, help="Processos usados, um por dia (1 mantém a execução serial).")
+    batch.set_defaults(executar=_comando_lote)
+
+    repair = comandos.add_parser('repair', parents=[dados], help="Repara uma escala já gerada após disrupções.")
+    repair.add_argument('escala', metavar='ESCALA_CSV', help="Escala a reparar (ex: data/escala_final.csv).")
+    repair.add_argument('--disruptions', required=True, metavar='CSV',
+                        help="Disrupções: colunas motorista e/ou veiculo e, opcionalmente, horario (HH:MM) da saída.")
+    repair.set_defaults(executar=_comando_reparar)
+
+    sweep = comandos.add_parser('sweep', parents=[dados, motor],
+                                help="Fronteira custo de deslocamento x motoristas para várias penalidades por "
+                                     "novo motorista.")
+    sweep.add_argument('minimo', type=float, metavar='MIN', help="Menor penalidade.")
+    sweep.add_argument('maximo', type=float, metavar='MAX', help="Maior penalidade.")
+    sweep.add_argument('passos', type=int, metavar='PASSOS', help="Número de penalidades entre MIN e MAX.")
+    sweep.add_argument('--workers', type=int, default=1, help="Processos usados, um por penalidade.")
+    sweep.add_argument('--pick', type=int, metavar='PONTO',
+                       help="Usa a escala deste ponto da fronteira (0 = menos motoristas) como escala final.")
+    sweep.set_defaults(executar=_comando_varrer)
+
+    scenarios = comandos.add_parser('scenarios', parents=[dados, motor],
+                                    help="Compara cenários hipotéticos lado a lado sobre os mesmos dados.")
+    scenarios.add_argument('arquivo', metavar='JSON',
+                           help="Cenários (exceções, motoristas indisponíveis, veículos em manutenção).")
+    scenarios.add_argument('--workers', type=int, default=1, help="Processos usados, um por cenário.")
+    scenarios.set_defaults(executar=_comando_cenarios)
+
+    serve = comandos.add_parser('serve', help="Sobe o serviço HTTP/JSON local de escalas (127.0.0.1). Ctrl+C encerra.")
+    serve.add_argument('porta', type=int, metavar='PORTA', help="Porta TCP do serviço.")
+    serve.add_argument('--workers', type=int, default=1, help="Processos do pool que resolve os pedidos.")
+    serve.add_argument('--queue-size', type=int, default=64, metavar='PEDIDOS',
+                       help="Número máximo de pedidos na fila ou em execução.")
+    serve.set_defaults(executar=_comando_servir)
+
+    snapshot = comandos.add_parser('compile-snapshot', parents=[dados],
+                                   help="Pré-processa os CSVs de data/ e grava o snapshot em --snapshot.")
+    snapshot.set_defaults(executar=_comando_snapshot)
+    return parser, comandos.choices
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Ponto de entrada da linha de comando.
+
+    Args:
+        argv: Argumentos (sem o nome do programa); None usa os de sys.argv.
+            Sem subcomando (nenhum argumento, ou uma opção como primeiro
+            argumento, como na linha de comando antiga), executa ``schedule``.
+
+    Returns:
+        O código de saída do processo.
+    """
+    parser, subcomandos = _criar_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        antigos = [opcao for opcao in MODOS_ANTIGOS if opcao in argv]
+        if antigos:
+            parser.error(f"{antigos[0]} agora é o subcomando '{MODOS_ANTIGOS[antigos[0]]}' "
+                         f"(veja python main.py {MODOS_ANTIGOS[antigos[0]]} --help).")
+        argv = ['schedule', *argv]
+    args = parser.parse_args(argv)
+    if args.comando is None:
+        parser.error("informe um subcomando.")
+    args.executar(args, subcomandos[args.comando])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+"""Cache persistente de deslocamentos (distância e tempo) entre pares de pontos.
+
+Linhas e garagens reutilizam um conjunto pequeno de pontos, e o agendador
+roda várias vezes por dia sobre eles. O cache guarda, para cada par
+(origem, destino), a distância e o tempo de deslocamento em dois níveis:
+
+- memória: um LRU de tamanho limitado, consultado primeiro;
+- disco: matrizes mapeadas em memória (np.memmap), indexadas por um índice
+  estável de pontos que só cresce, reaproveitadas entre execuções.
+
+As matrizes começam zeradas (arquivos esparsos: só as páginas com pares
+calculados ocupam disco) e uma matriz de estado marca, por par, o que já é
+conhecido. O tamanho cresce com o quadrado do número de pontos, o que é
+adequado ao conjunto de paradas e garagens de uma operação, não a
+coordenadas arbitrárias. Os tempos estimados (distância x
+AVG_MINUTES_PER_DISTANCE_UNIT) são descartados quando essa constante muda;
+tempos de rede viária carregados com ``load_road_times`` substituem a
+estimativa e nunca são descartados. O cache supõe um único processo
+escrevendo na pasta por vez.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models import optimizer
+from models.optimizer import calculate_distance_points, calculate_travel_minutes, parse_point
+
+# Pontos comportados pelas matrizes ao criar o cache (dobra quando enche)
+CAPACIDADE_INICIAL = 256
+# Pares mantidos no nível em memória
+CAPACIDADE_LRU = 200_000
+
+ARQUIVO_META = 'pontos.json'
+ARQUIVO_DISTANCIAS = 'distancias.f8'
+ARQUIVO_MINUTOS = 'minutos.f8'
+ARQUIVO_ESTADO = 'estado.u1'
+
+# Bits da matriz de estado de cada par
+DISTANCIA_CONHECIDA = 1
+TEMPO_CONHECIDO = 2
+TEMPO_DE_REDE = 4
+
+
+class DeadheadCache:
+    """
+    Cache de dois níveis (LRU em memória + matrizes em disco) de deslocamentos entre pontos.
+
+    Attributes:
+        pasta: Pasta das matrizes, ou None para um cache só em memória.
+        estatisticas: Contagem de consultas atendidas pela 'memoria', pelo
+            'disco' e 'calculadas' do zero.
+    """
+
+    def __init__(self, pasta: Optional[str] = None, capacidade_lru: int = CAPACIDADE_LRU) -> None:
+        """
+        Args:
+            pasta: Pasta onde as matrizes são criadas ou reabertas. None
+                mantém tudo em memória (útil para uma única execução).
+            capacidade_lru: Número máximo de pares no nível em memória.
+        """
+        if capacidade_lru < 1:
+            raise ValueError(f"Capacidade do LRU deve ser positiva: {capacidade_lru}.")
+        self.pasta = pasta
+        self.capacidade_lru = capacidade_lru
+        self.estatisticas: Counter = Counter()
+        self._lru: OrderedDict[Tuple[str, str], Tuple[float, float]] = OrderedDict()
+        self._indice: Dict[str, int] = {}
+        self._pontos: List[str] = []
+        self._avg = optimizer.AVG_MINUTES_PER_DISTANCE_UNIT
+        self._tem_rede = False
+
+        meta = None
+        if pasta is not None:
+            os.makedirs(pasta, exist_ok=True)
+            caminho_meta = os.path.join(pasta, ARQUIVO_META)
+            if os.path.exists(caminho_meta):
+                with open(caminho_meta, encoding='utf-8') as arquivo:
+                    meta = json.load(arquivo)
+        if meta is None:
+            self._capacidade = CAPACIDADE_INICIAL
+            self._distancias, self._minutos, self._estado = self._criar_matrizes(self._capacidade)
+            return
+
+        self._capacidade = meta['capacidade']
+        self._pontos = list(meta['pontos'])
+        self._indice = {ponto: i for i, ponto in enumerate(self._pontos)}
+        self._tem_rede = meta.get('tem_rede', False)
+        forma = (self._capacidade, self._capacidade)
+        self._distancias = np.memmap(self._caminho(ARQUIVO_DISTANCIAS), dtype=np.float64, mode='r+', shape=forma)
+        self._minutos = np.memmap(self._caminho(ARQUIVO_MINUTOS), dtype=np.float64, mode='r+', shape=forma)
+        self._estado = np.memmap(self._caminho(ARQUIVO_ESTADO), dtype=np.uint8, mode='r+', shape=forma)
+        if meta['avg_minutos'] != self._avg:
+            self._descartar_estimativas()
+
+    def _caminho(self, arquivo: str) -> str:
+        return os.path.join(self.pasta, arquivo)
+
+    def _criar_matrizes(self, capacidade: int, sufixo: str = '') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cria matrizes zeradas (estado 0 = par ainda não calculado), em disco se houver pasta."""
+        forma = (capacidade, capacidade)
+        if self.pasta is None:
+            return np.zeros(forma), np.zeros(forma), np.zeros(forma, dtype=np.uint8)
+        return (
+            np.memmap(self._caminho(ARQUIVO_DISTANCIAS + sufixo), dtype=np.float64, mode='w+', shape=forma),
+            np.memmap(self._caminho(ARQUIVO_MINUTOS + sufixo), dtype=np.float64, mode='w+', shape=forma),
+            np.memmap(self._caminho(ARQUIVO_ESTADO + sufixo), dtype=np.uint8, mode='w+', shape=forma),
+        )
+
+    def _crescer(self, n_pontos: int) -> None:
+        """Realoca as matrizes para comportar ``n_pontos``, preservando os pares já calculados."""
+        capacidade = max(2 * self._capacidade, n_pontos)
+        novas = self._criar_matrizes(capacidade, sufixo='.novo')
+        n = self._capacidade
+        for nova, antiga in zip(novas, (self._distancias, self._minutos, self._estado)):
+            nova[:n, :n] = antiga
+        if self.pasta is not None:
+            for nova in novas:
+                nova.flush()
+            del self._distancias, self._minutos, self._estado
+            for arquivo in (ARQUIVO_DISTANCIAS, ARQUIVO_MINUTOS, ARQUIVO_ESTADO):
+                os.replace(self._caminho(arquivo + '.novo'), self._caminho(arquivo))
+            forma = (capacidade, capacidade)
+            novas = (
+                np.memmap(self._caminho(ARQUIVO_DISTANCIAS), dtype=np.float64, mode='r+', shape=forma),
+                np.memmap(self._caminho(ARQUIVO_MINUTOS), dtype=np.float64, mode='r+', shape=forma),
+                np.memmap(self._caminho(ARQUIVO_ESTADO), dtype=np.uint8, mode='r+', shape=forma),
+            )
+        self._distancias, self._minutos, self._estado = novas
+        self._capacidade = capacidade
+
+    def _descartar_estimativas(self) -> None:
+        """Descarta os tempos estimados (mantendo os de rede) após mudança da velocidade média."""
+        n = len(self._pontos)
+        bloco = self._estado[:n, :n]
+        bloco[(bloco & TEMPO_DE_REDE) == 0] &= ~TEMPO_CONHECIDO & 0xFF
+        self._lru.clear()
+        self._avg = optimizer.AVG_MINUTES_PER_DISTANCE_UNIT
+
+    def index_of(self, ponto: str) -> int:
+        """
+        Retorna o índice estável de um ponto, registrando-o se for novo.
+
+        Args:
+            ponto: A coordenada como string (ex: "-23.55,-46.63"), exatamente
+                como aparece nos dados.
+
+        Returns:
+            A linha/coluna do ponto nas matrizes.
+        """
+        indice = self._indice.get(ponto)
+        if indice is None:
+            indice = self._indice[ponto] = len(self._pontos)
+            self._pontos.append(ponto)
+            if indice >= self._capacidade:
+                self._crescer(indice + 1)
+        return indice
+
+    def deadhead(self, origem: str, destino: str) -> Tuple[float, float]:
+        """
+        Retorna a distância e o tempo (em minutos) do deslocamento entre dois pontos.
+
+        Args:
+            origem: Ponto de partida, como string "lat,lon".
+            destino: Ponto de chegada, como string "lat,lon".
+
+        Returns:
+            Uma tupla (distância, minutos). O tempo é o de rede viária, se
+            carregado para o par, ou calculate_travel_minutes(distância).
+        """
+        if optimizer.AVG_MINUTES_PER_DISTANCE_UNIT != self._avg:
+            self._descartar_estimativas()
+        chave = (origem, destino)
+        valor = self._lru.get(chave)
+        if valor is not None:
+            self._lru.move_to_end(chave)
+            self.estatisticas['memoria'] += 1
+            return valor
+
+        i, j = self.index_of(origem), self.index_of(destino)
+        estado = int(self._estado[i, j])
+        if estado & DISTANCIA_CONHECIDA:
+            distancia = float(self._distancias[i, j])
+            self.estatisticas['disco'] += 1
+        else:
+            distancia = calculate_distance_points(parse_point(origem), parse_point(destino))
+            self._distancias[i, j] = distancia
+            self.estatisticas['calculados'] += 1
+        if estado & TEMPO_CONHECIDO:
+            minutos = float(self._minutos[i, j])
+        else:
+            minutos = calculate_travel_minutes(distancia)
+            self._minutos[i, j] = minutos
+        self._estado[i, j] = estado | DISTANCIA_CONHECIDA | TEMPO_CONHECIDO
+
+        valor = (distancia, minutos)
+        self._lru[chave] = valor
+        if len(self._lru) > self.capacidade_lru:
+            self._lru.popitem(last=False)
+        return valor
+
+    def load_road_times(self, tempos: pd.DataFrame) -> None:
+        """
+        Carrega tempos de deslocamento da rede viária, que substituem a estimativa euclidiana.
+
+        Args:
+            tempos: DataFrame com as colunas 'origem', 'destino' (strings
+                "lat,lon") e 'minutos'.
+        """
+        faltando = {'origem', 'destino', 'minutos'} - set(tempos.columns)
+        if faltando:
+            raise ValueError(f"Colunas ausentes nos tempos de rede: {', '.join(sorted(faltando))}.")
+        minutos = pd.to_numeric(tempos['minutos'], errors='coerce').to_numpy(dtype=float)
+        if np.isnan(minutos).any() or (minutos < 0).any():
+            raise ValueError("Tempos de rede devem ser números não negativos.")
+        origens = np.array([self.index_of(str(p)) for p in tempos['origem']], dtype=np.intp)
+        destinos = np.array([self.index_of(str(p)) for p in tempos['destino']], dtype=np.intp)
+        self._minutos[origens, destinos] = minutos
+        self._estado[origens, destinos] |= TEMPO_CONHECIDO | TEMPO_DE_REDE
+        self._tem_rede = self._tem_rede or len(tempos) > 0
+        self._lru.clear()
+
+    @property
+    def has_road_times(self) -> bool:
+        """Indica se algum par usa tempo de rede viária em vez da estimativa."""
+        return self._tem_rede
+
+    def __len__(self) -> int:
+        """Número de pontos indexados."""
+        return len(self._pontos)
+
+    def flush(self) -> None:
+        """Grava as matrizes e o índice de pontos na pasta (sem efeito em um cache só em memória)."""
+        if self.pasta is None:
+            return
+        for matriz in (self._distancias, self._minutos, self._estado):
+            matriz.flush()
+        meta = {
+            'capacidade': self._capacidade,
+            'avg_minutos': self._avg,
+            'tem_rede': self._tem_rede,
+            'pontos': self._pontos,
+        }
+        temporario = self._caminho(ARQUIVO_META + '.novo')
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(meta, arquivo, ensure_ascii=False)
+        os.replace(temporario, self._caminho(ARQUIVO_META))
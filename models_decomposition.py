@@ -0,0 +1,319 @@
+"""Decomposição da instância em subproblemas independentes resolvidos em paralelo.
+
+Linhas que exigem veículos de tipos diferentes nunca disputam o mesmo
+veículo, e motoristas raramente atravessam a fronteira entre garagens
+(coluna 'regiao'). Por isso a instância pode ser quebrada por tipo de veículo
+(e, opcionalmente, por região) e cada parte resolvida em um processo
+separado. Motoristas com mais de uma habilidade entram em todos os
+subproblemas dos seus tipos; uma passada final de reparo desfaz os conflitos
+que isso pode gerar e realoca as linhas liberadas na escala serial.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from models.domain import start_minutes
+from models.optimizer import calculate_distance_points, calculate_travel_minutes, cost_per_distance_unit, get_point
+from models.scheduler import build_point_table, create_schedule
+from models.timeline import Agendamento, DriverTimeline, as_timelines, build_timelines
+from services.data_loader import coordinates
+from services.metrics import RunMetrics
+
+# Chave usada quando a divisão por região está desativada
+TODAS_REGIOES = '*'
+
+
+class Subproblema(NamedTuple):
+    """Uma parte independente da instância: linhas, veículos e motoristas elegíveis."""
+    tipo: str
+    regiao: str
+    motoristas: pd.DataFrame
+    veiculos: pd.DataFrame
+    linhas: pd.DataFrame
+
+
+def _regiao_valida(valor: Any) -> bool:
+    return isinstance(valor, str) and valor.strip() != ''
+
+
+def _regioes_das_linhas(linhas: pd.DataFrame, motoristas: pd.DataFrame) -> pd.Series:
+    """
+    Define a região de cada linha.
+
+    Usa a coluna 'regiao' das linhas quando existir; caso contrário, cada
+    linha fica na região cujo centroide (média das localizações dos seus
+    motoristas) está mais próximo da origem da linha.
+    """
+    if 'regiao' in linhas.columns:
+        return linhas['regiao'].where(linhas['regiao'].map(_regiao_valida), TODAS_REGIOES)
+    com_regiao = motoristas[motoristas['regiao'].map(_regiao_valida)]
+    if com_regiao.empty or linhas.empty:
+        return pd.Series(TODAS_REGIOES, index=linhas.index)
+    pontos = pd.DataFrame(coordinates(com_regiao, 'localizacao'), columns=['lat', 'lon'], index=com_regiao.index)
+    centroides = pontos.groupby(com_regiao['regiao']).mean().sort_index()
+    origens = coordinates(linhas, 'origem')
+    distancias = np.linalg.norm(origens[:, None, :] - centroides.to_numpy()[None, :, :], axis=2)
+    return pd.Series(centroides.index.to_numpy()[distancias.argmin(axis=1)], index=linhas.index)
+
+
+def _repartir_veiculos(veiculos: pd.DataFrame, demanda: Dict[str, int]) -> Dict[str, List[Any]]:
+    """
+    Reparte os veículos de um tipo entre regiões, proporcionalmente à demanda.
+
+    Os veículos são distribuídos do mais econômico para o menos econômico,
+    cada um para a região com maior demanda por veículo já recebido (método
+    D'Hondt), de modo que todas as regiões recebem veículos baratos.
+
+    Returns:
+        Um dicionário {regiao: [índices do DataFrame de veículos]}.
+    """
+    registros = veiculos.to_dict('records')
+    ordem = sorted(range(len(registros)), key=lambda i: (cost_per_distance_unit(registros[i]), i))
+    partes: Dict[str, List[Any]] = {regiao: [] for regiao in demanda}
+    for i in ordem:
+        regiao = max(sorted(demanda), key=lambda r: demanda[r] / (len(partes[r]) + 1))
+        partes[regiao].append(veiculos.index[i])
+    return partes
+
+
+def split_instance(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    by_region: bool = False
+) -> List[Subproblema]:
+    """
+    Divide a instância em subproblemas independentes por tipo de veículo e, opcionalmente, por região.
+
+    Cada linha e cada veículo pertencem a exatamente um subproblema. Um
+    motorista entra em todos os subproblemas dos tipos que sabe dirigir (e da
+    sua região; motoristas sem região entram em todas).
+
+    Args:
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado de linhas.
+        by_region: Se True, divide também pela coluna 'regiao' dos motoristas.
+            Veículos sem coluna 'regiao' são repartidos entre as regiões
+            proporcionalmente ao número de linhas de cada uma.
+
+    Returns:
+        A lista de subproblemas ordenada por (tipo, região).
+    """
+    usar_regiao = by_region and 'regiao' in motoristas.columns
+    regiao_linha = _regioes_das_linhas(linhas, motoristas) if usar_regiao else pd.Series(TODAS_REGIOES, index=linhas.index)
+    if usar_regiao:
+        regiao_motorista = motoristas['regiao'].where(motoristas['regiao'].map(_regiao_valida), TODAS_REGIOES)
+    else:
+        regiao_motorista = pd.Series(TODAS_REGIOES, index=motoristas.index)
+    habilidades = motoristas['habilidades'] if 'habilidades' in motoristas.columns else pd.Series([[]] * len(motoristas), index=motoristas.index)
+
+    subproblemas = []
+    for tipo in sorted(linhas['tipo_veiculo_necessario'].dropna().unique()):
+        linhas_tipo = linhas[linhas['tipo_veiculo_necessario'] == tipo]
+        veiculos_tipo = veiculos[veiculos['tipo'] == tipo]
+        motoristas_tipo = motoristas[habilidades.map(lambda h: tipo in h)]
+        demanda = regiao_linha[linhas_tipo.index].value_counts().to_dict()
+
+        if usar_regiao and 'regiao' in veiculos.columns:
+            veiculos_por_regiao = {r: veiculos_tipo.index[veiculos_tipo['regiao'] == r].tolist() for r in demanda}
+        elif len(demanda) > 1:
+            veiculos_por_regiao = _repartir_veiculos(veiculos_tipo, demanda)
+        else:
+            veiculos_por_regiao = {r: veiculos_tipo.index.tolist() for r in demanda}
+
+        for regiao in sorted(demanda):
+            if regiao == TODAS_REGIOES:
+                motoristas_regiao = motoristas_tipo
+            else:
+                motoristas_regiao = motoristas_tipo[regiao_motorista[motoristas_tipo.index].isin({regiao, TODAS_REGIOES})]
+            subproblemas.append(Subproblema(
+                tipo=tipo,
+                regiao=regiao,
+                motoristas=motoristas_regiao,
+                veiculos=veiculos_tipo.loc[veiculos_por_regiao[regiao]],
+                linhas=linhas_tipo[regiao_linha[linhas_tipo.index] == regiao],
+            ))
+    return subproblemas
+
+
+def _resolver_subproblema(
+    subproblema: Subproblema,
+    motoristas_agendados: Dict[str, DriverTimeline],
+    new_driver_penalty: float,
+    engine: str,
+    improve_seconds: float,
+    medir: bool = False
+) -> Tuple[Dict[Any, Dict[str, Any]], Optional[RunMetrics]]:
+    """Resolve um subproblema (executado em um processo separado) e devolve suas métricas, se pedidas."""
+    metrics = RunMetrics() if medir else None
+    escala = create_schedule(
+        subproblema.motoristas, subproblema.veiculos, subproblema.linhas, motoristas_agendados,
+        new_driver_penalty, engine=engine, improve_seconds=improve_seconds, metrics=metrics
+    )
+    return escala, metrics
+
+
+def repair_conflicts(
+    escala: Dict[Any, Dict[str, Any]],
+    motoristas: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None,
+    pontos: Optional[Dict[str, Tuple[float, float]]] = None
+) -> List[Any]:
+    """
+    Remove da escala as linhas que tornam inviável a agenda de um motorista.
+
+    As linhas de cada motorista são revisadas em ordem cronológica com as
+    mesmas regras do agendador (jornada máxima, conflito de horário e tempo
+    de deslocamento a partir da viagem anterior). Em um conflito, a linha que
+    começa antes permanece. Só é necessário quando a escala vem de
+    subproblemas que compartilham motoristas.
+
+    Args:
+        escala: Escala combinada. É modificada: as linhas removidas saem dela.
+        motoristas: DataFrame pré-processado de motoristas.
+        linhas: DataFrame pré-processado com as linhas da escala.
+        motoristas_agendados: Agendamentos pré-existentes. Não é modificado.
+        pontos: Tabela de coordenadas (ver build_point_table).
+
+    Returns:
+        Os IDs das linhas removidas, na ordem em que foram removidas.
+    """
+    if pontos is None:
+        pontos = build_point_table(motoristas, linhas)
+    agendados_base = motoristas_agendados or {}
+    motorista_por_nome = {m['nome']: m for m in motoristas.to_dict('records')}
+    linha_por_id = {l['id']: l for l in linhas.to_dict('records')}
+
+    linhas_por_motorista: Dict[str, List[Dict[str, Any]]] = {}
+    for linha_id, info in escala.items():
+        if linha_id in linha_por_id:
+            linhas_por_motorista.setdefault(info['motorista'], []).append(linha_por_id[linha_id])
+
+    removidas = []
+    for nome in sorted(linhas_por_motorista, key=str):
+        motorista = motorista_por_nome.get(nome, {})
+        jornada_maxima_minutos = motorista.get('jornada_maxima_horas', 24) * 60
+        agenda = DriverTimeline(agendados_base.get(nome, ()))
+        for linha in sorted(linhas_por_motorista[nome], key=lambda l: (l['horario_inicio_min'], str(l['id']))):
+            viavel = (
+                agenda.minutos_trabalhados + linha['duracao_minutos'] <= jornada_maxima_minutos
+                and not agenda.has_conflict(linha['horario_inicio_min'], linha['horario_fim_min'])
+            )
+            if viavel:
+                anterior = agenda.previous_trip(linha['horario_inicio_min'])
+                partida = anterior[2] if anterior else motorista.get('localizacao')
+                if partida is not None:
+                    disponivel = anterior[1] if anterior else start_minutes(motorista.get('disponivel_a_partir_min'))
+                    distancia = calculate_distance_points(get_point(pontos, partida), get_point(pontos, linha['origem']))
+                    viavel = disponivel + calculate_travel_minutes(distancia) <= linha['horario_inicio_min']
+            if viavel:
+                agenda.insert(linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino'])
+            else:
+                del escala[linha['id']]
+                removidas.append(linha['id'])
+    return removidas
+
+
+def create_schedule_parallel(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, Union[DriverTimeline, List[Agendamento]]]] = None,
+    new_driver_penalty: float = 10000.0,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    workers: Optional[int] = None,
+    by_region: bool = False,
+    metrics: Optional[RunMetrics] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Cria a escala resolvendo cada subproblema (tipo de veículo / região) em paralelo.
+
+    Os subproblemas são resolvidos com ``create_schedule`` em um
+    ProcessPoolExecutor e combinados na ordem (tipo, região), o que torna o
+    resultado independente da ordem de término dos processos. Em seguida,
+    ``repair_conflicts`` desfaz conflitos de motoristas com várias
+    habilidades, e as linhas removidas ou sem veículo em sua região são
+    realocadas por uma última passada serial com os veículos que sobraram
+    (seguida de um novo reparo, já que essa passada encaixa linhas entre
+    viagens existentes).
+
+    Args:
+        motoristas: DataFrame de motoristas disponíveis.
+        veiculos: DataFrame de veículos disponíveis.
+        linhas: DataFrame de linhas a serem agendadas.
+        motoristas_agendados: Agendamentos existentes, atualizados no próprio
+            dicionário como em ``create_schedule``.
+        new_driver_penalty: Penalidade por novo motorista.
+        engine: Motor usado em cada subproblema.
+        improve_seconds: Orçamento de busca local de cada subproblema.
+        workers: Número máximo de processos. 1 resolve os subproblemas em
+            sequência no próprio processo; None usa o padrão do executor.
+        by_region: Se True, divide também por região (ver split_instance).
+        metrics: Se informado, recebe a soma das métricas dos subproblemas
+            (medidas em cada processo), da passada serial final e o número
+            de linhas removidas pelo reparo.
+
+    Returns:
+        A escala gerada, no mesmo formato de ``create_schedule``.
+    """
+    if motoristas_agendados is None:
+        motoristas_agendados = {}
+    agendados_base = {nome: agenda.copy() for nome, agenda in as_timelines(motoristas_agendados).items()}
+    subproblemas = [s for s in split_instance(motoristas, veiculos, linhas, by_region) if not s.linhas.empty]
+
+    tarefas = []
+    for subproblema in subproblemas:
+        nomes = set(subproblema.motoristas['nome'])
+        # Cópias: no modo serial, create_schedule modificaria as agendas base
+        agendados = {nome: agenda.copy() for nome, agenda in agendados_base.items() if nome in nomes}
+        tarefas.append((subproblema, agendados, new_driver_penalty, engine, improve_seconds, metrics is not None))
+
+    if workers == 1 or len(tarefas) <= 1:
+        resultados = [_resolver_subproblema(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(_resolver_subproblema, *tarefa) for tarefa in tarefas]
+            resultados = [futuro.result() for futuro in futuros]
+
+    escala_gerada = {}
+    for escala, metricas_subproblema in resultados:
+        escala_gerada.update(escala)
+        if metrics is not None:
+            metrics.merge(metricas_subproblema)
+
+    pontos = build_point_table(motoristas, linhas)
+    removidas = repair_conflicts(escala_gerada, motoristas, linhas, agendados_base, pontos)
+    if metrics is not None:
+        metrics.count('decomposicao.subproblemas', len(tarefas))
+        metrics.count('decomposicao.linhas_reparadas', len(removidas))
+
+    motoristas_agendados.clear()
+    motoristas_agendados.update(build_timelines(escala_gerada, linhas, agendados_base))
+
+    # Sem divisão por região, cada subproblema já viu todos os veículos e motoristas
+    # do seu tipo; só as linhas removidas pelo reparo voltam a ser tentadas.
+    if by_region:
+        pendentes = linhas[~linhas['id'].isin(escala_gerada.keys())]
+    else:
+        pendentes = linhas[linhas['id'].isin(removidas)]
+    veiculos_livres = veiculos[~veiculos['numero_carro'].isin({info['veiculo'] for info in escala_gerada.values()})]
+    if not pendentes.empty and not veiculos_livres.empty:
+        escala_gerada.update(create_schedule(
+            motoristas, veiculos_livres, pendentes, motoristas_agendados, new_driver_penalty, engine=engine,
+            metrics=metrics
+        ))
+        # Linhas encaixadas entre viagens já alocadas podem impedir a chegada à viagem seguinte
+        removidas = repair_conflicts(escala_gerada, motoristas, linhas, agendados_base, pontos)
+        if metrics is not None:
+            metrics.count('decomposicao.linhas_reparadas', len(removidas))
+        if removidas:
+            motoristas_agendados.clear()
+            motoristas_agendados.update(build_timelines(escala_gerada, linhas, agendados_base))
+    return escala_gerada
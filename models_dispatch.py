@@ -0,0 +1,220 @@
+"""Despacho online: aloca, uma a uma, linhas reservadas no mesmo dia sobre a escala em andamento.
+
+O estado de motoristas e veículos (agendas, origens das viagens e frota
+livre) fica em memória entre os eventos. Cada linha nova é decidida com as
+regras e custos de ``insertion_cost`` (models/repair.py), que já consideram
+uma linha caindo entre viagens existentes, mais as regras adicionais do
+despacho (ex: MinimumRestRule, RegionRule); um cancelamento devolve o
+motorista e o veículo. O trabalho por evento é proporcional ao número de
+motoristas com a habilidade exigida, independente de quantas linhas já
+foram despachadas.
+"""
+from __future__ import annotations
+
+from bisect import insort
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from models.fleet import VehicleIndex
+from models.optimizer import AVG_MINUTES_PER_DISTANCE_UNIT, Point, get_point
+from models.repair import insertion_cost
+from models.timeline import Agendamento, DriverTimeline, as_timelines
+from services.rule_engine import ConstraintEngine, Rule, default_rules
+
+# Campos obrigatórios de uma linha recebida pelo despacho
+CAMPOS_LINHA = ('id', 'origem', 'destino', 'horario_inicio', 'duracao_minutos', 'tipo_veiculo_necessario')
+
+
+def _minutos(horario: Any) -> int:
+    """Converte 'HH:MM' em minutos desde a meia-noite, validando o formato."""
+    try:
+        horas, minutos = (int(parte) for parte in str(horario).split(':'))
+    except ValueError:
+        raise ValueError(f"Horário inválido: {horario!r}. Use o formato HH:MM.") from None
+    if not (0 <= horas < 24 and 0 <= minutos < 60):
+        raise ValueError(f"Horário inválido: {horario!r}. Use o formato HH:MM.")
+    return horas * 60 + minutos
+
+
+class DispatchEngine:
+    """
+    Estado em memória de um dia de operação, atualizado por linhas adicionadas e canceladas.
+
+    Attributes:
+        escala: Escala corrente {linha_id: {'motorista', 'veiculo', 'horario'}}.
+    """
+
+    def __init__(
+        self,
+        motoristas: pd.DataFrame,
+        veiculos: pd.DataFrame,
+        linhas: Optional[pd.DataFrame] = None,
+        escala: Optional[Dict[Any, Dict[str, Any]]] = None,
+        motoristas_agendados: Optional[Dict[str, Union[DriverTimeline, List[Agendamento]]]] = None,
+        new_driver_penalty: float = 10000.0,
+        extra_rules: Sequence[Rule] = ()
+    ) -> None:
+        """
+        Args:
+            motoristas: DataFrame pré-processado de motoristas.
+            veiculos: DataFrame de veículos.
+            linhas: DataFrame pré-processado com as linhas da escala inicial.
+            escala: Escala inicial do dia (ex: a gerada por create_schedule,
+                incluindo as exceções manuais). Não é modificada.
+            motoristas_agendados: Compromissos dos motoristas fora da escala.
+                Não é modificado.
+            new_driver_penalty: Penalidade por novo motorista.
+            extra_rules: Regras de viabilidade adicionais às do motor guloso,
+                na forma escalar (ver services/rule_engine.py), aplicadas às
+                linhas despachadas.
+
+        Raises:
+            ValueError: Se alguma regra adicional não tiver a forma escalar.
+        """
+        self.new_driver_penalty = new_driver_penalty
+        self._restricoes = ConstraintEngine(default_rules(AVG_MINUTES_PER_DISTANCE_UNIT, extra_rules))
+        self._restricoes.require_scalar()
+        self._restricoes.prepare(motoristas)
+        self._motoristas = motoristas.to_dict('records')
+        self._por_habilidade: Dict[Any, List[int]] = {}
+        for chave, motorista in enumerate(self._motoristas):
+            for habilidade in motorista.get('habilidades', []):
+                self._por_habilidade.setdefault(habilidade, []).append(chave)
+
+        base = as_timelines(dict(motoristas_agendados or {}))
+        self._nomes_base = set(base)
+        self._agendas: Dict[str, DriverTimeline] = {nome: agenda.copy() for nome, agenda in base.items()}
+        self._origens: Dict[str, List[Tuple[float, str]]] = {}
+        self._pontos: Dict[str, Point] = {}
+        self._linhas: Dict[Any, Dict[str, Any]] = {}
+        self._veiculos = VehicleIndex(veiculos.to_dict('records'))
+        self.escala: Dict[Any, Dict[str, Any]] = {}
+
+        if escala and linhas is not None:
+            for linha in linhas[linhas['id'].isin(escala.keys())].to_dict('records'):
+                info = escala[linha['id']]
+                self._linhas[linha['id']] = linha
+                self._ocupar(linha, dict(info))
+
+    def __len__(self) -> int:
+        """Número de linhas alocadas (da escala inicial ou despachadas)."""
+        return len(self._linhas)
+
+    def _ocupar(self, linha: Dict[str, Any], info: Dict[str, Any]) -> None:
+        """Registra a alocação da linha na escala, na agenda do motorista e na frota."""
+        nome = info['motorista']
+        self.escala[linha['id']] = info
+        self._agendas.setdefault(nome, DriverTimeline()).insert(
+            linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino']
+        )
+        insort(self._origens.setdefault(nome, []), (linha['horario_inicio_min'], linha['origem']))
+        if info.get('veiculo') is not None:
+            self._veiculos.allocate(info['veiculo'])
+
+    def _ponto(self, linha: Dict[str, Any], campo: str) -> Point:
+        """Converte a coordenada 'lat,lon' de um campo da linha, validando o formato."""
+        try:
+            return get_point(self._pontos, linha[campo])
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError(f"Coordenada inválida em '{campo}' na linha {linha['id']}: {linha[campo]!r}. "
+                             "Use o formato 'lat,lon'.") from None
+
+    def add_line(self, linha: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Aloca uma linha nova ao melhor motorista e ao veículo livre mais barato do tipo.
+
+        Args:
+            linha: Registro com os campos de CAMPOS_LINHA ('horario_inicio'
+                no formato 'HH:MM').
+
+        Returns:
+            A alocação {'motorista', 'veiculo', 'horario'} ou None se nenhum
+            motorista ou veículo puder assumir a linha. Só uma linha alocada
+            fica registrada: uma linha recusada pode ser reenviada com o mesmo ID.
+
+        Raises:
+            ValueError: Se faltar algum campo, o horário, a duração ou as
+                coordenadas forem inválidos ou a linha já existir.
+        """
+        faltando = [campo for campo in CAMPOS_LINHA if campo not in linha]
+        if faltando:
+            raise ValueError(f"Campos ausentes na linha: {', '.join(faltando)}.")
+        if linha['id'] in self._linhas:
+            raise ValueError(f"Linha {linha['id']} já existe.")
+        try:
+            duracao = float(linha['duracao_minutos'])
+        except (TypeError, ValueError):
+            duracao = float('nan')
+        if not duracao >= 0:
+            raise ValueError(f"Duração inválida na linha {linha['id']}: {linha['duracao_minutos']!r}.")
+        # Campos além de CAMPOS_LINHA (ex: 'regiao') ficam para as regras adicionais
+        registro = dict(linha)
+        registro['duracao_minutos'] = duracao
+        registro['horario_inicio_min'] = _minutos(linha['horario_inicio'])
+        registro['horario_fim_min'] = registro['horario_inicio_min'] + duracao
+        origem = self._ponto(registro, 'origem')
+        destino = self._ponto(registro, 'destino')
+
+        veiculo = self._veiculos.peek(registro['tipo_veiculo_necessario'])
+        if veiculo is None:
+            return None
+
+        # Motoristas sem viagens custam ao menos a penalidade: só são avaliados se ninguém em rota
+        # custar menos. Empates vão para o primeiro motorista na ordem original, como no motor guloso.
+        melhor, melhor_custo = None, float('inf')
+        novos = []
+        for chave in self._por_habilidade.get(registro['tipo_veiculo_necessario'], ()):
+            motorista = self._motoristas[chave]
+            if motorista['nome'] not in self._agendas:
+                novos.append(chave)
+                continue
+            custo = insertion_cost(motorista, registro, origem, destino, veiculo, self._agendas, self._origens,
+                                   self._pontos, chave, self._restricoes)
+            if custo < melhor_custo:
+                melhor, melhor_custo = chave, custo
+        if melhor_custo >= self.new_driver_penalty:
+            for chave in novos:
+                custo = self.new_driver_penalty + insertion_cost(
+                    self._motoristas[chave], registro, origem, destino, veiculo, self._agendas, self._origens,
+                    self._pontos, chave, self._restricoes
+                )
+                if custo < melhor_custo or (custo == melhor_custo and melhor is not None and chave < melhor):
+                    melhor, melhor_custo = chave, custo
+        if melhor is None:
+            return None
+
+        info = {'motorista': self._motoristas[melhor]['nome'], 'veiculo': veiculo['numero_carro'],
+                'horario': registro['horario_inicio']}
+        self._linhas[registro['id']] = registro
+        self._ocupar(registro, info)
+        return info
+
+    def cancel_line(self, linha_id: Any) -> Dict[str, Any]:
+        """
+        Cancela uma linha, liberando o motorista e o veículo.
+
+        Args:
+            linha_id: ID da linha (da escala inicial ou adicionada depois).
+
+        Returns:
+            A alocação liberada.
+
+        Raises:
+            ValueError: Se a linha não estiver alocada (desconhecida, já
+                cancelada ou recusada por add_line).
+        """
+        linha = self._linhas.pop(linha_id, None)
+        if linha is None:
+            raise ValueError(f"Linha {linha_id} não encontrada.")
+        info = self.escala.pop(linha_id)
+        nome = info['motorista']
+        agenda = self._agendas[nome]
+        agenda.remove(linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino'])
+        self._origens[nome].remove((linha['horario_inicio_min'], linha['origem']))
+        # Sem nenhuma viagem, o motorista volta a contar como novo (com penalidade)
+        if not len(agenda) and nome not in self._nomes_base:
+            del self._agendas[nome]
+        if info.get('veiculo') is not None:
+            self._veiculos.release(info['veiculo'])
+        return info
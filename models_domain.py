@@ -0,0 +1,227 @@
+"""Modelo compacto de motoristas e linhas, em colunas indexadas por inteiros.
+
+Os motores recebem DataFrames, mas não precisam de um dicionário por
+registro: cada entidade vira uma posição (chave inteira) em colunas paralelas
+-- listas de strings internadas, arrays numéricos e máscaras de bits de
+habilidades. Os laços internos comparam inteiros e indexam listas em vez de
+fazer ``.get()`` com chaves de texto, e os nomes e IDs só são usados na
+montagem da saída.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Habilidades distintas que cabem na máscara de bits (um int64 por motorista)
+MAX_HABILIDADES = 63
+
+
+def _textos(valores: Iterable[Any]) -> List[Any]:
+    """Interna as strings (uma única cópia por valor distinto); outros valores ficam como estão."""
+    return [sys.intern(v) if type(v) is str else v for v in valores]
+
+
+def _coluna(df: pd.DataFrame, coluna: str, padrao: Any) -> List[Any]:
+    """Valores da coluna como lista, ou o valor padrão para todas as linhas se ela não existir."""
+    if coluna in df.columns:
+        return df[coluna].tolist()
+    return [padrao] * len(df)
+
+
+def start_minutes(valor: Any) -> float:
+    """Valor de 'disponivel_a_partir_min' de um motorista, com 0 para ausente ou NaN."""
+    return 0.0 if valor is None or valor != valor else float(valor)
+
+
+class SkillBits:
+    """
+    Atribui um bit a cada habilidade (tipo de veículo), na ordem em que aparecem.
+
+    Conjuntos de habilidades viram inteiros, e "o motorista tem a habilidade"
+    vira ``mascara & bit != 0`` -- também de forma vetorizada, sobre um array
+    de máscaras.
+    """
+
+    __slots__ = ('_bits',)
+
+    def __init__(self) -> None:
+        self._bits: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def __iter__(self):
+        return iter(self._bits)
+
+    def bit(self, habilidade: Any) -> int:
+        """
+        Bit da habilidade, atribuído na primeira vez em que ela aparece.
+
+        Raises:
+            ValueError: Se já houver MAX_HABILIDADES habilidades distintas.
+        """
+        bit = self._bits.get(habilidade)
+        if bit is None:
+            if len(self._bits) >= MAX_HABILIDADES:
+                raise ValueError(f"Mais de {MAX_HABILIDADES} habilidades distintas não cabem na máscara de bits.")
+            bit = self._bits[habilidade] = 1 << len(self._bits)
+        return bit
+
+    def get(self, habilidade: Any) -> int:
+        """Bit da habilidade, ou 0 se ela nunca apareceu."""
+        return self._bits.get(habilidade, 0)
+
+    def mask(self, habilidades: Iterable[Any]) -> int:
+        """Máscara com os bits de todas as habilidades."""
+        mascara = 0
+        for habilidade in habilidades:
+            mascara |= self.bit(habilidade)
+        return mascara
+
+
+class DriverTable:
+    """
+    Motoristas em colunas paralelas, na ordem do DataFrame (a chave de cada um é a sua posição).
+
+    Attributes:
+        nomes: Nomes internados.
+        localizacoes: Coordenadas de casa ("lat,lon"), internadas.
+        habilidades: Tupla de habilidades de cada motorista (tuplas iguais
+            são compartilhadas).
+        mascaras: Máscara de bits das habilidades (ver SkillBits), em um
+            array de inteiros.
+        disponivel: 1 se a disponibilidade é 'disponivel', 0 caso contrário.
+        jornada_minutos: Jornada máxima, em minutos.
+        disponivel_a_partir: Horário, em minutos, a partir do qual o motorista
+            sai de casa (ex: o fim do descanso após a jornada da véspera); 0
+            por padrão. Não conta como viagem nem como minutos trabalhados.
+        bits: Bits das habilidades.
+        por_habilidade: {habilidade: array de chaves} em ordem crescente,
+            incluindo os indisponíveis (os motores os contam como candidatos
+            podados).
+        chave_por_nome: {nome: primeira chave}, na ordem em que os nomes aparecem.
+        repetidos: {nome: [chaves]} só dos nomes que aparecem mais de uma vez
+            (eles compartilham a agenda); ver keys_for.
+    """
+
+    __slots__ = ('nomes', 'localizacoes', 'habilidades', 'mascaras', 'disponivel', 'jornada_minutos',
+                 'disponivel_a_partir', 'bits', 'por_habilidade', 'chave_por_nome', 'repetidos')
+
+    def __init__(self, motoristas: pd.DataFrame) -> None:
+        """
+        Args:
+            motoristas: DataFrame pré-processado de motoristas ('habilidades'
+                como listas). 'disponibilidade', 'jornada_maxima_horas',
+                'habilidades' e 'disponivel_a_partir_min' são opcionais, com
+                os mesmos padrões dos motores ('disponivel', 24 h, nenhuma e 0).
+        """
+        self._montar(
+            motoristas['nome'].tolist(),
+            _coluna(motoristas, 'localizacao', None),
+            _coluna(motoristas, 'habilidades', []),
+            _coluna(motoristas, 'disponibilidade', 'disponivel'),
+            _coluna(motoristas, 'jornada_maxima_horas', 24),
+            _coluna(motoristas, 'disponivel_a_partir_min', 0),
+        )
+
+    @classmethod
+    def from_records(cls, registros: Sequence[Dict[str, Any]]) -> DriverTable:
+        """Monta a tabela a partir de registros (dicionários), com os mesmos padrões do construtor."""
+        tabela = cls.__new__(cls)
+        tabela._montar(
+            [r['nome'] for r in registros],
+            [r.get('localizacao') for r in registros],
+            [r.get('habilidades', []) for r in registros],
+            [r.get('disponibilidade', 'disponivel') for r in registros],
+            [r.get('jornada_maxima_horas', 24) for r in registros],
+            [r.get('disponivel_a_partir_min', 0) for r in registros],
+        )
+        return tabela
+
+    def _montar(
+        self,
+        nomes: List[Any],
+        localizacoes: List[Any],
+        habilidades: List[Iterable[Any]],
+        disponibilidades: List[Any],
+        jornadas: List[float],
+        inicios: List[float]
+    ) -> None:
+        self.nomes = _textos(nomes)
+        self.localizacoes = _textos(localizacoes)
+        self.bits = SkillBits()
+        combinacoes: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+        self.habilidades: List[Tuple[Any, ...]] = []
+        self.mascaras = np.zeros(len(nomes), dtype=np.int64)
+        self.por_habilidade: Dict[Any, array] = {}
+        self.chave_por_nome: Dict[Any, int] = {}
+        self.repetidos: Dict[Any, List[int]] = {}
+        for chave, (nome, lista) in enumerate(zip(self.nomes, habilidades)):
+            tupla = tuple(lista)
+            tupla = combinacoes.setdefault(tupla, tupla)
+            self.habilidades.append(tupla)
+            self.mascaras[chave] = self.bits.mask(tupla)
+            for habilidade in tupla:
+                chaves = self.por_habilidade.get(habilidade)
+                if chaves is None:
+                    chaves = self.por_habilidade[habilidade] = array('q')
+                chaves.append(chave)
+            primeira = self.chave_por_nome.setdefault(nome, chave)
+            if primeira != chave:
+                self.repetidos.setdefault(nome, [primeira]).append(chave)
+        self.disponivel = bytearray(d == 'disponivel' for d in disponibilidades)
+        self.jornada_minutos = array('d', (j * 60 for j in jornadas))
+        self.disponivel_a_partir = array('d', (start_minutes(inicio) for inicio in inicios))
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def keys_for(self, nome: Any) -> List[int]:
+        """Chaves de todas as linhas do motorista com esse nome."""
+        repetidas = self.repetidos.get(nome)
+        return repetidas if repetidas is not None else [self.chave_por_nome[nome]]
+
+    def with_skill(self, habilidade: Any) -> np.ndarray:
+        """Máscara booleana (vetorizada) dos motoristas que têm a habilidade."""
+        return (self.mascaras & self.bits.get(habilidade)) != 0
+
+
+class LineTable:
+    """
+    Linhas em colunas paralelas, na ordem do DataFrame, com a ordem de processamento por horário.
+
+    Attributes:
+        ids: IDs das linhas.
+        origens, destinos: Coordenadas ("lat,lon"), internadas.
+        horarios: Horário de início original ('HH:MM').
+        inicio, fim, duracao: Início, término e duração, em minutos.
+        tipos: Tipo de veículo exigido, internado.
+        ordem: Chaves das linhas em ordem de início (ordenação estável, como
+            ``sort_values(kind='stable')``).
+    """
+
+    __slots__ = ('ids', 'origens', 'destinos', 'horarios', 'inicio', 'fim', 'duracao', 'tipos', 'ordem')
+
+    def __init__(self, linhas: pd.DataFrame) -> None:
+        """
+        Args:
+            linhas: DataFrame pré-processado de linhas (com 'horario_inicio_min'
+                e 'horario_fim_min').
+        """
+        self.ids = linhas['id'].tolist()
+        self.origens = _textos(linhas['origem'].tolist())
+        self.destinos = _textos(linhas['destino'].tolist())
+        self.horarios = _textos(linhas['horario_inicio'].tolist())
+        self.tipos = _textos(linhas['tipo_veiculo_necessario'].tolist())
+        # Listas de números nativos: a leitura no laço não cria objetos numpy
+        self.inicio = linhas['horario_inicio_min'].tolist()
+        self.fim = linhas['horario_fim_min'].tolist()
+        self.duracao = linhas['duracao_minutos'].tolist()
+        self.ordem = np.argsort(linhas['horario_inicio_min'].to_numpy(), kind='stable').tolist()
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,287 @@
+"""Índices da frota: veículos livres ordenados pelo custo de deslocamento e linha do tempo de cada veículo."""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from models.optimizer import (Point, calculate_distance_points, calculate_travel_minutes, cost_per_distance_unit,
+                              get_point)
+from models.spatial import DriverGrid, cell_size_for
+from models.timeline import DriverTimeline
+
+# Veículos por célula buscados ao dimensionar a grade da FleetTimeline
+VEICULOS_POR_CELULA = 16
+
+
+class VehicleIndex:
+    """
+    Fila de prioridade, por tipo de veículo, dos veículos ainda não alocados.
+
+    A chave é o custo por unidade de distância (seguido da ordem original
+    como desempate). Como o custo de deslocamento depende apenas do consumo
+    do veículo, o topo de cada fila é o melhor veículo para qualquer
+    motorista, obtido em O(1). Veículos alocados são removidos de forma
+    preguiçosa, ao chegarem ao topo, em O(log V) amortizado.
+    """
+
+    def __init__(self, veiculos: Iterable[Dict[str, Any]]) -> None:
+        """
+        Args:
+            veiculos: Registros de veículos (ex: DataFrame.to_dict('records')).
+                Veículos indisponíveis ou sem custo válido são ignorados.
+        """
+        self._filas: Dict[Any, List[Tuple[float, int, Dict[str, Any]]]] = {}
+        self._entradas: Dict[Any, Tuple[float, int, Dict[str, Any]]] = {}
+        self._alocados: Set[Any] = set()
+        for ordem, veiculo in enumerate(veiculos):
+            if veiculo.get('disponibilidade', 'disponivel') != 'disponivel':
+                continue
+            custo_km = cost_per_distance_unit(veiculo)
+            if math.isnan(custo_km):  # Custo NaN: o veículo nunca seria escolhido
+                continue
+            self._entradas[veiculo['numero_carro']] = (custo_km, ordem, veiculo)
+            self._filas.setdefault(veiculo.get('tipo'), []).append((custo_km, ordem, veiculo))
+        for fila in self._filas.values():
+            heapq.heapify(fila)
+
+    def peek(self, tipo: Any) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o veículo livre mais barato do tipo informado, sem alocá-lo.
+
+        Args:
+            tipo: O tipo de veículo (ex: 'simples').
+
+        Returns:
+            O registro do veículo ou None se não houver veículo livre do tipo.
+        """
+        fila = self._filas.get(tipo)
+        if not fila:
+            return None
+        while fila and fila[0][2]['numero_carro'] in self._alocados:
+            heapq.heappop(fila)
+        return fila[0][2] if fila else None
+
+    def allocate(self, numero_carro: Any) -> None:
+        """
+        Marca um veículo como alocado, retirando-o de todas as filas.
+
+        Args:
+            numero_carro: Identificador do veículo.
+        """
+        self._alocados.add(numero_carro)
+
+    def release(self, numero_carro: Any) -> None:
+        """
+        Devolve um veículo alocado à fila do seu tipo (ex: linha cancelada).
+
+        Args:
+            numero_carro: Identificador do veículo. Veículos fora do índice
+                (indisponíveis ou sem custo válido) são ignorados.
+        """
+        if numero_carro not in self._alocados:
+            return
+        self._alocados.discard(numero_carro)
+        entrada = self._entradas.get(numero_carro)
+        if entrada is not None:
+            # A entrada antiga pode continuar na fila: duplicatas apontam para o mesmo veículo
+            heapq.heappush(self._filas.setdefault(entrada[2].get('tipo'), []), entrada)
+
+
+def vehicle_timelines(escala: Dict[Any, Dict[str, Any]], linhas: pd.DataFrame) -> Dict[Any, DriverTimeline]:
+    """
+    Monta as linhas do tempo dos veículos a partir de uma escala (ex: as exceções manuais).
+
+    Args:
+        escala: Escala no formato {linha_id: {'motorista', 'veiculo', 'horario'}}.
+        linhas: DataFrame pré-processado com as linhas da escala. Linhas ausentes
+            do DataFrame ou sem veículo são ignoradas.
+
+    Returns:
+        Um dicionário {numero_carro: DriverTimeline}.
+    """
+    agendas: Dict[Any, DriverTimeline] = {}
+    linha_por_id = dict(zip(linhas['id'], zip(linhas['horario_inicio_min'], linhas['horario_fim_min'],
+                                               linhas['destino'])))
+    for linha_id, info in escala.items():
+        dados = linha_por_id.get(linha_id)
+        numero = info.get('veiculo')
+        if dados is None or numero is None or (isinstance(numero, float) and math.isnan(numero)):
+            continue
+        agendas.setdefault(numero, DriverTimeline()).insert(*dados)
+    return agendas
+
+
+class FleetTimeline:
+    """
+    Frota ao longo do dia, com veículos reaproveitados entre viagens que não se sobrepõem.
+
+    Cada veículo tem uma agenda (DriverTimeline), a posição onde termina a
+    sua última viagem e o horário em que fica livre. Um veículo ainda sem
+    viagens sai da garagem e serve qualquer linha do seu tipo; um veículo já
+    usado só serve uma linha se, livre no fim da última viagem, chega à
+    origem dela até o início (com o mesmo tempo de deslocamento dos
+    motoristas). O reposicionamento do veículo não entra no custo: o
+    deslocamento cobrado continua sendo o do motorista.
+
+    A escolha segue o critério de VehicleIndex -- menor custo por unidade de
+    distância -- e, na mesma faixa de custo, prefere um veículo já em uso (o
+    da célula mais próxima da origem e, nela, o de menor ordem) a tirar
+    outro da garagem. Os veículos usados de cada (tipo, custo) ficam em uma
+    grade (DriverGrid), então a consulta visita células, e não a frota
+    inteira. As consultas devem ser feitas em ordem crescente de horário.
+
+    Attributes:
+        agendas: Agendas {numero_carro: DriverTimeline}, com as viagens
+            pré-existentes e as alocadas por ``allocate``.
+    """
+
+    def __init__(
+        self,
+        veiculos: Iterable[Dict[str, Any]],
+        pontos: Dict[str, Point],
+        veiculos_agendados: Optional[Dict[Any, DriverTimeline]] = None,
+        tamanho_celula: Optional[float] = None
+    ) -> None:
+        """
+        Args:
+            veiculos: Registros de veículos. Veículos indisponíveis ou sem
+                custo válido são ignorados, como em VehicleIndex.
+            pontos: Tabela de coordenadas já convertidas.
+            veiculos_agendados: Agendas pré-existentes (ex: exceções manuais),
+                atualizadas no próprio dicionário com as novas viagens. Um
+                veículo com agenda só volta a ser oferecido depois do início
+                da sua primeira viagem e nunca em conflito com as demais.
+            tamanho_celula: Lado das células (None escolhe por cell_size_for).
+        """
+        self._pontos = pontos
+        self.agendas: Dict[Any, DriverTimeline] = veiculos_agendados if veiculos_agendados is not None else {}
+        self._veiculos: List[Dict[str, Any]] = []
+        self._chave_por_numero: Dict[Any, int] = {}
+        self._faixa: List[Tuple[Any, float]] = []
+        self._custos: Dict[Any, List[float]] = {}
+        self._garagem: Dict[Tuple[Any, float], List[int]] = {}
+        for veiculo in veiculos:
+            if veiculo.get('disponibilidade', 'disponivel') != 'disponivel':
+                continue
+            custo_km = cost_per_distance_unit(veiculo)
+            if math.isnan(custo_km):
+                continue
+            chave = len(self._veiculos)
+            faixa = (veiculo.get('tipo'), custo_km)
+            self._veiculos.append(veiculo)
+            self._chave_por_numero[veiculo['numero_carro']] = chave
+            self._faixa.append(faixa)
+            if veiculo['numero_carro'] not in self.agendas:
+                self._garagem.setdefault(faixa, []).append(chave)
+        for tipo, custo_km in set(self._faixa):
+            self._custos.setdefault(tipo, []).append(custo_km)
+        for custos in self._custos.values():
+            custos.sort()
+
+        # Uma grade por faixa, com células dimensionadas pelos veículos da faixa (e não pelo número de pontos)
+        por_faixa: Dict[Tuple[Any, float], int] = {}
+        for faixa in self._faixa:
+            por_faixa[faixa] = por_faixa.get(faixa, 0) + 1
+        n_veiculos = max(len(self._veiculos), 1)
+        lado_frota = tamanho_celula or cell_size_for(pontos.values(),
+                                                     max(1, len(pontos) * VEICULOS_POR_CELULA // n_veiculos))
+        self._grades: Dict[Tuple[Any, float], DriverGrid] = {
+            faixa: DriverGrid(lado_frota if tamanho_celula else lado_frota * math.sqrt(n_veiculos / n_faixa))
+            for faixa, n_faixa in por_faixa.items()
+        }
+        self._posicao: Dict[int, Point] = {}
+        self._livre_em: Dict[int, float] = {}
+        self._usados: Set[int] = set()
+        # Viagens pré-existentes entram no estado quando começam: (início, término, chave, destino)
+        self._pendentes: List[Tuple[float, float, int, str]] = []
+        self._com_agenda: Set[int] = set()
+        for numero, agenda in self.agendas.items():
+            chave = self._chave_por_numero.get(numero)
+            if chave is None:
+                continue
+            self._com_agenda.add(chave)
+            self._pendentes.extend((inicio, fim, chave, destino) for inicio, fim, destino in agenda)
+        heapq.heapify(self._pendentes)
+
+    def _mover(self, chave: int, fim: float, destino: Point) -> None:
+        """Atualiza posição e horário livre do veículo se a viagem termina depois da atual."""
+        if fim < self._livre_em.get(chave, -math.inf):
+            return
+        self._posicao[chave] = destino
+        self._livre_em[chave] = fim
+        self._grades[self._faixa[chave]].update(chave, destino, fim)
+
+    def _avancar(self, horario: float) -> None:
+        """Registra as viagens pré-existentes que começam até o horário."""
+        while self._pendentes and self._pendentes[0][0] <= horario:
+            _, fim, chave, destino = heapq.heappop(self._pendentes)
+            self._mover(chave, fim, get_point(self._pontos, destino))
+
+    def _alcanca(self, chave: int, origem: Point, inicio: float, fim: float) -> bool:
+        """Se o veículo usado chega à origem a tempo e não tem viagem pré-existente no intervalo."""
+        distancia = calculate_distance_points(self._posicao[chave], origem)
+        # Distância NaN (coordenada inválida): sem limite, como no índice dos motoristas
+        if self._livre_em[chave] + calculate_travel_minutes(distancia) > inicio:
+            return False
+        if chave in self._com_agenda:
+            return not self.agendas[self._veiculos[chave]['numero_carro']].has_conflict(inicio, fim)
+        return True
+
+    def _reaproveitavel(self, faixa: Tuple[Any, float], origem: Point, inicio: float, fim: float) -> Optional[int]:
+        """Veículo já usado da faixa que pode fazer a linha: o da célula mais próxima e, nela, o de menor ordem."""
+        for _, chaves in self._grades[faixa].query_by_distance(origem, inicio):
+            validas = [chave for chave in chaves if self._alcanca(chave, origem, inicio, fim)]
+            if validas:
+                return min(validas)
+        return None
+
+    def _da_garagem(self, faixa: Tuple[Any, float]) -> Optional[int]:
+        """Veículo ainda sem viagens da faixa, na ordem original."""
+        fila = self._garagem.get(faixa)
+        while fila and fila[0] in self._usados:
+            heapq.heappop(fila)
+        return fila[0] if fila else None
+
+    def peek(self, tipo: Any, origem: Point, inicio: float, fim: float) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o veículo mais barato do tipo que pode fazer a linha, sem alocá-lo.
+
+        Args:
+            tipo: O tipo de veículo (ex: 'simples').
+            origem: Ponto de partida da linha.
+            inicio: Início da linha, em minutos (não decrescente entre chamadas).
+            fim: Término da linha, em minutos.
+
+        Returns:
+            O registro do veículo ou None se nenhum veículo do tipo puder fazê-la.
+        """
+        self._avancar(inicio)
+        for custo_km in self._custos.get(tipo, ()):
+            faixa = (tipo, custo_km)
+            chave = self._reaproveitavel(faixa, origem, inicio, fim)
+            if chave is None:
+                chave = self._da_garagem(faixa)
+            if chave is not None:
+                return self._veiculos[chave]
+        return None
+
+    def allocate(self, numero_carro: Any, inicio: float, fim: float, destino: str) -> None:
+        """
+        Registra uma viagem do veículo, que fica livre no término, no destino.
+
+        Args:
+            numero_carro: Identificador do veículo. Veículos fora do índice
+                (indisponíveis ou sem custo válido) são ignorados.
+            inicio: Início da viagem, em minutos.
+            fim: Término da viagem, em minutos.
+            destino: Ponto final da viagem ("lat,lon").
+        """
+        chave = self._chave_por_numero.get(numero_carro)
+        if chave is None:
+            return
+        self.agendas.setdefault(numero_carro, DriverTimeline()).insert(inicio, fim, destino)
+        self._usados.add(chave)
+        self._mover(chave, fim, get_point(self._pontos, destino))
@@ -0,0 +1,318 @@
+"""Motor heurístico de encadeamento de viagens via emparelhamento bipartido de custo mínimo.
+
+O encadeamento é modelado como uma cobertura de caminhos de custo mínimo no
+grafo acíclico das linhas (ordenadas no tempo): cada linha escolhe exatamente
+um predecessor, que pode ser outra linha compatível (custo do deslocamento
+entre o destino de uma e a origem da outra), um motorista que abre uma nova
+cadeia (penalidade por novo motorista + deslocamento a partir de casa) ou,
+em último caso, ficar sem alocação (custo proibitivo). Cada predecessor é
+usado no máximo uma vez, o que torna o problema uma atribuição retangular,
+resolvida por caminhos mínimos sucessivos (Dijkstra com potenciais) em
+Python puro.
+
+O resultado é uma heurística, não o ótimo do encadeamento:
+
+- por padrão, o grafo é podado: cada linha mantém só os MAX_CANDIDATES
+  predecessores mais baratos (linhas e motoristas juntos), então uma cadeia
+  que dependa de um predecessor descartado não é considerada. Com
+  ``max_candidates=None`` a atribuição é exata sobre o grafo completo, cujas
+  arestas crescem com o quadrado do número de linhas (com 3.000 linhas, cerca
+  de dez vezes mais lento que o grafo podado);
+- a jornada máxima e os conflitos com agendas prévias não entram na
+  atribuição: as cadeias são cortadas depois, com as regras do motor
+  guloso, e as linhas que sobram são alocadas com as regras e custos do
+  motor guloso sobre as cadeias formadas (models.repair.allocate_lines).
+"""
+from __future__ import annotations
+
+import heapq
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.domain import DriverTable
+from models.fleet import VehicleIndex
+from models.optimizer import (AVG_MINUTES_PER_DISTANCE_UNIT, Point, calculate_distance_points,
+                              calculate_distances, calculate_travel_minutes, cost_per_distance_unit, get_point)
+from models.repair import allocate_lines
+from models.timeline import DriverTimeline
+from services.metrics import RunMetrics, timer
+
+# Número máximo de predecessores (linhas ou motoristas) mantidos por linha
+MAX_CANDIDATES = 30
+
+
+def solve_assignment(n_colunas: int, arestas: Sequence[Sequence[Tuple[int, float]]]) -> List[int]:
+    """
+    Resolve uma atribuição retangular de custo mínimo sobre um grafo esparso.
+
+    Cada linha (índice de ``arestas``) é atribuída a exatamente uma coluna e
+    cada coluna recebe no máximo uma linha. Usa o método húngaro na forma de
+    caminhos mínimos sucessivos com potenciais, de modo que o Dijkstra só
+    percorre custos reduzidos não negativos.
+
+    Args:
+        n_colunas: Número de colunas.
+        arestas: Para cada linha, a lista de pares (coluna, custo). Toda linha
+            precisa ter ao menos uma coluna exclusiva que garanta viabilidade.
+
+    Returns:
+        A coluna atribuída a cada linha.
+    """
+    inf = float('inf')
+    linha_da_coluna = [-1] * n_colunas
+    coluna_da_linha = [-1] * len(arestas)
+    u = [0.0] * len(arestas)
+    v = [0.0] * n_colunas
+
+    for r0, arestas_r0 in enumerate(arestas):
+        u[r0] = min(custo - v[c] for c, custo in arestas_r0)
+        dist: Dict[int, float] = {}
+        pred: Dict[int, int] = {}
+        finalizadas: Dict[int, float] = {}
+        linhas_visitadas = [(r0, 0.0)]
+        fila: List[Tuple[float, int]] = []
+
+        def relaxar(r: int, base: float) -> None:
+            ur = u[r]
+            for c, custo in arestas[r]:
+                if c in finalizadas:
+                    continue
+                d = base + custo - ur - v[c]
+                if d < dist.get(c, inf):
+                    dist[c] = d
+                    pred[c] = r
+                    heapq.heappush(fila, (d, c))
+
+        relaxar(r0, 0.0)
+        coluna_livre, d_final = -1, 0.0
+        while fila:
+            d, c = heapq.heappop(fila)
+            if c in finalizadas or d > dist[c]:
+                continue
+            finalizadas[c] = d
+            r = linha_da_coluna[c]
+            if r == -1:
+                coluna_livre, d_final = c, d
+                break
+            linhas_visitadas.append((r, d))
+            relaxar(r, d)
+
+        # Atualiza os potenciais mantendo custos reduzidos não negativos
+        for c, d in finalizadas.items():
+            v[c] -= d_final - d
+        for r, d in linhas_visitadas:
+            u[r] += d_final - d
+
+        # Inverte o caminho aumentante
+        c = coluna_livre
+        while True:
+            r = pred[c]
+            anterior = coluna_da_linha[r]
+            linha_da_coluna[c] = r
+            coluna_da_linha[r] = c
+            if r == r0:
+                break
+            c = anterior
+
+    return coluna_da_linha
+
+
+def create_schedule_flow(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Dict[str, DriverTimeline],
+    new_driver_penalty: float = 10000.0,
+    pontos: Optional[Dict[str, Point]] = None,
+    max_candidates: Optional[int] = MAX_CANDIDATES,
+    metrics: Optional[RunMetrics] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Cria a escala resolvendo o encadeamento de viagens como uma atribuição de custo mínimo.
+
+    A atribuição considera habilidades, disponibilidade e tempo de deslocamento
+    (calculate_travel_minutes). A jornada máxima não é expressável no
+    emparelhamento: cada cadeia é materializada com as mesmas regras do motor
+    guloso (jornada, conflito, alcançabilidade) e, se alguma falhar, a cadeia é
+    cortada ali. Linhas que sobrarem são alocadas sobre as cadeias com as
+    mesmas regras, conferindo também a chegada à viagem seguinte.
+
+    Args:
+        motoristas: DataFrame de motoristas disponíveis.
+        veiculos: DataFrame de veículos disponíveis.
+        linhas: DataFrame de linhas a serem agendadas.
+        motoristas_agendados: Dicionário {nome: DriverTimeline}, atualizado com
+            as novas alocações.
+        new_driver_penalty: Custo de abrir uma nova cadeia (novo motorista).
+        pontos: Tabela de coordenadas já convertidas {"lat,lon": (lat, lon)}.
+        max_candidates: Quantidade máxima de predecessores mais baratos
+            considerados por linha (poda do grafo esparso). Valores maiores
+            aproximam a atribuição da ótima, com mais arestas e mais tempo;
+            None desativa a poda (atribuição exata).
+        metrics: Se informado, recebe os tempos de cada fase ('flow.*'), o
+            tamanho do grafo e a quantidade de linhas que sobraram das cadeias.
+
+    Returns:
+        Um dicionário representando a escala gerada, no mesmo formato de
+        ``create_schedule``.
+    """
+    if pontos is None:
+        pontos = {}
+    registros_linhas = linhas.sort_values(by='horario_inicio_min', kind='stable').to_dict('records')
+    linha_por_id = {linha['id']: linha for linha in registros_linhas}
+    tabela = DriverTable(motoristas)
+    # Chaves (posições na tabela) dos motoristas disponíveis
+    chaves_motoristas = [chave for chave, disponivel in enumerate(tabela.disponivel) if disponivel]
+    indice_veiculos = VehicleIndex(veiculos.to_dict('records'))
+    n_linhas, n_motoristas = len(registros_linhas), len(chaves_motoristas)
+
+    # Custo por unidade de distância do veículo mais barato de cada tipo
+    custo_km_tipo: Dict[Any, float] = {}
+    for linha in registros_linhas:
+        tipo = linha['tipo_veiculo_necessario']
+        if tipo not in custo_km_tipo:
+            veiculo = indice_veiculos.peek(tipo)
+            custo_km_tipo[tipo] = cost_per_distance_unit(veiculo) if veiculo is not None else float('nan')
+
+    inicio = np.array([linha['horario_inicio_min'] for linha in registros_linhas], dtype=float)
+    fim = np.array([linha['horario_fim_min'] for linha in registros_linhas], dtype=float)
+    origem = np.array([get_point(pontos, linha['origem']) for linha in registros_linhas]).reshape(-1, 2)
+    destino = np.array([get_point(pontos, linha['destino']) for linha in registros_linhas]).reshape(-1, 2)
+    tipos = np.array([linha['tipo_veiculo_necessario'] for linha in registros_linhas], dtype=object)
+
+    # Posição inicial, habilidades e jornada de cada motorista, como arrays
+    partida = np.array([get_point(pontos, tabela.localizacoes[k]) for k in chaves_motoristas]).reshape(-1, 2)
+    jornada_minutos = np.array([tabela.jornada_minutos[k] for k in chaves_motoristas], dtype=float)
+    saida_de_casa = np.array([tabela.disponivel_a_partir[k] for k in chaves_motoristas], dtype=float)
+    penalidade = np.array([
+        0.0 if tabela.nomes[k] in motoristas_agendados else new_driver_penalty for k in chaves_motoristas
+    ])
+    # Habilidades pela máscara de bits da tabela
+    habilitados = {tipo: tabela.with_skill(tipo)[chaves_motoristas] for tipo in custo_km_tipo}
+    colunas_linhas = np.arange(n_linhas)
+    colunas_motoristas = n_linhas + np.arange(n_motoristas)
+
+    # --- Montagem do grafo esparso (linhas x predecessores) ---
+    inicio_fase = perf_counter()
+    max_custo = 0.0
+    arestas: List[List[Tuple[int, float]]] = []
+    for j, linha in enumerate(registros_linhas):
+        custo_km = custo_km_tipo[tipos[j]]
+        if np.isnan(custo_km):
+            arestas.append([])
+            continue
+        # Linhas do mesmo tipo que terminam a tempo de chegar à origem de j
+        dist_linhas = calculate_distances(destino, origem[j])
+        compativeis = (tipos == tipos[j]) & (fim + dist_linhas * AVG_MINUTES_PER_DISTANCE_UNIT <= inicio[j])
+        compativeis[j] = False
+        # Motoristas habilitados, com jornada suficiente, que alcançam a origem a partir de casa
+        dist_motoristas = calculate_distances(partida, origem[j])
+        aptos = (habilitados[tipos[j]] & (linha['duracao_minutos'] <= jornada_minutos)
+                 & (saida_de_casa + dist_motoristas * AVG_MINUTES_PER_DISTANCE_UNIT <= inicio[j]))
+
+        custos = np.concatenate([dist_linhas[compativeis] * custo_km,
+                                 dist_motoristas[aptos] * custo_km + penalidade[aptos]])
+        colunas = np.concatenate([colunas_linhas[compativeis], colunas_motoristas[aptos]])
+        if max_candidates is not None and custos.size > max_candidates:
+            mais_baratas = np.argpartition(custos, max_candidates - 1)[:max_candidates]
+            custos, colunas = custos[mais_baratas], colunas[mais_baratas]
+        if custos.size:
+            max_custo = max(max_custo, float(custos.max()))
+        arestas.append(list(zip(colunas.tolist(), custos.tolist())))
+
+    # Coluna exclusiva "sem alocação" por linha, mais cara que qualquer escala viável
+    custo_sem_alocacao = (max_custo + 1.0) * (n_linhas + 1)
+    for j in range(n_linhas):
+        arestas[j].append((n_linhas + n_motoristas + j, custo_sem_alocacao))
+    if metrics is not None:
+        metrics.add_time('flow.grafo', perf_counter() - inicio_fase)
+        metrics.count('flow.arestas', sum(len(a) for a in arestas))
+
+    with timer(metrics, 'flow.atribuicao'):
+        atribuicao = solve_assignment(2 * n_linhas + n_motoristas, arestas)
+
+    # --- Materialização das cadeias com as regras do motor guloso ---
+    sucessor: Dict[int, int] = {}
+    inicios_de_cadeia: List[Tuple[int, int]] = []
+    for j, c in enumerate(atribuicao):
+        if c < n_linhas:
+            sucessor[c] = j
+        elif c < n_linhas + n_motoristas:
+            inicios_de_cadeia.append((j, c - n_linhas))
+
+    veiculos_restantes: Dict[Any, int] = {}
+    for registro in veiculos.to_dict('records'):
+        if registro.get('disponibilidade', 'disponivel') == 'disponivel':
+            tipo = registro.get('tipo')
+            veiculos_restantes[tipo] = veiculos_restantes.get(tipo, 0) + 1
+
+    inicio_fase = perf_counter()
+    alocadas: List[Tuple[int, str, float]] = []  # (linha, motorista, distância do deslocamento)
+    for j, k in sorted(inicios_de_cadeia):
+        chave = chaves_motoristas[k]
+        nome = tabela.nomes[chave]
+        agenda = motoristas_agendados.get(nome, DriverTimeline())
+        jornada_maxima_minutos = tabela.jornada_minutos[chave]
+        while j is not None:
+            linha = registros_linhas[j]
+            if veiculos_restantes.get(linha['tipo_veiculo_necessario'], 0) <= 0:
+                break
+            if not agenda.minutos_trabalhados + linha['duracao_minutos'] <= jornada_maxima_minutos:
+                break
+            if agenda.has_conflict(linha['horario_inicio_min'], linha['horario_fim_min']):
+                break
+            anterior = agenda.previous_trip(linha['horario_inicio_min'])
+            ponto_partida = get_point(pontos, anterior[2] if anterior else tabela.localizacoes[chave])
+            disponivel_em = anterior[1] if anterior else tabela.disponivel_a_partir[chave]
+            dist = calculate_distance_points(ponto_partida, tuple(origem[j]))
+            if disponivel_em + calculate_travel_minutes(dist) > inicio[j]:
+                break
+
+            agenda.insert(linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino'])
+            motoristas_agendados[nome] = agenda
+            veiculos_restantes[linha['tipo_veiculo_necessario']] -= 1
+            alocadas.append((j, nome, dist))
+            j = sucessor.get(j)
+
+    if metrics is not None:
+        metrics.add_time('flow.cadeias', perf_counter() - inicio_fase)
+        metrics.count('flow.cadeias', len(inicios_de_cadeia))
+        metrics.count('flow.linhas_encadeadas', len(alocadas))
+
+    # Veículos: os deslocamentos mais longos recebem os veículos mais econômicos
+    escala_gerada: Dict[Any, Dict[str, Any]] = {}
+    for j, nome, _ in sorted(alocadas, key=lambda a: -a[2]):
+        linha = registros_linhas[j]
+        veiculo = indice_veiculos.peek(linha['tipo_veiculo_necessario'])
+        if veiculo is None:
+            continue
+        indice_veiculos.allocate(veiculo['numero_carro'])
+        escala_gerada[linha['id']] = {
+            'motorista': nome,
+            'veiculo': veiculo['numero_carro'],
+            'horario': linha['horario_inicio']
+        }
+
+    # Linhas não cobertas pelas cadeias são alocadas com as regras e custos do motor guloso sobre as
+    # cadeias já formadas. Elas podem cair entre duas viagens encadeadas, então o motorista também
+    # precisa chegar a tempo à origem da viagem seguinte (ver allocate_lines).
+    restantes = [linha for linha in registros_linhas if linha['id'] not in escala_gerada]
+    if restantes:
+        origens: Dict[str, List[Tuple[float, str]]] = {}
+        for linha_id, info in escala_gerada.items():
+            linha = linha_por_id[linha_id]
+            origens.setdefault(info['motorista'], []).append((linha['horario_inicio_min'], linha['origem']))
+        for lista in origens.values():
+            lista.sort()
+        veiculos_livres = veiculos[~veiculos['numero_carro'].isin([a['veiculo'] for a in escala_gerada.values()])]
+        with timer(metrics, 'flow.sobras'):
+            escala_gerada.update(allocate_lines(
+                restantes, motoristas.to_dict('records'), veiculos_livres.to_dict('records'), {},
+                motoristas_agendados, origens, pontos, new_driver_penalty
+            ))
+        if metrics is not None:
+            metrics.count('flow.linhas_restantes', len(restantes))
+    return escala_gerada
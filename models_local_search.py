@@ -0,0 +1,297 @@
+"""Fase de melhoria por busca local, com orçamento de tempo, sobre uma escala pronta."""
+from __future__ import annotations
+
+import random
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from models.domain import start_minutes
+from models.optimizer import (AVG_MINUTES_PER_DISTANCE_UNIT, Point, calculate_distance_points,
+                              calculate_travel_cost, get_point)
+from models.timeline import DriverTimeline, build_timelines
+from services.metrics import PROGRESS_STEP
+
+# Pesos dos movimentos sorteados a cada iteração: (realocar, trocar, fundir cadeias)
+MOVE_WEIGHTS = (0.5, 0.35, 0.15)
+# Janela, em posições da lista ordenada por horário, para sortear a linha de uma troca
+SWAP_WINDOW = 20
+
+
+class _Viagem:
+    """Viagem de uma rota: linha da escala (com custo) ou agendamento pré-existente (sem custo)."""
+
+    __slots__ = ('inicio', 'fim', 'duracao', 'origem', 'destino', 'tipo', 'veiculo', 'linha_id')
+
+    def __init__(self, inicio: float, fim: float, duracao: float, origem: Optional[Point], destino: Point,
+                 tipo: Any = None, veiculo: Optional[Dict[str, Any]] = None, linha_id: Any = None) -> None:
+        self.inicio = inicio
+        self.fim = fim
+        self.duracao = duracao
+        self.origem = origem
+        self.destino = destino
+        self.tipo = tipo
+        self.veiculo = veiculo
+        self.linha_id = linha_id
+
+
+class _Motorista:
+    """Estado de um motorista na busca local: rota ordenada e custo em cache."""
+
+    __slots__ = ('nome', 'casa', 'saida_de_casa', 'habilidades', 'jornada_minutos', 'em_rota', 'rota', 'custo')
+
+    def __init__(self, nome: str, casa: Point, habilidades: List[Any], jornada_minutos: float, em_rota: bool,
+                 saida_de_casa: float = 0.0) -> None:
+        self.nome = nome
+        self.casa = casa
+        self.saida_de_casa = saida_de_casa
+        self.habilidades = habilidades
+        self.jornada_minutos = jornada_minutos
+        self.em_rota = em_rota
+        self.rota: List[_Viagem] = []
+        self.custo = 0.0
+
+
+class LocalSearch:
+    """
+    Melhora uma escala com movimentos de realocação, troca e fusão de cadeias.
+
+    O objetivo é o mesmo do agendador: soma de calculate_travel_cost dos
+    deslocamentos mais new_driver_penalty por motorista aberto. Cada movimento
+    altera no máximo dois motoristas, então apenas as rotas envolvidas são
+    reavaliadas (custo delta), e o custo de cada rota fica em cache. As regras
+    de viabilidade são as do agendador: habilidades, jornada máxima, ausência
+    de conflito e tempo de deslocamento entre viagens.
+
+    Motoristas cuja agenda não é cronológica (agendamentos pré-existentes
+    sobrepostos) ficam congelados, assim como suas linhas.
+    """
+
+    def __init__(
+        self,
+        escala: Dict[Any, Dict[str, Any]],
+        motoristas: pd.DataFrame,
+        veiculos: pd.DataFrame,
+        linhas: pd.DataFrame,
+        motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None,
+        new_driver_penalty: float = 10000.0,
+        pontos: Optional[Dict[str, Point]] = None,
+        seed: Optional[int] = 0
+    ) -> None:
+        self.escala = {linha_id: dict(info) for linha_id, info in escala.items()}
+        self.new_driver_penalty = new_driver_penalty
+        self._rng = random.Random(seed)
+        pontos = pontos if pontos is not None else {}
+        motoristas_agendados = motoristas_agendados or {}
+
+        agendas = build_timelines(escala, linhas, motoristas_agendados)
+        linha_por_id = {l['id']: l for l in linhas.to_dict('records')}
+        veiculo_por_numero = {v['numero_carro']: v for v in veiculos.to_dict('records')}
+
+        self.motoristas: Dict[str, _Motorista] = {}
+        for registro in motoristas.to_dict('records'):
+            nome = registro['nome']
+            if nome in self.motoristas or registro.get('disponibilidade', 'disponivel') != 'disponivel':
+                continue
+            agenda = agendas.get(nome)
+            if agenda is not None and not agenda.is_chronological:
+                continue
+            motorista = _Motorista(
+                nome, get_point(pontos, registro['localizacao']), list(registro.get('habilidades', [])),
+                registro.get('jornada_maxima_horas', 24) * 60, nome in motoristas_agendados,
+                start_minutes(registro.get('disponivel_a_partir_min'))
+            )
+            # Agendamentos pré-existentes entram na rota sem custo e nunca se movem
+            for inicio, fim, destino in motoristas_agendados.get(nome, ()):
+                motorista.rota.append(_Viagem(inicio, fim, fim - inicio, None, get_point(pontos, destino)))
+            self.motoristas[nome] = motorista
+
+        self.moveis: List[_Viagem] = []
+        self._motorista_da_viagem: Dict[int, _Motorista] = {}
+        for linha_id, info in escala.items():
+            linha = linha_por_id.get(linha_id)
+            motorista = self.motoristas.get(info['motorista'])
+            if linha is None or motorista is None:
+                continue
+            inicio, fim = linha['horario_inicio_min'], linha['horario_fim_min']
+            viagem = _Viagem(inicio, fim, fim - inicio, get_point(pontos, linha['origem']),
+                             get_point(pontos, linha['destino']), linha['tipo_veiculo_necessario'],
+                             veiculo_por_numero.get(info['veiculo'], {}), linha_id)
+            motorista.rota.append(viagem)
+            self.moveis.append(viagem)
+            self._motorista_da_viagem[id(viagem)] = motorista
+
+        self._por_tipo: Dict[Any, List[_Motorista]] = {}
+        for nome, motorista in list(self.motoristas.items()):
+            motorista.rota.sort(key=lambda v: v.inicio)
+            motorista.custo = self._custo_rota(motorista, motorista.rota)
+            if motorista.custo == float('inf'):
+                # Rota inicial fora do modelo da busca (ex: empate de arredondamento): congela
+                del self.motoristas[nome]
+                continue
+            for habilidade in motorista.habilidades:
+                self._por_tipo.setdefault(habilidade, []).append(motorista)
+        self.moveis = [v for v in self.moveis if self._motorista_da_viagem[id(v)].nome in self.motoristas]
+        self.moveis.sort(key=lambda v: v.inicio)
+        self._posicao = {id(v): i for i, v in enumerate(self.moveis)}
+        self.custo_total = sum(m.custo for m in self.motoristas.values())
+        self.iteracoes = 0
+
+    def _custo_rota(self, motorista: _Motorista, rota: List[_Viagem]) -> float:
+        """Custo de uma rota (deslocamentos + penalidade), ou infinito se ela for inviável."""
+        custo = 0.0
+        posicao = motorista.casa
+        livre_em = motorista.saida_de_casa
+        trabalhado = 0.0
+        tem_linha = False
+        for viagem in rota:
+            if viagem.inicio < livre_em:
+                return float('inf')
+            trabalhado += viagem.duracao
+            if viagem.origem is not None:
+                if viagem.tipo not in motorista.habilidades:
+                    return float('inf')
+                dist = calculate_distance_points(posicao, viagem.origem)
+                if livre_em + dist * AVG_MINUTES_PER_DISTANCE_UNIT > viagem.inicio:
+                    return float('inf')
+                custo += calculate_travel_cost(dist, viagem.veiculo)
+                tem_linha = True
+            livre_em = viagem.fim
+            posicao = viagem.destino
+        if tem_linha and not trabalhado <= motorista.jornada_minutos:  # Jornada ausente (NaN) também é inviável
+            return float('inf')
+        if tem_linha and not motorista.em_rota:
+            custo += self.new_driver_penalty
+        return custo
+
+    def _aplicar(self, alteracoes: List[Tuple[_Motorista, List[_Viagem]]]) -> bool:
+        """Avalia o delta de custo das novas rotas e as aplica se houver melhora."""
+        novos_custos = [self._custo_rota(m, rota) for m, rota in alteracoes]
+        delta = sum(novos_custos) - sum(m.custo for m, _ in alteracoes)
+        if not delta < -1e-9:
+            return False
+        for (motorista, rota), custo in zip(alteracoes, novos_custos):
+            motorista.rota = rota
+            motorista.custo = custo
+            for viagem in rota:
+                if viagem.origem is not None:
+                    self._motorista_da_viagem[id(viagem)] = motorista
+        self.custo_total += delta
+        return True
+
+    def _realocar(self) -> bool:
+        viagem = self._rng.choice(self.moveis)
+        origem = self._motorista_da_viagem[id(viagem)]
+        destino = self._rng.choice(self._por_tipo[viagem.tipo])
+        if destino is origem:
+            return False
+        return self._aplicar([
+            (origem, [v for v in origem.rota if v is not viagem]),
+            (destino, sorted(destino.rota + [viagem], key=lambda v: v.inicio)),
+        ])
+
+    def _trocar(self) -> bool:
+        viagem_a = self._rng.choice(self.moveis)
+        posicao = self._posicao[id(viagem_a)]
+        vizinha = posicao + self._rng.randint(-SWAP_WINDOW, SWAP_WINDOW)
+        if not 0 <= vizinha < len(self.moveis):
+            return False
+        viagem_b = self.moveis[vizinha]
+        motorista_a = self._motorista_da_viagem[id(viagem_a)]
+        motorista_b = self._motorista_da_viagem[id(viagem_b)]
+        if motorista_a is motorista_b:
+            return False
+        return self._aplicar([
+            (motorista_a, sorted([v for v in motorista_a.rota if v is not viagem_a] + [viagem_b], key=lambda v: v.inicio)),
+            (motorista_b, sorted([v for v in motorista_b.rota if v is not viagem_b] + [viagem_a], key=lambda v: v.inicio)),
+        ])
+
+    def _fundir(self) -> bool:
+        viagem = self._rng.choice(self.moveis)
+        origem = self._motorista_da_viagem[id(viagem)]
+        if any(v.origem is None for v in origem.rota):
+            return False  # A cadeia tem agendamentos fixos e não pode ser esvaziada
+        destino = self._rng.choice(self._por_tipo[viagem.tipo])
+        if destino is origem:
+            return False
+        return self._aplicar([
+            (origem, []),
+            (destino, sorted(destino.rota + origem.rota, key=lambda v: v.inicio)),
+        ])
+
+    def run(
+        self,
+        time_budget: float,
+        max_iterations: Optional[int] = None,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Executa a busca até esgotar o orçamento de tempo (ou de iterações).
+
+        Só movimentos que reduzem o custo são aceitos, então a escala corrente
+        é sempre a melhor encontrada e pode ser devolvida a qualquer momento.
+
+        Args:
+            time_budget: Orçamento de tempo de relógio, em segundos.
+            max_iterations: Limite opcional de movimentos avaliados.
+            progress: Se informado, recebe a fração do orçamento de tempo já
+                usada a cada PROGRESS_STEP iterações; uma exceção lançada por
+                ele interrompe a busca.
+
+        Returns:
+            A melhor escala encontrada, no formato de ``create_schedule``.
+        """
+        movimentos = (self._realocar, self._trocar, self._fundir)
+        inicio = perf_counter()
+        limite = inicio + time_budget
+        iteracao = 0
+        while self.moveis and perf_counter() < limite:
+            if max_iterations is not None and iteracao >= max_iterations:
+                break
+            if progress is not None and iteracao % PROGRESS_STEP == 0:
+                progress(min(1.0, (perf_counter() - inicio) / time_budget))
+            self._rng.choices(movimentos, MOVE_WEIGHTS)[0]()
+            iteracao += 1
+        self.iteracoes = iteracao
+
+        for viagem in self.moveis:
+            self.escala[viagem.linha_id]['motorista'] = self._motorista_da_viagem[id(viagem)].nome
+        return self.escala
+
+
+def improve_schedule(
+    escala: Dict[Any, Dict[str, Any]],
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None,
+    new_driver_penalty: float = 10000.0,
+    time_budget: float = 1.0,
+    pontos: Optional[Dict[str, Point]] = None,
+    seed: Optional[int] = 0,
+    max_iterations: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Melhora uma escala por busca local dentro de um orçamento de tempo.
+
+    Args:
+        escala: Escala inicial (ex: resultado do motor guloso).
+        motoristas: DataFrame de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado das linhas da escala.
+        motoristas_agendados: Agendamentos que já existiam antes da escala
+            (ex: exceções manuais). Não é modificado.
+        new_driver_penalty: Penalidade por novo motorista.
+        time_budget: Orçamento de tempo de relógio, em segundos.
+        pontos: Tabela de coordenadas já convertidas {"lat,lon": (lat, lon)}.
+        seed: Semente do gerador de movimentos aleatórios.
+        max_iterations: Limite opcional de movimentos avaliados.
+        progress: Callback de progresso (ver ``LocalSearch.run``).
+
+    Returns:
+        Uma nova escala, com os mesmos veículos por linha e custo menor ou igual.
+    """
+    busca = LocalSearch(escala, motoristas, veiculos, linhas, motoristas_agendados, new_driver_penalty, pontos, seed)
+    return busca.run(time_budget, max_iterations, progress)
@@ -2,18 +2,87 @@
 from __future__ import annotations
 
 from datetime import timedelta
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+from models.timeline import DriverTimeline, build_timelines
+
+Point = Tuple[float, float]
 
 AVG_MINUTES_PER_DISTANCE_UNIT = 5.0
 FUEL_PRICE_PER_LITER = 5.50 # Exemplo: R$ 5,50 por litro
 NEW_DRIVER_PENALTY = 10000.0 # Custo artificialmente alto para desincentivar o uso de um novo motorista
 
+def parse_point(loc: str) -> Point:
+    """
+    Converte uma coordenada no formato "latitude,longitude" em uma tupla de floats.
+
+    Args:
+        loc: A coordenada como string (ex: "-23.55,-46.63").
+
+    Returns:
+        Uma tupla (latitude, longitude).
+    """
+    lat, lon = map(float, loc.split(','))
+    return lat, lon
+
+
+def get_point(tabela: Dict[str, Point], loc: str) -> Point:
+    """
+    Obtém um ponto já convertido a partir de uma tabela de coordenadas.
+
+    Coordenadas ausentes da tabela são convertidas uma única vez e memorizadas.
+
+    Args:
+        tabela: Dicionário {"lat,lon": (lat, lon)} montado no pré-processamento.
+        loc: A coordenada como string (ex: "-23.55,-46.63").
+
+    Returns:
+        Uma tupla (latitude, longitude).
+    """
+    ponto = tabela.get(loc)
+    if ponto is None:
+        ponto = tabela[loc] = parse_point(loc)
+    return ponto
+
+
+def calculate_distance_points(p1: Point, p2: Point) -> float:
+    """
+    Calcula a distância euclidiana entre dois pontos já convertidos.
+
+    Args:
+        p1: O primeiro ponto (latitude, longitude).
+        p2: O segundo ponto (latitude, longitude).
+
+    Returns:
+        A distância calculada como um float.
+    """
+    return ((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)**0.5
+
+
+def calculate_distances(pontos: np.ndarray, destino: Point) -> np.ndarray:
+    """
+    Calcula, de forma vetorizada, a distância euclidiana de vários pontos até um destino.
+
+    Args:
+        pontos: Array (n, 2) de pontos (latitude, longitude).
+        destino: O ponto de destino (latitude, longitude).
+
+    Returns:
+        Um array com n distâncias.
+    """
+    pontos = np.asarray(pontos, dtype=float)
+    return ((pontos[:, 0] - destino[0])**2 + (pontos[:, 1] - destino[1])**2)**0.5
+
+
 def calculate_distance(loc1: str, loc2: str) -> float:
     """
     Calcula a distância euclidiana entre duas coordenadas.
 
     As coordenadas são fornecidas como strings no formato "latitude,longitude".
+    Mantida por compatibilidade; no caminho crítico prefira os pontos já
+    convertidos pelo pré-processamento com calculate_distance_points.
 
     Args:
         loc1: A primeira coordenada (ex: "-23.55,-46.63").
@@ -22,9 +91,20 @@ def calculate_distance(loc1: str, loc2: str) -> float:
     Returns:
         A distância calculada como um float.
     """
-    lat1, lon1 = map(float, loc1.split(','))
-    lat2, lon2 = map(float, loc2.split(','))
-    return ((lat1 - lat2)**2 + (lon1 - lon2)**2)**0.5
+    return calculate_distance_points(parse_point(loc1), parse_point(loc2))
+
+
+def calculate_travel_minutes(distance: float) -> float:
+    """
+    Converte uma distância em um tempo de viagem estimado, em minutos.
+
+    Args:
+        distance: A distância a ser convertida.
+
+    Returns:
+        O tempo de viagem em minutos, na mesma escala dos horários das linhas.
+    """
+    return distance * AVG_MINUTES_PER_DISTANCE_UNIT
 
 
 def calculate_travel_time(distance: float) -> timedelta:
@@ -37,7 +117,7 @@ def calculate_travel_time(distance: float) -> timedelta:
     Returns:
         Um objeto timedelta representando o tempo de viagem.
     """
-    return timedelta(minutes=distance * AVG_MINUTES_PER_DISTANCE_UNIT)
+    return timedelta(minutes=calculate_travel_minutes(distance))
 
 
 def calculate_travel_cost(distance: float, vehicle: Dict[str, Any]) -> float:
@@ -59,4 +139,103 @@ def calculate_travel_cost(distance: float, vehicle: Dict[str, Any]) -> float:
 
     liters_needed = distance / consumo
     cost = liters_needed * FUEL_PRICE_PER_LITER
-    return cost
\ No newline at end of file
+    return cost
+
+
+def calculate_travel_costs(distances: np.ndarray, vehicle: Dict[str, Any]) -> np.ndarray:
+    """
+    Versão vetorizada de calculate_travel_cost para várias distâncias e um mesmo veículo.
+
+    Args:
+        distances: Array de distâncias de deslocamento.
+        vehicle: Um dicionário contendo os dados do veículo.
+
+    Returns:
+        Um array com o custo monetário de cada deslocamento, com o mesmo
+        fallback de calculate_travel_cost.
+    """
+    consumo = vehicle.get('consumo_km_l')
+    if consumo is None or not isinstance(consumo, (int, float)) or consumo <= 0:
+        return distances
+    return distances / consumo * FUEL_PRICE_PER_LITER
+
+
+def calculate_fleet_travel_costs(distances: np.ndarray, consumos: np.ndarray) -> np.ndarray:
+    """
+    Versão vetorizada de calculate_travel_cost para deslocamentos feitos por veículos diferentes.
+
+    Args:
+        distances: Array de distâncias de deslocamento.
+        consumos: Consumo (km/l) do veículo de cada deslocamento, alinhado a
+            ``distances``; NaN para veículos sem consumo conhecido.
+
+    Returns:
+        Um array com o custo monetário de cada deslocamento, com o mesmo
+        fallback de calculate_travel_cost para consumos ausentes ou não positivos.
+    """
+    distances = np.asarray(distances, dtype=float)
+    consumos = np.asarray(consumos, dtype=float)
+    validos = consumos > 0  # NaN compara como False e cai no fallback
+    return np.where(validos, distances / np.where(validos, consumos, 1.0) * FUEL_PRICE_PER_LITER, distances)
+
+
+def cost_per_distance_unit(vehicle: Dict[str, Any]) -> float:
+    """
+    Custo de uma unidade de distância percorrida pelo veículo.
+
+    Como calculate_travel_cost é linear na distância, este valor ordena os
+    veículos do mais barato ao mais caro para qualquer deslocamento.
+
+    Args:
+        vehicle: Um dicionário contendo os dados do veículo.
+
+    Returns:
+        O custo por unidade de distância (1.0 no caso de fallback).
+    """
+    return calculate_travel_cost(1.0, vehicle)
+
+
+def calculate_schedule_cost(
+    escala: Dict[Any, Dict[str, Any]],
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None,
+    new_driver_penalty: float = NEW_DRIVER_PENALTY
+) -> float:
+    """
+    Calcula o custo total de uma escala, com o mesmo modelo de custo do agendador.
+
+    O custo é a soma de calculate_travel_cost para o deslocamento de cada linha
+    (a partir do destino da viagem anterior do motorista, ou de casa) mais a
+    penalidade por novo motorista para cada motorista que não estava em rota.
+
+    Args:
+        escala: Escala no formato {linha_id: {'motorista', 'veiculo', 'horario'}}.
+        motoristas: DataFrame de motoristas (colunas 'nome' e 'localizacao').
+        veiculos: DataFrame de veículos (colunas 'numero_carro' e 'consumo_km_l').
+        linhas: DataFrame pré-processado das linhas da escala.
+        motoristas_agendados: Agendamentos que já existiam antes da escala
+            (ex: exceções manuais). Não é modificado.
+        new_driver_penalty: Penalidade por novo motorista.
+
+    Returns:
+        O custo total da escala.
+    """
+    motoristas_agendados = motoristas_agendados or {}
+    casa = dict(zip(motoristas['nome'], motoristas['localizacao']))
+    veiculo_por_numero = {v['numero_carro']: v for v in veiculos.to_dict('records')}
+    linha_por_id = {linha['id']: linha for linha in linhas.to_dict('records')}
+
+    agendas = build_timelines(escala, linhas, motoristas_agendados)
+    alocacoes = [(linha_por_id[linha_id], info) for linha_id, info in escala.items() if linha_id in linha_por_id]
+
+    custo_total = 0.0
+    for linha, info in alocacoes:
+        anterior = agendas[info['motorista']].previous_trip(linha['horario_inicio_min'])
+        partida = anterior[2] if anterior else casa[info['motorista']]
+        distancia = calculate_distance(partida, linha['origem'])
+        custo_total += calculate_travel_cost(distancia, veiculo_por_numero.get(info['veiculo'], {}))
+
+    novos_motoristas = {info['motorista'] for _, info in alocacoes} - set(motoristas_agendados)
+    return custo_total + new_driver_penalty * len(novos_motoristas)
@@ -0,0 +1,488 @@
+"""Reparo incremental de uma escala quando motoristas ou veículos saem no meio do dia.
+
+Em vez de refazer o dia inteiro (e gerar uma escala embaralhada que a
+operação precisa comunicar de novo), o reparo libera só as linhas afetadas
+pelas disrupções e tenta realocá-las, nesta ordem:
+
+1. linhas que perderam apenas o veículo ficam com o mesmo motorista e
+   recebem o veículo livre mais barato do tipo (e as que perderam só o
+   motorista, em qualquer etapa, mantêm o veículo);
+2. as demais são alocadas com as regras e custos do motor guloso, com as
+   agendas de todos os outros motoristas fixas e os veículos que sobraram;
+3. para as que ainda ficaram sem alocação, uma vizinhança limitada de linhas
+   do mesmo tipo, próximas no horário, é liberada e realocada junto com
+   elas. O resultado só é aceito se alocar mais linhas do que antes.
+
+Todas as outras alocações permanecem exatamente como estavam.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from models.domain import start_minutes
+from models.fleet import VehicleIndex
+from models.optimizer import (AVG_MINUTES_PER_DISTANCE_UNIT, Point, calculate_distance_points, calculate_travel_cost,
+                              calculate_travel_minutes, get_point)
+from models.spatial import ReachabilityIndex
+from models.timeline import Agendamento, DriverTimeline, as_timelines
+from services.metrics import RunMetrics, timer
+from services.rule_engine import ConstraintEngine, DriverCheck, default_rules
+
+# Máximo de linhas já alocadas liberadas para abrir espaço às linhas afetadas
+VIZINHANCA_MAXIMA = 20
+# Distância máxima, em minutos, entre o início de uma linha da vizinhança e o da linha afetada
+JANELA_VIZINHANCA = 120
+
+# Colunas das linhas consultadas pelo reparo
+COLUNAS_LINHA = ('id', 'origem', 'destino', 'horario_inicio', 'horario_inicio_min', 'horario_fim_min',
+                 'duracao_minutos', 'tipo_veiculo_necessario')
+# Folga relativa da distância mínima de cada grupo de candidatos, contra arredondamentos na poda por custo
+_MARGEM_DISTANCIA = 1 - 1e-9
+
+# Agenda vazia compartilhada (somente leitura) para motoristas ainda sem viagens
+_AGENDA_VAZIA = DriverTimeline()
+# Jornada, conflito e alcance, como no motor guloso (services/rule_engine.py)
+_RESTRICOES = ConstraintEngine(default_rules(AVG_MINUTES_PER_DISTANCE_UNIT))
+
+
+class RepairResult(NamedTuple):
+    """Resultado do reparo de uma escala."""
+    escala: Dict[Any, Dict[str, Any]]
+    afetadas: List[Any]
+    alteradas: List[Any]
+    sem_alocacao: List[Any]
+
+
+def _horario_em_minutos(valor: Any) -> int:
+    """Converte o horário de uma disrupção ('HH:MM'; vazio = início do dia) em minutos."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)) or valor == '':
+        return 0
+    horas, minutos = str(valor).split(':')
+    return int(horas) * 60 + int(minutos)
+
+
+def _valor_informado(valor: Any) -> bool:
+    return valor is not None and not (isinstance(valor, float) and pd.isna(valor)) and valor != ''
+
+
+def parse_disruptions(disrupcoes: Iterable[Dict[str, Any]]) -> Tuple[Dict[Any, int], Dict[Any, int]]:
+    """
+    Agrupa as disrupções por motorista e por veículo.
+
+    Args:
+        disrupcoes: Registros com 'motorista' ou 'veiculo' (ou ambos) e,
+            opcionalmente, 'horario' ('HH:MM') a partir do qual o recurso
+            deixa de estar disponível. Sem horário, vale o dia inteiro.
+
+    Returns:
+        Uma tupla ({motorista: minutos}, {veiculo: minutos}) com o horário
+        mais cedo de saída de cada recurso.
+    """
+    motoristas_fora: Dict[Any, int] = {}
+    veiculos_fora: Dict[Any, int] = {}
+    for disrupcao in disrupcoes:
+        motorista, veiculo = disrupcao.get('motorista'), disrupcao.get('veiculo')
+        if not _valor_informado(motorista) and not _valor_informado(veiculo):
+            raise ValueError(f"Disrupção sem motorista nem veículo: {disrupcao}.")
+        try:
+            horario = _horario_em_minutos(disrupcao.get('horario'))
+        except ValueError:
+            raise ValueError(f"Horário inválido na disrupção: {disrupcao.get('horario')!r}.") from None
+        if _valor_informado(motorista):
+            motoristas_fora[motorista] = min(horario, motoristas_fora.get(motorista, horario))
+        if _valor_informado(veiculo):
+            if isinstance(veiculo, float) and veiculo.is_integer():  # CSV com células vazias lê números como float
+                veiculo = int(veiculo)
+            veiculos_fora[veiculo] = min(horario, veiculos_fora.get(veiculo, horario))
+    return motoristas_fora, veiculos_fora
+
+
+def schedule_from_frame(df: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+    """
+    Lê uma escala no formato do arquivo de saída (ver main.py) de volta para um dicionário.
+
+    Args:
+        df: DataFrame com as colunas 'Linha_ID', 'Horario', 'Motorista_Alocado'
+            e 'Veiculo_Alocado'.
+
+    Returns:
+        A escala no formato {linha_id: {'motorista', 'veiculo', 'horario'}}.
+        Veículos 'Nao Alocado' viram None.
+    """
+    escala = {}
+    for registro in df.to_dict('records'):
+        veiculo = registro['Veiculo_Alocado']
+        if not _valor_informado(veiculo) or veiculo == 'Nao Alocado':
+            veiculo = None
+        elif isinstance(veiculo, str) and veiculo.lstrip('-').isdigit():
+            veiculo = int(veiculo)
+        escala[registro['Linha_ID']] = {
+            'motorista': registro['Motorista_Alocado'],
+            'veiculo': veiculo,
+            'horario': registro['Horario'],
+        }
+    return escala
+
+
+def _linhas_por_id(linhas: pd.DataFrame) -> Dict[Any, Dict[str, Any]]:
+    """Registros das linhas por ID, só com as colunas usadas no reparo (mais rápido que to_dict)."""
+    colunas = [coluna for coluna in COLUNAS_LINHA if coluna in linhas.columns]
+    valores = zip(*(linhas[coluna].tolist() for coluna in colunas))
+    return {registro['id']: registro for registro in (dict(zip(colunas, linha)) for linha in valores)}
+
+
+def _agendas(
+    escala: Dict[Any, Dict[str, Any]],
+    linha_por_id: Dict[Any, Dict[str, Any]],
+    agendados_base: Dict[str, DriverTimeline]
+) -> Tuple[Dict[str, DriverTimeline], Dict[str, List[Tuple[float, str]]]]:
+    """
+    Monta as agendas dos motoristas com as linhas da escala somadas às agendas base (copiadas).
+
+    Returns:
+        Uma tupla ({nome: DriverTimeline}, {nome: [(inicio, origem), ...]}),
+        com as origens das linhas da escala ordenadas por início. A
+        DriverTimeline guarda só destinos, e o reparo precisa da origem da
+        viagem seguinte.
+    """
+    agendas = {nome: agenda.copy() for nome, agenda in agendados_base.items()}
+    origens: Dict[str, List[Tuple[float, str]]] = {}
+    for linha_id, info in escala.items():
+        linha = linha_por_id.get(linha_id)
+        if linha is not None:
+            agendas.setdefault(info['motorista'], DriverTimeline()).insert(
+                linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino']
+            )
+            origens.setdefault(info['motorista'], []).append((linha['horario_inicio_min'], linha['origem']))
+    for lista in origens.values():
+        lista.sort()
+    return agendas, origens
+
+
+def _deslocamento(pontos: Dict[str, Point], origem: Point, partida: str) -> Tuple[float, float]:
+    """Distância de uma coordenada até a origem da linha e o tempo estimado pela distância (ver DriverCheck)."""
+    distancia = calculate_distance_points(get_point(pontos, partida), origem)
+    return distancia, calculate_travel_minutes(distancia)
+
+
+def insertion_cost(
+    motorista: Dict[str, Any],
+    linha: Dict[str, Any],
+    origem: Point,
+    destino: Point,
+    veiculo: Dict[str, Any],
+    agendas: Dict[str, DriverTimeline],
+    origens: Dict[str, List[Tuple[float, str]]],
+    pontos: Dict[str, Point],
+    chave: int = -1,
+    restricoes: Optional[ConstraintEngine] = None
+) -> float:
+    """
+    Custo de deslocamento do motorista até a linha, com as regras do motor guloso, sobre uma agenda já ocupada.
+
+    Além de disponibilidade e das regras (jornada, conflito, alcance a partir
+    da viagem anterior e as adicionais), verifica se o motorista chega a tempo
+    à origem da viagem seguinte, já que a linha pode cair entre duas viagens.
+
+    Args:
+        motorista: Registro do motorista.
+        linha: Registro da linha (com 'horario_inicio_min', 'horario_fim_min'
+            e 'duracao_minutos').
+        origem: Ponto de partida da linha, já convertido.
+        destino: Ponto final da linha, já convertido.
+        veiculo: Veículo que fará a linha.
+        agendas: Agendas correntes {nome: DriverTimeline}.
+        origens: Origens das viagens de cada motorista, [(inicio, origem), ...]
+            ordenadas por início (ver _agendas).
+        pontos: Tabela de coordenadas (completada sob demanda).
+        chave: Posição do motorista no DataFrame usado em
+            ``restricoes.prepare`` (lida por regras como RegionRule).
+        restricoes: Regras na forma escalar, já preparadas; None usa as
+            regras padrão (jornada, conflito e alcance).
+
+    Returns:
+        O custo de deslocamento (sem a penalidade de novo motorista) ou
+        infinito se o motorista não puder assumir a linha.
+    """
+    if motorista.get('disponibilidade', 'disponivel') != 'disponivel':
+        return float('inf')
+    inicio, fim = linha['horario_inicio_min'], linha['horario_fim_min']
+    verificacao = DriverCheck(linha, inicio, fim, linha['duracao_minutos'], partial(_deslocamento, pontos, origem))
+    verificacao.set_driver(chave, agendas.get(motorista['nome'], _AGENDA_VAZIA),
+                           motorista.get('jornada_maxima_horas', 24) * 60, motorista['localizacao'],
+                           start_minutes(motorista.get('disponivel_a_partir_min')))
+    if not (restricoes or _RESTRICOES).allows(verificacao):
+        return float('inf')
+    # A linha pode cair entre duas viagens: o motorista também precisa chegar à seguinte
+    seguintes = origens.get(motorista['nome'], [])
+    posicao = bisect_left(seguintes, (inicio,))
+    if posicao < len(seguintes):
+        inicio_seguinte, origem_seguinte = seguintes[posicao]
+        ate_seguinte = calculate_distance_points(destino, get_point(pontos, origem_seguinte))
+        if fim + calculate_travel_minutes(ate_seguinte) > inicio_seguinte:
+            return float('inf')
+    return calculate_travel_cost(verificacao.deadhead()[0], veiculo)
+
+
+def allocate_lines(
+    pendentes: List[Dict[str, Any]],
+    motoristas: List[Dict[str, Any]],
+    veiculos: List[Dict[str, Any]],
+    veiculos_fixos: Dict[Any, Dict[str, Any]],
+    agendas: Dict[str, DriverTimeline],
+    origens: Dict[str, List[Tuple[float, str]]],
+    pontos: Dict[str, Point],
+    new_driver_penalty: float
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Aloca as linhas pendentes com as mesmas regras e custos do motor guloso, sobre agendas já ocupadas.
+
+    Diferente do motor guloso, que percorre o dia em ordem e nunca encontra
+    viagens posteriores, aqui a linha pode cair entre duas viagens fixas: o
+    motorista também precisa chegar a tempo à origem da viagem seguinte.
+
+    Args:
+        pendentes: Registros das linhas a alocar, em ordem de início.
+        motoristas: Registros dos motoristas ('habilidades' como listas).
+        veiculos: Registros dos veículos livres.
+        veiculos_fixos: Veículo já definido de algumas linhas {linha_id: veículo};
+            as demais recebem o veículo livre mais barato do tipo.
+        agendas: Agendas correntes {nome: DriverTimeline}. Recebem as linhas
+            alocadas; motoristas fora delas pagam a penalidade.
+        origens: Origens das viagens das agendas (ver insertion_cost). Recebem
+            as linhas alocadas.
+        pontos: Tabela de coordenadas (completada sob demanda).
+        new_driver_penalty: Penalidade por novo motorista.
+
+    Returns:
+        A escala das linhas alocadas {linha_id: {'motorista', 'veiculo', 'horario'}}.
+    """
+    escala = {}
+    indice_veiculos = VehicleIndex(veiculos)
+    indice_alcance = ReachabilityIndex(motoristas, agendas, pontos)
+    por_habilidade: Dict[Any, List[int]] = {}
+    for chave, motorista in enumerate(motoristas):
+        for habilidade in motorista.get('habilidades', []):
+            por_habilidade.setdefault(habilidade, []).append(chave)
+
+    for linha in pendentes:
+        tipo = linha['tipo_veiculo_necessario']
+        veiculo = veiculos_fixos.get(linha['id']) or indice_veiculos.peek(tipo)
+        if veiculo is None:
+            continue
+        inicio, fim = linha['horario_inicio_min'], linha['horario_fim_min']
+        origem, destino = get_point(pontos, linha['origem']), get_point(pontos, linha['destino'])
+        if linha['duracao_minutos'] > 0:
+            grupos = indice_alcance.candidates_by_distance(tipo, origem, inicio)
+        else:
+            grupos = [(0.0, por_habilidade.get(tipo, []))]
+
+        # Os grupos vêm do mais próximo ao mais distante: a busca para quando a distância
+        # mínima do grupo já custa mais que o melhor candidato. Motoristas sem viagens
+        # custam ao menos a penalidade e só são avaliados se ninguém em rota custar menos.
+        # Empates vão para o primeiro motorista na ordem original, como no motor guloso.
+        melhor, melhor_custo = None, float('inf')
+        novos = []
+        for distancia_minima, chaves in grupos:
+            if calculate_travel_cost(distancia_minima * _MARGEM_DISTANCIA, veiculo) > melhor_custo:
+                break
+            for chave in chaves:
+                motorista = motoristas[chave]
+                if motorista['nome'] not in agendas:
+                    novos.append((distancia_minima, chave))
+                    continue
+                custo = insertion_cost(motorista, linha, origem, destino, veiculo, agendas, origens, pontos, chave)
+                if custo < melhor_custo or (custo == melhor_custo and melhor is not None and chave < melhor):
+                    melhor, melhor_custo = chave, custo
+        if melhor_custo >= new_driver_penalty:
+            for distancia_minima, chave in novos:
+                if calculate_travel_cost(distancia_minima * _MARGEM_DISTANCIA, veiculo) + new_driver_penalty > melhor_custo:
+                    break
+                custo = insertion_cost(motoristas[chave], linha, origem, destino, veiculo, agendas, origens, pontos, chave)
+                custo += new_driver_penalty
+                if custo < melhor_custo or (custo == melhor_custo and melhor is not None and chave < melhor):
+                    melhor, melhor_custo = chave, custo
+
+        if melhor is not None:
+            nome = motoristas[melhor]['nome']
+            escala[linha['id']] = {'motorista': nome, 'veiculo': veiculo['numero_carro'], 'horario': linha['horario_inicio']}
+            agendas.setdefault(nome, DriverTimeline()).insert(inicio, fim, linha['destino'])
+            insort(origens.setdefault(nome, []), (inicio, linha['origem']))
+            indice_alcance.assign(nome, fim, destino)
+            if linha['id'] not in veiculos_fixos:
+                indice_veiculos.allocate(veiculo['numero_carro'])
+    return escala
+
+
+def _vizinhanca(
+    pendentes: List[Any],
+    escala: Dict[Any, Dict[str, Any]],
+    linha_por_id: Dict[Any, Dict[str, Any]],
+    corte: Dict[Any, int],
+    bloqueadas: Set[Any],
+    maximo: int,
+    janela: float
+) -> List[Any]:
+    """
+    Escolhe até ``maximo`` linhas alocadas do mesmo tipo, mais próximas no horário das pendentes.
+
+    Só entram linhas que começam dentro da janela, não antes do horário da
+    disrupção que liberou a linha pendente, e que não estão bloqueadas.
+    """
+    por_tipo: Dict[Any, List[Tuple[float, str, Any]]] = {}
+    for linha_id in escala:
+        linha = linha_por_id.get(linha_id)
+        if linha is not None and linha_id not in bloqueadas:
+            por_tipo.setdefault(linha['tipo_veiculo_necessario'], []).append(
+                (linha['horario_inicio_min'], str(linha_id), linha_id))
+    for lista in por_tipo.values():
+        lista.sort()
+
+    distancias: Dict[Any, float] = {}
+    for pendente_id in pendentes:
+        pendente = linha_por_id[pendente_id]
+        inicio = pendente['horario_inicio_min']
+        lista = por_tipo.get(pendente['tipo_veiculo_necessario'], [])
+        primeira = bisect_left(lista, (max(inicio - janela, corte[pendente_id]),))
+        for inicio_vizinha, _, linha_id in lista[primeira:bisect_right(lista, (inicio + janela, chr(0x10FFFF)))]:
+            distancia = abs(inicio_vizinha - inicio)
+            if distancia < distancias.get(linha_id, float('inf')):
+                distancias[linha_id] = distancia
+    return sorted(distancias, key=lambda linha_id: (distancias[linha_id], str(linha_id)))[:maximo]
+
+
+def repair_schedule(
+    escala: Dict[Any, Dict[str, Any]],
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    disrupcoes: Iterable[Dict[str, Any]],
+    motoristas_agendados: Optional[Dict[str, Union[DriverTimeline, List[Agendamento]]]] = None,
+    new_driver_penalty: float = 10000.0,
+    max_vizinhanca: int = VIZINHANCA_MAXIMA,
+    janela_minutos: float = JANELA_VIZINHANCA,
+    fixas: Iterable[Any] = (),
+    metrics: Optional[RunMetrics] = None
+) -> RepairResult:
+    """
+    Repara uma escala após a saída de motoristas ou veículos, mexendo no mínimo de alocações.
+
+    Uma linha é afetada se seu motorista ou veículo sai em um horário
+    menor ou igual ao seu início; linhas já iniciadas antes da disrupção
+    permanecem. Motoristas que saem não recebem nenhuma linha nova.
+
+    Args:
+        escala: Escala atual {linha_id: {'motorista', 'veiculo', 'horario'}},
+            incluindo alocações manuais. Não é modificada.
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado com as linhas do dia.
+        disrupcoes: Saídas de motoristas ou veículos (ver parse_disruptions).
+        motoristas_agendados: Compromissos dos motoristas que não estão na
+            escala (ex: viagens de outro sistema). Não é modificado.
+        new_driver_penalty: Penalidade por novo motorista.
+        max_vizinhanca: Máximo de linhas não afetadas que podem ser
+            liberadas para abrir espaço. 0 desliga essa etapa.
+        janela_minutos: Distância máxima, em minutos, entre o início de uma
+            linha da vizinhança e o de uma linha afetada.
+        fixas: IDs de linhas que nunca entram na vizinhança (ex: exceções manuais).
+        metrics: Se informado, recebe o tempo do reparo e os contadores de
+            linhas afetadas, trocas de veículo, vizinhança e linhas sem alocação.
+
+    Returns:
+        Um RepairResult com a nova escala, as linhas afetadas, as linhas cuja
+        alocação mudou (ou foi removida) e as que ficaram sem alocação.
+    """
+    motoristas_fora, veiculos_fora = parse_disruptions(disrupcoes)
+    agendados_base = {nome: agenda.copy() for nome, agenda in as_timelines(dict(motoristas_agendados or {})).items()}
+
+    with timer(metrics, 'reparo.total'):
+        linha_por_id = _linhas_por_id(linhas[linhas['id'].isin(escala.keys())])
+
+        corte: Dict[Any, int] = {}
+        so_veiculo: Set[Any] = set()
+        sem_veiculo: Set[Any] = set()
+        for linha_id, info in escala.items():
+            linha = linha_por_id.get(linha_id)
+            if linha is None:
+                continue
+            inicio = linha['horario_inicio_min']
+            sai_motorista = motoristas_fora.get(info['motorista'], float('inf')) <= inicio
+            sai_veiculo = veiculos_fora.get(info['veiculo'], float('inf')) <= inicio
+            if sai_veiculo:
+                sem_veiculo.add(linha_id)
+            if sai_motorista or sai_veiculo:
+                corte[linha_id] = min(motoristas_fora.get(info['motorista'], inicio),
+                                      veiculos_fora.get(info['veiculo'], inicio))
+                if not sai_motorista:
+                    so_veiculo.add(linha_id)
+        afetadas = sorted(corte, key=lambda linha_id: (linha_por_id[linha_id]['horario_inicio_min'], str(linha_id)))
+        nova = {linha_id: info for linha_id, info in escala.items() if linha_id not in corte}
+
+        # Veículos livres: nunca usados na escala original nem pela nova, e sem disrupção. Uma linha
+        # liberada que não perdeu o veículo o mantém, mesmo que troque de motorista.
+        reservados = {info['veiculo'] for info in escala.values()} | set(veiculos_fora)
+
+        def veiculos_livres() -> List[Dict[str, Any]]:
+            usados = reservados | {info['veiculo'] for info in nova.values()}
+            return veiculos[~veiculos['numero_carro'].isin(usados)].to_dict('records')
+
+        def veiculos_mantidos(liberadas: List[Any]) -> Dict[Any, Dict[str, Any]]:
+            numeros = {escala[linha_id]['veiculo']: linha_id for linha_id in liberadas if linha_id not in sem_veiculo}
+            registros = veiculos[veiculos['numero_carro'].isin(numeros.keys())].to_dict('records')
+            return {numeros[veiculo['numero_carro']]: veiculo for veiculo in registros}
+
+        # 1. Linhas que perderam só o veículo mantêm o motorista
+        indice_veiculos = VehicleIndex(veiculos_livres())
+        trocas = 0
+        for linha_id in afetadas:
+            if linha_id not in so_veiculo:
+                continue
+            veiculo = indice_veiculos.peek(linha_por_id[linha_id]['tipo_veiculo_necessario'])
+            if veiculo is not None:
+                indice_veiculos.allocate(veiculo['numero_carro'])
+                nova[linha_id] = {**escala[linha_id], 'veiculo': veiculo['numero_carro']}
+                trocas += 1
+
+        # 2. Linhas pendentes alocadas com as demais agendas fixas
+        registros_motoristas = motoristas[~motoristas['nome'].isin(motoristas_fora)].to_dict('records')
+        pontos: Dict[str, Point] = {}
+        pendentes = [linha_id for linha_id in afetadas if linha_id not in nova]
+        if pendentes:
+            agendas, origens = _agendas(nova, linha_por_id, agendados_base)
+            nova.update(allocate_lines([linha_por_id[linha_id] for linha_id in pendentes], registros_motoristas,
+                                       veiculos_livres(), veiculos_mantidos(pendentes), agendas, origens, pontos,
+                                       new_driver_penalty))
+            pendentes = [linha_id for linha_id in pendentes if linha_id not in nova]
+
+        # 3. Vizinhança limitada liberada e realocada junto com as linhas pendentes
+        vizinhas: List[Any] = []
+        if pendentes and max_vizinhanca > 0:
+            bloqueadas = set(fixas) | set(corte)
+            vizinhas = _vizinhanca(pendentes, nova, linha_por_id, corte, bloqueadas, max_vizinhanca, janela_minutos)
+        if vizinhas:
+            restante = {linha_id: info for linha_id, info in nova.items() if linha_id not in vizinhas}
+            liberadas = sorted(pendentes + vizinhas,
+                               key=lambda linha_id: (linha_por_id[linha_id]['horario_inicio_min'], str(linha_id)))
+            agendas, origens = _agendas(restante, linha_por_id, agendados_base)
+            tentativa = allocate_lines([linha_por_id[linha_id] for linha_id in liberadas], registros_motoristas,
+                                       veiculos_livres(), veiculos_mantidos(liberadas), agendas, origens, pontos,
+                                       new_driver_penalty)
+            if len(tentativa) > len(vizinhas):
+                nova = {**restante, **tentativa}
+                pendentes = [linha_id for linha_id in liberadas if linha_id not in nova]
+            else:
+                vizinhas = []
+
+    alteradas = [linha_id for linha_id in escala if nova.get(linha_id) != escala[linha_id]]
+    if metrics is not None:
+        metrics.count('reparo.afetadas', len(afetadas))
+        metrics.count('reparo.trocas_veiculo', trocas)
+        metrics.count('reparo.vizinhanca', len(vizinhas))
+        metrics.count('reparo.alteradas', len(alteradas))
+        metrics.count('reparo.sem_alocacao', len(pendentes))
+    return RepairResult(nova, afetadas, alteradas, pendentes)
@@ -1,20 +1,89 @@
 """Módulo principal de agendamento que contém a lógica de otimização."""
 from __future__ import annotations
 
-from datetime import datetime, time, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import pandas as pd
-from models.optimizer import calculate_distance, calculate_travel_time, calculate_travel_cost
-from services.rule_engine import is_time_conflict
+from models.deadhead_cache import DeadheadCache
+from models.domain import DriverTable, LineTable
+from models.fleet import FleetTimeline, VehicleIndex
+from models.flow import MAX_CANDIDATES, create_schedule_flow
+from models.local_search import improve_schedule
+from models.optimizer import (AVG_MINUTES_PER_DISTANCE_UNIT, Point, calculate_distance_points, calculate_schedule_cost,
+                              calculate_travel_cost, calculate_travel_minutes, get_point)
+from models.scoring import create_schedule_vectorized
+from models.spatial import ReachabilityIndex
+from models.timeline import Agendamento, DriverTimeline, as_timelines, build_timelines
+from services.data_loader import coordinate_table
+from services.metrics import PROGRESS_STEP, RunMetrics, timer
+from services.rule_engine import ConstraintEngine, DriverCheck, Rule, default_rules
+
+ENGINES = ('python', 'numpy', 'flow')
+
+# Agenda vazia compartilhada (somente leitura) para motoristas ainda sem viagens
+_AGENDA_VAZIA = DriverTimeline()
+
+
+def build_point_table(motoristas: pd.DataFrame, linhas: pd.DataFrame) -> Dict[str, Tuple[float, float]]:
+    """
+    Monta a tabela de coordenadas já convertidas de motoristas e linhas.
+
+    Args:
+        motoristas: DataFrame de motoristas (coluna 'localizacao').
+        linhas: DataFrame de linhas (colunas 'origem' e 'destino').
+
+    Returns:
+        Um dicionário {"lat,lon": (lat, lon)}.
+    """
+    pontos = {}
+    for df, coluna in ((motoristas, 'localizacao'), (linhas, 'origem'), (linhas, 'destino')):
+        if coluna in df.columns:
+            pontos.update(coordinate_table(df, coluna))
+    return pontos
+
+
+def _deslocamento_estimado(
+    distancia_pontos: Callable[[Point, Point], float],
+    pontos: Dict[str, Point],
+    origem: Point,
+    partida: str
+) -> Tuple[float, float]:
+    """Distância até a origem da linha e o tempo estimado pela distância (ver DriverCheck)."""
+    distancia = distancia_pontos(get_point(pontos, partida), origem)
+    return distancia, calculate_travel_minutes(distancia)
+
+
+def _deslocamento_em_cache(
+    deslocamento: Callable[[str, str], Tuple[float, float]],
+    origem: str,
+    partida: str
+) -> Tuple[float, float]:
+    """Distância e tempo até a origem da linha, pelo cache de deslocamentos (ver DriverCheck)."""
+    return deslocamento(partida, origem)
+
+
+def _meia_barra(progress: Callable[[float], None], inicio: float, fracao: float) -> None:
+    """Repassa o progresso de uma das metades da barra (o motor ou a busca local)."""
+    progress(inicio + fracao / 2)
 
 
 def create_schedule(
     motoristas: pd.DataFrame,
     veiculos: pd.DataFrame,
     linhas: pd.DataFrame,
-    motoristas_agendados: Optional[Dict[str, List[Tuple[time, time, str]]]] = None,
-    new_driver_penalty: float = 10000.0
+    motoristas_agendados: Optional[Dict[str, Union[DriverTimeline, List[Agendamento]]]] = None,
+    new_driver_penalty: float = 10000.0,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    metrics: Optional[RunMetrics] = None,
+    distance_cache: Optional[DeadheadCache] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    reuse_vehicles: bool = False,
+    veiculos_agendados: Optional[Dict[Any, DriverTimeline]] = None,
+    extra_rules: Sequence[Rule] = (),
+    flow_candidates: Optional[int] = MAX_CANDIDATES
 ) -> Dict[Any, Dict[str, Any]]:
     """
     Cria a escala otimizada de motoristas, veículos e linhas.
@@ -22,136 +91,316 @@ def create_schedule(
     Esta versão é otimizada para desempenho, pré-processando os dados e
     reduzindo a complexidade dos loops aninhados para encontrar a melhor
     combinação de motorista/veículo, minimizando o custo e o número de
-    motoristas utilizados.
+    motoristas utilizados. Como o custo de deslocamento depende apenas do
+    consumo do veículo, o melhor veículo de cada linha vem do topo de uma fila
+    de prioridade por tipo, e o trabalho por linha cai de O(D·V) para
+    O(D + log V). Em caso de empate de custo, vence o veículo mais econômico
+    por unidade de distância (e, entre iguais, o primeiro da lista).
 
     Args:
         motoristas: DataFrame de motoristas disponíveis.
         veiculos: DataFrame de veículos disponíveis.
         linhas: DataFrame de linhas a serem agendadas.
         motoristas_agendados: Dicionário que rastreia os agendamentos existentes.
-            Formato: {'NomeMotorista': [(inicio, fim, destino), ...]}.
+            Formato: {'NomeMotorista': DriverTimeline}. Listas no formato antigo
+            [(inicio, fim, destino), ...] são convertidas no próprio dicionário.
         new_driver_penalty: Custo artificial para penalizar a alocação de um
             novo motorista que ainda não está em rota.
+        engine: Motor de agendamento. 'python' percorre os candidatos um a um;
+            'numpy' avalia todos os candidatos de cada linha de forma vetorizada
+            e produz as mesmas atribuições; 'flow' resolve o encadeamento de
+            viagens como uma atribuição de custo mínimo sobre um grafo podado
+            por padrão (ver flow_candidates), uma heurística (ver models/flow.py).
+        improve_seconds: Se positivo, orçamento de tempo (em segundos) de uma
+            fase de busca local executada após o motor (ver models/local_search.py).
+        metrics: Se informado, recebe contadores (candidatos habilitados e
+            podados por habilidade, disponibilidade, índice espacial, jornada,
+            conflito e alcance), tempos por fase e o histograma de candidatos
+            avaliados por linha.
+            Com None (padrão), nenhuma medição é feita no laço principal.
+        distance_cache: Cache persistente de deslocamentos (ver
+            models/deadhead_cache.py), consultado no lugar do cálculo da
+            distância e do tempo de cada par. Pode conter tempos de rede
+            viária; por isso só é aceito pelo motor 'python' sem busca local,
+            que são os que consultam o cache.
+        progress: Se informado, recebe a fração concluída (de 0 a 1) a cada
+            PROGRESS_STEP linhas (motores 'python' e 'numpy'; o 'flow' só
+            informa o fim) e durante a busca local. Uma exceção lançada pelo
+            callback interrompe a execução; é assim que ela é cancelada.
+        reuse_vehicles: Se True, um veículo volta a servir outras linhas
+            depois de cada viagem, desde que chegue à origem a tempo (ver
+            FleetTimeline em models/fleet.py); por padrão, cada veículo faz
+            uma única linha por dia. Só nos motores 'python' e 'numpy'.
+        veiculos_agendados: Com reuse_vehicles, agendas pré-existentes dos
+            veículos {numero_carro: DriverTimeline} (ex: exceções manuais),
+            atualizadas no próprio dicionário com as novas viagens.
+        extra_rules: Regras de viabilidade adicionais às do motor (ex:
+            MinimumRestRule, RegionRule; ver services/rule_engine.py),
+            avaliadas junto com jornada, conflito e alcance. Só nos motores
+            'python' (regras com a forma escalar) e 'numpy', sem busca local.
+        flow_candidates: Predecessores mantidos por linha no grafo do motor
+            'flow' (ver create_schedule_flow); None usa o grafo completo, com
+            a atribuição exata e mais tempo.
 
     Returns:
         Um dicionário representando a escala gerada, onde as chaves são os IDs
         das linhas e os valores são dicionários com motorista e veículo alocados.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de agendamento desconhecido: {engine!r}. Opções: {', '.join(ENGINES)}")
+    if distance_cache is not None and (engine != 'python' or improve_seconds > 0):
+        raise ValueError("O cache de deslocamentos só é suportado pelo motor 'python', sem busca local.")
+    if reuse_vehicles and engine == 'flow':
+        raise ValueError("O reaproveitamento de veículos só é suportado pelos motores 'python' e 'numpy'.")
+    if extra_rules and (engine == 'flow' or improve_seconds > 0):
+        raise ValueError("Regras adicionais só são suportadas pelos motores 'python' e 'numpy', sem busca local.")
+    if flow_candidates is not None and flow_candidates < 1:
+        raise ValueError("A quantidade de predecessores do motor 'flow' deve ser positiva (None desativa a poda).")
+    if reuse_vehicles and veiculos_agendados is None:
+        veiculos_agendados = {}
+
     escala_gerada = {}
     if motoristas_agendados is None:
         motoristas_agendados = {}
-    veiculos_alocados = set()
+    as_timelines(motoristas_agendados)
+    # Coordenadas convertidas uma única vez, em vez de a cada cálculo de distância
+    with timer(metrics, 'scheduler.pontos'):
+        pontos = build_point_table(motoristas, linhas)
+    if improve_seconds > 0:
+        agendados_base = {nome: agenda.copy() for nome, agenda in motoristas_agendados.items()}
+        # Metade da barra para o motor e metade para a busca local
+        progresso_motor = None if progress is None else partial(_meia_barra, progress, 0.0)
+        progresso_busca = None if progress is None else partial(_meia_barra, progress, 0.5)
+        # A busca local troca só motoristas: as agendas dos veículos continuam válidas
+        escala_inicial = create_schedule(motoristas, veiculos, linhas, motoristas_agendados, new_driver_penalty, engine,
+                                         metrics=metrics, progress=progresso_motor, reuse_vehicles=reuse_vehicles,
+                                         veiculos_agendados=veiculos_agendados, flow_candidates=flow_candidates)
+        with timer(metrics, 'scheduler.melhoria'):
+            escala_gerada = improve_schedule(
+                escala_inicial, motoristas, veiculos, linhas, agendados_base, new_driver_penalty, improve_seconds, pontos,
+                progress=progresso_busca
+            )
+            motoristas_agendados.clear()
+            motoristas_agendados.update(build_timelines(escala_gerada, linhas, agendados_base))
+        return escala_gerada
+    if engine == 'numpy':
+        return create_schedule_vectorized(motoristas, veiculos, linhas, motoristas_agendados, new_driver_penalty, pontos,
+                                          metrics, progress, veiculos_agendados if reuse_vehicles else None,
+                                          extra_rules)
+    if engine == 'flow':
+        escala_gerada = create_schedule_flow(motoristas, veiculos, linhas, motoristas_agendados, new_driver_penalty,
+                                             pontos, flow_candidates, metrics)
+        if progress is not None:
+            progress(1.0)
+        return escala_gerada
 
     # --- Otimização 1: Pré-processamento e Estruturas de Dados Eficientes ---
-    # Converter para lista de dicionários para iteração muito mais rápida que .iterrows()
-    motoristas_list = motoristas.to_dict('records')
-
-    # Criar lookups para filtragem rápida (O(M) e O(V) uma única vez)
-    motoristas_por_habilidade = {}
-    # Usamos defaultdict para simplificar a criação de listas
-    from collections import defaultdict
-    motoristas_por_habilidade = defaultdict(list)
-    for m in motoristas.to_dict('records'):
-        for habilidade in m.get('habilidades', []):
-            motoristas_por_habilidade[habilidade].append(m)
-
-    veiculos_por_tipo = {}
-    for v in veiculos.to_dict('records'):
-        tipo = v.get('tipo')
-        if tipo not in veiculos_por_tipo:
-            veiculos_por_tipo[tipo] = []
-        veiculos_por_tipo[tipo].append(v)
-
-    # Ordenar as linhas por horário de início e iterar sobre uma lista de dicts
-    sorted_linhas = linhas.sort_values(by='horario_inicio_dt').to_dict('records')
-
-    for linha in sorted_linhas:
+    with timer(metrics, 'scheduler.indices'):
+        # Colunas indexadas por inteiros (models/domain.py) em vez de um dicionário por motorista
+        tabela = DriverTable(motoristas)
+        nomes = tabela.nomes
+        localizacoes = tabela.localizacoes
+        disponivel = tabela.disponivel
+        jornada_minutos = tabela.jornada_minutos
+        saida_de_casa = tabela.disponivel_a_partir
+        # Agenda de cada chave; None para quem ainda não está em rota (paga a penalidade)
+        agenda_por_chave: List[Optional[DriverTimeline]] = [motoristas_agendados.get(nome) for nome in nomes]
+        # Jornada, conflito, alcance e as regras adicionais, na forma escalar (services/rule_engine.py)
+        restricoes = ConstraintEngine(default_rules(AVG_MINUTES_PER_DISTANCE_UNIT, extra_rules),
+                                      contar=metrics is not None)
+        restricoes.require_scalar()
+        restricoes.prepare(motoristas)
+        permite = restricoes.allows
+        # As regras padrão só leem os campos já em colunas; o registro completo é só para as adicionais
+        registros = linhas.to_dict('records') if extra_rules else None
+
+        # Fila de prioridade por tipo: o veículo livre mais barato é consultado em O(1)
+        # (ou, com reaproveitamento, a linha do tempo da frota, consultada por tipo, lugar e horário)
+        indice_veiculos = VehicleIndex(veiculos.to_dict('records')) if not reuse_vehicles else None
+        frota = FleetTimeline(veiculos.to_dict('records'), pontos, veiculos_agendados) if reuse_vehicles else None
+
+        # --- Otimização 3: Índice espacial das posições correntes dos motoristas ---
+        # Descarta, antes da pontuação, quem não chega à origem a tempo ou ainda está em viagem
+        # Tempos de rede não são limitados pela distância euclidiana: só a poda por viagem em andamento vale
+        indice_alcance = ReachabilityIndex(
+            tabela, motoristas_agendados, pontos,
+            limite_por_distancia=distance_cache is None or not distance_cache.has_road_times
+        )
+
+    # Linhas em colunas, percorridas em ordem de horário de início
+    with timer(metrics, 'scheduler.ordenacao'):
+        tabela_linhas = LineTable(linhas)
+
+    # Contadores de descarte: inteiros locais, publicados em ``metrics`` só no final
+    sem_veiculo = indisponiveis = 0
+    distancia_pontos = calculate_distance_points
+    deslocamento = distance_cache.deadhead if distance_cache is not None else None
+    if metrics is not None:
+        distancia_pontos = metrics.timed('scheduler.distancias', calculate_distance_points)
+        if deslocamento is not None:
+            deslocamento = metrics.timed('scheduler.distancias', deslocamento)
+        inicio_laco = perf_counter()
+        n_motoristas = len(tabela)
+        indisponiveis_por_habilidade = {
+            habilidade: sum(not disponivel[chave] for chave in chaves)
+            for habilidade, chaves in tabela.por_habilidade.items()
+        }
+
+    n_linhas = len(tabela_linhas)
+    for n, i in enumerate(tabela_linhas.ordem):
+        if progress is not None and n % PROGRESS_STEP == 0:
+            progress(n / n_linhas)
         melhor_pontuacao = float('inf')
-        melhor_motorista_info = None
-        melhor_veiculo_info = None
+        melhor_chave = None
+        inicio_linha = tabela_linhas.inicio[i]
+        fim_linha = tabela_linhas.fim[i]
+        duracao_linha = tabela_linhas.duracao[i]
 
         # --- Otimização 2: Filtrar candidatos antes dos loops principais ---
-        tipo_veiculo_req = linha['tipo_veiculo_necessario']
-        motoristas_candidatos = motoristas_por_habilidade.get(tipo_veiculo_req, [])
-        veiculos_candidatos = veiculos_por_tipo.get(tipo_veiculo_req, [])
+        tipo_veiculo_req = tabela_linhas.tipos[i]
+        chaves_candidatas = tabela.por_habilidade.get(tipo_veiculo_req, [])
+        origem_linha = get_point(pontos, tabela_linhas.origens[i])
+        if frota is None:
+            veiculo = indice_veiculos.peek(tipo_veiculo_req)
+        else:
+            veiculo = frota.peek(tipo_veiculo_req, origem_linha, inicio_linha, fim_linha)
+        if veiculo is None:
+            sem_veiculo += 1
+            continue
+        n_habilitados = len(chaves_candidatas)
+        # A poda por viagem em andamento vale só para linhas de duração positiva
+        if duracao_linha > 0:
+            chaves_candidatas = indice_alcance.candidates(tipo_veiculo_req, origem_linha, inicio_linha)
+            if metrics is not None:
+                n_indisponiveis = indisponiveis_por_habilidade.get(tipo_veiculo_req, 0)
+                metrics.count('scheduler.podados_indisponivel', n_indisponiveis)
+                metrics.count('scheduler.podados_indice', n_habilitados - n_indisponiveis - len(chaves_candidatas))
+        if metrics is not None:
+            metrics.record_candidates(len(chaves_candidatas))
+            metrics.count('scheduler.candidatos', n_habilitados)
+            metrics.count('scheduler.podados_habilidade', n_motoristas - n_habilitados)
+
+        # O deslocamento de cada motorista é medido uma vez, pela regra de alcance, e reaproveitado no custo
+        if deslocamento is None:
+            medir = partial(_deslocamento_estimado, distancia_pontos, pontos, origem_linha)
+        else:
+            medir = partial(_deslocamento_em_cache, deslocamento, tabela_linhas.origens[i])
+        verificacao = DriverCheck(registros[i] if registros is not None else {}, inicio_linha, fim_linha,
+                                  duracao_linha, medir)
 
-        for motorista in motoristas_candidatos:
+        for chave in chaves_candidatas:
             # Pula motoristas indisponíveis
-            if motorista.get('disponibilidade', 'disponivel') != 'disponivel':
+            if not disponivel[chave]:
+                indisponiveis += 1
                 continue
 
-            agendamentos_atuais = motoristas_agendados.get(motorista['nome'], [])
-
-            # Calcula o total de horas já trabalhadas pelo motorista
-            horas_trabalhadas = timedelta()
-            for inicio, fim, _ in agendamentos_atuais:
-                inicio_dt = datetime.combine(datetime.today(), inicio)
-                fim_dt = datetime.combine(datetime.today(), fim)
-                if fim_dt < inicio_dt:  # Lida com turnos que cruzam a meia-noite
-                    fim_dt += timedelta(days=1)
-                horas_trabalhadas += (fim_dt - inicio_dt)
-
-            # Verifica se a nova linha excede a jornada de trabalho máxima
-            duracao_nova_linha = timedelta(minutes=linha['duracao_minutos'])
-            jornada_maxima = timedelta(hours=motorista.get('jornada_maxima_horas', 24))
-            if horas_trabalhadas + duracao_nova_linha > jornada_maxima:
-                continue
+            agenda = agenda_por_chave[chave]
+            em_rota = agenda is not None
+            if not em_rota:
+                agenda = _AGENDA_VAZIA
 
-            # Verifica conflito de horário direto
-            agendamentos_simples = [(start, end) for start, end, dest in agendamentos_atuais]
-            if is_time_conflict(linha['horario_inicio_dt'], linha['horario_fim_dt'], agendamentos_simples):
+            # Jornada, conflito de horário, alcance e regras adicionais, da mais barata para a mais cara
+            verificacao.set_driver(chave, agenda, jornada_minutos[chave], localizacoes[chave], saida_de_casa[chave])
+            if not permite(verificacao):
                 continue
 
-            ponto_partida_motorista = motorista['localizacao']
-            horario_disponivel_motorista = datetime.min.time()
-            ultimo_agendamento = max([ag for ag in agendamentos_atuais if ag[1] <= linha['horario_inicio_dt']], default=None, key=lambda x: x[1])
+            # O veículo mais barato do tipo é o melhor para qualquer motorista
+            custo_final = calculate_travel_cost((verificacao.medida or verificacao.deadhead())[0], veiculo)
 
-            if ultimo_agendamento:
-                ponto_partida_motorista = ultimo_agendamento[2]  # Destino da última viagem
-                horario_disponivel_motorista = ultimo_agendamento[1]  # Horário de término
+            # Adiciona uma penalidade alta se for necessário usar um novo motorista
+            if not em_rota:
+                custo_final += new_driver_penalty
 
-            dist_deslocamento = calculate_distance(ponto_partida_motorista, linha['origem'])
-            tempo_deslocamento = calculate_travel_time(dist_deslocamento)
-            horario_inicio_linha_dt = datetime.combine(datetime.today(), linha['horario_inicio_dt'])
-            horario_disponivel_dt = datetime.combine(datetime.today(), horario_disponivel_motorista)
+            if custo_final < melhor_pontuacao:
+                melhor_pontuacao = custo_final
+                melhor_chave = chave
 
-            if horario_disponivel_dt + tempo_deslocamento > horario_inicio_linha_dt:
-                continue
+        if melhor_chave is not None:
+            # Nomes e IDs só voltam a ser usados na saída
+            melhor_motorista_nome = nomes[melhor_chave]
+            melhor_veiculo_num = veiculo['numero_carro']
 
-            for veiculo in veiculos_candidatos:
-                if veiculo.get('disponibilidade', 'disponivel') != 'disponivel':
-                    continue
-                if veiculo['numero_carro'] in veiculos_alocados:
-                    continue
+            escala_gerada[tabela_linhas.ids[i]] = {
+                'motorista': melhor_motorista_nome,
+                'veiculo': melhor_veiculo_num,
+                'horario': tabela_linhas.horarios[i]
+            }
 
-                # Calcula o custo do deslocamento com base no veículo específico
-                custo_deslocamento = calculate_travel_cost(dist_deslocamento, veiculo)
+            agenda = agenda_por_chave[melhor_chave]
+            if agenda is None:
+                agenda = motoristas_agendados[melhor_motorista_nome] = DriverTimeline()
+                for chave in tabela.keys_for(melhor_motorista_nome):
+                    agenda_por_chave[chave] = agenda
+            agenda.insert(inicio_linha, fim_linha, tabela_linhas.destinos[i])
+            indice_alcance.assign(melhor_motorista_nome, fim_linha, get_point(pontos, tabela_linhas.destinos[i]))
+            if frota is None:
+                indice_veiculos.allocate(melhor_veiculo_num)
+            else:
+                frota.allocate(melhor_veiculo_num, inicio_linha, fim_linha, tabela_linhas.destinos[i])
 
-                # Adiciona uma penalidade alta se for necessário usar um novo motorista
-                custo_final = custo_deslocamento
-                if motorista['nome'] not in motoristas_agendados:
-                    custo_final += new_driver_penalty
+    if progress is not None:
+        progress(1.0)
+    if metrics is not None:
+        metrics.add_time('scheduler.laco', perf_counter() - inicio_laco)
+        metrics.count('scheduler.linhas', len(tabela_linhas))
+        metrics.count('scheduler.linhas_alocadas', len(escala_gerada))
+        metrics.count('scheduler.linhas_sem_veiculo', sem_veiculo)
+        metrics.count('scheduler.podados_indisponivel', indisponiveis)
+        for regra in restricoes.regras:
+            metrics.count(f'scheduler.podados_{regra.nome}', restricoes.podados[regra.nome])
+    return escala_gerada
 
-                if custo_final < melhor_pontuacao:
-                    melhor_pontuacao = custo_final
-                    melhor_motorista_info = motorista
-                    melhor_veiculo_info = veiculo
 
-        if melhor_motorista_info and melhor_veiculo_info:
-            melhor_motorista_nome = melhor_motorista_info['nome']
-            melhor_veiculo_num = melhor_veiculo_info['numero_carro']
+def compare_engines(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, Union[DriverTimeline, List[Agendamento]]]] = None,
+    new_driver_penalty: float = 10000.0,
+    engines: Tuple[str, ...] = ('python', 'flow'),
+    flow_candidates: Optional[int] = MAX_CANDIDATES
+) -> pd.DataFrame:
+    """
+    Executa a mesma instância com vários motores e compara tempo e custo.
 
-            escala_gerada[linha['id']] = {
-                'motorista': melhor_motorista_nome,
-                'veiculo': melhor_veiculo_num,
-                'horario': linha['horario_inicio']
-            }
+    O motor guloso ('python') é a referência: a coluna 'pior_que_guloso'
+    marca os motores que usaram mais motoristas do que ele na mesma instância
+    (sempre False quando 'python' não está entre os motores comparados). O
+    'flow' pode ser marcado quando a jornada máxima corta muitas cadeias, já
+    que cada corte abre uma cadeia nova.
 
-            if melhor_motorista_nome not in motoristas_agendados:
-                motoristas_agendados[melhor_motorista_nome] = []
-            motoristas_agendados[melhor_motorista_nome].append(
-                (linha['horario_inicio_dt'], linha['horario_fim_dt'], linha['destino'])
-            )
-            veiculos_alocados.add(melhor_veiculo_num)
+    Args:
+        motoristas: DataFrame de motoristas disponíveis.
+        veiculos: DataFrame de veículos disponíveis.
+        linhas: DataFrame de linhas a serem agendadas.
+        motoristas_agendados: Agendamentos existentes. Não é modificado; cada
+            motor recebe uma cópia.
+        new_driver_penalty: Penalidade por novo motorista.
+        engines: Motores a comparar.
+        flow_candidates: Poda do grafo do motor 'flow' (ver create_schedule).
 
-    return escala_gerada
\ No newline at end of file
+    Returns:
+        Um DataFrame com uma linha por motor e as colunas 'motor', 'tempo_s',
+        'custo_total', 'motoristas', 'linhas_alocadas' e 'pior_que_guloso'.
+    """
+    agendados_base = as_timelines(dict(motoristas_agendados or {}))
+    resultados = []
+    for engine in engines:
+        agendados = {nome: agenda.copy() for nome, agenda in agendados_base.items()}
+        inicio = perf_counter()
+        escala = create_schedule(motoristas, veiculos, linhas, agendados, new_driver_penalty, engine=engine,
+                                 flow_candidates=flow_candidates)
+        tempo = perf_counter() - inicio
+        resultados.append({
+            'motor': engine,
+            'tempo_s': tempo,
+            'custo_total': calculate_schedule_cost(
+                escala, motoristas, veiculos, linhas, agendados_base, new_driver_penalty
+            ),
+            'motoristas': len({info['motorista'] for info in escala.values()}),
+            'linhas_alocadas': len(escala),
+        })
+    comparacao = pd.DataFrame(resultados)
+    referencia = comparacao.loc[comparacao['motor'] == 'python', 'motoristas']
+    comparacao['pior_que_guloso'] = (comparacao['motoristas'] > referencia.iloc[0]) if len(referencia) else False
+    return comparacao
@@ -0,0 +1,214 @@
+"""Motor de pontuação vetorizado (NumPy) para o agendador de escalas.
+
+Reproduz as mesmas decisões gulosas de ``create_schedule``, mas avalia todos
+os motoristas candidatos de uma linha de uma só vez, com operações de array,
+em vez de percorrer pares (motorista, veículo) em loops aninhados.
+"""
+from __future__ import annotations
+
+import heapq
+from collections import Counter
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.domain import DriverTable
+from models.fleet import FleetTimeline, VehicleIndex
+from models.optimizer import AVG_MINUTES_PER_DISTANCE_UNIT, Point, calculate_travel_costs, get_point
+from models.timeline import DriverTimeline
+from services.metrics import PROGRESS_STEP, RunMetrics, timer
+from services.rule_engine import ConstraintEngine, DriverState, LineContext, Rule, default_rules
+
+
+def create_schedule_vectorized(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    motoristas_agendados: Dict[str, DriverTimeline],
+    new_driver_penalty: float = 10000.0,
+    pontos: Optional[Dict[str, Point]] = None,
+    metrics: Optional[RunMetrics] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    veiculos_agendados: Optional[Dict[Any, DriverTimeline]] = None,
+    extra_rules: Sequence[Rule] = ()
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Cria a escala com a mesma heurística gulosa de ``create_schedule``, usando NumPy.
+
+    Para cada linha, a viabilidade de todos os motoristas candidatos vem do
+    motor de restrições (services/rule_engine.py): jornada, alcançabilidade
+    e conflito de horário, mais as regras adicionais, cada uma avaliada de
+    forma vetorizada, da mais barata para a mais cara. O veículo vem da mesma
+    fila de prioridade por tipo do motor original e o desempate entre
+    motoristas segue a mesma ordem.
+
+    Args:
+        motoristas: DataFrame de motoristas disponíveis.
+        veiculos: DataFrame de veículos disponíveis.
+        linhas: DataFrame de linhas a serem agendadas.
+        motoristas_agendados: Dicionário que rastreia os agendamentos existentes.
+            É atualizado com as novas alocações, como no motor original.
+        new_driver_penalty: Custo artificial para penalizar a alocação de um
+            novo motorista que ainda não está em rota.
+        pontos: Tabela de coordenadas já convertidas {"lat,lon": (lat, lon)}.
+            Coordenadas ausentes são convertidas sob demanda.
+        metrics: Se informado, recebe os mesmos contadores e tempos do motor
+            original, obtidos das máscaras de viabilidade.
+        progress: Callback de progresso, como em ``create_schedule``.
+        veiculos_agendados: Se informado, os veículos são reaproveitados entre
+            viagens (ver ``reuse_vehicles`` em ``create_schedule``) e o
+            dicionário recebe as novas viagens de cada veículo.
+        extra_rules: Regras de viabilidade adicionais (ver services/rule_engine.py).
+
+    Returns:
+        Um dicionário representando a escala gerada, no mesmo formato de
+        ``create_schedule``.
+    """
+    escala_gerada = {}
+    if pontos is None:
+        pontos = {}
+    medir = metrics is not None
+    inicio_indices = perf_counter()
+
+    # --- Dados estáticos dos motoristas, em colunas (models/domain.py) ---
+    tabela = DriverTable(motoristas)
+    n_motoristas = len(tabela)
+    codigo_por_nome = {nome: codigo for codigo, nome in enumerate(tabela.chave_por_nome)}
+    codigo_motorista = np.fromiter((codigo_por_nome[nome] for nome in tabela.nomes), dtype=np.intp,
+                                   count=n_motoristas)
+    jornada_minutos = np.frombuffer(tabela.jornada_minutos, dtype=float) if n_motoristas else np.empty(0)
+    disponivel = np.frombuffer(bytes(tabela.disponivel), dtype=np.uint8).astype(bool)
+    localizacao = np.full((n_motoristas, 2), np.nan)
+    for i in np.flatnonzero(disponivel & (tabela.mascaras != 0)).tolist():
+        localizacao[i] = get_point(pontos, tabela.localizacoes[i])
+    # Candidatos por habilidade pela máscara de bits; os indisponíveis são contados como podados
+    candidatos_por_habilidade = {}
+    indisponiveis_por_habilidade: Counter = Counter()
+    for habilidade in tabela.bits:
+        habilitados = tabela.with_skill(habilidade)
+        candidatos = np.flatnonzero(habilitados & disponivel)
+        if candidatos.size:
+            candidatos_por_habilidade[habilidade] = candidatos
+        indisponiveis_por_habilidade[habilidade] = int(np.count_nonzero(habilitados & ~disponivel))
+
+    # --- Regras de viabilidade e estado dinâmico por nome de motorista ---
+    restricoes = ConstraintEngine(default_rules(AVG_MINUTES_PER_DISTANCE_UNIT, extra_rules), contar=medir)
+    restricoes.prepare(motoristas)
+    capacidade = sum(len(ags) for ags in motoristas_agendados.values()) + len(linhas)
+    saida_de_casa = np.frombuffer(tabela.disponivel_a_partir, dtype=float) if n_motoristas else np.empty(0)
+    estado = DriverState(codigo_motorista, jornada_minutos, localizacao, len(codigo_por_nome), capacidade,
+                         restricoes.retencao_minutos, saida_de_casa)
+    n_viagens = 0
+    # Viagens ainda não encerradas no instante corrente: (fim, sequência, código, ponto)
+    pendentes: List[Tuple[float, int, int, Point]] = []
+
+    def registrar_viagem(codigo: int, inicio: float, fim: float, destino: Point) -> None:
+        nonlocal n_viagens
+        estado.add_trip(codigo, inicio, fim)
+        heapq.heappush(pendentes, (fim, n_viagens, codigo, destino))
+        n_viagens += 1
+
+    for nome, agendamentos in motoristas_agendados.items():
+        codigo = codigo_por_nome.get(nome)
+        if codigo is None:
+            continue
+        estado.em_rota[codigo] = True
+        for inicio, fim, destino in agendamentos:
+            registrar_viagem(codigo, inicio, fim, get_point(pontos, destino))
+
+    # --- Veículos: o mais barato de cada tipo vem do topo de uma fila de prioridade ---
+    # (ou, com reaproveitamento, da linha do tempo da frota)
+    frota = indice_veiculos = None
+    if veiculos_agendados is not None:
+        frota = FleetTimeline(veiculos.to_dict('records'), pontos, veiculos_agendados)
+    else:
+        indice_veiculos = VehicleIndex(veiculos.to_dict('records'))
+    if medir:
+        metrics.add_time('scheduler.indices', perf_counter() - inicio_indices)
+
+    with timer(metrics, 'scheduler.ordenacao'):
+        sorted_linhas = linhas.sort_values(by='horario_inicio_min', kind='stable').to_dict('records')
+
+    sem_veiculo = 0
+    viaveis = restricoes.feasible
+    if medir:
+        viaveis = metrics.timed('scheduler.regras', restricoes.feasible)
+        inicio_laco = perf_counter()
+
+    for n, linha in enumerate(sorted_linhas):
+        if progress is not None and n % PROGRESS_STEP == 0:
+            progress(n / len(sorted_linhas))
+        inicio_linha = linha['horario_inicio_min']
+        fim_linha = linha['horario_fim_min']
+
+        # Atualiza o ponto de partida dos motoristas cujas viagens terminaram
+        while pendentes and pendentes[0][0] <= inicio_linha:
+            fim, _, codigo, ponto = heapq.heappop(pendentes)
+            estado.finish_trip(codigo, fim, ponto)
+
+        tipo_veiculo_req = linha['tipo_veiculo_necessario']
+        candidatos = candidatos_por_habilidade.get(tipo_veiculo_req)
+        if frota is None:
+            veiculo = indice_veiculos.peek(tipo_veiculo_req)
+        else:
+            veiculo = frota.peek(tipo_veiculo_req, get_point(pontos, linha['origem']), inicio_linha, fim_linha)
+        if veiculo is None:
+            sem_veiculo += 1
+            continue
+        if medir:
+            n_indisponiveis = indisponiveis_por_habilidade[tipo_veiculo_req]
+            n_candidatos = n_indisponiveis + (0 if candidatos is None else len(candidatos))
+            metrics.record_candidates(n_candidatos)
+            metrics.count('scheduler.candidatos', n_candidatos)
+            metrics.count('scheduler.podados_habilidade', n_motoristas - n_candidatos)
+            metrics.count('scheduler.podados_indisponivel', n_indisponiveis)
+        if candidatos is None:
+            continue
+
+        # Jornada, alcance, conflito e regras adicionais, da mais barata para a mais cara
+        contexto = LineContext(linha, get_point(pontos, linha['origem']), candidatos, estado)
+        indices = viaveis(contexto)
+        if not indices.size:
+            continue
+
+        penalidade = np.where(estado.em_rota[contexto.codigos[indices]], 0.0, new_driver_penalty)
+        custo_final = calculate_travel_costs(contexto.deadheads(indices), veiculo) + penalidade
+
+        k = int(np.argmin(custo_final))
+        if not custo_final[k] < float('inf'):
+            continue
+
+        melhor_motorista = candidatos[indices[k]]
+        melhor_motorista_nome = tabela.nomes[melhor_motorista]
+        melhor_veiculo_num = veiculo['numero_carro']
+
+        escala_gerada[linha['id']] = {
+            'motorista': melhor_motorista_nome,
+            'veiculo': melhor_veiculo_num,
+            'horario': linha['horario_inicio']
+        }
+
+        if melhor_motorista_nome not in motoristas_agendados:
+            motoristas_agendados[melhor_motorista_nome] = DriverTimeline()
+        motoristas_agendados[melhor_motorista_nome].insert(
+            inicio_linha, fim_linha, linha['destino']
+        )
+        codigo = codigo_motorista[melhor_motorista]
+        registrar_viagem(codigo, inicio_linha, fim_linha, get_point(pontos, linha['destino']))
+        if frota is None:
+            indice_veiculos.allocate(melhor_veiculo_num)
+        else:
+            frota.allocate(melhor_veiculo_num, inicio_linha, fim_linha, linha['destino'])
+
+    if medir:
+        metrics.add_time('scheduler.laco', perf_counter() - inicio_laco)
+        metrics.count('scheduler.linhas', len(sorted_linhas))
+        metrics.count('scheduler.linhas_alocadas', len(escala_gerada))
+        metrics.count('scheduler.linhas_sem_veiculo', sem_veiculo)
+        for nome_regra, podados in restricoes.podados.items():
+            metrics.count(f'scheduler.podados_{nome_regra}', podados)
+    if progress is not None:
+        progress(1.0)
+    return escala_gerada
@@ -0,0 +1,428 @@
+"""Índice espacial das posições correntes dos motoristas para podar candidatos inalcançáveis.
+
+Cada motorista ocupa, em uma grade uniforme, a célula do ponto onde termina
+sua última viagem iniciada (ou de casa), junto com o horário em que fica
+livre. Para uma linha, só as células cuja distância mínima até a origem cabe
+na folga antes do início precisam ser visitadas e, em cada célula, só os
+motoristas livres a tempo. A poda é exata: um motorista descartado seria
+rejeitado pelo motor guloso por alcance ou por conflito de horário.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from models.domain import DriverTable
+from models.optimizer import Point, calculate_travel_minutes, get_point
+from models.timeline import DriverTimeline
+
+Celula = Tuple[int, int]
+# Conteúdo de uma célula: (disponivel_em, chave) ordenados e, em paralelo, só as chaves
+Conteudo = Tuple[List[Tuple[float, int]], List[int]]
+
+# Motoristas por célula buscados ao dimensionar a grade
+MOTORISTAS_POR_CELULA = 16
+# Tolerância (em minutos) do limite de cada célula: a consulta nunca descarta por arredondamento
+_FOLGA_MINUTOS = 1e-6
+# Acima de quantas células vazias por ocupada visitar os anéis custa mais que percorrer as células ocupadas
+_ANEIS_POR_CELULA = 4
+
+
+def _anel(i0: int, j0: int, raio: int) -> Iterator[Celula]:
+    """Células a exatamente ``raio`` células (na maior das duas direções) da célula (i0, j0)."""
+    if raio == 0:
+        yield i0, j0
+        return
+    for i in range(i0 - raio, i0 + raio + 1):
+        yield i, j0 - raio
+        yield i, j0 + raio
+    for j in range(j0 - raio + 1, j0 + raio):
+        yield i0 - raio, j
+        yield i0 + raio, j
+
+
+def cell_size_for(pontos: Iterable[Point], motoristas_por_celula: int = MOTORISTAS_POR_CELULA) -> float:
+    """
+    Escolhe o lado das células para que cada uma tenha, em média, ``motoristas_por_celula`` motoristas.
+
+    Args:
+        pontos: Posições dos motoristas. Pontos não finitos são ignorados.
+        motoristas_por_celula: Ocupação média desejada.
+
+    Returns:
+        O lado da célula, em unidades de distância (1.0 se não houver extensão).
+    """
+    validos = [p for p in pontos if math.isfinite(p[0]) and math.isfinite(p[1])]
+    if len(validos) < 2:
+        return 1.0
+    extensao = max(max(p[0] for p in validos) - min(p[0] for p in validos),
+                   max(p[1] for p in validos) - min(p[1] for p in validos))
+    celulas_por_eixo = max(1, math.ceil(math.sqrt(len(validos) / motoristas_por_celula)))
+    return extensao / celulas_por_eixo if extensao > 0 else 1.0
+
+
+class DriverGrid:
+    """
+    Grade uniforme de motoristas, cada um com uma posição e o horário em que fica livre.
+
+    Cada célula guarda uma lista ordenada de (disponivel_em, chave) e, em
+    paralelo, só as chaves, de modo que os motoristas livres até um limite
+    são obtidos por bisect e copiados em fatia. Motoristas sem coordenada
+    válida ficam fora da grade e são sempre retornados.
+
+    As consultas visitam as células em anéis a partir da célula da origem:
+    no anel r, a distância mínima até a origem é ao menos (r - 1) lados, de
+    modo que a busca para no anel que nenhum motorista alcança a tempo (pelo
+    menor horário livre da grade) ou que já cobre todas as células ocupadas.
+    """
+
+    def __init__(self, tamanho_celula: float) -> None:
+        """
+        Args:
+            tamanho_celula: Lado das células, em unidades de distância.
+        """
+        if not tamanho_celula > 0:
+            raise ValueError(f"Tamanho de célula inválido: {tamanho_celula}.")
+        self.tamanho_celula = tamanho_celula
+        self._celulas: Dict[Celula, Conteudo] = {}
+        self._estado: Dict[int, Tuple[Optional[Celula], float]] = {}
+        self._sem_posicao: Set[int] = set()
+        # Cotas que só se expandem: menor horário livre e extensão (i, j) das células já ocupadas
+        self._minimo_livre = math.inf
+        self._extensao: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._estado)
+
+    def _celula(self, ponto: Point) -> Optional[Celula]:
+        if not (math.isfinite(ponto[0]) and math.isfinite(ponto[1])):
+            return None
+        return math.floor(ponto[0] / self.tamanho_celula), math.floor(ponto[1] / self.tamanho_celula)
+
+    def update(self, chave: int, ponto: Point, disponivel_em: float) -> None:
+        """
+        Insere o motorista ou o move para uma nova posição e horário de liberação.
+
+        Args:
+            chave: Identificador do motorista (ex: sua posição no DataFrame).
+            ponto: Posição corrente.
+            disponivel_em: Horário, em minutos, a partir do qual está livre.
+        """
+        anterior = self._estado.get(chave)
+        if anterior is not None:
+            celula, disponivel = anterior
+            if celula is None:
+                self._sem_posicao.discard(chave)
+            else:
+                pares, chaves = self._celulas[celula]
+                posicao = bisect_right(pares, (disponivel, chave)) - 1
+                del pares[posicao]
+                del chaves[posicao]
+                if not pares:
+                    del self._celulas[celula]
+        celula = self._celula(ponto)
+        self._estado[chave] = (celula, disponivel_em)
+        if celula is None:
+            self._sem_posicao.add(chave)
+        else:
+            self._minimo_livre = min(self._minimo_livre, disponivel_em)
+            i, j = celula
+            if self._extensao is None:
+                self._extensao = (i, i, j, j)
+            else:
+                i_min, i_max, j_min, j_max = self._extensao
+                self._extensao = (min(i_min, i), max(i_max, i), min(j_min, j), max(j_max, j))
+            pares, chaves = self._celulas.setdefault(celula, ([], []))
+            posicao = bisect_right(pares, (disponivel_em, chave))
+            pares.insert(posicao, (disponivel_em, chave))
+            chaves.insert(posicao, chave)
+
+    def _raio(self, centro: Celula, horario: float) -> int:
+        """Último anel ao redor de ``centro`` que pode ter motorista livre a tempo (-1 se nenhum)."""
+        if self._extensao is None or self._minimo_livre > horario:
+            return -1
+        i0, j0 = centro
+        i_min, i_max, j_min, j_max = self._extensao
+        cobertura = max(i0 - i_min, i_max - i0, j0 - j_min, j_max - j0)
+        # O tempo de deslocamento é proporcional à distância: no anel r, ao menos (r - 1) lados
+        minutos_por_lado = calculate_travel_minutes(self.tamanho_celula)
+        if minutos_por_lado <= 0:
+            return cobertura
+        return min(cobertura, int((horario - self._minimo_livre + _FOLGA_MINUTOS) // minutos_por_lado) + 1)
+
+    def _celulas_no_raio(self, centro: Celula, raio: int) -> Iterable[Tuple[Celula, Conteudo]]:
+        """Células ocupadas até o anel ``raio``: pelos anéis ou, se há mais anéis que células, por todas."""
+        if (2 * raio + 1) ** 2 > _ANEIS_POR_CELULA * len(self._celulas):
+            return self._celulas.items()
+        celulas = self._celulas
+        return ((celula, celulas[celula]) for r in range(raio + 1) for celula in _anel(*centro, r) if celula in celulas)
+
+    def _limite(self, celula: Celula, origem: Point, horario: float) -> Tuple[float, float]:
+        """Distância mínima entre a origem e a célula e o último horário livre que ainda chega a tempo."""
+        lado = self.tamanho_celula
+        i, j = celula
+        ox, oy = origem
+        dx = max(i * lado - ox, 0.0, ox - (i + 1) * lado)
+        dy = max(j * lado - oy, 0.0, oy - (j + 1) * lado)
+        distancia = (dx * dx + dy * dy) ** 0.5
+        return distancia, horario - calculate_travel_minutes(distancia) + _FOLGA_MINUTOS
+
+    def query(self, origem: Optional[Point], horario: float) -> List[int]:
+        """
+        Retorna os motoristas que podem chegar à origem até o horário informado.
+
+        A distância usada em cada célula é a menor possível entre a origem e
+        a célula, então o resultado contém todos os motoristas cujo
+        ``disponivel_em + calculate_travel_minutes(distância)`` não passa do
+        horário (e, possivelmente, alguns que passam). Nenhum motorista livre
+        só depois do horário é retornado, exceto os sem posição.
+
+        Args:
+            origem: Ponto de partida da linha. None desliga o limite por
+                distância: retorna todos os motoristas livres até o horário.
+            horario: Início da linha, em minutos.
+
+        Returns:
+            As chaves dos motoristas, sem ordem definida.
+        """
+        chaves = list(self._sem_posicao)
+        if origem is None:
+            for pares, chaves_celula in self._celulas.values():
+                chaves.extend(chaves_celula[:bisect_right(pares, (horario, math.inf))])
+            return chaves
+        centro = self._celula(origem)
+        if centro is None:
+            return list(self._estado)
+        for celula, (pares, chaves_celula) in self._celulas_no_raio(centro, self._raio(centro, horario)):
+            primeiro = pares[0][0]
+            if primeiro > horario:
+                continue
+            _, limite = self._limite(celula, origem, horario)
+            if primeiro > limite:
+                continue
+            if pares[-1][0] <= limite:
+                chaves.extend(chaves_celula)
+            else:
+                chaves.extend(chaves_celula[:bisect_right(pares, (limite, math.inf))])
+        return chaves
+
+    def query_by_distance(self, origem: Point, horario: float) -> Iterator[Tuple[float, List[int]]]:
+        """
+        Como ``query``, mas agrupa os motoristas por célula, da mais próxima à mais distante da origem.
+
+        Os grupos são gerados sob demanda: um anel só é visitado quando a
+        próxima célula mais próxima pode estar nele, então quem para a busca
+        assim que a distância mínima de uma célula já torna qualquer
+        motorista dela pior que o melhor encontrado não paga pelas células
+        distantes. A grade não deve ser atualizada durante a iteração.
+
+        Args:
+            origem: Ponto de partida da linha.
+            horario: Início da linha, em minutos.
+
+        Yields:
+            Tuplas (distância mínima entre a origem e a célula, chaves), em
+            ordem crescente de distância (empates pela célula). Motoristas
+            sem posição (ou todos, se a origem não for válida) vêm primeiro,
+            com distância 0.
+        """
+        centro = self._celula(origem)
+        if centro is None:
+            yield 0.0, list(self._estado)
+            return
+        if self._sem_posicao:
+            yield 0.0, list(self._sem_posicao)
+        raio = self._raio(centro, horario)
+        if (2 * raio + 1) ** 2 > _ANEIS_POR_CELULA * len(self._celulas):
+            # Grade esparsa: todas as células ocupadas entram de uma vez no heap
+            aneis: Iterator[Iterable[Celula]] = iter([list(self._celulas)])
+            proximo_minimo = math.inf
+        else:
+            aneis = (_anel(*centro, r) for r in range(raio + 1))
+            proximo_minimo = 0.0
+        fila: List[Tuple[float, Celula, float]] = []
+        r = 0
+        while True:
+            # Só visita o próximo anel se a célula mais próxima do heap puder estar depois dele
+            while not fila or fila[0][0] > proximo_minimo:
+                anel = next(aneis, None)
+                if anel is None:
+                    break
+                for celula in anel:
+                    conteudo = self._celulas.get(celula)
+                    if conteudo is None or conteudo[0][0][0] > horario:
+                        continue
+                    distancia, limite = self._limite(celula, origem, horario)
+                    if conteudo[0][0][0] <= limite:
+                        heapq.heappush(fila, (distancia, celula, limite))
+                proximo_minimo = r * self.tamanho_celula
+                r += 1
+            if not fila:
+                return
+            distancia, celula, limite = heapq.heappop(fila)
+            pares, chaves_celula = self._celulas[celula]
+            yield distancia, chaves_celula[:bisect_right(pares, (limite, math.inf))]
+
+
+class ReachabilityIndex:
+    """
+    Posições correntes dos motoristas disponíveis, por habilidade, ao longo de um dia.
+
+    O estado de cada motorista é a viagem de maior término entre as já
+    iniciadas (destino e término) ou, sem viagens, sua casa e o horário em
+    que sai dela (``DriverTable.disponivel_a_partir``, 0 por padrão) -- o
+    mesmo ponto de partida que o motor guloso obtém com
+    ``DriverTimeline.previous_trip``. Enquanto a viagem está em andamento o
+    motorista fica livre só depois do horário consultado e é podado: ele
+    teria conflito de horário com qualquer linha de duração positiva.
+
+    As consultas devem ser feitas em ordem crescente de horário. Motoristas
+    com agendas sobrepostas ficam fora da poda e são sempre retornados.
+    """
+
+    def __init__(
+        self,
+        motoristas: Union[DriverTable, Sequence[Dict[str, Any]]],
+        motoristas_agendados: Dict[str, DriverTimeline],
+        pontos: Dict[str, Point],
+        tamanho_celula: Optional[float] = None,
+        limite_por_distancia: bool = True
+    ) -> None:
+        """
+        Args:
+            motoristas: Tabela (ver models/domain.py) ou registros de
+                motoristas, na ordem usada pelo motor: as chaves retornadas
+                são as posições nessa ordem.
+            motoristas_agendados: Agendas existentes {nome: DriverTimeline}.
+                Não são modificadas; novas viagens entram por ``assign``.
+            pontos: Tabela de coordenadas já convertidas.
+            tamanho_celula: Lado das células (None escolhe por cell_size_for).
+            limite_por_distancia: Se False, poda só os motoristas ainda em
+                viagem (para tempos de deslocamento que não derivam da
+                distância euclidiana, como os de rede viária).
+        """
+        if not isinstance(motoristas, DriverTable):
+            motoristas = DriverTable.from_records(motoristas)
+        self._limite_por_distancia = limite_por_distancia
+        self._pontos = pontos
+        self._chaves_por_nome: Dict[str, List[int]] = defaultdict(list)
+        self._habilidades: Dict[int, Tuple[Any, ...]] = {}
+        self._sempre: Dict[Any, List[int]] = defaultdict(list)
+        casas: Dict[int, Point] = {}
+        for chave, (nome, habilidades, disponivel) in enumerate(
+            zip(motoristas.nomes, motoristas.habilidades, motoristas.disponivel)
+        ):
+            if not disponivel or not habilidades:
+                continue
+            agenda = motoristas_agendados.get(nome)
+            if agenda is not None and not agenda.is_chronological:
+                for habilidade in habilidades:
+                    self._sempre[habilidade].append(chave)
+                continue
+            self._chaves_por_nome[nome].append(chave)
+            self._habilidades[chave] = habilidades
+            casas[chave] = get_point(pontos, motoristas.localizacoes[chave])
+
+        lado = tamanho_celula or cell_size_for(casas.values())
+        self._grades: Dict[Any, DriverGrid] = defaultdict(lambda: DriverGrid(lado))
+        self._estado: Dict[str, Tuple[float, Point]] = {}
+        for chave, casa in casas.items():
+            for habilidade in self._habilidades[chave]:
+                self._grades[habilidade].update(chave, casa, motoristas.disponivel_a_partir[chave])
+
+        # Viagens já agendadas entram no estado quando começam: (início, término, destino)
+        self._pendentes: List[Tuple[float, float, str, str]] = []
+        for nome in self._chaves_por_nome:
+            for inicio, fim, destino in motoristas_agendados.get(nome, ()):
+                self._pendentes.append((inicio, fim, nome, destino))
+        heapq.heapify(self._pendentes)
+
+    def _mover(self, nome: str, fim: float, destino: Point) -> None:
+        """Atualiza o estado do motorista se a viagem termina depois da atual."""
+        atual = self._estado.get(nome)
+        # Com términos iguais vale a viagem iniciada por último, como em previous_trip
+        if atual is not None and fim < atual[0]:
+            return
+        self._estado[nome] = (fim, destino)
+        for chave in self._chaves_por_nome[nome]:
+            for habilidade in self._habilidades[chave]:
+                self._grades[habilidade].update(chave, destino, fim)
+
+    def _avancar(self, horario: float) -> None:
+        """Move os motoristas cujas viagens já agendadas começam até o horário (uma vez cada)."""
+        movidos: Dict[str, Tuple[float, str]] = {}
+        while self._pendentes and self._pendentes[0][0] <= horario:
+            _, fim, nome, destino = heapq.heappop(self._pendentes)
+            atual = movidos.get(nome) or self._estado.get(nome)
+            if atual is None or fim >= atual[0]:
+                movidos[nome] = (fim, destino)
+        for nome, (fim, destino) in movidos.items():
+            self._mover(nome, fim, get_point(self._pontos, destino))
+
+    def candidates(self, habilidade: Any, origem: Point, horario: float) -> List[int]:
+        """
+        Retorna os motoristas com a habilidade que podem chegar à origem até o horário.
+
+        Args:
+            habilidade: Tipo de veículo exigido pela linha.
+            origem: Ponto de partida da linha.
+            horario: Início da linha, em minutos (não decrescente entre chamadas).
+
+        Returns:
+            As chaves dos motoristas (posições na ordem recebida pelo índice),
+            em ordem crescente.
+        """
+        self._avancar(horario)
+        grade = self._grades.get(habilidade)
+        if grade is None:
+            chaves = []
+        else:
+            chaves = grade.query(origem if self._limite_por_distancia else None, horario)
+        chaves.extend(self._sempre.get(habilidade, ()))
+        chaves.sort()
+        return chaves
+
+    def candidates_by_distance(self, habilidade: Any, origem: Point, horario: float) -> Iterator[Tuple[float, List[int]]]:
+        """
+        Como ``candidates``, mas agrupado por distância mínima até a origem (ver DriverGrid.query_by_distance).
+
+        Os grupos são gerados sob demanda e devem ser consumidos antes de
+        ``assign``.
+
+        Args:
+            habilidade: Tipo de veículo exigido pela linha.
+            origem: Ponto de partida da linha.
+            horario: Início da linha, em minutos (não decrescente entre chamadas).
+
+        Returns:
+            Os grupos (distância mínima, chaves), em ordem crescente de
+            distância. As chaves são as posições dos motoristas na lista
+            recebida pelo índice; os que ficam fora da poda vêm primeiro, com
+            distância 0.
+        """
+        self._avancar(horario)
+        grade = self._grades.get(habilidade)
+        grupos: Iterable[Tuple[float, List[int]]] = ()
+        if grade is not None and self._limite_por_distancia:
+            grupos = grade.query_by_distance(origem, horario)
+        elif grade is not None:
+            grupos = [(0.0, grade.query(None, horario))]
+        if self._sempre.get(habilidade):
+            grupos = chain([(0.0, list(self._sempre[habilidade]))], grupos)
+        return iter(grupos)
+
+    def assign(self, nome: str, fim: float, destino: Point) -> None:
+        """
+        Registra uma viagem alocada que começa no horário da consulta atual.
+
+        Args:
+            nome: Nome do motorista.
+            fim: Término da viagem, em minutos.
+            destino: Ponto final da viagem.
+        """
+        if nome in self._chaves_por_nome:
+            self._mover(nome, fim, destino)
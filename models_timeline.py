@@ -0,0 +1,232 @@
+"""Linha do tempo incremental dos agendamentos de um motorista."""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from services.rule_engine import is_time_conflict
+
+# (início, fim, destino), com horários em minutos desde a meia-noite do dia da escala
+Agendamento = Tuple[float, float, str]
+
+MINUTOS_POR_DIA = 24 * 60
+
+
+def time_to_minutes(t: time) -> float:
+    """Converte um objeto time em minutos desde a meia-noite."""
+    return t.hour * 60 + t.minute + t.second / 60 + t.microsecond / 60_000_000
+
+
+def _agendamento_em_minutos(inicio: Any, fim: Any, destino: str) -> Agendamento:
+    """Converte um agendamento no formato antigo (objetos time) para minutos."""
+    if isinstance(inicio, time):
+        inicio = time_to_minutes(inicio)
+    if isinstance(fim, time):
+        fim = time_to_minutes(fim)
+        if fim < inicio:  # No formato antigo, o término após a meia-noite dava a volta
+            fim += MINUTOS_POR_DIA
+    return inicio, fim, destino
+
+
+class DriverTimeline:
+    """
+    Agenda de um motorista ordenada por horário de início.
+
+    Mantém os intervalos em listas ordenadas (busca por bisect), o total de
+    minutos trabalhados acumulado a cada inserção e o último agendamento em
+    cache, de modo que a verificação de conflito e a busca da viagem anterior
+    a um horário custam O(log n) em vez de percorrer a agenda inteira.
+
+    Os horários são minutos desde a meia-noite do dia da escala, e viagens
+    que cruzam a meia-noite terminam depois de 1440. Enquanto os agendamentos
+    não se sobrepõem, os horários de término ficam na mesma ordem dos de
+    início. Caso contrário (ex: exceções manuais sobrepostas), as consultas
+    recorrem à varredura linear, preservando exatamente a semântica de
+    ``is_time_conflict``.
+    """
+
+    __slots__ = ('_inicios', '_fins', '_destinos', '_monotona', 'minutos_trabalhados', 'ultimo_agendamento')
+
+    def __init__(self, agendamentos: Iterable[Agendamento] = ()) -> None:
+        self._inicios: List[float] = []
+        self._fins: List[float] = []
+        self._destinos: List[str] = []
+        self._monotona = True
+        self.minutos_trabalhados = 0.0
+        # Agendamento com o maior horário de término (destino final do motorista)
+        self.ultimo_agendamento: Optional[Agendamento] = None
+        for inicio, fim, destino in agendamentos:
+            self.insert(inicio, fim, destino)
+
+    def insert(self, inicio: float, fim: float, destino: str) -> None:
+        """
+        Insere um agendamento mantendo a ordem por horário de início.
+
+        Args:
+            inicio: Início, em minutos desde a meia-noite.
+            fim: Término, em minutos desde a meia-noite (maior que 1440 se
+                a viagem cruzar a meia-noite).
+            destino: Coordenada do ponto final da viagem.
+        """
+        if fim < inicio:
+            raise ValueError(f"Término ({fim}) anterior ao início ({inicio}) do agendamento.")
+        idx = bisect_right(self._inicios, inicio)
+        if self._monotona:
+            # Os términos só permanecem ordenados se o novo intervalo não sobrepuser os vizinhos
+            if idx > 0 and self._fins[idx - 1] > inicio:
+                self._monotona = False
+            elif idx < len(self._inicios) and fim > self._inicios[idx]:
+                self._monotona = False
+        self._inicios.insert(idx, inicio)
+        self._fins.insert(idx, fim)
+        self._destinos.insert(idx, destino)
+
+        self.minutos_trabalhados += fim - inicio
+
+        if self.ultimo_agendamento is None or fim > self.ultimo_agendamento[1]:
+            self.ultimo_agendamento = (inicio, fim, destino)
+
+    def remove(self, inicio: float, fim: float, destino: str) -> None:
+        """
+        Remove um agendamento (ex: linha cancelada).
+
+        Args:
+            inicio: Início do agendamento, em minutos.
+            fim: Término do agendamento, em minutos.
+            destino: Coordenada do ponto final da viagem.
+
+        Raises:
+            ValueError: Se o agendamento não estiver na agenda.
+        """
+        idx = bisect_left(self._inicios, inicio)
+        while idx < len(self._inicios) and self._inicios[idx] == inicio:
+            if self._fins[idx] == fim and self._destinos[idx] == destino:
+                break
+            idx += 1
+        else:
+            raise ValueError(f"Agendamento não encontrado: {(inicio, fim, destino)}.")
+        del self._inicios[idx], self._fins[idx], self._destinos[idx]
+        self.minutos_trabalhados -= fim - inicio
+        if self.ultimo_agendamento is not None and self.ultimo_agendamento[1] == fim:
+            self.ultimo_agendamento = max(self, default=None, key=lambda ag: ag[1])
+        if not self._monotona:
+            self._monotona = all(f <= i for f, i in zip(self._fins, self._inicios[1:]))
+
+    def has_conflict(self, novo_inicio: float, novo_fim: float) -> bool:
+        """
+        Verifica se um novo intervalo conflita com algum agendamento existente.
+
+        Args:
+            novo_inicio: Início do novo agendamento, em minutos.
+            novo_fim: Fim do novo agendamento, em minutos.
+
+        Returns:
+            True se houver conflito, False caso contrário.
+        """
+        if not self._monotona:
+            return is_time_conflict(novo_inicio, novo_fim, list(zip(self._inicios, self._fins)))
+        # Apenas os agendamentos que começam antes de novo_fim podem conflitar; entre
+        # eles, o de maior término é o último (términos ordenados).
+        idx = bisect_left(self._inicios, novo_fim)
+        return idx > 0 and self._fins[idx - 1] > novo_inicio
+
+    def previous_trip(self, horario: float) -> Optional[Agendamento]:
+        """
+        Retorna o agendamento de maior término que termina até o horário informado.
+
+        Args:
+            horario: O horário de referência, em minutos (ex: início da nova linha).
+
+        Returns:
+            A tupla (inicio, fim, destino) ou None se não houver agendamento anterior.
+        """
+        ultimo = self.ultimo_agendamento
+        if ultimo is None:
+            return None
+        if ultimo[1] <= horario:
+            return ultimo
+        if not self._monotona:
+            anteriores = [ag for ag in self if ag[1] <= horario]
+            return max(anteriores, default=None, key=lambda ag: ag[1])
+        idx = bisect_right(self._fins, horario) - 1
+        if idx < 0:
+            return None
+        return self._inicios[idx], self._fins[idx], self._destinos[idx]
+
+    @property
+    def is_chronological(self) -> bool:
+        """Indica se os agendamentos não se sobrepõem."""
+        return self._monotona
+
+    def copy(self) -> DriverTimeline:
+        """Retorna uma cópia independente da linha do tempo."""
+        return DriverTimeline(self)
+
+    def __iter__(self) -> Iterator[Agendamento]:
+        return iter(zip(self._inicios, self._fins, self._destinos))
+
+    def __len__(self) -> int:
+        return len(self._inicios)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DriverTimeline):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"DriverTimeline({list(self)!r})"
+
+
+def as_timelines(
+    motoristas_agendados: Dict[str, Union[DriverTimeline, Iterable[Agendamento]]]
+) -> Dict[str, DriverTimeline]:
+    """
+    Converte, no próprio dicionário, listas de tuplas (inicio, fim, destino) em DriverTimeline.
+
+    Mantém compatibilidade com o formato antigo {'Nome': [(inicio, fim, destino), ...]},
+    inclusive com horários como objetos time (convertidos para minutos).
+
+    Args:
+        motoristas_agendados: Dicionário de agendamentos por motorista.
+
+    Returns:
+        O mesmo dicionário, com todos os valores como DriverTimeline.
+    """
+    for nome, agendamentos in motoristas_agendados.items():
+        if not isinstance(agendamentos, DriverTimeline):
+            motoristas_agendados[nome] = DriverTimeline(_agendamento_em_minutos(*ag) for ag in agendamentos)
+    return motoristas_agendados
+
+
+def build_timelines(
+    escala: Dict[Any, Dict[str, Any]],
+    linhas: pd.DataFrame,
+    motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None
+) -> Dict[str, DriverTimeline]:
+    """
+    Monta as linhas do tempo dos motoristas a partir de uma escala.
+
+    Args:
+        escala: Escala no formato {linha_id: {'motorista', 'veiculo', 'horario'}}.
+        linhas: DataFrame pré-processado com as linhas da escala. Linhas da
+            escala ausentes do DataFrame são ignoradas.
+        motoristas_agendados: Agendamentos pré-existentes (ex: exceções manuais),
+            copiados para o resultado. Não é modificado.
+
+    Returns:
+        Um novo dicionário {nome: DriverTimeline}.
+    """
+    agendas = {nome: DriverTimeline(_agendamento_em_minutos(*ag) for ag in agenda)
+               for nome, agenda in (motoristas_agendados or {}).items()}
+    linha_por_id = {l['id']: l for l in linhas.to_dict('records')}
+    for linha_id, info in escala.items():
+        linha = linha_por_id.get(linha_id)
+        if linha is None:
+            continue
+        agendas.setdefault(info['motorista'], DriverTimeline()).insert(
+            linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino']
+        )
+    return agendas
@@ -0,0 +1,244 @@
+"""Geração de escalas para um período (vários dias) reaproveitando o pré-processamento."""
+from __future__ import annotations
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from models.scheduler import create_schedule
+from models.timeline import MINUTOS_POR_DIA
+from services.exceptions_handler import apply_manual_assignments
+from services.metrics import RunMetrics
+
+# Abreviações aceitas na coluna 'dias_semana' das linhas, na ordem de date.weekday()
+DIAS_SEMANA = ('seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom')
+
+
+def date_range(inicio: date, fim: date) -> List[date]:
+    """Retorna os dias de inicio a fim, inclusive."""
+    if fim < inicio:
+        raise ValueError(f"Data final ({fim}) anterior à data inicial ({inicio}).")
+    return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+
+def lines_for_day(linhas: pd.DataFrame, dia: date) -> pd.DataFrame:
+    """
+    Seleciona as linhas que operam em um dia.
+
+    Uma linha com a coluna 'data' preenchida opera só naquela data; com a
+    coluna 'dias_semana' preenchida (ex: "seg,qua,sex"), só nesses dias da
+    semana. Sem nenhuma das duas, a linha opera todos os dias.
+
+    Args:
+        linhas: DataFrame pré-processado com as linhas de todo o período.
+        dia: O dia desejado.
+
+    Returns:
+        O subconjunto das linhas que operam no dia.
+    """
+    mascara = pd.Series(True, index=linhas.index)
+    if 'data' in linhas.columns:
+        datas = pd.to_datetime(linhas['data'], errors='coerce')
+        mascara &= datas.isna() | (datas.dt.date == dia)
+    if 'dias_semana' in linhas.columns:
+        sigla = DIAS_SEMANA[dia.weekday()]
+        mascara &= linhas['dias_semana'].map(
+            lambda dias: not isinstance(dias, str) or not dias.strip()
+            or sigla in [d.strip().lower() for d in dias.split(',')]
+        )
+    return linhas[mascara]
+
+
+def exceptions_for_day(excecoes: Iterable[Dict[str, Any]], dia: date) -> List[Dict[str, Any]]:
+    """Seleciona as exceções do dia; exceções sem 'data' valem para todos os dias."""
+    selecionadas = []
+    for excecao in excecoes:
+        data = excecao.get('data')
+        if data is None or pd.isna(data) or pd.to_datetime(data).date() == dia:
+            selecionadas.append(excecao)
+    return selecionadas
+
+
+def rest_blocks(
+    escala: Dict[Any, Dict[str, Any]],
+    linhas: pd.DataFrame,
+    min_rest_hours: float
+) -> Dict[str, float]:
+    """
+    Calcula, a partir da escala de um dia, até quando cada motorista descansa no dia seguinte.
+
+    Só entram os motoristas cujo descanso mínimo após a última viagem avança
+    sobre o dia seguinte. O limite é só de disponibilidade: o motorista sai
+    de casa a partir dele, sem contar como já em rota (paga a penalidade de
+    novo motorista como qualquer outro) nem somar minutos trabalhados.
+
+    Args:
+        escala: Escala completa do dia (manual e otimizada).
+        linhas: DataFrame pré-processado com as linhas do dia.
+        min_rest_hours: Descanso mínimo entre jornadas, em horas.
+
+    Returns:
+        Um dicionário {nome: minuto do dia seguinte a partir do qual o motorista está disponível}.
+    """
+    linha_por_id = {l['id']: l for l in linhas.to_dict('records')}
+    ultimo_fim: Dict[str, float] = {}
+    for linha_id, info in escala.items():
+        linha = linha_por_id.get(linha_id)
+        if linha is None:
+            continue
+        ultimo_fim[info['motorista']] = max(linha['horario_fim_min'], ultimo_fim.get(info['motorista'], 0))
+
+    limites = {}
+    for nome, fim in ultimo_fim.items():
+        # O término pode passar de 1440 (viagem que cruza a meia-noite); o limite
+        # é medido no eixo do dia seguinte
+        liberacao = math.ceil(fim + min_rest_hours * 60 - MINUTOS_POR_DIA)
+        if liberacao > 0:
+            limites[nome] = liberacao
+    return limites
+
+
+def schedule_day(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    excecoes: List[Dict[str, Any]],
+    descanso: Optional[Dict[str, float]] = None,
+    new_driver_penalty: float = 10000.0,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    metrics: Optional[RunMetrics] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Gera a escala completa (exceções manuais + otimização) de um dia.
+
+    Os limites de ``descanso`` vão para a coluna 'disponivel_a_partir_min'
+    dos motoristas (prevalecendo o maior valor, se ela já existir): os
+    motores só contam a saída de casa a partir desse minuto.
+
+    Args:
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado com as linhas do dia.
+        excecoes: Exceções manuais do dia.
+        descanso: Limites de descanso {nome: minuto} (ver rest_blocks).
+        new_driver_penalty: Penalidade por novo motorista.
+        engine: Motor de agendamento.
+        improve_seconds: Orçamento de busca local.
+        metrics: Métricas da execução (ver services/metrics.py), opcional.
+
+    Returns:
+        A escala do dia, no formato de ``create_schedule``.
+    """
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, agendados, _ = \
+        apply_manual_assignments(motoristas, veiculos, linhas, excecoes, metrics)
+
+    if descanso:
+        motoristas_restantes = motoristas_restantes.copy()
+        limite = motoristas_restantes['nome'].map(descanso).fillna(0)
+        if 'disponivel_a_partir_min' in motoristas_restantes.columns:
+            limite = limite.combine(motoristas_restantes['disponivel_a_partir_min'].fillna(0), max)
+        motoristas_restantes['disponivel_a_partir_min'] = limite
+
+    escala_otimizada = create_schedule(
+        motoristas_restantes, veiculos_restantes, linhas_restantes, agendados,
+        new_driver_penalty, engine=engine, improve_seconds=improve_seconds, metrics=metrics
+    )
+    return {**escala_manual, **escala_otimizada}
+
+
+def _schedule_day_measured(*args: Any) -> Tuple[Dict[Any, Dict[str, Any]], RunMetrics]:
+    """Executa schedule_day em outro processo, devolvendo também as métricas do dia."""
+    metrics = RunMetrics()
+    return schedule_day(*args, metrics=metrics), metrics
+
+
+def schedule_range(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    dias: List[date],
+    excecoes: Iterable[Dict[str, Any]] = (),
+    new_driver_penalty: float = 10000.0,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    min_rest_hours: float = 0.0,
+    workers: Optional[int] = None,
+    metrics: Optional[RunMetrics] = None
+) -> Dict[date, Dict[Any, Dict[str, Any]]]:
+    """
+    Gera as escalas de vários dias a partir de dados carregados e pré-processados uma única vez.
+
+    Sem descanso mínimo os dias são independentes e resolvidos em paralelo
+    (um processo por dia). Com ``min_rest_hours`` > 0 os dias são
+    encadeados: a escala de cada dia define até quando cada motorista
+    descansa no dia seguinte (ver rest_blocks).
+
+    Args:
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado com as linhas do período.
+        dias: Dias a escalar, em ordem.
+        excecoes: Exceções manuais; a chave opcional 'data' restringe a um dia.
+        new_driver_penalty: Penalidade por novo motorista.
+        engine: Motor de agendamento.
+        improve_seconds: Orçamento de busca local por dia.
+        min_rest_hours: Descanso mínimo entre jornadas, em horas (0 desativa o encadeamento).
+        workers: Número máximo de processos no modo paralelo (1 resolve em sequência).
+        metrics: Se informado, acumula as métricas de todos os dias (no modo
+            paralelo, cada processo mede o seu dia e o resultado é somado).
+
+    Returns:
+        Um dicionário {dia: escala do dia}.
+    """
+    excecoes = list(excecoes)
+    tarefas = [
+        (motoristas, veiculos, lines_for_day(linhas, dia), exceptions_for_day(excecoes, dia))
+        for dia in dias
+    ]
+
+    if min_rest_hours > 0:
+        escalas = {}
+        descanso: Dict[str, float] = {}
+        for dia, (motoristas_dia, veiculos_dia, linhas_dia, excecoes_dia) in zip(dias, tarefas):
+            escalas[dia] = schedule_day(motoristas_dia, veiculos_dia, linhas_dia, excecoes_dia, descanso,
+                                        new_driver_penalty, engine, improve_seconds, metrics)
+            descanso = rest_blocks(escalas[dia], linhas_dia, min_rest_hours)
+        return escalas
+
+    if workers == 1 or len(tarefas) <= 1:
+        resultados = [schedule_day(*tarefa, None, new_driver_penalty, engine, improve_seconds, metrics)
+                      for tarefa in tarefas]
+    elif metrics is not None:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(_schedule_day_measured, *tarefa, None, new_driver_penalty, engine, improve_seconds)
+                       for tarefa in tarefas]
+            resultados = []
+            for futuro in futuros:
+                escala, metricas_dia = futuro.result()
+                metrics.merge(metricas_dia)
+                resultados.append(escala)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = [executor.submit(schedule_day, *tarefa, None, new_driver_penalty, engine, improve_seconds)
+                       for tarefa in tarefas]
+            resultados = [futuro.result() for futuro in futuros]
+    return dict(zip(dias, resultados))
+
+
+def schedules_to_frame(escalas: Dict[date, Dict[Any, Dict[str, Any]]]) -> pd.DataFrame:
+    """Combina as escalas de vários dias em um único DataFrame, no formato do arquivo de saída."""
+    registros = []
+    for dia in sorted(escalas):
+        for linha_id, info in sorted(escalas[dia].items(), key=lambda item: str(item[0])):
+            registros.append({
+                'Data': dia.isoformat(),
+                'Linha_ID': linha_id,
+                'Horario': info.get('horario', 'N/A'),
+                'Motorista_Alocado': info.get('motorista', 'Nao Alocado'),
+                'Veiculo_Alocado': info.get('veiculo', 'Nao Alocado'),
+            })
+    return pd.DataFrame(registros, columns=['Data', 'Linha_ID', 'Horario', 'Motorista_Alocado', 'Veiculo_Alocado'])
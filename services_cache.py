@@ -0,0 +1,87 @@
+"""Cache em memória, com tamanho limitado, de resultados indexados por hash (dados pré-processados e escalas).
+
+As chaves são hashes do conteúdo das entradas e dos parâmetros (ver
+``cache_key``): o mesmo upload com os mesmos parâmetros devolve o resultado
+já calculado, e qualquer mudança gera outra chave. Quando o cache enche, a
+entrada usada há mais tempo é descartada.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def cache_key(*partes: Any) -> str:
+    """
+    Calcula a chave de cache de um conjunto de partes (hashes de entrada e parâmetros).
+
+    Args:
+        partes: Valores serializáveis em JSON; outros tipos entram pelo ``str``.
+
+    Returns:
+        O hash SHA-256 das partes, em hexadecimal.
+    """
+    texto = json.dumps(partes, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache LRU de tamanho limitado, seguro para uso por várias threads.
+
+    Os valores são guardados como estão (sem cópia): quem os lê não deve
+    modificá-los.
+
+    Attributes:
+        max_itens: Número máximo de entradas.
+        acertos: Consultas que encontraram a chave.
+        falhas: Consultas que não encontraram a chave.
+    """
+
+    def __init__(self, max_itens: int = 8) -> None:
+        """
+        Args:
+            max_itens: Número máximo de entradas (pelo menos 1).
+
+        Raises:
+            ValueError: Se max_itens for menor que 1.
+        """
+        if max_itens < 1:
+            raise ValueError("O cache precisa de pelo menos uma entrada.")
+        self.max_itens = max_itens
+        self.acertos = 0
+        self.falhas = 0
+        self._itens: OrderedDict = OrderedDict()
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._itens
+
+    def get(self, chave: Hashable) -> Optional[Any]:
+        """Valor da chave (que passa a ser a usada mais recentemente), ou None se não estiver no cache."""
+        with self._trava:
+            if chave not in self._itens:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave]
+
+    def put(self, chave: Hashable, valor: Any) -> None:
+        """Guarda o valor, descartando as entradas usadas há mais tempo além de max_itens."""
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove todas as entradas."""
+        with self._trava:
+            self._itens.clear()
@@ -1,19 +1,95 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+
+from services.metrics import timer
+
+COORDINATE_COLUMNS = {'motoristas': ['localizacao'], 'linhas': ['origem', 'destino']}
 
 def load_data(file_path):
     return pd.read_csv(file_path)
 
-def preprocess_data(motoristas, veiculos, linhas):
+def parse_coordinates(valores):
+    """Converte uma Series de strings "lat,lon" em um array (n, 2) de floats, de forma vetorizada."""
+    if len(valores) == 0:
+        return np.empty((0, 2))
+    partes = valores.astype(str).str.split(',', expand=True)
+    return partes.astype(float).to_numpy()
+
+def add_coordinate_columns(df, coluna):
+    """Adiciona as colunas '<coluna>_lat' e '<coluna>_lon' com as coordenadas já convertidas."""
+    pontos = parse_coordinates(df[coluna])
+    df[f'{coluna}_lat'] = pontos[:, 0]
+    df[f'{coluna}_lon'] = pontos[:, 1]
+    return df
+
+def coordinates(df, coluna):
+    """
+    Retorna as coordenadas de uma coluna como um array (n, 2).
+
+    Usa as colunas pré-processadas por preprocess_data quando existirem e só
+    recorre à conversão das strings quando o DataFrame não foi pré-processado.
+    """
+    if f'{coluna}_lat' in df.columns and f'{coluna}_lon' in df.columns:
+        return df[[f'{coluna}_lat', f'{coluna}_lon']].to_numpy(dtype=float)
+    return parse_coordinates(df[coluna])
+
+def parse_minutes(valores):
+    """
+    Converte uma Series de strings 'HH:MM' em minutos desde a meia-noite (inteiros), de forma vetorizada.
+
+    Os valores no formato exato 'HH:MM' são lidos diretamente dos bytes, sem
+    criar um objeto por linha; os demais (ex: '8:00') passam pelo
+    pd.to_datetime, que lança ValueError se o horário for inválido.
+    """
+    minutos = np.zeros(len(valores), dtype='int64')
+    try:
+        texto = valores.to_numpy(dtype='S6')
+    except UnicodeEncodeError:
+        texto = np.zeros(len(valores), dtype='S6')
+    digitos = texto.view(np.uint8).reshape(-1, 6).astype('int64') - ord('0')
+    horas = digitos[:, 0] * 10 + digitos[:, 1]
+    mins = digitos[:, 3] * 10 + digitos[:, 4]
+    validos = (
+        ((digitos[:, [0, 1, 3, 4]] >= 0) & (digitos[:, [0, 1, 3, 4]] <= 9)).all(axis=1)
+        & (digitos[:, 2] == ord(':') - ord('0')) & (digitos[:, 5] == -ord('0'))
+        & (horas < 24) & (mins < 60)
+    )
+    minutos[validos] = horas[validos] * 60 + mins[validos]
+    if not validos.all():
+        outros = pd.to_datetime(valores[~validos], format='%H:%M')
+        minutos[~validos] = outros.dt.hour * 60 + outros.dt.minute
+    return pd.Series(minutos, index=valores.index)
+
+def coordinate_table(df, coluna):
+    """Monta um dicionário {"lat,lon": (lat, lon)} com as coordenadas de uma coluna."""
+    pontos = coordinates(df, coluna)
+    return {loc: (lat, lon) for loc, (lat, lon) in zip(df[coluna].tolist(), pontos.tolist())}
+
+def preprocess_data(motoristas, veiculos, linhas, metrics=None):
     # Pré-processamento de Habilidades
-    if 'habilidades' in motoristas.columns:
-        motoristas['habilidades'] = motoristas['habilidades'].apply(lambda x: [h.strip() for h in str(x).split(',')])
+    with timer(metrics, 'preprocess.habilidades'):
+        if 'habilidades' in motoristas.columns:
+            motoristas['habilidades'] = motoristas['habilidades'].apply(lambda x: [h.strip() for h in str(x).split(',')])
+
+    # Pré-processamento de Coordenadas (convertidas uma única vez)
+    with timer(metrics, 'preprocess.coordenadas'):
+        for coluna in COORDINATE_COLUMNS['motoristas']:
+            if coluna in motoristas.columns:
+                add_coordinate_columns(motoristas, coluna)
+        for coluna in COORDINATE_COLUMNS['linhas']:
+            if coluna in linhas.columns:
+                add_coordinate_columns(linhas, coluna)
 
-    # Pré-processamento de Horários
-    if 'horario_inicio' in linhas.columns and 'duracao_minutos' in linhas.columns:
-        # Converte a string 'HH:MM' para um objeto time
-        linhas['horario_inicio_dt'] = pd.to_datetime(linhas['horario_inicio'], format='%H:%M').dt.time
-        # Calcula o horário de término
-        linhas['horario_fim_dt'] = linhas.apply(lambda x: (datetime.combine(datetime.today(), x['horario_inicio_dt']) + timedelta(minutes=x['duracao_minutos'])).time(), axis=1)
+    # Pré-processamento de Horários, em minutos desde a meia-noite do dia da escala
+    with timer(metrics, 'preprocess.horarios'):
+        if 'horario_inicio' in linhas.columns and 'duracao_minutos' in linhas.columns:
+            linhas['horario_inicio_min'] = parse_minutes(linhas['horario_inicio'])
+            # O término não é reduzido módulo 24h: uma viagem que cruza a meia-noite
+            # termina depois de 1440, e a duração é sempre fim - início.
+            linhas['horario_fim_min'] = linhas['horario_inicio_min'] + linhas['duracao_minutos']
 
+    if metrics is not None:
+        metrics.count('preprocess.motoristas', len(motoristas))
+        metrics.count('preprocess.veiculos', len(veiculos))
+        metrics.count('preprocess.linhas', len(linhas))
     return motoristas, veiculos, linhas
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Serviço de despacho online: eventos de linhas em JSON, um por linha de texto, via stdin ou socket local.
+
+Eventos aceitos (campos em português, como nos CSVs de entrada):
+
+- ``{"evento": "adicionar", "linha": {"id": ..., "origem": "lat,lon", "destino": "lat,lon",
+  "horario_inicio": "HH:MM", "duracao_minutos": ..., "tipo_veiculo_necessario": ...}}``
+- ``{"evento": "cancelar", "linha": <id>}``
+- ``{"evento": "latencia"}``: resumo das latências de decisão (p50/p99).
+
+Cada evento recebe uma resposta JSON em uma linha, com o campo ``status``
+('alocada', 'sem_alocacao', 'cancelada', 'latencia' ou 'erro') e, para
+adições e cancelamentos, a latência da decisão em ``latencia_ms``.
+"""
+from __future__ import annotations
+
+import json
+import socketserver
+import threading
+from time import perf_counter
+from typing import Any, Dict, Optional, TextIO
+
+from models.dispatch import DispatchEngine
+from services.metrics import LatencyWindow, RunMetrics
+
+# Endereço do socket local: só aceita conexões da própria máquina
+HOST_LOCAL = '127.0.0.1'
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def handle_event(engine: DispatchEngine, evento: Dict[str, Any], latencias: LatencyWindow) -> Dict[str, Any]:
+    """
+    Aplica um evento ao motor de despacho e monta a resposta.
+
+    Args:
+        engine: Motor de despacho com o estado do dia.
+        evento: Evento já decodificado (ver a documentação do módulo).
+        latencias: Janela que recebe a latência de adições e cancelamentos.
+
+    Returns:
+        A resposta, serializável em JSON.
+    """
+    inicio = perf_counter()
+    tipo = evento.get('evento') if isinstance(evento, dict) else None
+    try:
+        if tipo == 'adicionar':
+            linha = evento.get('linha')
+            if not isinstance(linha, dict):
+                raise ValueError("O evento 'adicionar' exige o objeto 'linha'.")
+            info = engine.add_line(linha)
+            resposta = {'evento': tipo, 'linha': linha['id']}
+            resposta.update({'status': 'alocada', **info} if info else {'status': 'sem_alocacao'})
+        elif tipo == 'cancelar':
+            engine.cancel_line(evento.get('linha'))
+            resposta = {'evento': tipo, 'linha': evento.get('linha'), 'status': 'cancelada'}
+        elif tipo == 'latencia':
+            return {'evento': tipo, 'status': 'latencia', **latencias.summary()}
+        else:
+            raise ValueError(f"Evento desconhecido: {tipo!r}. Opções: adicionar, cancelar, latencia.")
+    except (TypeError, ValueError) as e:
+        return {'evento': tipo, 'status': 'erro', 'mensagem': str(e)}
+    segundos = perf_counter() - inicio
+    latencias.record(segundos)
+    resposta['latencia_ms'] = round(segundos * 1000, 3)
+    return resposta
+
+
+def _processar(engine: DispatchEngine, texto: str, latencias: LatencyWindow,
+               metrics: Optional[RunMetrics]) -> Dict[str, Any]:
+    """Decodifica uma linha de texto e aplica o evento."""
+    try:
+        evento = json.loads(texto)
+    except json.JSONDecodeError as e:
+        resposta = {'evento': None, 'status': 'erro', 'mensagem': f"JSON inválido: {e}"}
+    else:
+        resposta = handle_event(engine, evento, latencias)
+    if metrics is not None:
+        metrics.count(f"despacho.{resposta['status']}")
+    return resposta
+
+
+def serve_stream(
+    engine: DispatchEngine,
+    entrada: TextIO,
+    saida: TextIO,
+    latencias: LatencyWindow,
+    metrics: Optional[RunMetrics] = None
+) -> None:
+    """
+    Processa eventos de ``entrada`` até o fim do fluxo, escrevendo uma resposta por evento.
+
+    Args:
+        engine: Motor de despacho com o estado do dia.
+        entrada: Fluxo de texto com um evento JSON por linha (ex: sys.stdin).
+        saida: Fluxo de texto que recebe as respostas (descarregado a cada uma).
+        latencias: Janela das latências de decisão.
+        metrics: Se informado, conta as respostas por status ('despacho.alocada', ...).
+    """
+    for texto in entrada:
+        if not texto.strip():
+            continue
+        resposta = _processar(engine, texto, latencias, metrics)
+        saida.write(json.dumps(resposta, ensure_ascii=False, default=str) + '\n')
+        saida.flush()
+
+
+def serve_socket(
+    engine: DispatchEngine,
+    porta: int,
+    latencias: LatencyWindow,
+    metrics: Optional[RunMetrics] = None,
+    host: str = HOST_LOCAL
+) -> None:
+    """
+    Atende conexões TCP locais com o mesmo protocolo de ``serve_stream``, até Ctrl+C.
+
+    Cada conexão é atendida em uma thread, mas os eventos são aplicados um
+    de cada vez: o estado do dia é único e as decisões são sequenciais.
+
+    Args:
+        engine: Motor de despacho com o estado do dia.
+        porta: Porta TCP (0 escolhe uma porta livre).
+        latencias: Janela das latências de decisão.
+        metrics: Se informado, conta as respostas por status.
+        host: Endereço de escuta (por padrão, só a própria máquina).
+    """
+    with make_server(engine, porta, latencias, metrics, host) as servidor:
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def make_server(
+    engine: DispatchEngine,
+    porta: int,
+    latencias: LatencyWindow,
+    metrics: Optional[RunMetrics] = None,
+    host: str = HOST_LOCAL
+) -> socketserver.ThreadingTCPServer:
+    """Cria (sem iniciar) o servidor TCP usado por ``serve_socket``."""
+    trava = threading.Lock()
+
+    class _Conexao(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for bruto in self.rfile:
+                texto = bruto.decode('utf-8', errors='replace')
+                if not texto.strip():
+                    continue
+                with trava:
+                    resposta = _processar(engine, texto, latencias, metrics)
+                self.wfile.write((json.dumps(resposta, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+    return _Servidor((host, porta), _Conexao)
@@ -1,74 +1,183 @@
 """Módulo para lidar com alocações manuais (exceções) na escala."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from datetime import time
+
+from models.timeline import DriverTimeline
+from services.metrics import RunMetrics, timer
+
+# Colunas do relatório de conflitos das exceções
+COLUNAS_CONFLITO = ('tipo', 'linha', 'recurso', 'linha_conflitante')
+# Tipos de conflito: linha inexistente, linha repetida (vale a última exceção) e recurso em horários sobrepostos
+TIPOS_CONFLITO = ('linha_inexistente', 'linha_duplicada', 'motorista', 'veiculo')
+
+
+def _sobreposicoes(aplicadas: pd.DataFrame, recurso: str) -> pd.DataFrame:
+    """
+    Encontra, em lote, as exceções que usam o mesmo recurso em horários sobrepostos.
+
+    Ordena os intervalos por recurso e início e compara cada um com o maior
+    término dos anteriores do mesmo recurso, com a mesma regra de
+    ``is_time_conflict``. Cada exceção em conflito aparece uma vez, ao lado da
+    viagem anterior que termina mais tarde.
+
+    Args:
+        aplicadas: Exceções aplicadas, com 'linha', o recurso, 'inicio' e 'fim'.
+        recurso: Coluna do recurso ('motorista' ou 'veiculo').
+
+    Returns:
+        DataFrame com as colunas de COLUNAS_CONFLITO.
+    """
+    dados = aplicadas[aplicadas[recurso].notna()]
+    dados = dados.sort_values([recurso, 'inicio'], kind='stable').reset_index(drop=True)
+    grupo = dados[recurso]
+    mudou = (grupo != grupo.shift()).to_numpy()
+    # Posição, dentro do lote ordenado, da viagem com o maior término até cada linha (inclusive)
+    maior_fim = dados.groupby(recurso, sort=False)['fim'].cummax()
+    dono = pd.Series(np.where(dados['fim'] == maior_fim, dados.index, np.nan)).groupby(grupo, sort=False).ffill()
+    dono_anterior = dono.shift().to_numpy()
+    dono_anterior[mudou] = np.nan
+
+    valido = ~np.isnan(dono_anterior)
+    posicoes = dono_anterior[valido].astype(int)
+    candidatas = dados[valido]
+    fim_anterior = dados['fim'].to_numpy()[posicoes]
+    inicio_anterior = dados['inicio'].to_numpy()[posicoes]
+    conflito = (candidatas['inicio'].to_numpy() < fim_anterior) & (candidatas['fim'].to_numpy() > inicio_anterior)
+    return pd.DataFrame({
+        'tipo': recurso,
+        'linha': candidatas['linha'].to_numpy()[conflito],
+        'recurso': candidatas[recurso].to_numpy()[conflito],
+        'linha_conflitante': dados['linha'].to_numpy()[posicoes[conflito]],
+    }, columns=list(COLUNAS_CONFLITO))
 
 
 def apply_manual_assignments(
     motoristas: pd.DataFrame,
     veiculos: pd.DataFrame,
     linhas: pd.DataFrame,
-    excecoes: List[Dict[str, Any]]
-) -> Tuple[Dict[Any, Dict[str, Any]], pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, List[Tuple[time, time, str]]]]:
+    excecoes: List[Dict[str, Any]],
+    metrics: Optional[RunMetrics] = None,
+    reuse_vehicles: bool = False
+) -> Tuple[Dict[Any, Dict[str, Any]], pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, DriverTimeline],
+           pd.DataFrame]:
     """
     Aplica as exceções manuais antes da otimização.
 
+    As exceções são ligadas às linhas por um índice de IDs (uma única junção,
+    em vez de uma busca na tabela de linhas por exceção) e os conflitos são
+    detectados em lote. Exceções conflitantes continuam sendo aplicadas, pois
+    são decisões do operador; elas só são listadas no relatório. Se a mesma
+    linha aparecer em mais de uma exceção, vale a última.
+
     Args:
         motoristas: DataFrame com todos os motoristas.
         veiculos: DataFrame com todos os veículos.
         linhas: DataFrame com todas as linhas.
         excecoes: Lista de dicionários, onde cada um representa uma alocação manual.
+        metrics: Se informado, recebe os tempos da junção, da detecção de
+            conflitos e da filtragem dos recursos, e os contadores de exceções
+            aplicadas, ignoradas e em conflito.
+        reuse_vehicles: Se True, os veículos alocados manualmente continuam
+            em veiculos_restantes, para serem reaproveitados entre viagens (a
+            agenda deles vem de ``models.fleet.vehicle_timelines`` sobre a
+            escala manual); por padrão, são retirados da frota do otimizador.
 
     Returns:
         Uma tupla contendo:
         - escala_manual: Dicionário com as alocações manuais.
         - motoristas_restantes: DataFrame de motoristas para o otimizador.
-        - veiculos_restantes: DataFrame de veículos disponíveis.
+        - veiculos_restantes: DataFrame de veículos disponíveis (ver reuse_vehicles).
         - linhas_restantes: DataFrame de linhas a serem agendadas.
-        - motoristas_agendados_manualmente: Dicionário com os horários já ocupados.
+        - motoristas_agendados_manualmente: Dicionário {nome: DriverTimeline} com os horários já ocupados.
+        - conflitos: DataFrame com as colunas de COLUNAS_CONFLITO ('tipo' é um
+          de TIPOS_CONFLITO; 'recurso' é o motorista ou o veículo em conflito e
+          'linha_conflitante', a outra linha que o ocupa no mesmo horário).
     """
-    escala_manual = {}
-    motoristas_agendados_manualmente = {}
-    veiculos_usados = set()
-    linhas_usadas = set()
-
-    for excecao in excecoes:
-        linha_id = excecao['linha']
-        motorista_nome = excecao['motorista']
-        veiculo_numero = excecao.get('veiculo')
-
-        # Encontra a linha correspondente para obter os horários
-        linha_info_series = linhas[linhas['id'] == linha_id]
-        if linha_info_series.empty:
-            print(f"Aviso: Linha ID {linha_id} da exceção não encontrada. Pulando.")
-            continue
-        linha_info = linha_info_series.iloc[0]
-
-        escala_manual[linha_id] = {
-            'motorista': motorista_nome,
-            'veiculo': veiculo_numero,
-            'horario': linha_info['horario_inicio']
-        }
-        
-        linhas_usadas.add(linha_id)
-        
-        # Adiciona o agendamento manual ao calendário do motorista
-        if motorista_nome not in motoristas_agendados_manualmente:
-            motoristas_agendados_manualmente[motorista_nome] = []
-        # Adiciona o destino ao agendamento para rastrear a localização final
-        motoristas_agendados_manualmente[motorista_nome].append(
-            (linha_info['horario_inicio_dt'], linha_info['horario_fim_dt'], linha_info['destino'])
+    with timer(metrics, 'excecoes.juncao'):
+        ids = [excecao['linha'] for excecao in excecoes]
+        unicas = linhas if linhas['id'].is_unique else linhas.drop_duplicates('id')
+        posicoes = pd.Index(unicas['id']).get_indexer(ids) if ids else np.empty(0, dtype=int)
+        tabela = pd.DataFrame({
+            'linha': pd.Series(ids, dtype=object),
+            'motorista': pd.Series([excecao['motorista'] for excecao in excecoes], dtype=object),
+            'veiculo': pd.Series([excecao.get('veiculo') for excecao in excecoes], dtype=object),
+            'posicao': posicoes,
+        })
+        encontrada = tabela['posicao'] >= 0
+        ultima = ~tabela['linha'].duplicated(keep='last')
+        aplicadas = tabela[encontrada & ultima]
+        dados_linhas = unicas.iloc[aplicadas['posicao'].to_numpy()]
+        aplicadas = aplicadas.assign(
+            inicio=dados_linhas['horario_inicio_min'].to_numpy(),
+            fim=dados_linhas['horario_fim_min'].to_numpy(),
         )
 
-        if veiculo_numero:
-            veiculos_usados.add(veiculo_numero)
+        escala_manual = {}
+        motoristas_agendados_manualmente: Dict[str, DriverTimeline] = {}
+        for linha_id, motorista_nome, veiculo_numero, horario, inicio, fim, destino in zip(
+            aplicadas['linha'], aplicadas['motorista'], aplicadas['veiculo'], dados_linhas['horario_inicio'],
+            aplicadas['inicio'], aplicadas['fim'], dados_linhas['destino']
+        ):
+            escala_manual[linha_id] = {'motorista': motorista_nome, 'veiculo': veiculo_numero, 'horario': horario}
+            # Adiciona o agendamento manual ao calendário do motorista, com o destino para rastrear a localização final
+            if motorista_nome not in motoristas_agendados_manualmente:
+                motoristas_agendados_manualmente[motorista_nome] = DriverTimeline()
+            motoristas_agendados_manualmente[motorista_nome].insert(inicio, fim, destino)
+        veiculos_usados = set(aplicadas['veiculo'].dropna())
+
+    with timer(metrics, 'excecoes.conflitos'):
+        inexistentes = tabela[~encontrada]
+        duplicadas = tabela[encontrada & ~ultima]
+        conflitos = pd.concat([
+            pd.DataFrame({'tipo': 'linha_inexistente', 'linha': inexistentes['linha'], 'recurso': None,
+                          'linha_conflitante': None}, columns=list(COLUNAS_CONFLITO)),
+            pd.DataFrame({'tipo': 'linha_duplicada', 'linha': duplicadas['linha'],
+                          'recurso': duplicadas['motorista'], 'linha_conflitante': duplicadas['linha']},
+                         columns=list(COLUNAS_CONFLITO)),
+            _sobreposicoes(aplicadas, 'motorista'),
+            _sobreposicoes(aplicadas, 'veiculo'),
+        ], ignore_index=True).astype(object)
+        conflitos = conflitos.where(conflitos.notna(), None)
+
+    if metrics is not None:
+        metrics.count('excecoes.recebidas', len(excecoes))
+        metrics.count('excecoes.aplicadas', len(escala_manual))
+        metrics.count('excecoes.veiculos_reservados', len(veiculos_usados))
+        for tipo, quantidade in conflitos['tipo'].value_counts().items():
+            metrics.count(f'excecoes.conflitos_{tipo}', int(quantidade))
 
     # Filtra os dataframes para remover os recursos já alocados manualmente
     # Nota: Não removemos mais o motorista, pois ele pode estar disponível para outros horários.
-    motoristas_restantes = motoristas
-    veiculos_restantes = veiculos[~veiculos['numero_carro'].isin(veiculos_usados)]
-    linhas_restantes = linhas[~linhas['id'].isin(linhas_usadas)]
+    with timer(metrics, 'excecoes.filtragem'):
+        motoristas_restantes = motoristas
+        veiculos_restantes = veiculos if reuse_vehicles else veiculos[~veiculos['numero_carro'].isin(veiculos_usados)]
+        linhas_restantes = linhas[~linhas['id'].isin(escala_manual.keys())]
 
-    return escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados_manualmente
\ No newline at end of file
+    return (escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes,
+            motoristas_agendados_manualmente, conflitos)
+
+
+def format_conflicts(conflitos: pd.DataFrame) -> List[str]:
+    """
+    Descreve cada conflito do relatório em uma frase, para exibição.
+
+    Args:
+        conflitos: Relatório devolvido por ``apply_manual_assignments``.
+
+    Returns:
+        Uma mensagem por linha do relatório.
+    """
+    mensagens = []
+    for tipo, linha_id, recurso, outra in conflitos[list(COLUNAS_CONFLITO)].itertuples(index=False):
+        if tipo == 'linha_inexistente':
+            mensagens.append(f"Linha ID {linha_id} da exceção não encontrada. Exceção ignorada.")
+        elif tipo == 'linha_duplicada':
+            mensagens.append(f"Linha ID {linha_id} aparece em mais de uma exceção; vale a última "
+                             f"(ignorada a do motorista {recurso}).")
+        else:
+            mensagens.append(f"{tipo.capitalize()} {recurso} alocado às linhas {outra} e {linha_id} "
+                             "em horários sobrepostos.")
+    return mensagens
@@ -0,0 +1,86 @@
+"""Execução de tarefas longas (ex: geração da escala) em segundo plano, com progresso e cancelamento.
+
+A tarefa recebe um callback de progresso, que os motores chamam
+periodicamente (ver o parâmetro ``progress`` de ``create_schedule``). O
+cancelamento é cooperativo: depois de ``cancel()``, a próxima chamada do
+callback lança ``JobCancelled``, que interrompe a tarefa.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional
+
+# Estados de uma tarefa
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+CANCELADA = 'cancelada'
+FALHOU = 'falhou'
+
+
+class JobCancelled(Exception):
+    """Lançada pelo callback de progresso de uma tarefa cancelada."""
+
+
+class BackgroundJob:
+    """
+    Tarefa executada em uma thread separada.
+
+    Attributes:
+        progresso: Última fração concluída informada (de 0 a 1).
+        resultado: Valor devolvido pela tarefa, quando concluída.
+        erro: Exceção lançada pela tarefa, quando falhou.
+    """
+
+    def __init__(self, tarefa: Callable[[Callable[[float], None]], Any]) -> None:
+        """
+        Args:
+            tarefa: Função que recebe o callback de progresso e devolve o resultado.
+        """
+        self._tarefa = tarefa
+        self._cancelar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._estado = EXECUTANDO
+        self.progresso = 0.0
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+    def start(self) -> BackgroundJob:
+        """Inicia a tarefa e devolve a própria instância."""
+        self._thread.start()
+        return self
+
+    def _informar(self, fracao: float) -> None:
+        if self._cancelar.is_set():
+            raise JobCancelled()
+        self.progresso = fracao
+
+    def _executar(self) -> None:
+        try:
+            self.resultado = self._tarefa(self._informar)
+        except JobCancelled:
+            self._estado = CANCELADA
+        except Exception as e:  # a falha é guardada e mostrada por quem acompanha a tarefa
+            self.erro = e
+            self._estado = FALHOU
+        else:
+            self.progresso = 1.0
+            self._estado = CONCLUIDA
+
+    def cancel(self) -> None:
+        """Pede o cancelamento; a tarefa para na próxima chamada do callback de progresso."""
+        self._cancelar.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera o fim da tarefa (por até ``timeout`` segundos) e informa se ela terminou."""
+        self._thread.join(timeout)
+        return self.done
+
+    @property
+    def done(self) -> bool:
+        """Se a tarefa terminou (concluída, cancelada ou com falha)."""
+        return self._estado != EXECUTANDO
+
+    @property
+    def status(self) -> str:
+        """Um de EXECUTANDO, CONCLUIDA, CANCELADA ou FALHOU."""
+        return self._estado
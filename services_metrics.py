@@ -0,0 +1,176 @@
+"""Métricas de execução (contadores, cronômetros e histograma de candidatos) do pipeline de escala.
+
+A instrumentação é opcional: as funções do pipeline recebem ``metrics=None``
+por padrão e, nesse caso, não executam nenhum código de medição nos laços
+críticos. Para medir uma execução, crie um ``RunMetrics`` e passe-o a
+``preprocess_data``, ``apply_manual_assignments`` e ``create_schedule``.
+"""
+from __future__ import annotations
+
+import math
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# Limites superiores (inclusivos) das faixas do histograma de candidatos por linha
+FAIXAS_HISTOGRAMA = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Amostras mantidas por uma janela de latências (as mais antigas são descartadas)
+JANELA_LATENCIAS = 100_000
+# Linhas (ou iterações da busca local) entre duas chamadas do callback de progresso dos motores
+PROGRESS_STEP = 256
+
+
+class RunMetrics:
+    """
+    Métricas estruturadas de uma execução.
+
+    Attributes:
+        contadores: Contagens por nome (ex: 'scheduler.podados_jornada').
+        tempos: Segundos acumulados por fase (ex: 'scheduler.laco').
+        candidatos_por_linha: Quantas vezes cada número de candidatos
+            avaliados por linha ocorreu ({n_candidatos: n_linhas}).
+    """
+
+    __slots__ = ('contadores', 'tempos', 'candidatos_por_linha')
+
+    def __init__(self) -> None:
+        self.contadores: Counter = Counter()
+        self.tempos: Dict[str, float] = {}
+        self.candidatos_por_linha: Counter = Counter()
+
+    def count(self, nome: str, quantidade: int = 1) -> None:
+        """Soma ``quantidade`` ao contador ``nome``."""
+        self.contadores[nome] += quantidade
+
+    def add_time(self, fase: str, segundos: float) -> None:
+        """Soma ``segundos`` ao tempo acumulado da fase."""
+        self.tempos[fase] = self.tempos.get(fase, 0.0) + segundos
+
+    @contextmanager
+    def timer(self, fase: str) -> Iterator[None]:
+        """Cronometra o bloco e acumula o tempo na fase."""
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(fase, perf_counter() - inicio)
+
+    def timed(self, fase: str, funcao: Callable[..., Any]) -> Callable[..., Any]:
+        """Retorna uma versão de ``funcao`` que acumula seu tempo de execução na fase."""
+        tempos = self.tempos
+        tempos.setdefault(fase, 0.0)
+
+        def cronometrada(*args: Any, **kwargs: Any) -> Any:
+            inicio = perf_counter()
+            resultado = funcao(*args, **kwargs)
+            tempos[fase] += perf_counter() - inicio
+            return resultado
+        return cronometrada
+
+    def record_candidates(self, n_candidatos: int) -> None:
+        """Registra o número de candidatos avaliados para uma linha."""
+        self.candidatos_por_linha[n_candidatos] += 1
+
+    def histogram(self) -> List[Tuple[str, int]]:
+        """
+        Agrupa os candidatos por linha em faixas.
+
+        Returns:
+            Uma lista de (rótulo da faixa, número de linhas), sem faixas vazias
+            nas pontas. Ex: [('0', 3), ('1', 10), ('3-5', 42), ...].
+        """
+        contagens = [0] * (len(FAIXAS_HISTOGRAMA) + 1)
+        for n, linhas in self.candidatos_por_linha.items():
+            faixa = next((i for i, limite in enumerate(FAIXAS_HISTOGRAMA) if n <= limite), len(FAIXAS_HISTOGRAMA))
+            contagens[faixa] += linhas
+        rotulos = []
+        anterior = -1
+        for limite in FAIXAS_HISTOGRAMA:
+            rotulos.append(str(limite) if limite == anterior + 1 else f'{anterior + 1}-{limite}')
+            anterior = limite
+        rotulos.append(f'>{FAIXAS_HISTOGRAMA[-1]}')
+        usadas = [i for i, c in enumerate(contagens) if c]
+        if not usadas:
+            return []
+        return [(rotulos[i], contagens[i]) for i in range(usadas[0], usadas[-1] + 1)]
+
+    def merge(self, outra: RunMetrics) -> RunMetrics:
+        """Soma as métricas de outra execução a estas (ex: subproblemas ou dias)."""
+        self.contadores.update(outra.contadores)
+        for fase, segundos in outra.tempos.items():
+            self.add_time(fase, segundos)
+        self.candidatos_por_linha.update(outra.candidatos_por_linha)
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Representação serializável em JSON."""
+        return {
+            'contadores': dict(sorted(self.contadores.items())),
+            'tempos': dict(sorted(self.tempos.items())),
+            'histograma_candidatos': dict(self.histogram()),
+        }
+
+    def report(self) -> str:
+        """Relatório em texto para o terminal."""
+        partes = ["--- Métricas da Execução ---", "Tempos (s):"]
+        partes += [f"  {fase:<40} {segundos:10.4f}" for fase, segundos in sorted(self.tempos.items())]
+        partes.append("Contadores:")
+        partes += [f"  {nome:<40} {valor:10d}" for nome, valor in sorted(self.contadores.items())]
+        histograma = self.histogram()
+        if histograma:
+            partes.append("Candidatos avaliados por linha:")
+            maior = max(linhas for _, linhas in histograma)
+            for rotulo, linhas in histograma:
+                barra = '#' * max(1, round(40 * linhas / maior)) if linhas else ''
+                partes.append(f"  {rotulo:>9} | {linhas:7d} {barra}")
+        return '\n'.join(partes)
+
+
+def timer(metrics: Optional[RunMetrics], fase: str) -> ContextManager[None]:
+    """Cronômetro de fase que não faz nada quando a instrumentação está desligada."""
+    return nullcontext() if metrics is None else metrics.timer(fase)
+
+
+class LatencyWindow:
+    """
+    Latências das últimas decisões de um processo de longa duração (ex: despacho online).
+
+    Guarda no máximo ``tamanho`` amostras, de modo que a memória não cresce
+    com o tempo de execução; os percentis se referem a essa janela.
+    """
+
+    __slots__ = ('_amostras', 'total')
+
+    def __init__(self, tamanho: int = JANELA_LATENCIAS) -> None:
+        if tamanho < 1:
+            raise ValueError(f"Tamanho da janela de latências deve ser positivo: {tamanho}.")
+        self._amostras: deque = deque(maxlen=tamanho)
+        self.total = 0
+
+    def record(self, segundos: float) -> None:
+        """Registra a latência de uma decisão."""
+        self._amostras.append(segundos)
+        self.total += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Retorna o percentil ``p`` (0-100) das latências da janela, em segundos (pelo posto mais próximo).
+
+        Returns:
+            O percentil, ou 0.0 se nenhuma latência foi registrada.
+        """
+        if not self._amostras:
+            return 0.0
+        ordenadas = sorted(self._amostras)
+        posto = max(1, math.ceil(p / 100 * len(ordenadas)))
+        return ordenadas[posto - 1]
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo serializável em JSON: total de decisões e p50/p99/máximo da janela, em milissegundos."""
+        return {
+            'decisoes': self.total,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(max(self._amostras, default=0.0) * 1000, 3),
+        }
@@ -0,0 +1,61 @@
+"""Execução de tarefas em processos paralelos sobre uma mesma instância somente leitura.
+
+Varreduras de penalidade, cenários hipotéticos e comparações em lote
+resolvem muitas tarefas pequenas sobre os mesmos DataFrames. Em vez de
+enviar a instância com cada tarefa, ``map_shared`` a entrega a cada processo
+uma única vez, pelo inicializador do executor (no Linux, herdada sem cópia
+pelo fork); cada tarefa envia só o próprio item e lê a instância com
+``shared()``.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+Item = TypeVar('Item')
+Resultado = TypeVar('Resultado')
+
+# Instância do processo corrente (ver map_shared)
+_COMPARTILHADO: Any = None
+
+
+def _compartilhar(instancia: Any) -> None:
+    """Guarda a instância no processo (inicializador do executor)."""
+    global _COMPARTILHADO
+    _COMPARTILHADO = instancia
+
+
+def shared() -> Any:
+    """Instância entregue por ``map_shared`` ao processo corrente."""
+    return _COMPARTILHADO
+
+
+def map_shared(
+    funcao: Callable[[Item], Resultado],
+    itens: Sequence[Item],
+    instancia: Any,
+    workers: Optional[int] = None
+) -> List[Resultado]:
+    """
+    Aplica ``funcao`` a cada item, com a instância compartilhada pelos processos.
+
+    Args:
+        funcao: Função de nível de módulo (enviada aos processos por nome), que
+            lê a instância com ``shared()`` e não a modifica.
+        itens: Itens das tarefas.
+        instancia: Dados somente leitura comuns a todas as tarefas.
+        workers: Número máximo de processos. 1 (ou um único item) resolve em
+            sequência no próprio processo; None usa o padrão do executor.
+
+    Returns:
+        Os resultados, na ordem dos itens.
+    """
+    if workers == 1 or len(itens) <= 1:
+        anterior = _COMPARTILHADO
+        _compartilhar(instancia)
+        try:
+            return [funcao(item) for item in itens]
+        finally:
+            _compartilhar(anterior)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_compartilhar, initargs=(instancia,)) as executor:
+        return list(executor.map(funcao, itens))
@@ -1,20 +1,45 @@
-"""Módulo com as regras de negócio para validação de agendamentos."""
+"""Módulo com as regras de negócio para validação de agendamentos.
+
+Além da verificação escalar de conflito (``is_time_conflict``), o módulo traz
+o motor de restrições dos agendadores. Cada regra tem duas formas:
+
+- ``mask``, vetorizada, usada pelo motor 'numpy': recebe os candidatos de uma
+  linha que ainda são viáveis e devolve, com operações de array, a máscara
+  dos que continuam viáveis;
+- ``allows``, escalar, usada pelos motores que avaliam um motorista de cada
+  vez (o guloso 'python' e ``insertion_cost``, do reparo e do despacho).
+
+Nas duas formas, as regras são avaliadas da mais barata para a mais cara, e
+a avaliação para assim que não resta candidato. Regras novas (ex: descanso
+mínimo entre viagens, restrição de região) são subclasses de ``Rule``
+passadas ao agendador (``extra_rules`` de ``create_schedule``), sem mudanças
+no laço dos motores.
+"""
 from __future__ import annotations
-from datetime import time
-from typing import List, Tuple
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Point = Tuple[float, float]
 
 
 def is_time_conflict(
-    novo_inicio: time,
-    novo_fim: time,
-    agendamentos_motorista: List[Tuple[time, time]]
+    novo_inicio: float,
+    novo_fim: float,
+    agendamentos_motorista: List[Tuple[float, float]]
 ) -> bool:
     """
     Verifica se o horário da nova linha conflita com os agendamentos existentes de um motorista.
 
+    Os horários são minutos desde a meia-noite do dia da escala; um término
+    após a meia-noite é maior que 1440, de modo que a comparação é direta.
+
     Args:
-        novo_inicio: Horário de início do novo agendamento.
-        novo_fim: Horário de fim do novo agendamento.
+        novo_inicio: Início do novo agendamento, em minutos.
+        novo_fim: Fim do novo agendamento, em minutos.
         agendamentos_motorista: Lista de tuplas (início, fim) dos agendamentos existentes.
 
     Returns:
@@ -24,4 +49,527 @@ def is_time_conflict(
     for inicio_existente, fim_existente in agendamentos_motorista:
         if novo_inicio < fim_existente and novo_fim > inicio_existente:
             return True # Conflito encontrado
-    return False # Sem conflitos
\ No newline at end of file
+    return False # Sem conflitos.
+
+
+class DriverState:
+    """
+    Estado dos motoristas durante a construção da escala, em arrays lidos pelas regras.
+
+    Os arrays por chave seguem a ordem do DataFrame de motoristas; os por
+    código têm uma posição por nome distinto (motoristas com o mesmo nome
+    compartilham a agenda, mas cada um parte da própria casa).
+
+    Attributes:
+        codigo: Código do nome de cada chave.
+        jornada_minutos: Jornada máxima de cada chave, em minutos.
+        partida_x: Latitude do ponto de partida de cada chave: o destino da
+            última viagem encerrada do código ou, se não houver, a casa (NaN
+            para quem nunca é candidato).
+        partida_y: Longitude desse ponto.
+        trabalhado: Minutos já alocados a cada código.
+        ultimo_fim: Término da última viagem encerrada de cada código (-inf se nenhuma).
+        livre_em: Horário a partir do qual cada chave está livre no ponto de
+            partida: o término da última viagem encerrada do código ou, se
+            não houver, a saída de casa.
+        em_rota: Se o código já tem alguma viagem.
+        marcados: Máscara por código para uso temporário das regras, que a
+            devolvem zerada.
+        retencao_minutos: Por quanto tempo após o término uma viagem continua
+            nos arrays de viagens (ver Rule.retencao_minutos).
+    """
+
+    def __init__(self, codigo: np.ndarray, jornada_minutos: np.ndarray, localizacao: np.ndarray,
+                 n_codigos: int, capacidade: int, retencao_minutos: float = 0.0,
+                 saida_de_casa: Optional[np.ndarray] = None) -> None:
+        """
+        Args:
+            codigo: Código do nome de cada chave.
+            jornada_minutos: Jornada máxima de cada chave, em minutos.
+            localizacao: Array (n, 2) com as coordenadas de casa de cada chave.
+            n_codigos: Número de nomes distintos.
+            capacidade: Número máximo de viagens registradas.
+            retencao_minutos: Tempo, após o término, em que as viagens
+                encerradas ainda são consultadas pelas regras.
+            saida_de_casa: Horário em que cada chave sai de casa (ver
+                DriverTable.disponivel_a_partir); None para 0.
+        """
+        self.codigo = codigo
+        self.jornada_minutos = jornada_minutos
+        self.partida_x = np.array(localizacao[:, 0], dtype=float)
+        self.partida_y = np.array(localizacao[:, 1], dtype=float)
+        self.trabalhado = np.zeros(n_codigos)
+        self.ultimo_fim = np.full(n_codigos, -np.inf)
+        self.livre_em = np.zeros(len(codigo)) if saida_de_casa is None else np.array(saida_de_casa, dtype=float)
+        self.em_rota = np.zeros(n_codigos, dtype=bool)
+        self.marcados = np.zeros(n_codigos, dtype=bool)
+        self.retencao_minutos = retencao_minutos
+        # Chave de cada código; as chaves extras dos nomes repetidos, à parte
+        self._chave = np.zeros(n_codigos, dtype=np.intp)
+        self._chave[codigo[::-1]] = np.arange(len(codigo))[::-1]
+        self._chaves_repetidas: Dict[int, List[int]] = {}
+        if len(codigo) > n_codigos:
+            for chave, cod in enumerate(codigo.tolist()):
+                self._chaves_repetidas.setdefault(cod, []).append(chave)
+            self._chaves_repetidas = {cod: chaves for cod, chaves in self._chaves_repetidas.items() if len(chaves) > 1}
+        self._viagem_inicio = np.empty(capacidade)
+        self._viagem_fim = np.empty(capacidade)
+        self._viagem_codigo = np.empty(capacidade, dtype=np.intp)
+        self._n_viagens = 0
+        self._encerradas = 0
+
+    def add_trip(self, codigo: int, inicio: float, fim: float) -> None:
+        """Registra uma viagem do código (e os minutos trabalhados)."""
+        n = self._n_viagens
+        self._viagem_inicio[n] = inicio
+        self._viagem_fim[n] = fim
+        self._viagem_codigo[n] = codigo
+        self._n_viagens = n + 1
+        self.trabalhado[codigo] += fim - inicio
+        self.em_rota[codigo] = True
+
+    def finish_trip(self, codigo: int, fim: float, ponto: Point) -> None:
+        """
+        Marca uma viagem como encerrada no instante corrente; o destino passa a ser o ponto de partida do código.
+
+        As viagens são encerradas em ordem de término, e as linhas são
+        avaliadas em ordem de início: uma viagem encerrada há mais de
+        retencao_minutos não volta a ser consultada. Quando as encerradas
+        passam de metade das viagens registradas, essas são retiradas dos
+        arrays de viagens, de modo que a regra de conflito percorre só as
+        viagens em andamento, futuras ou recentes.
+        """
+        if fim > self.ultimo_fim[codigo]:
+            self.ultimo_fim[codigo] = fim
+            chaves = self._chaves_repetidas.get(codigo, self._chave[codigo])
+            self.livre_em[chaves] = fim
+            self.partida_x[chaves] = ponto[0]
+            self.partida_y[chaves] = ponto[1]
+        self._encerradas += 1
+        if 2 * self._encerradas > self._n_viagens:
+            self._compactar(fim - self.retencao_minutos)
+
+    def _compactar(self, corte: float) -> None:
+        n = self._n_viagens
+        ativas = np.flatnonzero(self._viagem_fim[:n] > corte)
+        for array in (self._viagem_inicio, self._viagem_fim, self._viagem_codigo):
+            array[:ativas.size] = array[ativas]
+        self._n_viagens = ativas.size
+        self._encerradas = 0
+
+    def active_trips(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Início, término e código das viagens registradas que ainda podem ser consultadas (visões, sem cópia)."""
+        n = self._n_viagens
+        return self._viagem_inicio[:n], self._viagem_fim[:n], self._viagem_codigo[:n]
+
+
+class LineContext:
+    """
+    Linha em avaliação e os seus candidatos, como lidos pelas regras.
+
+    Attributes:
+        linha: Registro da linha (colunas do DataFrame de linhas).
+        inicio: Início da linha, em minutos.
+        fim: Término da linha, em minutos.
+        origem: Coordenadas da origem.
+        candidatos: Chaves dos motoristas candidatos.
+        codigos: Código do nome de cada candidato.
+        estado: Estado dos motoristas (DriverState).
+    """
+
+    __slots__ = ('linha', 'inicio', 'fim', 'origem', 'candidatos', 'codigos', 'estado', '_distancias')
+
+    def __init__(self, linha: Dict[str, Any], origem: Point, candidatos: np.ndarray, estado: DriverState) -> None:
+        self.linha = linha
+        self.inicio = linha['horario_inicio_min']
+        self.fim = linha['horario_fim_min']
+        self.origem = origem
+        self.candidatos = candidatos
+        self.codigos = estado.codigo[candidatos]
+        self.estado = estado
+        self._distancias: Optional[np.ndarray] = None
+
+    def deadheads(self, posicoes: np.ndarray) -> np.ndarray:
+        """
+        Distância de deslocamento de cada candidato (nas posições dadas) até a origem da linha.
+
+        As distâncias já calculadas (ex: pela regra de alcance, antes da
+        pontuação) são reaproveitadas.
+        """
+        if self._distancias is not None:
+            distancias = self._distancias[posicoes]
+            if not np.isnan(distancias).any():
+                return distancias
+        else:
+            self._distancias = np.full(len(self.candidatos), np.nan)
+        # Operações no próprio array, sobre as coordenadas já separadas: sem arrays (n, 2) temporários
+        chaves = self.candidatos[posicoes]
+        dx = self.estado.partida_x[chaves]
+        dx -= self.origem[0]
+        dy = self.estado.partida_y[chaves]
+        dy -= self.origem[1]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        distancias = np.sqrt(dx, out=dx)
+        self._distancias[posicoes] = distancias
+        return distancias
+
+
+class DriverCheck:
+    """
+    Linha em avaliação para um motorista de cada vez, como lida pelas regras escalares.
+
+    O mesmo objeto serve a todos os candidatos da linha: ``set_driver``
+    troca o motorista sem alocar nada por candidato.
+
+    Attributes:
+        linha: Registro da linha (colunas do DataFrame de linhas).
+        inicio: Início da linha, em minutos.
+        fim: Término da linha, em minutos.
+        duracao: Duração da linha, em minutos.
+        chave: Chave do motorista (posição no DataFrame de motoristas).
+        agenda: Agenda do motorista (DriverTimeline; vazia se não está em rota).
+        jornada_minutos: Jornada máxima do motorista, em minutos.
+        casa: Coordenada de casa do motorista ("lat,lon").
+        saida_de_casa: Horário em que o motorista sai de casa, se não tem
+            viagem anterior à linha (ver DriverTable.disponivel_a_partir).
+        medida: Resultado de ``deadhead`` para o motorista, ou None se ainda
+            não foi calculado.
+    """
+
+    __slots__ = ('linha', 'inicio', 'fim', 'duracao', 'chave', 'agenda', 'jornada_minutos', 'casa', 'saida_de_casa',
+                 'medida', '_deslocamento')
+
+    def __init__(self, linha: Mapping[str, Any], inicio: float, fim: float, duracao: float,
+                 deslocamento: Callable[[str], Tuple[float, float]]) -> None:
+        """
+        Args:
+            linha: Registro da linha.
+            inicio: Início da linha, em minutos.
+            fim: Término da linha, em minutos.
+            duracao: Duração da linha, em minutos.
+            deslocamento: Distância e minutos de deslocamento de uma
+                coordenada ("lat,lon") até a origem da linha.
+        """
+        self.linha = linha
+        self.inicio = inicio
+        self.fim = fim
+        self.duracao = duracao
+        self._deslocamento = deslocamento
+        self.chave = -1
+        self.agenda: Any = None
+        self.jornada_minutos = 0.0
+        self.casa = ''
+        self.saida_de_casa = 0.0
+        self.medida: Optional[Tuple[float, float, float]] = None
+
+    def set_driver(self, chave: int, agenda: Any, jornada_minutos: float, casa: str, saida_de_casa: float = 0.0) -> None:
+        """Passa a avaliar a linha para outro motorista."""
+        self.chave = chave
+        self.agenda = agenda
+        self.jornada_minutos = jornada_minutos
+        self.casa = casa
+        self.saida_de_casa = saida_de_casa
+        self.medida = None
+
+    def deadhead(self) -> Tuple[float, float, float]:
+        """
+        Deslocamento do motorista até a origem da linha, calculado uma vez por motorista.
+
+        Returns:
+            A distância e os minutos de deslocamento, a partir do destino da
+            viagem anterior à linha (ou de casa), e o horário em que o
+            motorista fica livre (término dessa viagem, ou a saída de casa).
+        """
+        if self.medida is None:
+            anterior = self.agenda.previous_trip(self.inicio)
+            partida, livre = (anterior[2], anterior[1]) if anterior else (self.casa, self.saida_de_casa)
+            distancia, minutos = self._deslocamento(partida)
+            self.medida = (distancia, minutos, livre)
+        return self.medida
+
+
+class Rule:
+    """
+    Regra de viabilidade avaliada sobre todos os candidatos de uma linha de uma vez.
+
+    Subclasses definem ``mask`` (motor 'numpy'), ``allows`` (motores que
+    avaliam um motorista de cada vez) e, se precisarem de dados dos
+    motoristas que não estão no estado, ``prepare``. Uma regra sem ``allows``
+    só pode ser usada pelo motor 'numpy'.
+
+    Attributes:
+        nome: Nome curto da regra; os candidatos descartados por ela são
+            contados em 'scheduler.podados_<nome>'.
+        custo: Custo relativo da avaliação; as regras mais baratas vêm primeiro.
+        retencao_minutos: Por quanto tempo após o término a regra ainda
+            consulta as viagens encerradas (ver DriverState.active_trips).
+    """
+
+    nome = 'regra'
+    custo = 1.0
+    retencao_minutos = 0.0
+
+    def prepare(self, motoristas: pd.DataFrame) -> None:
+        """Chamada uma vez por execução, antes da primeira linha, com o DataFrame de motoristas."""
+
+    def mask(self, contexto: LineContext, posicoes: np.ndarray) -> np.ndarray:
+        """
+        Avalia a regra para os candidatos ainda viáveis.
+
+        Args:
+            contexto: A linha e o estado dos motoristas.
+            posicoes: Posições, em ``contexto.candidatos``, dos candidatos ainda viáveis.
+
+        Returns:
+            Máscara booleana, alinhada a ``posicoes``, dos candidatos que respeitam a regra.
+        """
+        raise NotImplementedError
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        """
+        Avalia a regra para um único motorista.
+
+        Args:
+            verificacao: A linha e o motorista em avaliação.
+
+        Returns:
+            True se o motorista respeita a regra.
+        """
+        raise NotImplementedError
+
+
+class WorkdayRule(Rule):
+    """
+    Descarta quem excederia a jornada máxima com a nova linha.
+
+    A comparação é escrita de modo que uma jornada ausente (NaN) também
+    descarte o motorista, como no agendador original.
+    """
+
+    nome = 'jornada'
+    custo = 1.0
+
+    def mask(self, contexto: LineContext, posicoes: np.ndarray) -> np.ndarray:
+        estado = contexto.estado
+        return (estado.trabalhado[contexto.codigos[posicoes]] + contexto.linha['duracao_minutos']
+                <= estado.jornada_minutos[contexto.candidatos[posicoes]])
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        return verificacao.agenda.minutos_trabalhados + verificacao.duracao <= verificacao.jornada_minutos
+
+
+class ReachabilityRule(Rule):
+    """Descarta quem não chega à origem da linha até o início dela, partindo da última viagem ou de casa."""
+
+    nome = 'alcance'
+    custo = 3.0
+
+    def __init__(self, minutos_por_unidade: float) -> None:
+        """
+        Args:
+            minutos_por_unidade: Minutos de deslocamento por unidade de distância.
+        """
+        self.minutos_por_unidade = minutos_por_unidade
+
+    def mask(self, contexto: LineContext, posicoes: np.ndarray) -> np.ndarray:
+        livre_em = contexto.estado.livre_em[contexto.candidatos[posicoes]]
+        return ~(livre_em + contexto.deadheads(posicoes) * self.minutos_por_unidade > contexto.inicio)
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        # Os minutos vêm de quem mede o deslocamento (estimativa ou tempos de rede)
+        _, minutos, livre = verificacao.medida or verificacao.deadhead()
+        return not livre + minutos > verificacao.inicio
+
+
+class TimeConflictRule(Rule):
+    """
+    Descarta quem tem alguma viagem que se sobrepõe à linha.
+
+    Percorre só as viagens ainda não encerradas (ver DriverState.active_trips)
+    e marca os códigos com sobreposição em uma máscara por código.
+    """
+
+    nome = 'conflito'
+    custo = 2.0
+
+    def __init__(self, folga_minutos: float = 0.0) -> None:
+        """
+        Args:
+            folga_minutos: Intervalo mínimo exigido entre a linha e as demais
+                viagens do motorista (0 exige só que não se sobreponham).
+        """
+        self.folga_minutos = folga_minutos
+        self.retencao_minutos = folga_minutos
+
+    def mask(self, contexto: LineContext, posicoes: np.ndarray) -> np.ndarray:
+        estado = contexto.estado
+        inicios, fins, codigos = estado.active_trips()
+        folga = self.folga_minutos
+        ocupados = codigos[(inicios < contexto.fim + folga) & (fins + folga > contexto.inicio)]
+        if not ocupados.size:
+            return np.ones(len(posicoes), dtype=bool)
+        estado.marcados[ocupados] = True
+        aprovados = ~estado.marcados[contexto.codigos[posicoes]]
+        estado.marcados[ocupados] = False
+        return aprovados
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        folga = self.folga_minutos
+        return not verificacao.agenda.has_conflict(verificacao.inicio - folga, verificacao.fim + folga)
+
+
+class MinimumRestRule(TimeConflictRule):
+    """Exige um descanso mínimo entre a linha e as demais viagens do motorista."""
+
+    nome = 'descanso'
+
+    def __init__(self, minutos: float) -> None:
+        """
+        Args:
+            minutos: Descanso mínimo, em minutos.
+
+        Raises:
+            ValueError: Se minutos for negativo.
+        """
+        if minutos < 0:
+            raise ValueError(f"Descanso mínimo inválido: {minutos} minutos.")
+        super().__init__(minutos)
+
+
+class RegionRule(Rule):
+    """
+    Restringe cada linha aos motoristas da mesma região.
+
+    Linhas sem região (coluna ausente ou vazia) aceitam qualquer motorista;
+    motoristas sem região só atendem linhas sem região.
+    """
+
+    nome = 'regiao'
+    custo = 0.5
+
+    def __init__(self, coluna_motorista: str = 'regiao', coluna_linha: str = 'regiao') -> None:
+        """
+        Args:
+            coluna_motorista: Coluna da região no DataFrame de motoristas.
+            coluna_linha: Coluna da região no DataFrame de linhas.
+        """
+        self.coluna_motorista = coluna_motorista
+        self.coluna_linha = coluna_linha
+        self._regiao_motorista = np.empty(0, dtype=np.intp)
+        self._codigo_regiao: Dict[Any, int] = {}
+
+    def prepare(self, motoristas: pd.DataFrame) -> None:
+        if self.coluna_motorista not in motoristas.columns:
+            raise ValueError(f"Coluna de região '{self.coluna_motorista}' ausente dos motoristas.")
+        codigos, regioes = pd.factorize(motoristas[self.coluna_motorista])
+        self._regiao_motorista = codigos
+        self._codigo_regiao = {regiao: codigo for codigo, regiao in enumerate(regioes)}
+
+    def mask(self, contexto: LineContext, posicoes: np.ndarray) -> np.ndarray:
+        regiao = contexto.linha.get(self.coluna_linha)
+        if regiao is None or regiao != regiao:  # coluna ausente ou NaN
+            return np.ones(len(posicoes), dtype=bool)
+        return self._regiao_motorista[contexto.candidatos[posicoes]] == self._codigo_regiao.get(regiao, -2)
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        regiao = verificacao.linha.get(self.coluna_linha)
+        if regiao is None or regiao != regiao:
+            return True
+        return bool(self._regiao_motorista[verificacao.chave] == self._codigo_regiao.get(regiao, -2))
+
+
+class ConstraintEngine:
+    """
+    Conjunto de regras avaliadas em ordem de custo, com parada antecipada.
+
+    Attributes:
+        regras: As regras, da mais barata para a mais cara (estável entre iguais).
+        podados: Candidatos descartados por regra ({nome: quantidade}), se contar=True.
+    """
+
+    def __init__(self, regras: Iterable[Rule], contar: bool = False) -> None:
+        """
+        Args:
+            regras: Regras a avaliar.
+            contar: Se True, conta os candidatos descartados por cada regra.
+        """
+        self.regras: List[Rule] = sorted(regras, key=lambda regra: regra.custo)
+        self.contar = contar
+        self.podados: Counter = Counter()
+        # Métodos escalares já resolvidos: a avaliação por motorista não procura atributos
+        self._escalares = tuple(regra.allows for regra in self.regras)
+
+    def prepare(self, motoristas: pd.DataFrame) -> None:
+        """Prepara todas as regras para uma execução (ver Rule.prepare)."""
+        for regra in self.regras:
+            regra.prepare(motoristas)
+
+    @property
+    def retencao_minutos(self) -> float:
+        """Maior retenção de viagens encerradas exigida pelas regras."""
+        return max((regra.retencao_minutos for regra in self.regras), default=0.0)
+
+    def require_scalar(self) -> None:
+        """
+        Garante que todas as regras têm a forma escalar (``allows``).
+
+        Raises:
+            ValueError: Se alguma regra só puder ser avaliada pelo motor 'numpy'.
+        """
+        for regra in self.regras:
+            if type(regra).allows is Rule.allows:
+                raise ValueError(f"A regra '{regra.nome}' só é suportada pelo motor 'numpy'.")
+
+    def allows(self, verificacao: DriverCheck) -> bool:
+        """
+        Avalia as regras para um único motorista, parando na primeira que o descarta.
+
+        Returns:
+            True se o motorista respeita todas as regras.
+        """
+        for permite in self._escalares:
+            if not permite(verificacao):
+                if self.contar:
+                    self.podados[permite.__self__.nome] += 1
+                return False
+        return True
+
+    def feasible(self, contexto: LineContext) -> np.ndarray:
+        """
+        Avalia as regras sobre os candidatos da linha.
+
+        Cada regra recebe só os candidatos aprovados pelas anteriores; se não
+        sobra nenhum, as regras restantes não são avaliadas.
+
+        Returns:
+            Posições, em ``contexto.candidatos``, dos candidatos viáveis, em ordem crescente.
+        """
+        posicoes = np.arange(len(contexto.candidatos))
+        for regra in self.regras:
+            if not posicoes.size:
+                break
+            aprovados = regra.mask(contexto, posicoes)
+            if self.contar:
+                self.podados[regra.nome] += int(posicoes.size - np.count_nonzero(aprovados))
+            posicoes = posicoes[aprovados]
+        return posicoes
+
+
+def default_rules(minutos_por_unidade: float, extras: Sequence[Rule] = ()) -> List[Rule]:
+    """
+    Regras padrão do agendador (jornada, alcance e conflito de horário) mais as regras adicionais.
+
+    Habilidade e disponibilidade não mudam durante a execução: os motores já
+    as aplicam ao montar os candidatos de cada tipo de veículo. A ordem segue
+    o custo de cada regra (ver ConstraintEngine).
+
+    Args:
+        minutos_por_unidade: Minutos de deslocamento por unidade de distância.
+        extras: Regras adicionais.
+
+    Returns:
+        A lista de regras.
+    """
+    return [WorkdayRule(), ReachabilityRule(minutos_por_unidade), TimeConflictRule(), *extras]
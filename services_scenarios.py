@@ -0,0 +1,194 @@
+"""Cenários hipotéticos (what-if) resolvidos sobre uma mesma instância pré-processada.
+
+Cada cenário é uma sobreposição leve da instância base: outro conjunto de
+exceções manuais, motoristas marcados como 'indisponivel' e veículos em
+'manutencao'. A base é pré-processada uma única vez e não é copiada: a
+sobreposição troca só a coluna 'disponibilidade' em uma cópia rasa do
+DataFrame, que compartilha as demais colunas com a base. Os cenários são
+resolvidos em processos paralelos e comparados lado a lado pelo custo de
+deslocamento, pelos motoristas usados e pelas linhas sem alocação.
+
+Formato do arquivo de cenários (JSON), com todos os campos opcionais exceto
+``nome``::
+
+    [{"nome": "sem M7", "motoristas_indisponiveis": ["M7"]},
+     {"nome": "feriado", "excecoes": "excecoes_feriado.csv", "veiculos_manutencao": [12, 15]}]
+
+``excecoes`` é um CSV (relativo ao arquivo de cenários) ou uma lista de
+registros nas colunas do CSV de exceções; sem ele, valem as exceções da base.
+Exceções com um motorista ou veículo que o cenário tira de operação são
+descartadas (a linha volta ao otimizador) e contadas nos conflitos.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.optimizer import NEW_DRIVER_PENALTY, calculate_schedule_cost
+from models.scheduler import create_schedule
+from services.exceptions_handler import apply_manual_assignments
+from services.parallel import map_shared, shared
+
+# Colunas da comparação dos cenários, na ordem
+COLUNAS_CENARIOS = ('cenario', 'custo_deslocamento', 'motoristas', 'linhas_alocadas', 'linhas_sem_alocacao',
+                    'conflitos')
+
+
+class Scenario(NamedTuple):
+    """Sobreposição de um cenário sobre a instância base."""
+    nome: str
+    # None mantém as exceções da base; uma lista (mesmo vazia) as substitui
+    excecoes: Optional[List[Dict[str, Any]]] = None
+    motoristas_indisponiveis: Tuple[Any, ...] = ()
+    veiculos_manutencao: Tuple[Any, ...] = ()
+
+
+def overlay_availability(df: pd.DataFrame, coluna: str, ids: Sequence[Any], estado: str) -> pd.DataFrame:
+    """
+    Marca os registros de ``ids`` com outra disponibilidade, sem copiar a tabela.
+
+    Args:
+        df: DataFrame base (motoristas ou veículos). Não é modificado.
+        coluna: Coluna de identificação ('nome' ou 'numero_carro').
+        ids: Identificadores a marcar.
+        estado: Nova disponibilidade (ex: 'indisponivel', 'manutencao').
+
+    Returns:
+        O próprio ``df`` se não houver ids; caso contrário, uma cópia rasa em
+        que só a coluna 'disponibilidade' é nova.
+
+    Raises:
+        ValueError: Se algum identificador não existir em ``df``.
+    """
+    if not len(ids):
+        return df
+    marcados = df[coluna].isin(ids).to_numpy()
+    inexistentes = sorted(set(ids) - set(df.loc[marcados, coluna]), key=str)
+    if inexistentes:
+        raise ValueError(f"Valores de '{coluna}' inexistentes no cenário: {inexistentes}.")
+    atual = df['disponibilidade'].to_numpy() if 'disponibilidade' in df.columns else np.full(len(df), 'disponivel')
+    sobreposto = df.copy(deep=False)
+    sobreposto['disponibilidade'] = np.where(marcados, estado, atual).astype(object)
+    return sobreposto
+
+
+def load_scenarios(caminho: str) -> List[Scenario]:
+    """
+    Lê os cenários de um arquivo JSON (ver a documentação do módulo).
+
+    Args:
+        caminho: Caminho do arquivo de cenários.
+
+    Returns:
+        Os cenários, na ordem do arquivo.
+
+    Raises:
+        ValueError: Se o arquivo não for uma lista de cenários com nomes
+            distintos, ou se houver campos desconhecidos.
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        registros = json.load(arquivo)
+    if not isinstance(registros, list) or not all(isinstance(r, dict) and r.get('nome') for r in registros):
+        raise ValueError("O arquivo de cenários deve ser uma lista de objetos com 'nome'.")
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    cenarios = []
+    for registro in registros:
+        desconhecidos = set(registro) - set(Scenario._fields)
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos no cenário '{registro['nome']}': {sorted(desconhecidos)}.")
+        excecoes = registro.get('excecoes')
+        if isinstance(excecoes, str):
+            excecoes = pd.read_csv(os.path.join(pasta, excecoes)).to_dict('records')
+        cenarios.append(Scenario(
+            nome=str(registro['nome']),
+            excecoes=excecoes,
+            motoristas_indisponiveis=tuple(registro.get('motoristas_indisponiveis', ())),
+            veiculos_manutencao=tuple(registro.get('veiculos_manutencao', ())),
+        ))
+    return cenarios
+
+
+def _resolver_cenario(cenario: Scenario) -> Tuple[Dict[Any, Dict[str, Any]], Dict[str, Any]]:
+    """Aplica a sobreposição do cenário à instância base, resolve e mede a escala final."""
+    motoristas, veiculos, linhas, excecoes_base, penalidade, engine, improve_seconds = shared()
+    motoristas = overlay_availability(motoristas, 'nome', cenario.motoristas_indisponiveis, 'indisponivel')
+    veiculos = overlay_availability(veiculos, 'numero_carro', cenario.veiculos_manutencao, 'manutencao')
+    excecoes = excecoes_base if cenario.excecoes is None else cenario.excecoes
+    # Um recurso fora de operação no cenário não cumpre a exceção: a linha volta ao otimizador
+    fora = set(cenario.motoristas_indisponiveis)
+    fora_veiculos = set(cenario.veiculos_manutencao)
+    validas = [excecao for excecao in excecoes
+               if excecao['motorista'] not in fora and excecao.get('veiculo') not in fora_veiculos]
+
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, conflitos = \
+        apply_manual_assignments(motoristas, veiculos, linhas, validas)
+    escala_otimizada = create_schedule(motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados,
+                                       penalidade, engine=engine, improve_seconds=improve_seconds)
+    escala_final = {**escala_manual, **escala_otimizada}
+    return escala_final, {
+        'cenario': cenario.nome,
+        'custo_deslocamento': calculate_schedule_cost(escala_final, motoristas, veiculos, linhas,
+                                                      new_driver_penalty=0.0),
+        'motoristas': len({info['motorista'] for info in escala_final.values()}),
+        'linhas_alocadas': len(escala_final),
+        'linhas_sem_alocacao': int(len(linhas) - linhas['id'].isin(list(escala_final)).sum()),
+        'conflitos': len(conflitos) + len(excecoes) - len(validas),
+    }
+
+
+def run_scenarios(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    cenarios: Sequence[Scenario],
+    excecoes: Sequence[Dict[str, Any]] = (),
+    new_driver_penalty: float = NEW_DRIVER_PENALTY,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    workers: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[str, Dict[Any, Dict[str, Any]]]]:
+    """
+    Resolve cada cenário sobre a mesma instância pré-processada e compara os resultados.
+
+    A instância base vai para cada processo uma única vez (ver
+    services/parallel.py); cada tarefa envia só a sobreposição do cenário e
+    devolve a escala final.
+
+    Args:
+        motoristas: DataFrame pré-processado de todos os motoristas.
+        veiculos: DataFrame pré-processado de todos os veículos.
+        linhas: DataFrame pré-processado de todas as linhas.
+        cenarios: Cenários a resolver.
+        excecoes: Exceções manuais da base, usadas pelos cenários sem 'excecoes'.
+        new_driver_penalty: Penalidade por novo motorista.
+        engine: Motor de agendamento.
+        improve_seconds: Orçamento de busca local de cada cenário.
+        workers: Número máximo de processos. 1 resolve em sequência no
+            próprio processo; None usa o padrão do executor.
+
+    Returns:
+        Uma tupla com o DataFrame da comparação (colunas de COLUNAS_CENARIOS,
+        uma linha por cenário, na ordem recebida; o custo de deslocamento não
+        inclui a penalidade; os conflitos incluem as exceções descartadas) e
+        a escala final (com as exceções) de cada cenário.
+
+    Raises:
+        ValueError: Se não houver cenários, se dois cenários tiverem o mesmo
+            nome ou se um cenário citar motorista ou veículo inexistente.
+    """
+    nomes = [cenario.nome for cenario in cenarios]
+    if not nomes:
+        raise ValueError("Nenhum cenário para resolver.")
+    if len(set(nomes)) != len(nomes):
+        raise ValueError(f"Nomes de cenário repetidos: {sorted({n for n in nomes if nomes.count(n) > 1})}.")
+    instancia = (motoristas, veiculos, linhas, list(excecoes), float(new_driver_penalty), engine, improve_seconds)
+
+    resultados = map_shared(_resolver_cenario, list(cenarios), instancia, workers)
+
+    comparacao = pd.DataFrame([linha for _, linha in resultados], columns=list(COLUNAS_CENARIOS))
+    escalas = {nome: escala for nome, (escala, _) in zip(nomes, resultados)}
+    return comparacao, escalas
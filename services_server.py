@@ -0,0 +1,370 @@
+"""Serviço local de geração de escalas: HTTP/JSON, fila limitada, pool de processos e deduplicação por hash.
+
+O serviço fica no ar entre os pedidos, de modo que o custo de iniciar o
+interpretador e importar o pandas é pago uma única vez. Cada pedido passa
+pelo mesmo pipeline do ``main.py`` (``preprocess_data`` →
+``apply_manual_assignments`` → ``create_schedule``) em um processo do pool.
+
+Endpoints (corpo e respostas em JSON):
+
+- ``POST /jobs``: envia um pedido ``{"motoristas": [...], "veiculos": [...],
+  "linhas": [...], "excecoes": [...], "parametros": {...}}``, com as tabelas
+  como listas de registros (mesmas colunas dos CSVs de entrada). Responde 202
+  com o ``job`` (o hash do pedido), o ``status`` e se o pedido foi
+  ``deduplicado``; 400 para pedidos inválidos e 503 com a fila cheia ou se
+  o pool de processos precisou ser recriado (o pedido pode ser reenviado).
+- ``GET /jobs/<job>``: estado do pedido ('na_fila', 'executando',
+  'concluida' ou 'falhou'); 404 se for desconhecido ou se o resultado já
+  tiver sido descartado do cache.
+- ``GET /jobs/<job>/result``: a escala, o custo e os conflitos das exceções;
+  409 se o pedido ainda não terminou e 422 se falhou.
+
+O identificador de um pedido é o hash do seu conteúdo, com os parâmetros
+omitidos preenchidos pelos padrões: um pedido idêntico a outro na fila, em
+execução ou já concluído (e ainda guardado) recebe o mesmo identificador e
+não é processado de novo.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from models.fleet import vehicle_timelines
+from models.optimizer import NEW_DRIVER_PENALTY, calculate_schedule_cost
+from models.scheduler import ENGINES, create_schedule
+from services.cache import ResultCache, cache_key
+from services.data_loader import preprocess_data
+from services.exceptions_handler import apply_manual_assignments, format_conflicts
+from services.jobs import CONCLUIDA, EXECUTANDO, FALHOU
+
+# Endereço padrão: só aceita conexões da própria máquina
+HOST_LOCAL = '127.0.0.1'
+
+# Estado de um pedido aceito que ainda espera um processo livre
+NA_FILA = 'na_fila'
+
+# Tabelas obrigatórias de um pedido
+TABELAS = ('motoristas', 'veiculos', 'linhas')
+
+# Parâmetros aceitos e os seus valores padrão
+PARAMETROS_PADRAO = {
+    'penalidade': NEW_DRIVER_PENALTY,
+    'motor': 'python',
+    'busca_local_segundos': 0.0,
+    'reaproveitar_veiculos': False,
+}
+
+_ROTA_JOB = re.compile(r'^/jobs/([0-9a-f]{64})(/result)?$')
+
+
+class QueueFull(Exception):
+    """Lançada por ``SchedulingService.submit`` quando a fila de pedidos está cheia."""
+
+
+class PoolRestarted(Exception):
+    """Lançada por ``SchedulingService.submit`` quando o pool de processos quebrou e foi recriado."""
+
+
+def _validar_pedido(pedido: Any) -> Dict[str, Any]:
+    """Confere a estrutura do pedido e devolve os parâmetros completos (com os padrões, nos tipos dos padrões)."""
+    if not isinstance(pedido, dict):
+        raise ValueError("O pedido deve ser um objeto JSON.")
+    for tabela in TABELAS:
+        if not isinstance(pedido.get(tabela), list):
+            raise ValueError(f"O pedido exige '{tabela}' como uma lista de registros.")
+    if not isinstance(pedido.get('excecoes', []), list):
+        raise ValueError("'excecoes' deve ser uma lista de registros.")
+    parametros = pedido.get('parametros', {})
+    if not isinstance(parametros, dict):
+        raise ValueError("'parametros' deve ser um objeto.")
+    desconhecidos = set(parametros) - set(PARAMETROS_PADRAO)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros desconhecidos: {', '.join(sorted(desconhecidos))}. "
+                         f"Opções: {', '.join(PARAMETROS_PADRAO)}.")
+    parametros = {**PARAMETROS_PADRAO, **parametros}
+    if parametros['motor'] not in ENGINES:
+        raise ValueError(f"Motor desconhecido: {parametros['motor']!r}. Opções: {', '.join(ENGINES)}.")
+    if not isinstance(parametros['reaproveitar_veiculos'], bool):
+        raise ValueError("'reaproveitar_veiculos' deve ser true ou false.")
+    for nome in ('penalidade', 'busca_local_segundos'):
+        if isinstance(parametros[nome], bool) or not isinstance(parametros[nome], (int, float)):
+            raise ValueError(f"'{nome}' deve ser um número.")
+        parametros[nome] = float(parametros[nome])
+    return parametros
+
+
+def _tabela(registros: list) -> pd.DataFrame:
+    """Monta um DataFrame como o lido do CSV (habilidades enviadas como lista viram texto separado por vírgulas)."""
+    df = pd.DataFrame(registros)
+    if 'habilidades' in df.columns:
+        df['habilidades'] = df['habilidades'].map(lambda x: ','.join(map(str, x)) if isinstance(x, list) else x)
+    return df
+
+
+def run_pipeline(pedido: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executa o pipeline completo de um pedido: pré-processamento, exceções manuais e otimização.
+
+    Args:
+        pedido: Pedido no formato de ``POST /jobs`` (ver a documentação do módulo).
+
+    Returns:
+        Resultado serializável em JSON: 'escala' (uma linha por linha de
+        ônibus, nas colunas do CSV de saída), 'custo' da escala final (com a
+        penalidade do pedido), 'motoristas' usados, 'linhas_sem_alocacao' e
+        'conflitos' (mensagens de ``format_conflicts``).
+
+    Raises:
+        ValueError: Se o pedido for inválido.
+    """
+    parametros = _validar_pedido(pedido)
+    motoristas, veiculos, linhas = preprocess_data(*(_tabela(pedido[tabela]) for tabela in TABELAS))
+    reaproveitar = parametros['reaproveitar_veiculos']
+
+    escala_manual, motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados, conflitos = \
+        apply_manual_assignments(motoristas, veiculos, linhas, pedido.get('excecoes', []),
+                                 reuse_vehicles=reaproveitar)
+    escala_otimizada = create_schedule(
+        motoristas_restantes, veiculos_restantes, linhas_restantes, motoristas_agendados,
+        parametros['penalidade'], engine=parametros['motor'],
+        improve_seconds=parametros['busca_local_segundos'], reuse_vehicles=reaproveitar,
+        veiculos_agendados=vehicle_timelines(escala_manual, linhas) if reaproveitar else None
+    )
+    escala_final = {**escala_manual, **escala_otimizada}
+
+    linhas_escala = pd.DataFrame([{
+        'Linha_ID': linha_id,
+        'Horario': info.get('horario', 'N/A'),
+        'Motorista_Alocado': info.get('motorista', 'Nao Alocado'),
+        'Veiculo_Alocado': 'Nao Alocado' if info.get('veiculo') is None else info['veiculo'],
+    } for linha_id, info in sorted(escala_final.items())])
+    custo = calculate_schedule_cost(escala_final, motoristas, veiculos, linhas,
+                                    new_driver_penalty=parametros['penalidade'])
+    return {
+        # O to_json converte os tipos do numpy em tipos nativos do JSON
+        'escala': json.loads(linhas_escala.to_json(orient='records', force_ascii=False)) if len(linhas_escala) else [],
+        'custo': float(custo),
+        'motoristas': len({info['motorista'] for info in escala_final.values()}),
+        'linhas_sem_alocacao': int(len(linhas) - linhas['id'].isin(list(escala_final)).sum()),
+        'conflitos': format_conflicts(conflitos),
+    }
+
+
+class SchedulingService:
+    """
+    Fila de pedidos de escala atendida por um pool de processos, com deduplicação pelo hash do pedido.
+
+    Um pedido ocupa a fila do envio até o fim do processamento; quando a
+    fila está cheia, novos pedidos (que não sejam duplicados) são recusados.
+    Os resultados concluídos (e as falhas, que se repetiriam com a mesma
+    entrada) ficam em um cache LRU limitado. A queda de um processo do pool
+    não é uma falha do pedido: os pedidos afetados saem da fila sem
+    resultado e o pool é recriado no envio seguinte.
+
+    Attributes:
+        max_fila: Número máximo de pedidos na fila ou em execução.
+        executados: Pedidos efetivamente enviados ao pool.
+        deduplicados: Envios atendidos por um pedido idêntico anterior.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_fila: int = 64, max_resultados: int = 256) -> None:
+        """
+        Args:
+            workers: Número de processos do pool; None usa o padrão do executor.
+            max_fila: Número máximo de pedidos na fila ou em execução (pelo menos 1).
+            max_resultados: Número de resultados guardados para consulta e deduplicação.
+
+        Raises:
+            ValueError: Se max_fila ou max_resultados for menor que 1.
+        """
+        if max_fila < 1:
+            raise ValueError("A fila precisa de pelo menos uma posição.")
+        self.max_fila = max_fila
+        self.executados = 0
+        self.deduplicados = 0
+        self._resultados = ResultCache(max_resultados)
+        self._pendentes: Dict[str, Future] = {}
+        self._workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._trava = threading.Lock()
+
+    def submit(self, pedido: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Enfileira um pedido, a menos que um idêntico já esteja na fila ou concluído.
+
+        Args:
+            pedido: Pedido no formato de ``POST /jobs``.
+
+        Returns:
+            O identificador do pedido (hash do conteúdo) e se ele foi deduplicado.
+
+        Raises:
+            ValueError: Se o pedido for inválido.
+            QueueFull: Se a fila estiver cheia.
+            PoolRestarted: Se o pool de processos estava quebrado (ex: um
+                processo morreu); o pool é recriado e o pedido pode ser reenviado.
+        """
+        # Com os padrões preenchidos, omitir um parâmetro ou enviá-lo com o valor padrão é o mesmo pedido
+        pedido = {**pedido, 'excecoes': pedido.get('excecoes', []), 'parametros': _validar_pedido(pedido)}
+        job = cache_key('pedido', pedido)
+        with self._trava:
+            if job in self._pendentes or job in self._resultados:
+                self.deduplicados += 1
+                return job, True
+            if len(self._pendentes) >= self.max_fila:
+                raise QueueFull(f"Fila cheia ({self.max_fila} pedidos em andamento).")
+            try:
+                futuro = self._executor.submit(run_pipeline, pedido)
+            except BrokenProcessPool:
+                self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+                raise PoolRestarted("O pool de processos foi recriado; reenvie o pedido.") from None
+            self._pendentes[job] = futuro
+            self.executados += 1
+        futuro.add_done_callback(lambda f: self._concluir(job, f))
+        return job, False
+
+    def _concluir(self, job: str, futuro: Future) -> None:
+        """Move o pedido terminado da fila para o cache de resultados."""
+        erro = futuro.exception()
+        if isinstance(erro, BrokenProcessPool):
+            # O pedido não chegou a falhar: fica fora do cache para poder ser reenviado
+            with self._trava:
+                self._pendentes.pop(job, None)
+            return
+        desfecho = ({'status': FALHOU, 'erro': f"{type(erro).__name__}: {erro}"} if erro is not None
+                    else {'status': CONCLUIDA, 'resultado': futuro.result()})
+        with self._trava:
+            self._resultados.put(job, desfecho)
+            self._pendentes.pop(job, None)
+
+    def status(self, job: str) -> Optional[Dict[str, Any]]:
+        """
+        Estado de um pedido.
+
+        Returns:
+            Dicionário com 'job', 'status' e, para falhas, 'erro'; None se o
+            pedido for desconhecido (ou o seu resultado já tiver sido descartado).
+        """
+        with self._trava:
+            futuro = self._pendentes.get(job)
+        if futuro is not None and futuro.done():
+            # O callback de conclusão pode ainda não ter rodado; registrar o desfecho duas vezes é inofensivo
+            self._concluir(job, futuro)
+        elif futuro is not None:
+            return {'job': job, 'status': EXECUTANDO if futuro.running() else NA_FILA}
+        desfecho = self._resultados.get(job)
+        if desfecho is None:
+            return None
+        return {'job': job, 'status': desfecho['status'], **({'erro': desfecho['erro']} if 'erro' in desfecho else {})}
+
+    def result(self, job: str) -> Optional[Dict[str, Any]]:
+        """Resultado de um pedido concluído (ver run_pipeline), ou None se ele não estiver concluído."""
+        desfecho = self._resultados.get(job)
+        if desfecho is None or desfecho['status'] != CONCLUIDA:
+            return None
+        return desfecho['resultado']
+
+    def wait(self, job: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Espera o fim de um pedido (por até ``timeout`` segundos) e devolve o seu estado."""
+        with self._trava:
+            futuro = self._pendentes.get(job)
+        if futuro is not None:
+            try:
+                futuro.exception(timeout)
+            except FuturesTimeout:
+                pass
+        return self.status(job)
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos, esperando os pedidos em execução."""
+        self._executor.shutdown(wait=True)
+
+
+def make_server(service: SchedulingService, porta: int, host: str = HOST_LOCAL) -> ThreadingHTTPServer:
+    """Cria (sem iniciar) o servidor HTTP do serviço; cada conexão é atendida em uma thread."""
+
+    class _Requisicao(BaseHTTPRequestHandler):
+        def _responder(self, codigo: int, corpo: Dict[str, Any]) -> None:
+            dados = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_POST(self) -> None:
+            if self.path != '/jobs':
+                self._responder(404, {'erro': f"Rota desconhecida: {self.path}"})
+                return
+            try:
+                tamanho = int(self.headers.get('Content-Length', 0))
+                if tamanho < 0:
+                    # rfile.read(-1) esperaria o fim da conexão, prendendo a thread
+                    raise ValueError(f"Content-Length inválido: {tamanho}.")
+                job, deduplicado = service.submit(json.loads(self.rfile.read(tamanho)))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                self._responder(400, {'erro': f"JSON inválido: {e}"})
+            except ValueError as e:
+                self._responder(400, {'erro': str(e)})
+            except (QueueFull, PoolRestarted) as e:
+                self._responder(503, {'erro': str(e)})
+            else:
+                estado = service.status(job)
+                if estado is None:
+                    # Deduplicado por um resultado descartado do cache logo em seguida
+                    self._responder(404, {'erro': f"Resultado do pedido {job} descartado; reenvie o pedido."})
+                else:
+                    self._responder(202, {**estado, 'deduplicado': deduplicado})
+
+        def do_GET(self) -> None:
+            rota = _ROTA_JOB.match(self.path)
+            estado = service.status(rota.group(1)) if rota else None
+            if estado is None:
+                self._responder(404, {'erro': f"Pedido ou rota desconhecidos: {self.path}"})
+            elif not rota.group(2):
+                self._responder(200, estado)
+            elif estado['status'] == FALHOU:
+                self._responder(422, estado)
+            elif estado['status'] != CONCLUIDA:
+                self._responder(409, estado)
+            else:
+                resultado = service.result(estado['job'])
+                if resultado is None:
+                    self._responder(404, {'erro': f"Resultado do pedido {estado['job']} descartado; reenvie o pedido."})
+                else:
+                    self._responder(200, {**estado, 'resultado': resultado})
+
+        def log_message(self, formato: str, *args: Any) -> None:
+            # Sem um log por requisição no stderr; os pedidos são acompanhados pelos endpoints
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), _Requisicao)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def serve(service: SchedulingService, porta: int, host: str = HOST_LOCAL) -> None:
+    """
+    Atende requisições HTTP até Ctrl+C e então encerra o pool de processos.
+
+    Args:
+        service: Serviço com a fila e o pool de processos.
+        porta: Porta TCP (0 escolhe uma porta livre).
+        host: Endereço de escuta (por padrão, só a própria máquina).
+    """
+    with make_server(service, porta, host) as servidor:
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.shutdown()
@@ -0,0 +1,235 @@
+"""Snapshot colunar dos dados pré-processados (motoristas, veículos e linhas).
+
+O passo de compilação grava cada coluna já pré-processada em um arquivo
+``.npy`` (sem pickle) e um ``manifesto.json`` com o hash do conteúdo dos
+CSVs de origem. Na carga, se o hash dos CSVs atuais bate com o do manifesto,
+as colunas numéricas são mapeadas em memória e nenhuma string é convertida
+de novo; caso contrário, os CSVs são lidos e pré-processados normalmente.
+
+Tipos de coluna suportados: numéricas e booleanas (gravadas como estão),
+texto com valores ausentes (códigos inteiros + valores distintos, de modo
+que a carga cria um objeto str por valor distinto e não por linha) e listas
+de texto, como 'habilidades' (códigos + listas distintas concatenadas, com
+os deslocamentos de cada uma).
+O índice não é gravado: os DataFrames carregados têm RangeIndex, como os
+lidos por ``load_data``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services.data_loader import load_data, preprocess_data
+from services.metrics import RunMetrics, timer
+
+# Versão do formato; snapshots de outra versão são tratados como desatualizados
+SNAPSHOT_VERSION = 1
+TABELAS = ('motoristas', 'veiculos', 'linhas')
+MANIFESTO = 'manifesto.json'
+
+Fonte = Union[str, bytes]
+
+
+def content_hash(fontes: Iterable[Fonte]) -> str:
+    """
+    Calcula o hash SHA-256 do conteúdo das fontes de dados, na ordem dada.
+
+    Args:
+        fontes: Caminhos de arquivos ou o conteúdo já lido (bytes, ex: upload).
+
+    Returns:
+        O hash em hexadecimal, que inclui a versão do formato do snapshot.
+    """
+    sha = hashlib.sha256(f'snapshot-v{SNAPSHOT_VERSION}'.encode())
+    for fonte in fontes:
+        if isinstance(fonte, bytes):
+            conteudo = fonte
+        else:
+            with open(fonte, 'rb') as arquivo:
+                conteudo = arquivo.read()
+        # O tamanho separa as fontes, de modo que mover bytes de uma para outra muda o hash
+        sha.update(len(conteudo).to_bytes(8, 'little'))
+        sha.update(conteudo)
+    return sha.hexdigest()
+
+
+def _salvar(caminho: str, valores: np.ndarray) -> None:
+    """
+    Grava um .npy com outro nome e o substitui de forma atômica.
+
+    O arquivo anterior não é truncado: os DataFrames já carregados com as
+    colunas mapeadas em memória continuam vendo os dados antigos.
+    """
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        np.save(arquivo, valores)
+    os.replace(temporario, caminho)
+
+
+def _gravar_coluna(pasta: str, prefixo: str, serie: pd.Series) -> Dict[str, Any]:
+    """Grava uma coluna em um ou mais arquivos .npy e retorna a sua descrição para o manifesto."""
+    valores = serie.to_numpy()
+    if valores.dtype.kind in 'biuf':
+        _salvar(os.path.join(pasta, f'{prefixo}.npy'), valores)
+        return {'tipo': 'numerica'}
+    if valores.dtype.kind != 'O':
+        raise ValueError(f"Coluna '{serie.name}' com tipo não suportado no snapshot: {valores.dtype}.")
+
+    if all(isinstance(v, list) for v in valores):
+        # Listas distintas (ex: combinações de habilidades) são poucas: grava-se cada uma uma vez
+        codigos, distintas = pd.factorize(pd.Series([tuple(str(item) for item in lista) for lista in valores],
+                                                    dtype=object))
+        deslocamentos = np.zeros(len(distintas) + 1, dtype='int64')
+        np.cumsum([len(lista) for lista in distintas], out=deslocamentos[1:])
+        itens = [item for lista in distintas for item in lista]
+        _salvar(os.path.join(pasta, f'{prefixo}.npy'), codigos.astype('int64'))
+        _salvar(os.path.join(pasta, f'{prefixo}.valores.npy'), np.array(itens, dtype=str))
+        _salvar(os.path.join(pasta, f'{prefixo}.deslocamentos.npy'), deslocamentos)
+        return {'tipo': 'lista'}
+
+    codigos, categorias = pd.factorize(serie)
+    if not all(isinstance(v, str) for v in categorias):
+        raise ValueError(f"Coluna '{serie.name}' mistura texto e outros tipos; não suportada no snapshot.")
+    _salvar(os.path.join(pasta, f'{prefixo}.npy'), codigos.astype('int64'))
+    _salvar(os.path.join(pasta, f'{prefixo}.categorias.npy'), np.array(categorias, dtype=str))
+    return {'tipo': 'texto'}
+
+
+def _ler_coluna(pasta: str, prefixo: str, tipo: str, mmap: bool) -> Any:
+    """Lê uma coluna gravada por _gravar_coluna."""
+    if tipo == 'numerica':
+        # Cópia na escrita: os DataFrames carregados continuam modificáveis sem alterar o arquivo
+        valores = np.load(os.path.join(pasta, f'{prefixo}.npy'), mmap_mode='c' if mmap else None)
+        return valores.view(np.ndarray)
+    if tipo == 'lista':
+        itens = np.load(os.path.join(pasta, f'{prefixo}.valores.npy')).tolist()
+        limites = np.load(os.path.join(pasta, f'{prefixo}.deslocamentos.npy')).tolist()
+        distintas = np.empty(len(limites) - 1, dtype=object)
+        distintas[:] = [tuple(itens[inicio:fim]) for inicio, fim in zip(limites, limites[1:])]
+        # Cada linha recebe a sua própria lista, como no pré-processamento
+        return list(map(list, distintas[np.load(os.path.join(pasta, f'{prefixo}.npy'))]))
+    # Só os valores distintos viram objetos str; o código -1 (ausente) aponta para o NaN do final
+    categorias = np.append(np.load(os.path.join(pasta, f'{prefixo}.categorias.npy')).astype(object), np.nan)
+    return categorias[np.load(os.path.join(pasta, f'{prefixo}.npy'))]
+
+
+def write_snapshot(pasta: str, tabelas: Sequence[pd.DataFrame], hash_conteudo: str) -> None:
+    """
+    Grava o snapshot dos DataFrames pré-processados.
+
+    O manifesto anterior é removido antes das colunas e o novo é gravado por
+    último (e substituído de forma atômica), de modo que uma compilação
+    interrompida nunca deixa um snapshot válido com colunas incompletas. Cada
+    coluna também é substituída de forma atômica, sem alterar os arquivos
+    mapeados em memória por cargas anteriores.
+
+    Args:
+        pasta: Pasta do snapshot (criada se não existir).
+        tabelas: Motoristas, veículos e linhas, já pré-processados.
+        hash_conteudo: Hash das fontes (ver content_hash).
+
+    Raises:
+        ValueError: Se alguma coluna tiver um tipo não suportado.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    try:
+        os.remove(os.path.join(pasta, MANIFESTO))
+    except FileNotFoundError:
+        pass
+    manifesto = {'versao': SNAPSHOT_VERSION, 'hash': hash_conteudo, 'tabelas': {}}
+    for nome, df in zip(TABELAS, tabelas):
+        colunas = []
+        for i, coluna in enumerate(df.columns):
+            descricao = _gravar_coluna(pasta, f'{nome}.{i}', df[coluna])
+            colunas.append({'nome': coluna, **descricao})
+        manifesto['tabelas'][nome] = {'linhas': len(df), 'colunas': colunas}
+    temporario = os.path.join(pasta, MANIFESTO + '.tmp')
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1)
+    os.replace(temporario, os.path.join(pasta, MANIFESTO))
+
+
+def read_snapshot(
+    pasta: str,
+    hash_conteudo: Optional[str] = None,
+    mmap: bool = True
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+    """
+    Lê o snapshot, se existir e estiver atualizado.
+
+    Args:
+        pasta: Pasta do snapshot.
+        hash_conteudo: Hash esperado das fontes; None aceita qualquer snapshot
+            da versão atual.
+        mmap: Mapeia as colunas numéricas em memória em vez de lê-las.
+
+    Returns:
+        Motoristas, veículos e linhas, ou None se o snapshot não existir, for
+        de outra versão ou de outro conteúdo.
+    """
+    try:
+        with open(os.path.join(pasta, MANIFESTO), encoding='utf-8') as arquivo:
+            manifesto = json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifesto.get('versao') != SNAPSHOT_VERSION:
+        return None
+    if hash_conteudo is not None and manifesto.get('hash') != hash_conteudo:
+        return None
+
+    tabelas = []
+    for nome in TABELAS:
+        info = manifesto['tabelas'][nome]
+        dados = {coluna['nome']: _ler_coluna(pasta, f'{nome}.{i}', coluna['tipo'], mmap)
+                 for i, coluna in enumerate(info['colunas'])}
+        tabelas.append(pd.DataFrame(dados, index=pd.RangeIndex(info['linhas']), copy=False))
+    return tabelas[0], tabelas[1], tabelas[2]
+
+
+def compile_snapshot(fontes: Sequence[str], pasta: str, metrics: Optional[RunMetrics] = None) -> str:
+    """
+    Lê e pré-processa os CSVs de motoristas, veículos e linhas e grava o snapshot.
+
+    Args:
+        fontes: Caminhos dos CSVs de motoristas, veículos e linhas.
+        pasta: Pasta do snapshot.
+        metrics: Métricas da execução, opcional.
+
+    Returns:
+        O hash do conteúdo gravado no manifesto.
+    """
+    hash_conteudo = content_hash(fontes)
+    tabelas = preprocess_data(*(load_data(fonte) for fonte in fontes), metrics)
+    with timer(metrics, 'snapshot.gravacao'):
+        write_snapshot(pasta, tabelas, hash_conteudo)
+    return hash_conteudo
+
+
+def load_preprocessed(
+    fontes: Sequence[str],
+    pasta: Optional[str] = None,
+    metrics: Optional[RunMetrics] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, bool]:
+    """
+    Carrega os dados pré-processados, pelo snapshot quando ele estiver atualizado.
+
+    Args:
+        fontes: Caminhos dos CSVs de motoristas, veículos e linhas.
+        pasta: Pasta do snapshot; None sempre lê os CSVs.
+        metrics: Métricas da execução, opcional.
+
+    Returns:
+        Motoristas, veículos e linhas pré-processados e se vieram do snapshot.
+    """
+    if pasta is not None:
+        with timer(metrics, 'snapshot.leitura'):
+            tabelas = read_snapshot(pasta, content_hash(fontes))
+        if tabelas is not None:
+            return tabelas[0], tabelas[1], tabelas[2], True
+    motoristas, veiculos, linhas = preprocess_data(*(load_data(fonte) for fonte in fontes), metrics)
+    return motoristas, veiculos, linhas, False
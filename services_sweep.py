@@ -0,0 +1,129 @@
+"""Varredura da penalidade por novo motorista e fronteira de Pareto entre custo e número de motoristas.
+
+A mesma instância (já pré-processada e com as exceções aplicadas) é resolvida
+para cada penalidade de uma grade, em processos paralelos. Cada ponto é
+medido pelo custo de deslocamento em vazio (o custo da escala sem a
+penalidade) e pelo número de motoristas usados; a fronteira de Pareto traz
+os pontos que nenhum outro supera nos dois critérios ao mesmo tempo.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.optimizer import calculate_schedule_cost
+from models.scheduler import create_schedule
+from models.timeline import DriverTimeline, as_timelines
+from services.parallel import map_shared, shared
+
+# Colunas do resultado da varredura, na ordem
+COLUNAS_VARREDURA = ('penalidade', 'custo_deslocamento', 'motoristas', 'linhas_alocadas', 'na_fronteira')
+
+
+def penalty_grid(minimo: float, maximo: float, passos: int) -> List[float]:
+    """
+    Monta uma grade de penalidades igualmente espaçadas.
+
+    Args:
+        minimo: Menor penalidade.
+        maximo: Maior penalidade.
+        passos: Número de pontos (pelo menos 1; com 1, só o mínimo).
+
+    Returns:
+        As penalidades, em ordem crescente.
+
+    Raises:
+        ValueError: Se passos for menor que 1, maximo for menor que minimo ou
+            minimo for negativo.
+    """
+    if passos < 1:
+        raise ValueError("A varredura precisa de pelo menos uma penalidade.")
+    if minimo < 0 or maximo < minimo:
+        raise ValueError(f"Intervalo de penalidades inválido: {minimo} a {maximo}.")
+    return np.linspace(minimo, maximo, passos).tolist() if passos > 1 else [float(minimo)]
+
+
+def _resolver_penalidade(penalidade: float) -> Tuple[Dict[Any, Dict[str, Any]], float, int]:
+    """Resolve a instância compartilhada com uma penalidade e mede custo de deslocamento e motoristas."""
+    motoristas, veiculos, linhas, agendados_base, engine, improve_seconds = shared()
+    # As agendas base não são modificadas: cada penalidade parte de uma cópia
+    agendados = {nome: agenda.copy() for nome, agenda in agendados_base.items()}
+    escala = create_schedule(motoristas, veiculos, linhas, agendados, penalidade, engine=engine,
+                             improve_seconds=improve_seconds)
+    custo = calculate_schedule_cost(escala, motoristas, veiculos, linhas, agendados_base, new_driver_penalty=0.0)
+    usados = {info['motorista'] for info in escala.values()} | set(agendados_base)
+    return escala, custo, len(usados)
+
+
+def pareto_frontier(resultados: pd.DataFrame) -> pd.Series:
+    """
+    Marca os pontos da fronteira de Pareto (menor custo de deslocamento e menos motoristas).
+
+    Um ponto fica na fronteira se nenhum outro tem custo menor ou igual com
+    menos motoristas, nem custo menor com os mesmos motoristas. Entre pontos
+    idênticos nos dois critérios, fica o de menor penalidade.
+
+    Args:
+        resultados: DataFrame com 'penalidade', 'custo_deslocamento' e 'motoristas'.
+
+    Returns:
+        Série booleana, alinhada a ``resultados``.
+    """
+    ordenados = resultados.sort_values(['motoristas', 'custo_deslocamento', 'penalidade'], kind='stable')
+    # Com menos (ou os mesmos) motoristas, só entra quem baixa o menor custo visto até aqui
+    menor_anterior = ordenados['custo_deslocamento'].cummin().shift(fill_value=np.inf)
+    na_fronteira = ordenados['custo_deslocamento'] < menor_anterior
+    return na_fronteira.reindex(resultados.index)
+
+
+def sweep_penalties(
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    penalidades: Sequence[float],
+    motoristas_agendados: Optional[Dict[str, DriverTimeline]] = None,
+    engine: str = 'python',
+    improve_seconds: float = 0.0,
+    workers: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[float, Dict[Any, Dict[str, Any]]]]:
+    """
+    Resolve a mesma instância para cada penalidade e calcula a fronteira de Pareto.
+
+    A instância vai para cada processo uma única vez e é só lida pelos
+    processos (ver services/parallel.py); cada tarefa envia apenas a
+    penalidade e devolve a escala.
+
+    Args:
+        motoristas: DataFrame de motoristas disponíveis.
+        veiculos: DataFrame de veículos disponíveis.
+        linhas: DataFrame de linhas a serem agendadas.
+        penalidades: Penalidades por novo motorista a resolver (ver penalty_grid).
+        motoristas_agendados: Agendamentos existentes (ex: exceções manuais).
+            Não é modificado; os motoristas com agendamentos contam como usados.
+        engine: Motor de agendamento.
+        improve_seconds: Orçamento de busca local de cada penalidade.
+        workers: Número máximo de processos. 1 resolve em sequência no
+            próprio processo; None usa o padrão do executor.
+
+    Returns:
+        Uma tupla com o DataFrame da varredura (colunas de COLUNAS_VARREDURA,
+        uma linha por penalidade distinta, em ordem crescente) e as escalas
+        por penalidade.
+    """
+    penalidades = sorted(set(float(p) for p in penalidades))
+    agendados_base = as_timelines(dict(motoristas_agendados or {}))
+    instancia = (motoristas, veiculos, linhas, agendados_base, engine, improve_seconds)
+
+    resultados = map_shared(_resolver_penalidade, penalidades, instancia, workers)
+
+    varredura = pd.DataFrame({
+        'penalidade': penalidades,
+        'custo_deslocamento': [custo for _, custo, _ in resultados],
+        'motoristas': [usados for _, _, usados in resultados],
+        'linhas_alocadas': [len(escala) for escala, _, _ in resultados],
+    })
+    varredura['na_fronteira'] = pareto_frontier(varredura)
+    escalas = {penalidade: escala for penalidade, (escala, _, _) in zip(penalidades, resultados)}
+    return varredura[list(COLUNAS_VARREDURA)], escalas
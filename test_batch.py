@@ -0,0 +1,99 @@
+"""Testes unitários para o módulo services/batch.py."""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from models.scheduler import create_schedule
+from services.batch import date_range, lines_for_day, rest_blocks, schedule_range
+from services.data_loader import preprocess_data
+
+SEGUNDA = date(2024, 5, 6)
+
+
+def test_seleciona_linhas_por_data_e_dia_da_semana():
+    """
+    Testa se as colunas opcionais 'data' e 'dias_semana' restringem os dias de operação.
+    """
+    linhas = pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'data': [None, '2024-05-07', None, None],
+        'dias_semana': [None, None, 'seg,qua', 'sab, dom'],
+    })
+
+    assert list(lines_for_day(linhas, SEGUNDA)['id']) == [1, 3]
+    assert list(lines_for_day(linhas, date(2024, 5, 7))['id']) == [1, 2]
+    assert list(lines_for_day(linhas, date(2024, 5, 12))['id']) == [1, 4]
+    with pytest.raises(ValueError):
+        date_range(date(2024, 5, 7), SEGUNDA)
+
+
+def test_dias_paralelos_iguais_a_execucoes_independentes(instancia_aleatoria):
+    """
+    Testa se o lote paralelo produz, para cada dia, a mesma escala de uma execução isolada.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(4)
+    linhas['dias_semana'] = [['seg,ter', 'ter', None][i % 3] for i in range(len(linhas))]
+    dias = date_range(SEGUNDA, date(2024, 5, 8))
+
+    escalas = schedule_range(motoristas, veiculos, linhas, dias, new_driver_penalty=100, workers=2)
+
+    assert list(escalas) == dias
+    for dia in dias:
+        assert escalas[dia] == create_schedule(motoristas, veiculos, lines_for_day(linhas, dia), {}, 100)
+
+
+def test_descanso_minimo_encadeia_os_dias():
+    """
+    Testa se um motorista que terminou tarde não é escalado antes do fim do descanso no dia seguinte.
+    """
+    motoristas = pd.DataFrame([
+        {'nome': 'Perto', 'localizacao': '0,0', 'habilidades': 'simples'},
+        {'nome': 'Longe', 'localizacao': '0,3', 'habilidades': 'simples'},
+    ])
+    veiculos = pd.DataFrame([{'numero_carro': 1, 'tipo': 'simples', 'consumo_km_l': 3}])
+    linhas = pd.DataFrame([
+        {'id': 1, 'data': '2024-05-06', 'origem': '0,0', 'destino': '0,0', 'horario_inicio': '22:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 2, 'data': '2024-05-07', 'origem': '0,0', 'destino': '0,0', 'horario_inicio': '06:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+    ])
+    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
+    dias = [SEGUNDA, date(2024, 5, 7)]
+
+    sem_descanso = schedule_range(motoristas, veiculos, linhas, dias, new_driver_penalty=100, workers=1)
+    com_descanso = schedule_range(motoristas, veiculos, linhas, dias, new_driver_penalty=100, min_rest_hours=11)
+
+    assert sem_descanso[dias[1]][2]['motorista'] == 'Perto'
+    assert com_descanso[dias[0]][1]['motorista'] == 'Perto'
+    assert com_descanso[dias[1]][2]['motorista'] == 'Longe'
+    assert rest_blocks(com_descanso[dias[0]], lines_for_day(linhas, dias[0]), 11) == {'Perto': 600}  # 23:00 + 11h = 10:00
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_descanso_nao_isenta_da_penalidade_de_novo_motorista(engine):
+    """
+    Testa se quem trabalhou na véspera ainda paga a penalidade de novo motorista no dia seguinte.
+
+    O descanso termina antes da linha do dia seguinte: a escala encadeada deve
+    ser a mesma dos dias independentes, em que o motorista mais próximo
+    vence apesar de não ter trabalhado na véspera.
+    """
+    motoristas = pd.DataFrame([
+        {'nome': 'Longe', 'localizacao': '0,1', 'habilidades': 'simples'},
+        {'nome': 'Perto', 'localizacao': '0,0', 'habilidades': 'simples'},
+    ])
+    veiculos = pd.DataFrame([{'numero_carro': 1, 'tipo': 'simples', 'consumo_km_l': 3}])
+    linhas = pd.DataFrame([
+        {'id': 1, 'data': '2024-05-06', 'origem': '0,1', 'destino': '0,1', 'horario_inicio': '20:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 2, 'data': '2024-05-07', 'origem': '0,0', 'destino': '0,0', 'horario_inicio': '12:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+    ])
+    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
+    dias = [SEGUNDA, date(2024, 5, 7)]
+
+    independentes = schedule_range(motoristas, veiculos, linhas, dias, new_driver_penalty=100, engine=engine, workers=1)
+    encadeados = schedule_range(motoristas, veiculos, linhas, dias, new_driver_penalty=100, engine=engine,
+                                min_rest_hours=11)
+
+    assert encadeados[dias[0]][1]['motorista'] == 'Longe'
+    assert encadeados == independentes
+    assert encadeados[dias[1]][2]['motorista'] == 'Perto'
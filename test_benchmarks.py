@@ -0,0 +1,45 @@
+"""Testes unitários para o pacote benchmarks."""
+from __future__ import annotations
+
+import pandas as pd
+from benchmarks.suite import PHASES, compare_results, run_benchmark
+from benchmarks.synthetic import generate_instance
+
+
+def test_gerador_e_reprodutivel_e_consistente():
+    """
+    Testa se a mesma semente gera a mesma instância e se as exceções referenciam recursos compatíveis.
+    """
+    instancia = generate_instance(300, seed=7)
+    repetida = generate_instance(300, seed=7)
+
+    for df, df_repetido in zip(instancia[:3], repetida[:3]):
+        pd.testing.assert_frame_equal(df, df_repetido)
+    assert instancia.excecoes == repetida.excecoes
+    assert len(instancia.linhas) == 300 and instancia.linhas['id'].is_unique
+
+    linhas = instancia.linhas.set_index('id')
+    habilidades = dict(zip(instancia.motoristas['nome'], instancia.motoristas['habilidades']))
+    tipo_veiculo = dict(zip(instancia.veiculos['numero_carro'], instancia.veiculos['tipo']))
+    assert instancia.excecoes
+    for excecao in instancia.excecoes:
+        tipo = linhas.at[excecao['linha'], 'tipo_veiculo_necessario']
+        assert tipo in habilidades[excecao['motorista']].split(',')
+        assert tipo_veiculo[excecao['veiculo']] == tipo
+
+
+def test_benchmark_gera_todas_as_fases_e_compara_com_baseline():
+    """
+    Testa o formato do resultado e se a comparação só acusa regressões acima da tolerância.
+    """
+    resultado = run_benchmark(scales=[60], seed=1)
+
+    assert resultado['meta']['seed'] == 1
+    assert set(resultado['resultados'][0]['fases']) == set(PHASES)
+    assert not any(c['regressao'] for c in compare_results(resultado, resultado))
+
+    lento = {'resultados': [dict(r, fases={f: t + 1.0 for f, t in r['fases'].items()}, total=r['total'] + 3.0)
+                            for r in resultado['resultados']]}
+    regressoes = {c['fase'] for c in compare_results(resultado, lento) if c['regressao']}
+    assert regressoes == set(PHASES) | {'total'}
+    assert not any(c['regressao'] for c in compare_results(lento, resultado))
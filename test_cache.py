@@ -0,0 +1,35 @@
+"""Testes unitários para o módulo services/cache.py."""
+from __future__ import annotations
+
+import pytest
+from services.cache import ResultCache, cache_key
+
+
+def test_descarta_a_entrada_usada_ha_mais_tempo():
+    """
+    Testa se o cache respeita o limite de entradas, descartando a menos usada recentemente.
+    """
+    cache = ResultCache(max_itens=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'a' passa a ser a mais recente
+    cache.put('c', 3)
+
+    assert len(cache) == 2
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert (cache.acertos, cache.falhas) == (3, 1)
+    with pytest.raises(ValueError):
+        ResultCache(max_itens=0)
+
+
+def test_chave_muda_com_qualquer_parametro():
+    """
+    Testa se a chave é estável para as mesmas partes e muda com o hash da entrada ou com um parâmetro.
+    """
+    base = cache_key('escala', 'abc', None, 10000.0, 0.0)
+    assert cache_key('escala', 'abc', None, 10000.0, 0.0) == base
+    assert cache_key('escala', 'abd', None, 10000.0, 0.0) != base
+    assert cache_key('escala', 'abc', None, 9000.0, 0.0) != base
+    assert cache_key('escala', 'abc', 'exc', 10000.0, 0.0) != base
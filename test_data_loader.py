@@ -0,0 +1,45 @@
+"""Testes unitários para o módulo services/data_loader.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from services.data_loader import preprocess_data
+
+
+def test_horarios_em_minutos_inteiros_com_virada_da_meia_noite():
+    """
+    Testa se os horários viram minutos inteiros e se o término após a meia-noite passa de 1440.
+    """
+    linhas = pd.DataFrame({
+        'origem': ['0,0'] * 3,
+        'destino': ['1,1'] * 3,
+        'horario_inicio': ['00:00', '08:15', '23:30'],
+        'duracao_minutos': [45, 60, 90],
+    })
+
+    _, _, linhas = preprocess_data(pd.DataFrame(), pd.DataFrame(), linhas)
+
+    assert linhas['horario_inicio_min'].tolist() == [0, 495, 1410]
+    assert linhas['horario_fim_min'].tolist() == [45, 555, 1500]
+    assert linhas['horario_inicio_min'].dtype.kind == 'i'
+
+
+def test_horario_invalido_gera_erro():
+    """
+    Testa se um horário fora do formato HH:MM é rejeitado.
+    """
+    linhas = pd.DataFrame({'horario_inicio': ['25:00'], 'duracao_minutos': [30]})
+
+    with pytest.raises(ValueError):
+        preprocess_data(pd.DataFrame(), pd.DataFrame(), linhas)
+
+
+def test_horario_com_hora_de_um_digito():
+    """
+    Testa se horários fora do formato fixo (ex: '8:05') ainda são aceitos.
+    """
+    linhas = pd.DataFrame({'horario_inicio': ['8:05', '10:00'], 'duracao_minutos': [30, 30]})
+
+    _, _, linhas = preprocess_data(pd.DataFrame(), pd.DataFrame(), linhas)
+
+    assert linhas['horario_inicio_min'].tolist() == [485, 600]
@@ -0,0 +1,84 @@
+"""Testes unitários para o módulo models/deadhead_cache.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models import optimizer
+from models.deadhead_cache import DeadheadCache
+from models.scheduler import create_schedule
+
+
+def test_cache_nao_altera_a_escala_e_persiste_entre_execucoes(tmp_path, instancia_aleatoria):
+    """
+    Testa se a escala é a mesma com o cache e se uma segunda execução não recalcula nenhum par.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0)
+    escala_sem = create_schedule(motoristas, veiculos, linhas)
+
+    cache = DeadheadCache(str(tmp_path))
+    assert create_schedule(motoristas, veiculos, linhas, distance_cache=cache) == escala_sem
+    assert cache.estatisticas['calculados'] > 0
+    cache.flush()
+
+    reaberto = DeadheadCache(str(tmp_path))
+    assert len(reaberto) == len(cache)
+    assert create_schedule(motoristas, veiculos, linhas, distance_cache=reaberto) == escala_sem
+    assert reaberto.estatisticas['calculados'] == 0
+    assert reaberto.estatisticas['disco'] == cache.estatisticas['calculados']
+
+
+def test_lru_limitado_e_crescimento_das_matrizes():
+    """
+    Testa se o nível em memória respeita a capacidade e se as matrizes crescem sem perder pares.
+    """
+    cache = DeadheadCache(capacidade_lru=10)
+    pontos = [f'{i},{i % 7}' for i in range(300)]
+    esperado = {}
+    for origem, destino in zip(pontos, pontos[1:]):
+        esperado[(origem, destino)] = cache.deadhead(origem, destino)
+    assert len(cache._lru) == 10
+    assert len(cache) == 300
+
+    for (origem, destino), valor in esperado.items():
+        assert cache.deadhead(origem, destino) == valor
+    assert cache.estatisticas['calculados'] == len(esperado)
+
+
+def test_tempos_de_rede_sobrevivem_a_mudanca_da_velocidade_media(tmp_path, monkeypatch):
+    """
+    Testa se só os tempos estimados são descartados quando AVG_MINUTES_PER_DISTANCE_UNIT muda.
+    """
+    cache = DeadheadCache(str(tmp_path))
+    cache.load_road_times(pd.DataFrame([{'origem': '0,0', 'destino': '3,4', 'minutos': 12}]))
+    assert cache.has_road_times
+    assert cache.deadhead('0,0', '3,4') == (5.0, 12.0)
+    assert cache.deadhead('0,0', '6,8') == (10.0, 50.0)
+    cache.flush()
+
+    monkeypatch.setattr(optimizer, 'AVG_MINUTES_PER_DISTANCE_UNIT', 2.0)
+    assert cache.deadhead('0,0', '6,8') == (10.0, 20.0)
+    assert cache.deadhead('0,0', '3,4') == (5.0, 12.0)
+
+    # O arquivo ainda guarda a estimativa antiga: ao reabrir, ela é descartada
+    reaberto = DeadheadCache(str(tmp_path))
+    assert reaberto.has_road_times
+    assert reaberto.deadhead('0,0', '6,8') == (10.0, 20.0)
+    assert reaberto.deadhead('0,0', '3,4') == (5.0, 12.0)
+    assert reaberto.estatisticas['calculados'] == 0
+
+
+def test_entradas_invalidas(instancia_aleatoria):
+    """
+    Testa as validações dos tempos de rede e dos motores que não suportam o cache.
+    """
+    cache = DeadheadCache()
+    with pytest.raises(ValueError):
+        cache.load_road_times(pd.DataFrame([{'origem': '0,0', 'destino': '1,1'}]))
+    with pytest.raises(ValueError):
+        cache.load_road_times(pd.DataFrame([{'origem': '0,0', 'destino': '1,1', 'minutos': -3}]))
+    with pytest.raises(ValueError):
+        DeadheadCache(capacidade_lru=0)
+
+    motoristas, veiculos, linhas = instancia_aleatoria(1, n_linhas=10)
+    with pytest.raises(ValueError):
+        create_schedule(motoristas, veiculos, linhas, engine='numpy', distance_cache=cache)
@@ -0,0 +1,70 @@
+"""Testes unitários para o módulo models/decomposition.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models.decomposition import create_schedule_parallel, repair_conflicts, split_instance
+from services.data_loader import preprocess_data
+
+
+def _com_regioes(motoristas: pd.DataFrame) -> pd.DataFrame:
+    """Atribui a região pela longitude da localização (oeste/leste)."""
+    motoristas['regiao'] = ['Oeste' if lon < 10 else 'Leste' for lon in motoristas['localizacao_lon']]
+    return motoristas
+
+
+def test_divide_linhas_e_veiculos_sem_sobreposicao(instancia_aleatoria):
+    """
+    Testa se cada linha e cada veículo caem em exatamente um subproblema e se os motoristas respeitam habilidade e região.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0, n_motoristas=40, n_veiculos=30, n_linhas=80)
+    motoristas = _com_regioes(motoristas)
+
+    subproblemas = split_instance(motoristas, veiculos, linhas, by_region=True)
+
+    assert sorted(l for s in subproblemas for l in s.linhas['id']) == sorted(linhas['id'])
+    assert sorted(v for s in subproblemas for v in s.veiculos['numero_carro']) == sorted(veiculos['numero_carro'])
+    assert {(s.tipo, s.regiao) for s in subproblemas} == {(t, r) for t in ('articulado', 'simples') for r in ('Leste', 'Oeste')}
+    for s in subproblemas:
+        assert (s.linhas['tipo_veiculo_necessario'] == s.tipo).all()
+        assert (s.veiculos['tipo'] == s.tipo).all()
+        assert all(s.tipo in h for h in s.motoristas['habilidades'])
+        assert (s.motoristas['regiao'] == s.regiao).all()
+
+
+@pytest.mark.parametrize('by_region', [False, True])
+def test_escala_paralela_e_deterministica_e_sem_conflitos(by_region, instancia_aleatoria):
+    """
+    Testa se o resultado com vários processos é igual ao serial e se nenhum motorista fica com agenda inviável.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(2, n_motoristas=40, n_veiculos=60, n_linhas=120)
+    motoristas = _com_regioes(motoristas)
+
+    agendados_serial, agendados_paralelo = {}, {}
+    escala_serial = create_schedule_parallel(motoristas, veiculos, linhas, agendados_serial, 100, workers=1, by_region=by_region)
+    escala_paralela = create_schedule_parallel(motoristas, veiculos, linhas, agendados_paralelo, 100, workers=2, by_region=by_region)
+
+    assert escala_paralela == escala_serial
+    assert agendados_paralelo == agendados_serial
+    assert repair_conflicts(dict(escala_paralela), motoristas, linhas) == []
+    veiculos_usados = [info['veiculo'] for info in escala_paralela.values()]
+    assert len(veiculos_usados) == len(set(veiculos_usados))
+
+
+def test_reparo_remove_linha_sobreposta_de_motorista_com_duas_habilidades():
+    """
+    Testa se o reparo mantém a linha que começa antes quando um motorista recebeu duas linhas sobrepostas.
+    """
+    motoristas = pd.DataFrame([{'nome': 'Ana', 'localizacao': '0,0', 'habilidades': 'simples,articulado'}])
+    linhas = pd.DataFrame([
+        {'id': 1, 'origem': '0,0', 'destino': '0,1', 'horario_inicio': '08:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 2, 'origem': '0,0', 'destino': '0,1', 'horario_inicio': '08:30', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'articulado'},
+    ])
+    motoristas, _, linhas = preprocess_data(motoristas, pd.DataFrame(), linhas)
+    escala = {1: {'motorista': 'Ana', 'veiculo': 10, 'horario': '08:00'},
+              2: {'motorista': 'Ana', 'veiculo': 20, 'horario': '08:30'}}
+
+    removidas = repair_conflicts(escala, motoristas, linhas)
+
+    assert removidas == [2]
+    assert list(escala) == [1]
@@ -0,0 +1,148 @@
+"""Testes unitários para os módulos models/dispatch.py e services/dispatch.py."""
+from __future__ import annotations
+
+import io
+import json
+import socket
+import threading
+
+import pytest
+from models.dispatch import CAMPOS_LINHA, DispatchEngine
+from models.scheduler import create_schedule
+from services.dispatch import handle_event, make_server, serve_stream
+from services.metrics import LatencyWindow, RunMetrics
+
+
+def _eventos(linhas):
+    """Converte as linhas (em ordem de horário) em eventos 'adicionar'."""
+    ordenadas = linhas.sort_values(by='horario_inicio_min', kind='stable')
+    return [{'evento': 'adicionar', 'linha': {campo: linha[campo] for campo in CAMPOS_LINHA}}
+            for linha in ordenadas.to_dict('records')]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_despacho_em_ordem_de_horario_reproduz_o_motor_guloso(seed, instancia_aleatoria):
+    """
+    Testa se despachar as linhas do dia, uma a uma e em ordem de horário, produz a escala de create_schedule.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed)
+    engine = DispatchEngine(motoristas, veiculos)
+    latencias = LatencyWindow()
+
+    for evento in _eventos(linhas):
+        handle_event(engine, evento, latencias)
+
+    assert engine.escala == create_schedule(motoristas, veiculos, linhas)
+    assert len(engine) == len(engine.escala)
+    assert latencias.summary()['decisoes'] == len(linhas)
+
+
+def test_cancelamento_devolve_motorista_e_veiculo(instancia_aleatoria):
+    """
+    Testa se cancelar uma linha libera o motorista e o veículo para a próxima linha equivalente.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(1)
+    escala = create_schedule(motoristas, veiculos, linhas)
+    engine = DispatchEngine(motoristas, veiculos, linhas, escala)
+    linha_id, info = next(iter(escala.items()))
+    linha = linhas.set_index('id').loc[linha_id]
+    evento = {'evento': 'adicionar', 'linha': {**{c: linha[c] for c in CAMPOS_LINHA if c != 'id'}, 'id': 'NOVA'}}
+    latencias = LatencyWindow()
+
+    ocupada = handle_event(engine, evento, latencias)
+    assert ocupada['linha'] == 'NOVA' and ocupada['status'] in ('alocada', 'sem_alocacao')
+    assert (ocupada.get('motorista'), ocupada.get('veiculo')) != (info['motorista'], info['veiculo'])
+    # Só uma linha alocada fica registrada e pode ser cancelada
+    esperado = 'cancelada' if ocupada['status'] == 'alocada' else 'erro'
+    assert handle_event(engine, {'evento': 'cancelar', 'linha': 'NOVA'}, latencias)['status'] == esperado
+
+    assert handle_event(engine, {'evento': 'cancelar', 'linha': linha_id}, latencias)['status'] == 'cancelada'
+    assert linha_id not in engine.escala
+    evento['linha']['id'] = 'NOVA2'
+    realocada = handle_event(engine, evento, latencias)
+    assert (realocada['motorista'], realocada['veiculo']) == (info['motorista'], info['veiculo'])
+    assert engine.escala == {**{outra: i for outra, i in escala.items() if outra != linha_id}, 'NOVA2': dict(info)}
+
+
+def test_linha_recusada_nao_fica_registrada(instancia_aleatoria):
+    """
+    Testa se uma linha sem motorista ou veículo possível não fica registrada e pode ser reenviada com o mesmo ID.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(3)
+    linha = _eventos(linhas)[0]['linha']
+    engine = DispatchEngine(motoristas, veiculos[veiculos['tipo'] != linha['tipo_veiculo_necessario']])
+
+    assert engine.add_line(linha) is None
+    assert len(engine) == 0 and not engine.escala
+    with pytest.raises(ValueError):
+        engine.cancel_line(linha['id'])
+    assert engine.add_line(linha) is None
+
+
+def test_eventos_invalidos_respondem_com_erro_sem_alterar_o_estado(instancia_aleatoria):
+    """
+    Testa as respostas de erro do protocolo e a contagem por status em serve_stream.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(2)
+    engine = DispatchEngine(motoristas, veiculos)
+    linha = _eventos(linhas)[0]['linha']
+    entrada = io.StringIO('\n'.join([
+        json.dumps({'evento': 'adicionar', 'linha': linha}),
+        json.dumps({'evento': 'adicionar', 'linha': linha}),
+        json.dumps({'evento': 'adicionar', 'linha': {**linha, 'id': 'X', 'horario_inicio': '24:00'}}),
+        json.dumps({'evento': 'adicionar', 'linha': {**linha, 'id': 'Y', 'duracao_minutos': -5}}),
+        json.dumps({'evento': 'adicionar', 'linha': {'id': 'Z'}}),
+        json.dumps({'evento': 'adicionar', 'linha': {**linha, 'id': 'W', 'destino': '3;3'}}),
+        json.dumps({'evento': 'adicionar', 'linha': {**linha, 'id': 'W'}}),
+        json.dumps({'evento': 'cancelar', 'linha': 'inexistente'}),
+        json.dumps({'evento': 'voar'}),
+        'isto não é json',
+        '',
+        json.dumps({'evento': 'latencia'}),
+    ]))
+    saida = io.StringIO()
+    metrics = RunMetrics()
+
+    serve_stream(engine, entrada, saida, LatencyWindow(), metrics)
+
+    respostas = [json.loads(texto) for texto in saida.getvalue().splitlines()]
+    esperados = ['alocada'] + ['erro'] * 5 + [respostas[6]['status']] + ['erro'] * 3 + ['latencia']
+    assert [r['status'] for r in respostas] == esperados
+    assert 'já existe' in respostas[1]['mensagem']
+    assert 'Horário inválido' in respostas[2]['mensagem']
+    assert 'Duração inválida' in respostas[3]['mensagem']
+    assert 'Campos ausentes' in respostas[4]['mensagem']
+    # A linha com coordenada inválida não fica registrada: reenviada corrigida, é aceita
+    assert 'Coordenada inválida' in respostas[5]['mensagem']
+    assert respostas[6]['status'] in ('alocada', 'sem_alocacao')
+    assert 'JSON inválido' in respostas[9]['mensagem']
+    assert respostas[10]['decisoes'] == 2
+    assert set(engine.escala) <= {linha['id'], 'W'} and len(engine) == len(engine.escala)
+    assert metrics.contadores['despacho.erro'] == 8
+
+
+def test_socket_local_atende_eventos(instancia_aleatoria):
+    """
+    Testa uma conexão TCP local com o servidor de despacho.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0)
+    engine = DispatchEngine(motoristas, veiculos)
+    eventos = _eventos(linhas)[:3]
+    servidor = make_server(engine, 0, LatencyWindow())
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.create_connection(servidor.server_address, timeout=5) as conexao:
+            arquivo = conexao.makefile('rw', encoding='utf-8')
+            respostas = []
+            for evento in eventos:
+                arquivo.write(json.dumps(evento) + '\n')
+                arquivo.flush()
+                respostas.append(json.loads(arquivo.readline()))
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    assert [r['linha'] for r in respostas] == [e['linha']['id'] for e in eventos]
+    assert all(r['status'] in ('alocada', 'sem_alocacao') for r in respostas)
+    assert len(engine) == sum(r['status'] == 'alocada' for r in respostas)
@@ -0,0 +1,59 @@
+"""Testes unitários para o módulo models/domain.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models.domain import MAX_HABILIDADES, DriverTable, LineTable, SkillBits
+
+
+def test_tabela_de_motoristas_equivale_aos_registros(instancia_aleatoria):
+    """
+    Testa colunas, máscaras de habilidades e nomes internados, a partir do DataFrame e dos registros.
+    """
+    motoristas, _, _ = instancia_aleatoria(6)
+    motoristas = pd.concat([motoristas, motoristas.head(1)], ignore_index=True)  # nome repetido
+    tabela = DriverTable(motoristas)
+    registros = motoristas.to_dict('records')
+
+    assert len(tabela) == len(DriverTable.from_records(registros)) == len(registros)
+    for chave, registro in enumerate(registros):
+        assert tabela.nomes[chave] == registro['nome']
+        assert list(tabela.habilidades[chave]) == registro['habilidades']
+        assert tabela.disponivel[chave] == (registro['disponibilidade'] == 'disponivel')
+        assert tabela.jornada_minutos[chave] == registro['jornada_maxima_horas'] * 60
+    for habilidade in ('simples', 'articulado'):
+        esperado = [habilidade in r['habilidades'] for r in registros]
+        assert tabela.with_skill(habilidade).tolist() == esperado
+        assert tabela.por_habilidade[habilidade].tolist() == [k for k, tem in enumerate(esperado) if tem]
+    assert not tabela.with_skill('inexistente').any()
+    assert tabela.keys_for(registros[0]['nome']) == [0, len(registros) - 1]
+    assert tabela.keys_for(registros[1]['nome']) == [1]
+    assert tabela.nomes[0] is tabela.nomes[-1]
+    assert tabela.from_records(registros).mascaras.tolist() == tabela.mascaras.tolist()
+
+
+def test_padroes_de_colunas_ausentes_e_limite_de_habilidades():
+    """
+    Testa os valores padrão dos motores e o limite de habilidades da máscara de bits.
+    """
+    tabela = DriverTable(pd.DataFrame({'nome': ['A'], 'localizacao': ['0,0']}))
+    assert tabela.habilidades == [()] and tabela.disponivel[0] == 1 and tabela.jornada_minutos[0] == 24 * 60
+
+    bits = SkillBits()
+    assert bits.mask(['a', 'b', 'a']) == 0b11 and bits.get('c') == 0
+    for i in range(MAX_HABILIDADES - 2):
+        bits.bit(i)
+    with pytest.raises(ValueError):
+        bits.bit('excedente')
+
+
+def test_tabela_de_linhas_na_ordem_do_motor(instancia_aleatoria):
+    """
+    Testa se a ordem de processamento é a mesma da ordenação estável por horário.
+    """
+    _, _, linhas = instancia_aleatoria(7)
+    tabela = LineTable(linhas)
+
+    ordenadas = linhas.sort_values(by='horario_inicio_min', kind='stable')
+    assert [tabela.ids[i] for i in tabela.ordem] == ordenadas['id'].tolist()
+    assert [tabela.fim[i] for i in tabela.ordem] == ordenadas['horario_fim_min'].tolist()
@@ -0,0 +1,97 @@
+"""Testes unitários para o módulo services/exceptions_handler.py."""
+from __future__ import annotations
+
+import random
+
+import pandas as pd
+from services.data_loader import preprocess_data
+from services.exceptions_handler import COLUNAS_CONFLITO, apply_manual_assignments, format_conflicts
+from services.metrics import RunMetrics
+
+
+def _aplicar_uma_a_uma(linhas, excecoes):
+    """Referência: busca cada exceção na tabela de linhas, como a implementação original."""
+    escala, agendas = {}, {}
+    for excecao in excecoes:
+        linha = linhas[linhas['id'] == excecao['linha']].iloc[0]
+        escala[excecao['linha']] = {'motorista': excecao['motorista'], 'veiculo': excecao.get('veiculo'),
+                                    'horario': linha['horario_inicio']}
+        agendas.setdefault(excecao['motorista'], []).append(
+            (linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino']))
+    return escala, agendas
+
+
+def test_juncao_por_indice_equivale_a_busca_por_excecao(instancia_aleatoria):
+    """
+    Testa se escala manual, agendas e recursos restantes são os mesmos da busca linha a linha.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(5, n_linhas=80)
+    rng = random.Random(5)
+    excecoes = [{'linha': linha_id, 'motorista': f'M{rng.randrange(25)}',
+                 'veiculo': rng.choice([None, 100 + rng.randrange(15)])}
+                for linha_id in rng.sample(list(linhas['id']), 30)]
+
+    escala, restantes_m, restantes_v, restantes_l, agendados, conflitos = \
+        apply_manual_assignments(motoristas, veiculos, linhas, excecoes)
+
+    escala_ref, agendas_ref = _aplicar_uma_a_uma(linhas, excecoes)
+    assert escala == escala_ref
+    assert {nome: sorted(agenda) for nome, agenda in agendados.items()} == \
+        {nome: sorted(agenda) for nome, agenda in agendas_ref.items()}
+    assert restantes_m is motoristas
+    usados = {e['veiculo'] for e in excecoes if e['veiculo'] is not None}
+    assert set(restantes_v['numero_carro']) == set(veiculos['numero_carro']) - usados
+    assert set(restantes_l['id']) == set(linhas['id']) - set(escala)
+    assert list(conflitos.columns) == list(COLUNAS_CONFLITO)
+    assert set(conflitos['tipo']) <= {'motorista', 'veiculo'}
+
+
+def test_relatorio_de_conflitos():
+    """
+    Testa a detecção em lote de linhas inexistentes, repetidas e recursos em horários sobrepostos.
+    """
+    linhas = pd.DataFrame({
+        'id': [1, 2, 3, 4, 5, 6],
+        'origem': ['0,0'] * 6,
+        'destino': ['1,1'] * 6,
+        'horario_inicio': ['08:00', '09:00', '09:30', '09:45', '23:00', '00:30'],
+        'duracao_minutos': [60, 60, 60, 30, 120, 30],
+        'tipo_veiculo_necessario': ['simples'] * 6,
+    })
+    motoristas = pd.DataFrame({'nome': ['A', 'B'], 'localizacao': ['0,0'] * 2, 'habilidades': ['simples'] * 2,
+                               'disponibilidade': ['disponivel'] * 2})
+    veiculos = pd.DataFrame({'numero_carro': [7, 8], 'tipo': ['simples'] * 2,
+                             'disponibilidade': ['disponivel'] * 2, 'consumo_km_l': [3, 3]})
+    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
+    excecoes = [
+        {'linha': 1, 'motorista': 'A', 'veiculo': 7},
+        {'linha': 2, 'motorista': 'A', 'veiculo': 8},   # encosta na linha 1: sem conflito
+        {'linha': 3, 'motorista': 'A', 'veiculo': 7},   # sobrepõe a 2 (motorista); o veículo 7 está livre
+        {'linha': 4, 'motorista': 'B', 'veiculo': 8},   # veículo 8 ainda na linha 2
+        {'linha': 99, 'motorista': 'B', 'veiculo': None},
+        {'linha': 5, 'motorista': 'B', 'veiculo': 0},
+        {'linha': 6, 'motorista': 'A', 'veiculo': None},  # 00:30 do mesmo dia, antes de tudo
+        {'linha': 5, 'motorista': 'A', 'veiculo': None},  # repetida: vale esta
+    ]
+    metrics = RunMetrics()
+
+    escala, _, restantes_v, _, agendados, conflitos = \
+        apply_manual_assignments(motoristas, veiculos, linhas, excecoes, metrics)
+
+    registros = sorted(conflitos.itertuples(index=False, name=None), key=str)
+    assert registros == sorted([
+        ('linha_inexistente', 99, None, None),
+        ('linha_duplicada', 5, 'B', 5),
+        ('motorista', 3, 'A', 2),
+        ('veiculo', 4, 8, 2),
+    ], key=str)
+    assert escala[5]['motorista'] == 'A' and 'B' not in {i['motorista'] for l, i in escala.items() if l == 5}
+    assert [destino for _, _, destino in agendados['B']] == ['1,1']
+    assert list(restantes_v['numero_carro']) == []
+    assert metrics.contadores['excecoes.conflitos_motorista'] == 1
+    assert metrics.contadores['excecoes.aplicadas'] == 6
+    mensagens = format_conflicts(conflitos)
+    assert len(mensagens) == 4 and any('não encontrada' in m for m in mensagens)
+
+    vazio = apply_manual_assignments(motoristas, veiculos, linhas, [])
+    assert vazio[0] == {} and vazio[5].empty
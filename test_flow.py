@@ -0,0 +1,93 @@
+"""Testes unitários para o módulo models/flow.py."""
+from __future__ import annotations
+
+import itertools
+import random
+
+import pytest
+from models.decomposition import repair_conflicts
+from models.flow import MAX_CANDIDATES, solve_assignment
+from models.scheduler import compare_engines, create_schedule
+from models.timeline import DriverTimeline
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_atribuicao_igual_a_forca_bruta(seed):
+    """
+    Testa se a atribuição de custo mínimo encontra o ótimo de uma enumeração exaustiva.
+    """
+    rng = random.Random(seed)
+    n_linhas, n_colunas = 5, 7
+    custos = [[rng.randint(0, 20) for _ in range(n_colunas)] for _ in range(n_linhas)]
+    arestas = [[(c, float(custo)) for c, custo in enumerate(linha)] for linha in custos]
+
+    atribuicao = solve_assignment(n_colunas, arestas)
+
+    otimo = min(sum(custos[r][c] for r, c in enumerate(p)) for p in itertools.permutations(range(n_colunas), n_linhas))
+    assert len(set(atribuicao)) == n_linhas
+    assert sum(custos[r][c] for r, c in enumerate(atribuicao)) == otimo
+
+
+@pytest.mark.parametrize('flow_candidates', [MAX_CANDIDATES, None])
+def test_motor_flow_respeita_regras_de_negocio(instancia_aleatoria, flow_candidates):
+    """
+    Testa se a escala do motor 'flow', com e sem poda, respeita habilidades, veículos únicos e conflitos de horário.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(7, n_veiculos=80)
+
+    escala = create_schedule(motoristas, veiculos, linhas, new_driver_penalty=100, engine='flow',
+                             flow_candidates=flow_candidates)
+
+    habilidades = dict(zip(motoristas['nome'], motoristas['habilidades']))
+    linha_por_id = linhas.set_index('id')
+    veiculos_usados = [info['veiculo'] for info in escala.values()]
+    assert len(veiculos_usados) == len(set(veiculos_usados))
+    agendas = {}
+    for linha_id, info in escala.items():
+        linha = linha_por_id.loc[linha_id]
+        assert linha['tipo_veiculo_necessario'] in habilidades[info['motorista']]
+        agenda = agendas.setdefault(info['motorista'], DriverTimeline())
+        assert not agenda.has_conflict(linha['horario_inicio_min'], linha['horario_fim_min'])
+        agenda.insert(linha['horario_inicio_min'], linha['horario_fim_min'], linha['destino'])
+
+
+def test_sobras_do_motor_flow_chegam_a_viagem_seguinte(instancia_aleatoria):
+    """
+    Testa se as linhas que sobram das cadeias, numa instância densa, não deixam o motorista atrasado para a viagem seguinte.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(10, n_motoristas=60, n_veiculos=200, n_linhas=300)
+
+    escala = create_schedule(motoristas, veiculos, linhas, new_driver_penalty=100, engine='flow')
+
+    assert repair_conflicts(dict(escala), motoristas, linhas) == []
+
+
+def test_comparacao_reporta_tempo_e_custo(instancia_aleatoria):
+    """
+    Testa se a comparação reporta tempo e custo dos motores sem alterar os agendamentos de entrada.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(3, n_veiculos=80)
+    nome = motoristas['nome'].iloc[0]
+    agendados = {nome: DriverTimeline([])}
+
+    comparacao = compare_engines(motoristas, veiculos, linhas, agendados, new_driver_penalty=100)
+
+    assert comparacao['motor'].tolist() == ['python', 'flow']
+    assert (comparacao['tempo_s'] >= 0).all()
+    assert (comparacao['custo_total'] > 0).all()
+    assert len(agendados[nome]) == 0
+    guloso = comparacao.loc[comparacao['motor'] == 'python', 'motoristas'].iloc[0]
+    assert comparacao['pior_que_guloso'].tolist() == (comparacao['motoristas'] > guloso).tolist()
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_motor_flow_nao_usa_mais_motoristas_que_o_guloso(instancia_aleatoria, seed):
+    """
+    Testa se, com a poda padrão, o motor 'flow' nunca usa mais motoristas que o guloso nas instâncias densas.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_motoristas=60, n_veiculos=200, n_linhas=300)
+
+    comparacao = compare_engines(motoristas, veiculos, linhas, new_driver_penalty=100)
+
+    assert not comparacao['pior_que_guloso'].any()
+    assert comparacao.loc[comparacao['motor'] == 'python', 'pior_que_guloso'].tolist() == [False]
@@ -0,0 +1,65 @@
+"""Testes unitários para o módulo services/jobs.py."""
+from __future__ import annotations
+
+import threading
+
+from models.scheduler import create_schedule
+from services.jobs import CANCELADA, CONCLUIDA, FALHOU, BackgroundJob
+
+
+def test_tarefa_conclui_com_o_mesmo_resultado_e_progresso_crescente(instancia_aleatoria):
+    """
+    Testa se a escala gerada em segundo plano é a mesma e se o progresso informado só cresce até 1.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0, n_linhas=600)
+    esperada = create_schedule(motoristas, veiculos, linhas)
+    fracoes = []
+
+    def tarefa(progress):
+        def registrar(fracao):
+            fracoes.append(fracao)
+            progress(fracao)
+        return create_schedule(motoristas, veiculos, linhas, progress=registrar)
+
+    job = BackgroundJob(tarefa).start()
+    assert job.wait(30)
+    assert job.status == CONCLUIDA
+    assert job.resultado == esperada
+    assert fracoes == sorted(fracoes) and fracoes[0] == 0.0 and fracoes[-1] == 1.0
+    assert len(fracoes) > 2
+
+
+def test_cancelamento_interrompe_o_motor(instancia_aleatoria):
+    """
+    Testa se o cancelamento interrompe a escala na próxima chamada do callback de progresso.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(1, n_linhas=600)
+    primeira_chamada, liberar = threading.Event(), threading.Event()
+
+    def tarefa(progress):
+        def pausar(fracao):
+            primeira_chamada.set()
+            liberar.wait(10)
+            progress(fracao)
+        return create_schedule(motoristas, veiculos, linhas, engine='numpy', progress=pausar)
+
+    job = BackgroundJob(tarefa).start()
+    assert primeira_chamada.wait(10)
+    job.cancel()
+    liberar.set()
+    assert job.wait(10)
+    assert job.status == CANCELADA
+    assert job.resultado is None
+
+
+def test_falha_da_tarefa_fica_registrada():
+    """
+    Testa se uma exceção da tarefa é guardada em vez de se perder na thread.
+    """
+    def tarefa(progress):
+        raise ValueError("dados inválidos")
+
+    job = BackgroundJob(tarefa).start()
+    assert job.wait(10)
+    assert job.status == FALHOU
+    assert isinstance(job.erro, ValueError)
@@ -0,0 +1,40 @@
+"""Testes unitários para o módulo models/local_search.py."""
+from __future__ import annotations
+
+import pytest
+from models.local_search import LocalSearch
+from models.optimizer import calculate_schedule_cost
+from models.scheduler import create_schedule
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_busca_local_reduz_custo_com_delta_consistente(seed, instancia_aleatoria):
+    """
+    Testa se a busca local nunca piora a escala e se o custo incremental bate com o recálculo completo.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_veiculos=80)
+    escala = create_schedule(motoristas, veiculos, linhas, new_driver_penalty=100)
+    custo_inicial = calculate_schedule_cost(escala, motoristas, veiculos, linhas, {}, 100)
+
+    busca = LocalSearch(escala, motoristas, veiculos, linhas, {}, 100)
+    custo_busca_inicial = busca.custo_total
+    escala_melhorada = busca.run(time_budget=60, max_iterations=3000)
+    custo_final = calculate_schedule_cost(escala_melhorada, motoristas, veiculos, linhas, {}, 100)
+
+    assert custo_final <= custo_inicial
+    assert custo_inicial - custo_final == pytest.approx(custo_busca_inicial - busca.custo_total)
+    assert {k: v['veiculo'] for k, v in escala_melhorada.items()} == {k: v['veiculo'] for k, v in escala.items()}
+
+
+def test_fase_de_melhoria_atualiza_agendamentos(instancia_aleatoria):
+    """
+    Testa se create_schedule com orçamento de melhoria devolve agendas coerentes com a escala final.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(1, n_veiculos=80)
+    agendados = {}
+
+    escala = create_schedule(motoristas, veiculos, linhas, agendados, new_driver_penalty=100, improve_seconds=0.2)
+
+    assert sum(len(agenda) for agenda in agendados.values()) == len(escala)
+    for linha_id, info in escala.items():
+        assert len(agendados[info['motorista']]) > 0
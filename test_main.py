@@ -0,0 +1,81 @@
+"""Testes unitários para a linha de comando (main.py)."""
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from models.scheduler import ENGINES
+
+import main
+
+
+def test_motores_da_linha_de_comando_sao_os_do_agendador():
+    """
+    Testa se a lista de motores declarada na linha de comando acompanha a do agendador.
+    """
+    assert main.MOTORES == ENGINES
+
+
+@pytest.mark.parametrize('argumentos', [
+    ['schedule', '--reuse-vehicles', '--dispatch'],
+    ['schedule', '--reuse-vehicles', '--dispatch-port', '8765'],
+    ['schedule', '--reuse-vehicles', '--engine', 'flow'],
+    ['schedule', '--reuse-vehicles', '--workers', '2'],
+    ['schedule', '--trip-rest', '30', '--engine', 'flow'],
+    ['schedule', '--same-region', '--improve', '5'],
+    ['schedule', '--same-region', '--workers', '2'],
+    ['schedule', '--trip-rest', '30', '--by-region'],
+    ['schedule', '--trip-rest', '-1'],
+    ['schedule', '--distance-cache', 'cache', '--engine', 'numpy'],
+    ['schedule', '--dispatch', '--dispatch-port', '8765'],
+    ['schedule', '--flow-exact'],
+    ['schedule', '--engine', 'flow', '--flow-exact', '--workers', '2'],
+    ['batch', '--start', '2024-05-06', '--trip-rest', '30'],
+    ['batch', '--start', '2024-05-06', '--end', '2024-05-01'],
+    ['batch', '--end', '2024-05-06'],
+    ['sweep', '0', '100', '3', '--reuse-vehicles'],
+    ['sweep', '0', '100', '3', '--same-region'],
+    ['scenarios', 'cenarios.json', '--by-region'],
+    ['repair', 'escala.csv'],
+    ['--reuse-vehicles', '--engine', 'flow'],
+    ['--sweep', '0', '100', '3'],
+    ['--serve', '8000'],
+])
+def test_combinacoes_invalidas_sao_recusadas_antes_de_carregar_os_dados(argumentos, monkeypatch, tmp_path):
+    """
+    Testa se as combinações de opções não suportadas encerram com erro de uso, sem ler os dados.
+    """
+    monkeypatch.chdir(tmp_path)  # Sem data/: carregar os dados falharia com outro erro
+    with pytest.raises(SystemExit) as saida:
+        main.main(argumentos)
+    assert saida.value.code == 2
+
+
+@pytest.mark.parametrize('argumentos', [[], ['--engine', 'numpy', '--workers', '2', '--profile']])
+def test_sem_subcomando_executa_schedule(argumentos, monkeypatch):
+    """
+    Testa se, sem subcomando, as opções da linha de comando antiga são as do subcomando schedule.
+    """
+    chamadas = []
+    monkeypatch.setattr(main, '_comando_agendar', lambda args, parser: chamadas.append(args))
+
+    assert main.main(argumentos) == 0
+
+    assert len(chamadas) == 1
+    assert chamadas[0].comando == 'schedule'
+    assert chamadas[0].engine == ('numpy' if argumentos else 'python')
+    assert chamadas[0].workers == (2 if argumentos else 1)
+    assert chamadas[0].profile == bool(argumentos)
+
+
+def test_ajuda_nao_importa_os_motores():
+    """
+    Testa se montar a linha de comando não importa os motores nem o pandas.
+    """
+    codigo = ("import sys, main; main._criar_parser(); "
+              "print(sorted(m for m in ('pandas', 'numpy', 'models') if m in sys.modules))")
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=Path(main.__file__).parent, capture_output=True, text=True,
+                           check=True)
+    assert saida.stdout.strip() == '[]'
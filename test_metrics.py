@@ -0,0 +1,73 @@
+"""Testes unitários para o módulo services/metrics.py."""
+from __future__ import annotations
+
+import pytest
+from models.scheduler import create_schedule
+from services.metrics import LatencyWindow, RunMetrics
+
+PODAS = ('podados_indisponivel', 'podados_indice', 'podados_jornada', 'podados_conflito', 'podados_alcance')
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_metricas_nao_alteram_a_escala_e_sao_consistentes(seed, instancia_aleatoria):
+    """
+    Testa se a escala é a mesma com e sem métricas e se os contadores fecham com o histograma.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed)
+    escala_sem = create_schedule(motoristas, veiculos, linhas)
+    metrics = RunMetrics()
+    escala_com = create_schedule(motoristas, veiculos, linhas, metrics=metrics)
+
+    assert escala_com == escala_sem
+    contadores = metrics.contadores
+    assert contadores['scheduler.linhas'] == len(linhas)
+    assert contadores['scheduler.linhas_alocadas'] == len(escala_com)
+    # Cada linha com veículo disponível entra no histograma exatamente uma vez
+    assert sum(metrics.candidatos_por_linha.values()) == len(linhas) - contadores['scheduler.linhas_sem_veiculo']
+    avaliados = sum(n * k for n, k in metrics.candidatos_por_linha.items())
+    assert avaliados == contadores['scheduler.candidatos'] - contadores['scheduler.podados_indisponivel'] \
+        - contadores['scheduler.podados_indice']
+    assert sum(contadores[f'scheduler.{p}'] for p in PODAS) <= contadores['scheduler.candidatos']
+    assert sum(linhas for _, linhas in metrics.histogram()) == sum(metrics.candidatos_por_linha.values())
+    assert {'scheduler.indices', 'scheduler.laco', 'scheduler.distancias'} <= set(metrics.tempos)
+
+
+def test_motor_numpy_reporta_as_mesmas_contagens(instancia_aleatoria):
+    """
+    Testa se o motor vetorizado conta candidatos e podas como o motor original.
+
+    O motor original poda pelo índice espacial parte dos motoristas que o
+    vetorizado rejeita por jornada, conflito ou alcance; o total é o mesmo.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(3, n_linhas=80)
+    metricas_python, metricas_numpy = RunMetrics(), RunMetrics()
+    create_schedule(motoristas, veiculos, linhas, metrics=metricas_python)
+    create_schedule(motoristas, veiculos, linhas, engine='numpy', metrics=metricas_numpy)
+
+    python, numpy_ = metricas_python.contadores, metricas_numpy.contadores
+    for nome in ('candidatos', 'linhas', 'linhas_alocadas', 'podados_habilidade', 'podados_indisponivel'):
+        assert python[f'scheduler.{nome}'] == numpy_[f'scheduler.{nome}']
+    assert sum(python[f'scheduler.{p}'] for p in PODAS) == sum(numpy_[f'scheduler.{p}'] for p in PODAS)
+    assert python['scheduler.podados_indice'] > 0
+
+    combinada = RunMetrics().merge(metricas_python).merge(metricas_numpy)
+    assert combinada.contadores['scheduler.linhas'] == 2 * len(linhas)
+    assert 'Candidatos avaliados por linha' in combinada.report()
+
+
+def test_janela_de_latencias_limita_amostras_e_calcula_percentis():
+    """
+    Testa os percentis pelo posto mais próximo e o descarte das amostras mais antigas.
+    """
+    assert LatencyWindow().summary() == {'decisoes': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    with pytest.raises(ValueError):
+        LatencyWindow(0)
+
+    latencias = LatencyWindow(tamanho=100)
+    for ms in range(1, 201):
+        latencias.record(ms / 1000)
+
+    assert latencias.percentile(50) == pytest.approx(0.150)
+    assert latencias.percentile(99) == pytest.approx(0.199)
+    assert latencias.percentile(0) == pytest.approx(0.101)
+    assert latencias.summary() == {'decisoes': 200, 'p50_ms': 150.0, 'p99_ms': 199.0, 'max_ms': 200.0}
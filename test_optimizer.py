@@ -0,0 +1,44 @@
+"""Testes unitários para o módulo models/optimizer.py."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from models.optimizer import calculate_distance, calculate_distance_points, calculate_distances, parse_point
+from services.data_loader import preprocess_data
+
+
+def test_distancia_por_string_igual_a_distancia_por_pontos():
+    """
+    Testa se a API de strings continua equivalente à API de pontos convertidos.
+    """
+    assert calculate_distance('0,0', '3,4') == pytest.approx(5.0)
+    assert calculate_distance('-23.55,-46.63', '-23.60,-46.65') == \
+        calculate_distance_points(parse_point('-23.55,-46.63'), parse_point('-23.60,-46.65'))
+
+
+def test_distancias_vetorizadas_iguais_as_escalares():
+    """
+    Testa se o cálculo em lote produz as mesmas distâncias do cálculo ponto a ponto.
+    """
+    pontos = np.array([[0.0, 0.0], [3.0, 4.0], [-23.55, -46.63]])
+    destino = (1.0, 1.0)
+
+    distancias = calculate_distances(pontos, destino)
+
+    esperado = [calculate_distance_points(tuple(p), destino) for p in pontos]
+    assert distancias.tolist() == pytest.approx(esperado)
+
+
+def test_preprocessamento_converte_coordenadas_uma_vez():
+    """
+    Testa se o pré-processamento adiciona as colunas de latitude e longitude já convertidas.
+    """
+    motoristas = pd.DataFrame([{'nome': 'A', 'localizacao': '-23.55,-46.63', 'habilidades': 'simples'}])
+    linhas = pd.DataFrame([{'id': 1, 'origem': '1,2', 'destino': '3,4', 'horario_inicio': '08:00', 'duracao_minutos': 30}])
+
+    motoristas, _, linhas = preprocess_data(motoristas, pd.DataFrame(), linhas)
+
+    assert motoristas.loc[0, 'localizacao_lat'] == -23.55
+    assert motoristas.loc[0, 'localizacao_lon'] == -46.63
+    assert linhas.loc[0, ['origem_lat', 'origem_lon', 'destino_lat', 'destino_lon']].tolist() == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,103 @@
+"""Testes unitários para o módulo models/repair.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models.decomposition import repair_conflicts
+from models.repair import parse_disruptions, repair_schedule, schedule_from_frame
+from models.scheduler import create_schedule
+from services.data_loader import preprocess_data
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_saida_de_motorista_altera_so_as_linhas_afetadas_e_vizinhanca(seed, instancia_aleatoria):
+    """
+    Testa se, após a saída de um motorista, só linhas afetadas ou da vizinhança mudam e a escala segue viável.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_motoristas=40, n_veiculos=80, n_linhas=120)
+    escala = create_schedule(motoristas, veiculos, linhas)
+    contagem = pd.Series([info['motorista'] for info in escala.values()]).value_counts()
+    motorista = contagem.index[0]
+
+    resultado = repair_schedule(escala, motoristas, veiculos, linhas, [{'motorista': motorista, 'horario': '10:00'}],
+                                max_vizinhanca=5)
+
+    inicio = linhas.set_index('id')['horario_inicio_min']
+    assert resultado.afetadas == sorted(
+        (l for l, info in escala.items() if info['motorista'] == motorista and inicio[l] >= 600),
+        key=lambda l: (inicio[l], str(l)))
+    assert len(set(resultado.alteradas) - set(resultado.afetadas)) <= 5
+    for linha_id, info in escala.items():
+        if linha_id not in resultado.alteradas:
+            assert resultado.escala[linha_id] == info
+    assert all(info['motorista'] != motorista or inicio[l] < 600 for l, info in resultado.escala.items())
+    # Linhas que perderam só o motorista mantêm o veículo
+    assert all(resultado.escala[l]['veiculo'] == escala[l]['veiculo'] for l in resultado.afetadas if l in resultado.escala)
+    assert set(resultado.sem_alocacao) == set(escala) - set(resultado.escala)
+    assert repair_conflicts(dict(resultado.escala), motoristas, linhas) == []
+    veiculos_usados = [info['veiculo'] for info in resultado.escala.values()]
+    assert len(veiculos_usados) == len(set(veiculos_usados))
+
+
+def test_saida_de_veiculo_mantem_o_motorista(instancia_aleatoria):
+    """
+    Testa se a linha que perdeu o veículo fica com o mesmo motorista e o veículo livre mais econômico.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(4, n_veiculos=80)
+    escala = create_schedule(motoristas, veiculos, linhas)
+    linha_id, info = next(iter(escala.items()))
+
+    resultado = repair_schedule(escala, motoristas, veiculos, linhas, [{'veiculo': info['veiculo']}])
+
+    assert resultado.afetadas == resultado.alteradas == [linha_id]
+    assert resultado.escala[linha_id]['motorista'] == info['motorista']
+    assert resultado.escala[linha_id]['veiculo'] not in {i['veiculo'] for i in escala.values()}
+
+
+def test_vizinhanca_libera_motorista_para_a_linha_afetada():
+    """
+    Testa se uma linha que nenhum motorista livre alcança é coberta trocando uma linha vizinha de motorista.
+    """
+    motoristas = pd.DataFrame([
+        {'nome': 'Ana', 'localizacao': '0,0', 'habilidades': 'simples'},
+        {'nome': 'Bia', 'localizacao': '0,0', 'habilidades': 'simples'},
+        {'nome': 'Caio', 'localizacao': '0,20', 'habilidades': 'simples'},
+    ])
+    veiculos = pd.DataFrame([{'numero_carro': n, 'tipo': 'simples', 'consumo_km_l': 3} for n in (1, 2, 3)])
+    linhas = pd.DataFrame([
+        {'id': 'Z', 'origem': '0,20', 'destino': '0,20', 'horario_inicio': '08:00', 'duracao_minutos': 110, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 'X', 'origem': '0,0', 'destino': '0,0', 'horario_inicio': '10:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 'Y', 'origem': '0,20', 'destino': '0,20', 'horario_inicio': '10:00', 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+    ])
+    motoristas, veiculos, linhas = preprocess_data(motoristas, veiculos, linhas)
+    escala = {'Z': {'motorista': 'Caio', 'veiculo': 3, 'horario': '08:00'},
+              'X': {'motorista': 'Bia', 'veiculo': 1, 'horario': '10:00'},
+              'Y': {'motorista': 'Ana', 'veiculo': 2, 'horario': '10:00'}}
+    disrupcao = [{'motorista': 'Bia', 'horario': '09:00'}]
+
+    sem_vizinhanca = repair_schedule(escala, motoristas, veiculos, linhas, disrupcao, max_vizinhanca=0)
+    assert sem_vizinhanca.sem_alocacao == ['X']
+
+    resultado = repair_schedule(escala, motoristas, veiculos, linhas, disrupcao)
+    assert resultado.sem_alocacao == []
+    assert resultado.escala['X']['motorista'] == 'Ana'
+    assert resultado.escala['Y']['motorista'] == 'Caio'
+    assert resultado.escala['Z'] == escala['Z']
+    assert sorted(resultado.alteradas) == ['X', 'Y']
+
+
+def test_disrupcoes_e_leitura_da_escala():
+    """
+    Testa a validação das disrupções e a leitura da escala salva em CSV.
+    """
+    assert parse_disruptions([{'motorista': 'Ana', 'horario': '10:30'}, {'motorista': 'Ana', 'horario': '09:00'},
+                              {'veiculo': 7.0, 'motorista': float('nan')}]) == ({'Ana': 540}, {7: 0})
+    with pytest.raises(ValueError):
+        parse_disruptions([{'horario': '10:00'}])
+    with pytest.raises(ValueError):
+        parse_disruptions([{'motorista': 'Ana', 'horario': 'meio-dia'}])
+
+    df = pd.DataFrame([{'Linha_ID': 1, 'Horario': '08:00', 'Motorista_Alocado': 'Ana', 'Veiculo_Alocado': '12'},
+                       {'Linha_ID': 2, 'Horario': '09:00', 'Motorista_Alocado': 'Bia', 'Veiculo_Alocado': 'Nao Alocado'}])
+    assert schedule_from_frame(df) == {1: {'motorista': 'Ana', 'veiculo': 12, 'horario': '08:00'},
+                                       2: {'motorista': 'Bia', 'veiculo': None, 'horario': '09:00'}}
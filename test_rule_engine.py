@@ -0,0 +1,140 @@
+"""Testes unitários para o motor de restrições de services/rule_engine.py."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from models.dispatch import CAMPOS_LINHA, DispatchEngine
+from models.scheduler import create_schedule
+from services.rule_engine import ConstraintEngine, DriverState, LineContext, MinimumRestRule, RegionRule, Rule
+
+
+class _RegraContada(Rule):
+    """Regra de teste que aprova os candidatos de uma máscara fixa e conta as avaliações."""
+
+    def __init__(self, nome, custo, aprovados):
+        self.nome = nome
+        self.custo = custo
+        self.aprovados = np.asarray(aprovados)
+        self.avaliacoes = 0
+
+    def mask(self, contexto, posicoes):
+        self.avaliacoes += 1
+        return self.aprovados[posicoes]
+
+
+def _contexto(n):
+    estado = DriverState(np.arange(n), np.full(n, 600.0), np.zeros((n, 2)), n, 1)
+    linha = {'horario_inicio_min': 480, 'horario_fim_min': 540, 'duracao_minutos': 60}
+    return LineContext(linha, (0.0, 0.0), np.arange(n), estado)
+
+
+def test_regras_em_ordem_de_custo_com_parada_antecipada():
+    """
+    Testa se as regras são avaliadas da mais barata para a mais cara e param quando não resta candidato.
+    """
+    cara = _RegraContada('cara', 5.0, [True, False, True, True])
+    barata = _RegraContada('barata', 1.0, [True, True, False, True])
+    motor = ConstraintEngine([cara, barata], contar=True)
+
+    assert motor.regras == [barata, cara]
+    assert motor.feasible(_contexto(4)).tolist() == [0, 3]
+    assert motor.podados == {'barata': 1, 'cara': 1}
+
+    nenhum = _RegraContada('nenhum', 0.0, [False] * 4)
+    motor = ConstraintEngine([cara, barata, nenhum])
+    assert motor.feasible(_contexto(4)).size == 0
+    assert (nenhum.avaliacoes, barata.avaliacoes, cara.avaliacoes) == (1, 1, 1)
+
+
+def _instancia_com_regioes(instancia_aleatoria, seed, n_linhas):
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_motoristas=40, n_veiculos=60, n_linhas=n_linhas)
+    motoristas['regiao'] = ['norte' if i % 2 else 'sul' for i in range(len(motoristas))]
+    linhas['regiao'] = [('norte', 'sul', None)[i % 3] for i in range(len(linhas))]
+    return motoristas, veiculos, linhas
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_descanso_minimo_entre_viagens(engine, instancia_aleatoria):
+    """
+    Testa se, com MinimumRestRule, nenhum motorista tem duas viagens separadas por menos que o descanso.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(3, n_motoristas=40, n_veiculos=60, n_linhas=120)
+
+    def menor_intervalo(agendados):
+        intervalos = [b[0] - a[1] for agenda in agendados.values() for a, b in zip(list(agenda), list(agenda)[1:])]
+        return min(intervalos)
+
+    livres = {}
+    create_schedule(motoristas, veiculos, linhas, livres, 50, engine=engine)
+    com_descanso = {}
+    escala = create_schedule(motoristas, veiculos, linhas, com_descanso, 50, engine=engine,
+                             extra_rules=[MinimumRestRule(90)])
+
+    assert menor_intervalo(livres) < 90
+    assert menor_intervalo(com_descanso) >= 90
+    assert escala
+    with pytest.raises(ValueError):
+        MinimumRestRule(-1)
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_restricao_de_regiao(engine, instancia_aleatoria):
+    """
+    Testa se, com RegionRule, as linhas com região só recebem motoristas da mesma região.
+    """
+    motoristas, veiculos, linhas = _instancia_com_regioes(instancia_aleatoria, 4, 80)
+    regiao_motorista = dict(zip(motoristas['nome'], motoristas['regiao']))
+
+    escala = create_schedule(motoristas, veiculos, linhas, {}, 50, engine=engine, extra_rules=[RegionRule()])
+
+    regiao_linha = dict(zip(linhas['id'], linhas['regiao']))
+    com_regiao = [linha_id for linha_id in escala if regiao_linha[linha_id] is not None]
+    assert com_regiao and len(com_regiao) < len(escala)
+    assert all(regiao_motorista[escala[linha_id]['motorista']] == regiao_linha[linha_id] for linha_id in com_regiao)
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy', 'flow'])
+def test_jornada_ausente_descarta_o_motorista(engine, instancia_aleatoria):
+    """
+    Testa se um motorista sem jornada máxima (NaN) não recebe linhas, em vez de ter a jornada ilimitada.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(5, n_veiculos=60)
+    usados = sorted({info['motorista'] for info in create_schedule(motoristas, veiculos, linhas, {}, 50).values()})[:3]
+    motoristas.loc[motoristas['nome'].isin(usados), 'jornada_maxima_horas'] = np.nan
+
+    escala = create_schedule(motoristas, veiculos, linhas, {}, 50, engine=engine)
+
+    assert escala
+    assert not {info['motorista'] for info in escala.values()} & set(usados)
+
+
+def test_despacho_aplica_as_regras_adicionais(instancia_aleatoria):
+    """
+    Testa se o despacho em ordem de horário, com descanso mínimo e região, reproduz o motor 'python' com as mesmas regras.
+    """
+    motoristas, veiculos, linhas = _instancia_com_regioes(instancia_aleatoria, 5, 120)
+    regras = [MinimumRestRule(60), RegionRule()]
+    engine = DispatchEngine(motoristas, veiculos, new_driver_penalty=50, extra_rules=regras)
+
+    for linha in linhas.sort_values(by='horario_inicio_min', kind='stable').to_dict('records'):
+        engine.add_line({campo: linha[campo] for campo in (*CAMPOS_LINHA, 'regiao')})
+
+    assert engine.escala == create_schedule(motoristas, veiculos, linhas, {}, 50, extra_rules=regras)
+    assert engine.escala != create_schedule(motoristas, veiculos, linhas, {}, 50)
+
+
+def test_regras_adicionais_exigem_um_motor_que_as_avalie(instancia_aleatoria):
+    """
+    Testa se as regras adicionais são recusadas pelos motores e regras que não as avaliam.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0)
+    for parametros in ({'engine': 'flow'}, {'engine': 'python', 'improve_seconds': 1.0},
+                       {'engine': 'numpy', 'improve_seconds': 1.0}):
+        with pytest.raises(ValueError):
+            create_schedule(motoristas, veiculos, linhas, {}, extra_rules=[RegionRule()], **parametros)
+    # Uma regra só com a forma vetorizada não é aceita pelos motores escalares
+    so_mascara = _RegraContada('mascara', 1.0, [True] * len(motoristas))
+    with pytest.raises(ValueError):
+        create_schedule(motoristas, veiculos, linhas, {}, engine='python', extra_rules=[so_mascara])
+    with pytest.raises(ValueError):
+        DispatchEngine(motoristas, veiculos, extra_rules=[so_mascara])
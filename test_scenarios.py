@@ -0,0 +1,134 @@
+"""Testes unitários para o módulo services/scenarios.py."""
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from models.scheduler import create_schedule
+from services.exceptions_handler import apply_manual_assignments
+from services.scenarios import COLUNAS_CENARIOS, Scenario, load_scenarios, overlay_availability, run_scenarios
+
+
+def _excecoes(motoristas, veiculos, linhas, quantidade):
+    """Exceções válidas para as primeiras linhas: motorista habilitado e veículo do tipo, disponíveis e sem repetição."""
+    excecoes = []
+    motoristas_livres = motoristas[motoristas['disponibilidade'] == 'disponivel'].to_dict('records')
+    veiculos_livres = veiculos[veiculos['disponibilidade'] == 'disponivel'].to_dict('records')
+    for linha in linhas.head(quantidade).to_dict('records'):
+        tipo = linha['tipo_veiculo_necessario']
+        motorista = next(m for m in motoristas_livres if tipo in m['habilidades'])
+        veiculo = next(v for v in veiculos_livres if v['tipo'] == tipo)
+        motoristas_livres.remove(motorista)
+        veiculos_livres.remove(veiculo)
+        excecoes.append({'linha': linha['id'], 'motorista': motorista['nome'], 'veiculo': veiculo['numero_carro']})
+    return excecoes
+
+
+def test_sobreposicao_nao_copia_nem_altera_a_base(instancia_aleatoria):
+    """
+    Testa se a sobreposição só troca a disponibilidade, compartilhando as demais colunas com a base.
+    """
+    motoristas, _, _ = instancia_aleatoria(0)
+    disponibilidade = motoristas['disponibilidade'].tolist()
+    nomes = motoristas['nome'].tolist()[1:3]
+
+    sobreposto = overlay_availability(motoristas, 'nome', nomes, 'indisponivel')
+
+    assert overlay_availability(motoristas, 'nome', [], 'indisponivel') is motoristas
+    assert motoristas['disponibilidade'].tolist() == disponibilidade
+    assert sobreposto.loc[sobreposto['nome'].isin(nomes), 'disponibilidade'].eq('indisponivel').all()
+    assert (sobreposto['disponibilidade'] != motoristas['disponibilidade']).sum() <= 2
+    assert np.shares_memory(sobreposto['localizacao_lat'].to_numpy(), motoristas['localizacao_lat'].to_numpy())
+    with pytest.raises(ValueError):
+        overlay_availability(motoristas, 'nome', ['inexistente'], 'indisponivel')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cenarios_comparados_lado_a_lado(workers, instancia_aleatoria):
+    """
+    Testa se cada cenário equivale a uma execução completa com a sobreposição aplicada aos dados.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(1)
+    excecoes = _excecoes(motoristas, veiculos, linhas, 1)
+    fixo = excecoes[0]['motorista']
+    manutencao = tuple(veiculos['numero_carro'].tolist()[-2:])
+
+    def execucao_completa(motoristas, veiculos, excecoes):
+        escala_manual, m, v, l, agendados, _ = apply_manual_assignments(motoristas, veiculos, linhas, excecoes)
+        return {**escala_manual, **create_schedule(m, v, l, agendados, 500.0)}
+
+    base = execucao_completa(motoristas, veiculos, excecoes)
+    usados = sorted({info['motorista'] for info in base.values()} - {fixo})[:2]
+    cenarios = [
+        Scenario('base'),
+        Scenario('sem_excecoes', excecoes=[]),
+        Scenario('desfalque', motoristas_indisponiveis=tuple(usados), veiculos_manutencao=manutencao),
+    ]
+
+    comparacao, escalas = run_scenarios(motoristas, veiculos, linhas, cenarios, excecoes, 500.0, workers=workers)
+
+    assert list(comparacao.columns) == list(COLUNAS_CENARIOS)
+    assert comparacao['cenario'].tolist() == ['base', 'sem_excecoes', 'desfalque']
+    assert escalas['base'] == base
+    assert escalas['sem_excecoes'] == execucao_completa(motoristas, veiculos, [])
+    motoristas_desfalque = motoristas.copy()
+    motoristas_desfalque.loc[motoristas['nome'].isin(usados), 'disponibilidade'] = 'indisponivel'
+    veiculos_desfalque = veiculos.copy()
+    veiculos_desfalque.loc[veiculos['numero_carro'].isin(manutencao), 'disponibilidade'] = 'manutencao'
+    desfalque = escalas['desfalque']
+    assert desfalque == execucao_completa(motoristas_desfalque, veiculos_desfalque, excecoes)
+    assert not {info['motorista'] for info in desfalque.values()} & set(usados)
+
+    linha = comparacao.set_index('cenario').loc['desfalque']
+    assert linha['linhas_alocadas'] + linha['linhas_sem_alocacao'] == len(linhas)
+    assert linha['motoristas'] == len({info['motorista'] for info in desfalque.values()})
+    # A base não é alterada pelos cenários
+    assert motoristas.loc[motoristas['nome'].isin(usados), 'disponibilidade'].eq('disponivel').all()
+    with pytest.raises(ValueError):
+        run_scenarios(motoristas, veiculos, linhas, [Scenario('a'), Scenario('a')])
+
+
+def test_excecoes_de_recursos_fora_de_operacao_sao_descartadas(instancia_aleatoria):
+    """
+    Testa se as exceções com motorista ou veículo tirado de operação pelo cenário voltam ao otimizador como conflitos.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(2)
+    excecoes = _excecoes(motoristas, veiculos, linhas, 3)
+    motorista, veiculo, linha_mantida = excecoes[0]['motorista'], excecoes[1]['veiculo'], excecoes[2]['linha']
+    cenarios = [Scenario('base'),
+                Scenario('desfalque', motoristas_indisponiveis=(motorista,), veiculos_manutencao=(veiculo,))]
+
+    comparacao, escalas = run_scenarios(motoristas, veiculos, linhas, cenarios, excecoes, 500.0, workers=1)
+
+    motoristas_cenario = overlay_availability(motoristas, 'nome', [motorista], 'indisponivel')
+    veiculos_cenario = overlay_availability(veiculos, 'numero_carro', [veiculo], 'manutencao')
+    escala_manual, m, v, l, agendados, conflitos = apply_manual_assignments(
+        motoristas_cenario, veiculos_cenario, linhas, excecoes[2:])
+    assert escalas['desfalque'] == {**escala_manual, **create_schedule(m, v, l, agendados, 500.0)}
+    assert motorista not in {info['motorista'] for info in escalas['desfalque'].values()}
+    assert veiculo not in {info['veiculo'] for info in escalas['desfalque'].values()}
+    assert escalas['desfalque'][linha_mantida] == escalas['base'][linha_mantida]
+    assert comparacao.set_index('cenario').loc['desfalque', 'conflitos'] == len(conflitos) + 2
+
+
+def test_arquivo_de_cenarios(tmp_path):
+    """
+    Testa a leitura do arquivo de cenários, com exceções em um CSV relativo ao arquivo.
+    """
+    pd.DataFrame([{'linha': 'L1', 'motorista': 'M2', 'veiculo': 103}]).to_csv(tmp_path / 'feriado.csv', index=False)
+    (tmp_path / 'cenarios.json').write_text(json.dumps([
+        {'nome': 'sem M7', 'motoristas_indisponiveis': ['M7']},
+        {'nome': 'feriado', 'excecoes': 'feriado.csv', 'veiculos_manutencao': [104]},
+    ]))
+
+    cenarios = load_scenarios(str(tmp_path / 'cenarios.json'))
+
+    assert cenarios == [
+        Scenario('sem M7', motoristas_indisponiveis=('M7',)),
+        Scenario('feriado', excecoes=[{'linha': 'L1', 'motorista': 'M2', 'veiculo': 103}], veiculos_manutencao=(104,)),
+    ]
+    (tmp_path / 'invalido.json').write_text(json.dumps([{'nome': 'x', 'penalidade': 1}]))
+    with pytest.raises(ValueError):
+        load_scenarios(str(tmp_path / 'invalido.json'))
@@ -22,8 +22,8 @@ def base_data() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         {'numero_carro': 102, 'tipo': 'simples', 'disponibilidade': 'disponivel', 'consumo_km_l': 10},
     ])
     linhas = pd.DataFrame([
-        {'id': 'L1', 'origem': '0,0', 'destino': '5,5', 'horario_inicio': '08:00', 'horario_inicio_dt': time(8, 0), 'horario_fim_dt': time(9, 0), 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
-        {'id': 'L2', 'origem': '10,10', 'destino': '15,15', 'horario_inicio': '10:00', 'horario_inicio_dt': time(10, 0), 'horario_fim_dt': time(11, 0), 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 'L1', 'origem': '0,0', 'destino': '5,5', 'horario_inicio': '08:00', 'horario_inicio_min': 480, 'horario_fim_min': 540, 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+        {'id': 'L2', 'origem': '10,10', 'destino': '15,15', 'horario_inicio': '10:00', 'horario_inicio_min': 600, 'horario_fim_min': 660, 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
     ])
     return motoristas, veiculos, linhas
 
@@ -81,8 +81,8 @@ def test_nao_atribui_se_houver_conflito_de_horario(base_data, mocker):
     # Cria duas linhas com horários conflitantes
     linhas_conflitantes = linhas.copy()
     # Ajusta L2 para começar enquanto L1 está em andamento
-    linhas_conflitantes.loc[1, 'horario_inicio_dt'] = time(8, 30)
-    linhas_conflitantes.loc[1, 'horario_fim_dt'] = time(9, 30)
+    linhas_conflitantes.loc[1, 'horario_inicio_min'] = 510  # 08:30
+    linhas_conflitantes.loc[1, 'horario_fim_min'] = 570  # 09:30
 
     # REMOVIDO: validate_assignment não é mais usado
     mocker.patch('models.scheduler.calculate_travel_cost', return_value=1)
@@ -151,3 +151,128 @@ def test_aplica_penalidade_para_novo_motorista(base_data, mocker):
     # Assert
     # O sistema deve escolher o Motorista A, pois 10 (custo) < 0 (custo) + 10000 (penalidade)
     assert escala['L2']['motorista'] == 'Motorista A'
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_motor_numpy_produz_mesma_escala(seed, instancia_aleatoria):
+    """
+    Testa se o motor vetorizado produz exatamente as mesmas atribuições do motor original.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed)
+    agendados_manuais = {'M0': [(time(12, 0), time(13, 0), '3,3')]}
+
+    agendados_python = {k: list(v) for k, v in agendados_manuais.items()}
+    agendados_numpy = {k: list(v) for k, v in agendados_manuais.items()}
+    escala_python = create_schedule(motoristas, veiculos, linhas, agendados_python, new_driver_penalty=50)
+    escala_numpy = create_schedule(motoristas, veiculos, linhas, agendados_numpy, new_driver_penalty=50, engine='numpy')
+
+    assert escala_numpy == escala_python
+    assert agendados_numpy == agendados_python
+
+
+def test_motor_desconhecido_gera_erro(base_data):
+    """
+    Testa se um motor de agendamento inválido é rejeitado.
+    """
+    motoristas, veiculos, linhas = base_data
+    with pytest.raises(ValueError):
+        create_schedule(motoristas, veiculos, linhas, engine='cuda')
+
+
+def test_escolhe_veiculo_mais_economico_e_nao_reutiliza(base_data):
+    """
+    Testa se o veículo livre de menor custo por distância é escolhido e depois retirado da frota.
+    """
+    motoristas, veiculos, linhas = base_data
+    veiculos.loc[veiculos['numero_carro'] == 102, 'consumo_km_l'] = 20  # Mais econômico
+
+    escala = create_schedule(motoristas, veiculos, linhas)
+
+    assert escala['L1']['veiculo'] == 102
+    assert escala['L2']['veiculo'] == 101
+
+
+def test_reaproveita_veiculo_entre_viagens_que_nao_se_sobrepoem(base_data):
+    """
+    Testa se, com reuse_vehicles, o veículo volta a servir quando chega à origem a tempo, e só então.
+    """
+    motoristas, veiculos, linhas = base_data
+    veiculos = veiculos.iloc[:1]  # Só o veículo 101
+    linhas = pd.concat([linhas, pd.DataFrame([
+        # Sobreposta a L2: o único veículo está ocupado
+        {'id': 'L3', 'origem': '10,10', 'destino': '0,0', 'horario_inicio': '10:30', 'horario_inicio_min': 630,
+         'horario_fim_min': 690, 'duracao_minutos': 60, 'tipo_veiculo_necessario': 'simples'},
+    ])], ignore_index=True)
+
+    assert len(create_schedule(motoristas, veiculos, linhas)) == 1
+    veiculos_agendados = {}
+    escala = create_schedule(motoristas, veiculos, linhas, reuse_vehicles=True, veiculos_agendados=veiculos_agendados)
+
+    # L1 termina às 9h em (5,5); L2 começa às 10h em (10,10), a ~7 unidades de distância
+    assert escala['L1']['veiculo'] == escala['L2']['veiculo'] == 101
+    assert 'L3' not in escala
+    assert list(veiculos_agendados[101]) == [(480, 540, '5,5'), (600, 660, '15,15')]
+    with pytest.raises(ValueError):
+        create_schedule(motoristas, veiculos, linhas, engine='flow', reuse_vehicles=True)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_reaproveitamento_igual_nos_motores_e_sem_sobreposicao(seed, instancia_aleatoria):
+    """
+    Testa se os motores 'python' e 'numpy' reaproveitam os veículos da mesma forma, respeitando as agendas manuais.
+    """
+    from models.optimizer import calculate_distance, calculate_travel_minutes
+    from models.timeline import DriverTimeline
+
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_veiculos=6, n_linhas=80)
+    numero_manual = veiculos['numero_carro'].iloc[0]
+    escalas, agendas = {}, {}
+    for engine in ('python', 'numpy'):
+        agendas[engine] = {numero_manual: DriverTimeline([(600, 700, '3,3')])}
+        escalas[engine] = create_schedule(motoristas, veiculos, linhas, engine=engine, reuse_vehicles=True,
+                                          veiculos_agendados=agendas[engine])
+
+    assert escalas['numpy'] == escalas['python']
+    assert agendas['numpy'] == agendas['python']
+    assert len(escalas['python']) > len(create_schedule(motoristas, veiculos, linhas))
+    for agenda in agendas['python'].values():
+        viagens = list(agenda)
+        assert all(fim <= inicio for (_, fim, _), (inicio, _, _) in zip(viagens, viagens[1:]))
+    # Cada viagem seguinte começa depois de o veículo chegar à sua origem
+    por_id = linhas.set_index('id')
+    for numero in agendas['python']:
+        ids = sorted((l for l, info in escalas['python'].items() if info['veiculo'] == numero),
+                     key=lambda l: por_id.loc[l, 'horario_inicio_min'])
+        for anterior, seguinte in zip(ids, ids[1:]):
+            chegada = por_id.loc[anterior, 'horario_fim_min'] + calculate_travel_minutes(
+                calculate_distance(por_id.loc[anterior, 'destino'], por_id.loc[seguinte, 'origem']))
+            assert chegada <= por_id.loc[seguinte, 'horario_inicio_min'] + 1e-9
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy', 'flow'])
+def test_respeita_disponibilidade_a_partir_de_um_horario(engine, instancia_aleatoria):
+    """
+    Testa se nenhum motorista sai de casa antes de 'disponivel_a_partir_min', em todos os motores.
+    """
+    from models.optimizer import calculate_distance, calculate_travel_minutes
+
+    motoristas, veiculos, linhas = instancia_aleatoria(7, n_linhas=80)
+    motoristas['disponivel_a_partir_min'] = [(i % 4) * 240 for i in range(len(motoristas))]
+
+    escala = create_schedule(motoristas, veiculos, linhas, new_driver_penalty=50, engine=engine)
+    referencia = create_schedule(motoristas, veiculos, linhas, new_driver_penalty=50)
+
+    inicio = dict(zip(linhas['id'], linhas['horario_inicio_min']))
+    origem = dict(zip(linhas['id'], linhas['origem']))
+    motorista = motoristas.set_index('nome')
+    primeira: dict = {}
+    for linha_id, info in escala.items():
+        if info['motorista'] not in primeira or inicio[linha_id] < inicio[primeira[info['motorista']]]:
+            primeira[info['motorista']] = linha_id
+    for nome, linha_id in primeira.items():
+        casa = motorista.loc[nome, 'localizacao']
+        saida = motorista.loc[nome, 'disponivel_a_partir_min']
+        assert saida + calculate_travel_minutes(calculate_distance(casa, origem[linha_id])) <= inicio[linha_id]
+    assert any(motorista.loc[info['motorista'], 'disponivel_a_partir_min'] > 0 for info in escala.values())
+    if engine == 'numpy':
+        assert escala == referencia
@@ -0,0 +1,191 @@
+"""Testes unitários para o módulo services/server.py."""
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+from models.optimizer import NEW_DRIVER_PENALTY
+from models.scheduler import create_schedule
+from services.jobs import CONCLUIDA, FALHOU
+from services.server import PoolRestarted, QueueFull, SchedulingService, make_server, run_pipeline
+
+
+@pytest.fixture
+def novo_pedido(instancia_aleatoria):
+    """Fábrica de pedidos com as tabelas de uma instância aleatória, nas colunas dos CSVs de entrada."""
+    def montar(seed=0, **parametros):
+        tabelas = {}
+        for nome, df in zip(('motoristas', 'veiculos', 'linhas'), instancia_aleatoria(seed)):
+            colunas = [c for c in df.columns if not c.endswith(('_lat', '_lon', '_min'))]
+            tabelas[nome] = json.loads(df[colunas].to_json(orient='records'))
+        return {**tabelas, 'excecoes': [], 'parametros': parametros}
+    return montar
+
+
+def test_pipeline_reproduz_a_escala_do_agendador(instancia_aleatoria, novo_pedido):
+    """
+    Testa se o pipeline do serviço gera a mesma escala que o agendador sobre os mesmos dados.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0)
+    esperada = create_schedule(motoristas, veiculos, linhas, {}, 500.0)
+
+    resultado = run_pipeline(novo_pedido(0, penalidade=500.0))
+
+    obtida = {linha['Linha_ID']: (linha['Motorista_Alocado'], linha['Veiculo_Alocado']) for linha in resultado['escala']}
+    assert obtida == {linha_id: (info['motorista'], info['veiculo']) for linha_id, info in esperada.items()}
+    assert resultado['linhas_sem_alocacao'] == len(linhas) - len(esperada)
+    with pytest.raises(ValueError):
+        run_pipeline(novo_pedido(0, motor='inexistente'))
+
+
+def test_servico_deduplica_pedidos_e_limita_a_fila(novo_pedido):
+    """
+    Testa a deduplicação pelo hash do pedido (na fila e depois de concluído) e a recusa com a fila cheia.
+    """
+    servico = SchedulingService(workers=1, max_fila=1)
+    try:
+        pedido = novo_pedido(0, busca_local_segundos=0.3)
+        job, deduplicado = servico.submit(pedido)
+        assert not deduplicado
+        assert servico.submit(json.loads(json.dumps(pedido))) == (job, True)
+        with pytest.raises(QueueFull):
+            servico.submit(novo_pedido(1))
+
+        assert servico.wait(job, timeout=30)['status'] == CONCLUIDA
+        assert servico.submit(pedido) == (job, True)
+        assert servico.executados == 1 and servico.deduplicados == 2
+        assert servico.result(job)['escala']
+
+        # Pedidos que falham no processo ficam registrados e também não são refeitos
+        invalido = novo_pedido(1)
+        invalido['linhas'] = [{'id': 1}]
+        falho, _ = servico.submit(invalido)
+        estado = servico.wait(falho, timeout=30)
+        assert estado['status'] == FALHOU and 'erro' in estado
+        assert servico.result(falho) is None
+        with pytest.raises(ValueError):
+            servico.submit({'motoristas': []})
+    finally:
+        servico.shutdown()
+
+
+def test_parametros_padrao_nao_mudam_o_pedido(novo_pedido):
+    """
+    Testa se omitir os parâmetros ou enviá-los com os valores padrão gera o mesmo pedido, executado uma vez.
+    """
+    servico = SchedulingService(workers=1)
+    try:
+        pedido = novo_pedido(6)
+        job, _ = servico.submit(pedido)
+        explicito = novo_pedido(6, penalidade=int(NEW_DRIVER_PENALTY), motor='python', reaproveitar_veiculos=False)
+        assert servico.submit(explicito) == (job, True)
+        del pedido['parametros'], pedido['excecoes']
+        assert servico.submit(pedido) == (job, True)
+        assert servico.executados == 1
+        assert servico.submit(novo_pedido(6, penalidade=500.0))[0] != job
+        with pytest.raises(ValueError):
+            servico.submit(novo_pedido(6, penalidade='alta'))
+    finally:
+        servico.shutdown()
+
+
+def _servidor_de_teste(servico):
+    """Inicia o servidor HTTP do serviço em uma thread e devolve o servidor e uma função de requisição."""
+    servidor = make_server(servico, 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+    def requisitar(caminho, corpo=None):
+        dados = None if corpo is None else json.dumps(corpo).encode('utf-8')
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base + caminho, data=dados), timeout=30) as resposta:
+                return resposta.status, json.loads(resposta.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    return servidor, requisitar
+
+
+def test_endpoints_http(novo_pedido):
+    """
+    Testa o envio, o estado e o resultado de um pedido pelos endpoints HTTP, e as respostas de erro.
+    """
+    servico = SchedulingService(workers=1)
+    servidor, requisitar = _servidor_de_teste(servico)
+    try:
+        codigo, enviado = requisitar('/jobs', novo_pedido(2, penalidade=500.0))
+        assert codigo == 202 and not enviado['deduplicado']
+        job = enviado['job']
+        servico.wait(job, timeout=30)
+
+        assert requisitar(f'/jobs/{job}') == (200, {'job': job, 'status': CONCLUIDA})
+        codigo, resultado = requisitar(f'/jobs/{job}/result')
+        assert codigo == 200 and resultado['resultado']['escala']
+        assert requisitar('/jobs', novo_pedido(2, penalidade=500.0))[1]['deduplicado']
+
+        assert requisitar('/jobs', {'motoristas': 'x'})[0] == 400
+        conexao = http.client.HTTPConnection(*servidor.server_address[:2], timeout=30)
+        conexao.putrequest('POST', '/jobs')
+        conexao.putheader('Content-Length', '-1')
+        conexao.endheaders()
+        assert conexao.getresponse().status == 400
+        conexao.close()
+        assert requisitar('/jobs/' + '0' * 64)[0] == 404
+        assert requisitar('/outra')[0] == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        servico.shutdown()
+
+
+def test_pool_quebrado_responde_503_e_e_recriado(novo_pedido):
+    """
+    Testa se, depois da morte de um processo do pool, o envio responde 503 e o pedido reenviado é atendido.
+    """
+    servico = SchedulingService(workers=1)
+    servidor, requisitar = _servidor_de_teste(servico)
+    try:
+        # Um processo do pool que morre deixa o executor quebrado
+        assert servico._executor.submit(os._exit, 1).exception(timeout=30) is not None
+        with pytest.raises(PoolRestarted):
+            servico.submit(novo_pedido(3))
+
+        servico._executor.submit(os._exit, 1).exception(timeout=30)
+        assert requisitar('/jobs', novo_pedido(3))[0] == 503
+        codigo, enviado = requisitar('/jobs', novo_pedido(3))
+        assert codigo == 202 and not enviado['deduplicado']
+        assert servico.wait(enviado['job'], timeout=30)['status'] == CONCLUIDA
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        servico.shutdown()
+
+
+def test_resultado_descartado_do_cache_responde_404(novo_pedido):
+    """
+    Testa se um pedido deduplicado cujo resultado sai do cache antes da resposta recebe 404, e não um erro interno.
+    """
+    servico = SchedulingService(workers=1, max_resultados=1)
+    servidor, requisitar = _servidor_de_teste(servico)
+    try:
+        job, _ = servico.submit(novo_pedido(4))
+        servico.wait(job, timeout=30)
+        # O estado consultado após a deduplicação já não encontra o resultado
+        servico.status = lambda job: None
+        descartado = {'erro': f"Resultado do pedido {job} descartado; reenvie o pedido."}
+        assert requisitar('/jobs', novo_pedido(4)) == (404, descartado)
+        del servico.status
+
+        outro, _ = servico.submit(novo_pedido(5))
+        servico.wait(outro, timeout=30)
+        assert requisitar(f'/jobs/{job}/result')[0] == 404
+        assert requisitar(f'/jobs/{outro}/result')[0] == 200
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        servico.shutdown()
@@ -0,0 +1,93 @@
+"""Testes unitários para o módulo services/snapshot.py."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from models.scheduler import create_schedule
+from services.data_loader import load_data, preprocess_data
+from services.snapshot import compile_snapshot, content_hash, load_preprocessed, read_snapshot, write_snapshot
+
+
+def _gravar_csvs(instancia_aleatoria, pasta, seed=0):
+    """Grava os CSVs de uma instância aleatória (antes do pré-processamento) e retorna os caminhos."""
+    motoristas, veiculos, linhas = instancia_aleatoria(seed)
+    motoristas['habilidades'] = motoristas['habilidades'].str.join(',')
+    motoristas['regiao'] = motoristas['regiao'].where(motoristas.index == 0)  # coluna de texto com valores ausentes
+    fontes = []
+    for nome, df in (('motoristas', motoristas), ('veiculos', veiculos), ('linhas', linhas)):
+        colunas = [c for c in df.columns if not c.endswith(('_lat', '_lon', '_min'))]
+        caminho = str(pasta / f'{nome}.csv')
+        df[colunas].to_csv(caminho, index=False)
+        fontes.append(caminho)
+    return fontes
+
+
+def test_snapshot_reproduz_os_dados_pre_processados(tmp_path, instancia_aleatoria):
+    """
+    Testa se o snapshot devolve os mesmos DataFrames (e a mesma escala) do caminho pelos CSVs.
+    """
+    fontes = _gravar_csvs(instancia_aleatoria, tmp_path)
+    pasta = str(tmp_path / 'snapshot')
+    esperado = preprocess_data(*(load_data(fonte) for fonte in fontes))
+
+    assert compile_snapshot(fontes, pasta) == content_hash(fontes)
+    *tabelas, do_snapshot = load_preprocessed(fontes, pasta)
+
+    assert do_snapshot
+    for obtido, referencia in zip(tabelas, esperado):
+        pd.testing.assert_frame_equal(obtido, referencia)
+    assert tabelas[0]['habilidades'].tolist() == esperado[0]['habilidades'].tolist()
+    assert tabelas[0]['regiao'].isna().sum() == len(tabelas[0]) - 1
+    assert create_schedule(*tabelas) == create_schedule(*esperado)
+    # As colunas mapeadas em memória continuam modificáveis, sem alterar o snapshot
+    tabelas[2].loc[0, 'duracao_minutos'] = -1
+    assert read_snapshot(pasta)[2].loc[0, 'duracao_minutos'] == esperado[2].loc[0, 'duracao_minutos']
+
+
+def test_snapshot_desatualizado_volta_para_os_csvs(tmp_path, instancia_aleatoria):
+    """
+    Testa se uma mudança nos CSVs invalida o snapshot e se a ausência dele também cai nos CSVs.
+    """
+    fontes = _gravar_csvs(instancia_aleatoria, tmp_path)
+    pasta = str(tmp_path / 'snapshot')
+    assert load_preprocessed(fontes, pasta)[3] is False
+    assert load_preprocessed(fontes, None)[3] is False
+    compile_snapshot(fontes, pasta)
+
+    linhas = pd.read_csv(fontes[2])
+    linhas.loc[0, 'duracao_minutos'] += 15
+    linhas.to_csv(fontes[2], index=False)
+
+    assert read_snapshot(pasta, content_hash(fontes)) is None
+    *tabelas, do_snapshot = load_preprocessed(fontes, pasta)
+    assert not do_snapshot
+    assert tabelas[2].loc[0, 'duracao_minutos'] == linhas.loc[0, 'duracao_minutos']
+    assert content_hash([b'ab', b'c']) != content_hash([b'a', b'bc'])
+
+
+def test_nova_gravacao_nao_altera_os_dados_ja_carregados(tmp_path):
+    """
+    Testa se regravar o snapshot na mesma pasta não muda as colunas mapeadas em memória por cargas anteriores.
+    """
+    pasta = str(tmp_path / 'snapshot')
+    base = pd.DataFrame({'x': np.arange(3)})
+    write_snapshot(pasta, (base, base, base), 'a')
+    carregado = read_snapshot(pasta)[0]
+
+    maior = pd.DataFrame({'x': np.arange(5000, 6000)})
+    write_snapshot(pasta, (maior, maior, maior), 'b')
+
+    assert carregado['x'].tolist() == [0, 1, 2]
+    assert read_snapshot(pasta, 'b')[0]['x'].tolist() == maior['x'].tolist()
+    assert read_snapshot(pasta, 'a') is None
+
+
+def test_coluna_nao_suportada():
+    """
+    Testa se colunas com tipos que não podem ser gravados sem pickle são rejeitadas.
+    """
+    motoristas = pd.DataFrame({'nome': ['A', 'B'], 'extra': ['x', 1]})
+    vazio = pd.DataFrame({'a': np.array([], dtype=float)})
+    with pytest.raises(ValueError):
+        write_snapshot('/nao/usado', (motoristas, vazio, vazio), 'hash')
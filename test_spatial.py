@@ -0,0 +1,63 @@
+"""Testes unitários para o módulo models/spatial.py."""
+from __future__ import annotations
+
+import random
+
+import pytest
+from models.optimizer import calculate_distance_points, calculate_travel_minutes
+from models.scheduler import create_schedule
+from models.spatial import DriverGrid
+from models.timeline import DriverTimeline
+
+
+@pytest.mark.parametrize('tamanho_celula', [2.5, 0.05])
+def test_grade_retorna_todos_os_motoristas_que_chegam_a_tempo(tamanho_celula):
+    """
+    Testa, contra uma busca exaustiva, se a consulta nunca perde um motorista alcançável
+    (com células densas, visitadas em anéis, e esparsas, percorridas todas).
+    """
+    rng = random.Random(0)
+    grade = DriverGrid(tamanho_celula=tamanho_celula)
+    estado = {}
+    for _ in range(600):
+        chave = rng.randrange(80)
+        estado[chave] = ((rng.uniform(0, 20), rng.uniform(0, 20)), rng.choice([0.0, rng.uniform(0, 600)]))
+        grade.update(chave, *estado[chave])
+
+    for _ in range(50):
+        origem, horario = (rng.uniform(-5, 25), rng.uniform(-5, 25)), rng.choice([rng.uniform(0, 30), rng.uniform(0, 700)])
+        retornados = set(grade.query(origem, horario))
+        alcancaveis = {
+            chave for chave, (ponto, livre) in estado.items()
+            if livre + calculate_travel_minutes(calculate_distance_points(ponto, origem)) <= horario
+        }
+        assert alcancaveis <= retornados
+        assert all(estado[chave][1] <= horario for chave in retornados)
+        grupos = list(grade.query_by_distance(origem, horario))
+        assert {chave for _, chaves in grupos for chave in chaves} == retornados
+        assert [d for d, _ in grupos] == sorted(d for d, _ in grupos)
+        assert all(calculate_distance_points(estado[chave][0], origem) >= d - 1e-9 for d, chaves in grupos for chave in chaves)
+    assert len(grade) == len(estado)
+    with pytest.raises(ValueError):
+        DriverGrid(0)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_poda_espacial_nao_altera_a_escala(seed, instancia_aleatoria):
+    """
+    Testa se o motor guloso (com índice) e o vetorizado (sem índice) geram a mesma escala,
+    inclusive com agendas prévias sobrepostas ou no futuro.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(seed, n_motoristas=40, n_veiculos=40, n_linhas=150)
+
+    def agendas():
+        return {
+            'M1': DriverTimeline([(600, 660, '3,3'), (1380, 1500, '4,4')]),
+            'M2': DriverTimeline([(480, 600, '10,10'), (540, 570, '0,0')]),  # sobreposta: fica fora da poda
+            'M3': DriverTimeline([(900, 960, '19,1')]),
+        }
+
+    escala_python = create_schedule(motoristas, veiculos, linhas, agendas())
+    escala_numpy = create_schedule(motoristas, veiculos, linhas, agendas(), engine='numpy')
+
+    assert escala_python == escala_numpy
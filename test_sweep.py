@@ -0,0 +1,43 @@
+"""Testes unitários para o módulo services/sweep.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models.scheduler import create_schedule
+from services.sweep import pareto_frontier, penalty_grid, sweep_penalties
+
+
+def test_grade_e_fronteira_de_pareto():
+    """
+    Testa a grade de penalidades e a marcação dos pontos não dominados (com empates).
+    """
+    assert penalty_grid(0, 1000, 3) == [0.0, 500.0, 1000.0]
+    assert penalty_grid(500, 500, 1) == [500.0]
+    with pytest.raises(ValueError):
+        penalty_grid(10, 0, 3)
+
+    resultados = pd.DataFrame({
+        'penalidade': [0.0, 1.0, 2.0, 3.0, 4.0],
+        'custo_deslocamento': [100.0, 150.0, 150.0, 160.0, 120.0],
+        'motoristas': [10, 6, 6, 5, 8],
+    })
+    # (160, 5), (150, 6) e (100, 10) ficam; o empate (150, 6) mantém a menor penalidade; (120, 8) também fica
+    assert pareto_frontier(resultados).tolist() == [True, True, False, True, True]
+
+
+def test_varredura_paralela_igual_a_serial_e_ao_motor(instancia_aleatoria):
+    """
+    Testa se a varredura em processos dá o mesmo resultado da serial e do motor chamado diretamente.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(4, n_linhas=80)
+    penalidades = [0.0, 500.0, 10000.0]
+
+    serial, escalas_serial = sweep_penalties(motoristas, veiculos, linhas, penalidades, workers=1)
+    paralela, escalas_paralela = sweep_penalties(motoristas, veiculos, linhas, penalidades, workers=2)
+
+    pd.testing.assert_frame_equal(serial, paralela)
+    assert escalas_serial == escalas_paralela
+    assert escalas_serial[500.0] == create_schedule(motoristas, veiculos, linhas, new_driver_penalty=500.0)
+    assert serial['na_fronteira'].any()
+    # Penalidade maior nunca usa mais motoristas que a nula
+    assert serial['motoristas'].iloc[-1] <= serial['motoristas'].iloc[0]
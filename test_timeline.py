@@ -0,0 +1,83 @@
+"""Testes unitários para o módulo models/timeline.py."""
+from __future__ import annotations
+
+from datetime import time
+
+import pytest
+from models.timeline import DriverTimeline, as_timelines
+from services.rule_engine import is_time_conflict
+
+
+def test_acumula_minutos_trabalhados_incluindo_virada_da_meia_noite():
+    """
+    Testa se o total de minutos trabalhados é mantido a cada inserção.
+    """
+    agenda = DriverTimeline()
+    agenda.insert(480, 570, '1,1')     # 08:00-09:30
+    agenda.insert(1380, 1500, '2,2')   # 23:00-01:00 do dia seguinte
+
+    assert agenda.minutos_trabalhados == 90 + 120
+    assert agenda.is_chronological
+    with pytest.raises(ValueError):
+        agenda.insert(600, 540, '3,3')
+
+
+def test_conflito_e_viagem_anterior_com_insercoes_fora_de_ordem():
+    """
+    Testa a verificação de conflito e a busca da viagem anterior via bisect.
+    """
+    agenda = DriverTimeline()
+    agenda.insert(840, 900, 'C')
+    agenda.insert(480, 540, 'A')
+    agenda.insert(600, 660, 'B')
+
+    assert agenda.has_conflict(510, 570)
+    assert agenda.has_conflict(570, 870)
+    assert not agenda.has_conflict(660, 840)
+    assert agenda.previous_trip(420) is None
+    assert agenda.previous_trip(660) == (600, 660, 'B')
+    assert agenda.previous_trip(839) == (600, 660, 'B')
+    assert agenda.previous_trip(1080) == (840, 900, 'C')
+    assert [destino for _, _, destino in agenda] == ['A', 'B', 'C']
+
+
+def test_remocao_atualiza_minutos_e_ultimo_agendamento():
+    """
+    Testa se remover um agendamento desfaz a inserção (minutos, último agendamento e conflitos).
+    """
+    agenda = DriverTimeline()
+    agenda.insert(480, 540, 'A')
+    agenda.insert(840, 900, 'C')
+    agenda.insert(600, 660, 'B')
+
+    agenda.remove(840, 900, 'C')
+    assert agenda.minutos_trabalhados == 120
+    assert agenda.ultimo_agendamento == (600, 660, 'B')
+    assert not agenda.has_conflict(850, 870)
+    agenda.remove(480, 540, 'A')
+    assert list(agenda) == [(600, 660, 'B')]
+    with pytest.raises(ValueError):
+        agenda.remove(480, 540, 'A')
+
+
+def test_agendamentos_sobrepostos_mantem_semantica_original():
+    """
+    Testa se agendas com sobreposição (ex: exceções manuais) seguem a regra de is_time_conflict.
+    """
+    agendamentos = [(480, 720, 'A'), (540, 600, 'B'), (1320, 1560, 'C')]
+    agenda = DriverTimeline(agendamentos)
+
+    for inicio, fim in [(660, 690), (720, 1260), (1470, 1500), (30, 60)]:
+        esperado = is_time_conflict(inicio, fim, [(i, f) for i, f, _ in agendamentos])
+        assert agenda.has_conflict(inicio, fim) == esperado
+    assert agenda.previous_trip(660) == (540, 600, 'B')
+
+
+def test_converte_agendas_no_formato_antigo_com_objetos_time():
+    """
+    Testa se listas de tuplas com objetos time são convertidas para minutos, inclusive após a meia-noite.
+    """
+    agendados = as_timelines({'Ana': [(time(8, 0), time(9, 0), 'A'), (time(23, 0), time(1, 0), 'B')]})
+
+    assert list(agendados['Ana']) == [(480, 540, 'A'), (1380, 1500, 'B')]
+    assert agendados['Ana'].minutos_trabalhados == 180
@@ -0,0 +1,86 @@
+"""Testes unitários para o módulo validation_tool.py."""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from models.optimizer import calculate_schedule_cost
+from models.scheduler import create_schedule
+from validation_tool import (COLUNAS_KPI, NAO_ALOCADO, compare_batch, deadhead_costs, read_kpis, schedule_kpis,
+                             write_kpis)
+
+
+def _exportar(escala, linhas):
+    """Converte a escala para o formato exportado, com as linhas não alocadas como NAO_ALOCADO."""
+    return pd.DataFrame([{
+        'Linha_ID': linha_id,
+        'Horario': horario,
+        'Motorista_Alocado': escala.get(linha_id, {}).get('motorista', NAO_ALOCADO),
+        'Veiculo_Alocado': escala.get(linha_id, {}).get('veiculo', NAO_ALOCADO),
+    } for linha_id, horario in zip(linhas['id'], linhas['horario_inicio'])])
+
+
+def test_custo_de_deslocamento_vetorizado_igual_ao_do_otimizador(instancia_aleatoria):
+    """
+    Testa se o custo vetorizado de deslocamento coincide com calculate_schedule_cost sem penalidade.
+    """
+    for seed in range(3):
+        motoristas, veiculos, linhas = instancia_aleatoria(seed)
+        escala = create_schedule(motoristas, veiculos, linhas, {}, 500.0)
+        _, custo = deadhead_costs(_exportar(escala, linhas), motoristas, veiculos, linhas)
+        esperado = calculate_schedule_cost(escala, motoristas, veiculos, linhas, new_driver_penalty=0.0)
+        assert custo == pytest.approx(esperado)
+
+
+def test_indicadores_do_dia_e_divergencias(instancia_aleatoria):
+    """
+    Testa a contagem de motoristas, veículos, linhas não alocadas e divergências entre os lados.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(0)
+    real = _exportar(create_schedule(motoristas, veiculos, linhas, {}, 500.0), linhas)
+    agente = real.copy()
+    agente.loc[0, ['Motorista_Alocado', 'Veiculo_Alocado']] = NAO_ALOCADO
+    agente = agente.iloc[:-1]  # a última linha só existe na escala real
+
+    kpis = schedule_kpis(real, agente, motoristas, veiculos, linhas)
+
+    alocadas_real = real[real['Motorista_Alocado'] != NAO_ALOCADO]
+    assert kpis['linhas'] == len(real)
+    assert kpis['motoristas_real'] == alocadas_real['Motorista_Alocado'].nunique()
+    assert kpis['veiculos_real'] == alocadas_real['Veiculo_Alocado'].nunique()
+    assert kpis['linhas_nao_alocadas_real'] == len(real) - len(alocadas_real)
+    divergentes = {real['Linha_ID'].iloc[0], real['Linha_ID'].iloc[-1]}
+    esperadas = len(divergentes - set(real.loc[real['Motorista_Alocado'] == NAO_ALOCADO, 'Linha_ID']))
+    assert kpis['divergencias'] == esperadas
+    assert kpis['taxa_divergencia'] == pytest.approx(esperadas / len(real))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_lote_grava_um_dia_por_par_em_arquivo_colunar(tmp_path, workers, instancia_aleatoria):
+    """
+    Testa o modo em lote: pares pelo nome do arquivo, um dia por linha e ida e volta pelo .npz.
+    """
+    motoristas, veiculos, linhas = instancia_aleatoria(1)
+    (tmp_path / 'real').mkdir()
+    (tmp_path / 'agente').mkdir()
+    for dia, penalidade in (('2024-05-06', 0.0), ('2024-05-07', 10000.0)):
+        real = _exportar(create_schedule(motoristas, veiculos, linhas, {}, penalidade), linhas)
+        real.to_csv(tmp_path / 'real' / f'{dia}.csv', index=False)
+        _exportar(create_schedule(motoristas, veiculos, linhas, {}, 10000.0), linhas).to_csv(
+            tmp_path / 'agente' / f'{dia}.csv', index=False)
+    (tmp_path / 'real' / 'sem_par.csv').write_text('Linha_ID\n')
+
+    kpis = compare_batch(str(tmp_path / 'real'), str(tmp_path / 'agente'), motoristas, veiculos, linhas,
+                         workers=workers)
+
+    assert list(kpis.columns) == list(COLUNAS_KPI)
+    assert kpis['dia'].tolist() == ['2024-05-06', '2024-05-07']
+    # O agente do segundo dia é a mesma escala que a real
+    assert kpis['divergencias'].iloc[1] == 0
+    assert kpis['custo_deslocamento_real'].iloc[1] == pytest.approx(kpis['custo_deslocamento_agente'].iloc[1])
+
+    caminho = str(tmp_path / 'kpis.npz')
+    write_kpis(kpis, caminho)
+    pd.testing.assert_frame_equal(read_kpis(caminho), kpis, check_dtype=False)
+
+    with pytest.raises(ValueError):
+        compare_batch(str(tmp_path / 'real'), str(tmp_path), motoristas, veiculos, linhas)
@@ -1,8 +1,41 @@
-"""Ferramenta de linha de comando para comparar duas escalas."""
+"""Ferramenta de linha de comando para comparar duas escalas ou, em lote, pares de escalas de vários dias.
+
+No modo em lote, cada dia é um par de arquivos com o mesmo nome em duas
+pastas (ex: ``real/2024-05-06.csv`` e ``agente/2024-05-06.csv``). Os pares
+são processados em paralelo e, para cada dia e cada lado, são calculados de
+forma vetorizada os indicadores da escala: distância e custo de
+deslocamento em vazio (com o modelo de custo do otimizador), motoristas e
+veículos usados e linhas não alocadas, além da taxa de divergência entre os
+dois lados. O agregado é gravado em um único arquivo colunar ``.npz`` (um
+array por coluna, sem pickle; ver read_kpis).
+"""
 from __future__ import annotations
 
+import argparse
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-import sys
+
+from models.optimizer import calculate_fleet_travel_costs
+from services.data_loader import coordinates
+from services.parallel import map_shared, shared
+from services.snapshot import load_preprocessed
+
+# Valor usado nas escalas exportadas para linhas sem motorista ou veículo
+NAO_ALOCADO = 'Nao Alocado'
+
+# Lados comparados no modo em lote, na ordem das colunas
+LADOS = ('real', 'agente')
+
+# Indicadores calculados para cada lado de um dia (colunas '<indicador>_<lado>')
+INDICADORES = ('distancia_deslocamento', 'custo_deslocamento', 'motoristas', 'veiculos', 'linhas_nao_alocadas')
+
+# Colunas do agregado do modo em lote, na ordem
+COLUNAS_KPI = (('dia', 'linhas')
+               + tuple(f'{indicador}_{lado}' for lado in LADOS for indicador in INDICADORES)
+               + ('divergencias', 'taxa_divergencia'))
 
 
 def compare_scales(real_scale_path: str, agent_scale_path: str) -> None:
@@ -47,9 +80,257 @@ def compare_scales(real_scale_path: str, agent_scale_path: str) -> None:
         print(f"\nEncontradas {len(divergences)} divergências:")
         print(divergences.to_string(index=False))
 
-if __name__ == "__main__":
-    # Exemplo de como usar: python validation_tool.py data/escala_real.csv data/escala_agente.csv
-    if len(sys.argv) != 3:
-        print("Uso: python validation_tool.py <caminho_escala_real> <caminho_escala_agente>")
+
+def _normalizar_alocacao(valores: pd.Series) -> pd.Series:
+    """Converte a coluna de motorista ou veículo para texto, com ausentes como NAO_ALOCADO."""
+    return valores.astype(object).where(valores.notna(), NAO_ALOCADO).astype(str)
+
+
+def deadhead_costs(
+    escala: pd.DataFrame,
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame
+) -> Tuple[float, float]:
+    """
+    Calcula, de forma vetorizada, a distância e o custo totais de deslocamento em vazio de uma escala.
+
+    Segue o modelo de calculate_schedule_cost (sem a penalidade por novo
+    motorista): cada linha parte do destino da viagem anterior do motorista
+    (a de maior término até o início da linha) ou, se não houver, de casa. A
+    viagem anterior de todas as linhas é encontrada com uma única busca
+    binária sobre os términos ordenados por motorista.
+
+    Args:
+        escala: Escala exportada (colunas 'Linha_ID', 'Motorista_Alocado' e 'Veiculo_Alocado').
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos (colunas 'numero_carro' e, opcionalmente, 'consumo_km_l').
+        linhas: DataFrame pré-processado das linhas.
+
+    Returns:
+        A distância e o custo totais. Linhas sem motorista ou ausentes de
+        ``linhas`` não entram; motoristas sem localização conhecida partem da
+        origem da sua primeira linha.
+    """
+    motorista = _normalizar_alocacao(escala['Motorista_Alocado']).to_numpy()
+    posicao = pd.Index(linhas['id']).get_indexer(escala['Linha_ID'])
+    validas = (posicao >= 0) & (motorista != NAO_ALOCADO)
+    if not validas.any():
+        return 0.0, 0.0
+    posicao, motorista = posicao[validas], motorista[validas]
+    veiculo = _normalizar_alocacao(escala['Veiculo_Alocado']).to_numpy()[validas]
+
+    origem = coordinates(linhas, 'origem')[posicao]
+    destino = coordinates(linhas, 'destino')[posicao]
+    inicio = linhas['horario_inicio_min'].to_numpy(dtype=float)[posicao]
+    fim = linhas['horario_fim_min'].to_numpy(dtype=float)[posicao]
+
+    # Chave (motorista, horário) em um único float: os horários de um motorista
+    # ficam em uma faixa própria, e uma busca binária acha a viagem anterior de todas as linhas
+    grupo, _ = pd.factorize(motorista)
+    base = min(inicio.min(), fim.min())
+    largura = max(inicio.max(), fim.max()) - base + 1.0
+    chave_fim = grupo * largura + (fim - base)
+    ordem = np.argsort(chave_fim, kind='stable')
+    idx = np.searchsorted(chave_fim[ordem], grupo * largura + (inicio - base), side='right') - 1
+    anterior = ordem[np.maximum(idx, 0)]
+    tem_anterior = (idx >= 0) & (grupo[anterior] == grupo)
+
+    # Como em calculate_schedule_cost, vale a última localização de um nome repetido
+    nomes = motoristas['nome']
+    unicos = ~nomes.duplicated(keep='last').to_numpy()
+    casa_idx = pd.Index(nomes[unicos]).get_indexer(motorista)
+    casa = np.where((casa_idx >= 0)[:, None], coordinates(motoristas, 'localizacao')[unicos][casa_idx], origem)
+    partida = np.where(tem_anterior[:, None], destino[anterior], casa)
+    distancias = ((partida[:, 0] - origem[:, 0])**2 + (partida[:, 1] - origem[:, 1])**2)**0.5
+
+    if 'consumo_km_l' in veiculos.columns:
+        consumo_por_veiculo = pd.Series(pd.to_numeric(veiculos['consumo_km_l'], errors='coerce').to_numpy(dtype=float),
+                                        index=veiculos['numero_carro'].astype(str))
+        consumo_por_veiculo = consumo_por_veiculo[~consumo_por_veiculo.index.duplicated(keep='last')]
+        consumos = consumo_por_veiculo.reindex(veiculo).to_numpy(dtype=float)
     else:
-        compare_scales(sys.argv[1], sys.argv[2])
\ No newline at end of file
+        consumos = np.full(len(veiculo), np.nan)
+    custos = calculate_fleet_travel_costs(distancias, consumos)
+    return float(distancias.sum()), float(custos.sum())
+
+
+def schedule_kpis(
+    escala_real: pd.DataFrame,
+    escala_agente: pd.DataFrame,
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame
+) -> Dict[str, Any]:
+    """
+    Calcula os indicadores de um dia para as duas escalas e a divergência entre elas.
+
+    As escalas são juntadas pela Linha_ID (como em compare_scales): uma linha
+    que só aparece em um dos lados conta como não alocada no outro. Uma linha
+    diverge se motorista ou veículo forem diferentes nos dois lados.
+
+    Args:
+        escala_real: Escala real (humana) exportada.
+        escala_agente: Escala gerada pelo agente.
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado das linhas.
+
+    Returns:
+        Dicionário com as colunas de COLUNAS_KPI, exceto 'dia'.
+    """
+    colunas = ['Linha_ID', 'Motorista_Alocado', 'Veiculo_Alocado']
+    juntas = pd.merge(escala_real[colunas], escala_agente[colunas], on='Linha_ID', how='outer',
+                      suffixes=('_real', '_agente'))
+    kpis: Dict[str, Any] = {'linhas': len(juntas)}
+    for lado, escala in zip(LADOS, (escala_real, escala_agente)):
+        motorista = _normalizar_alocacao(juntas[f'Motorista_Alocado_{lado}'])
+        veiculo = _normalizar_alocacao(juntas[f'Veiculo_Alocado_{lado}'])
+        distancia, custo = deadhead_costs(escala, motoristas, veiculos, linhas)
+        kpis[f'distancia_deslocamento_{lado}'] = distancia
+        kpis[f'custo_deslocamento_{lado}'] = custo
+        kpis[f'motoristas_{lado}'] = int(motorista[motorista != NAO_ALOCADO].nunique())
+        kpis[f'veiculos_{lado}'] = int(veiculo[veiculo != NAO_ALOCADO].nunique())
+        kpis[f'linhas_nao_alocadas_{lado}'] = int((motorista == NAO_ALOCADO).sum())
+
+    divergentes = ((_normalizar_alocacao(juntas['Motorista_Alocado_real'])
+                    != _normalizar_alocacao(juntas['Motorista_Alocado_agente']))
+                   | (_normalizar_alocacao(juntas['Veiculo_Alocado_real'])
+                      != _normalizar_alocacao(juntas['Veiculo_Alocado_agente'])))
+    kpis['divergencias'] = int(divergentes.sum())
+    kpis['taxa_divergencia'] = kpis['divergencias'] / len(juntas) if len(juntas) else 0.0
+    return kpis
+
+
+def schedule_pairs(pasta_real: str, pasta_agente: str) -> List[Tuple[str, str, str]]:
+    """
+    Encontra os pares de escalas do modo em lote: os CSVs com o mesmo nome nas duas pastas.
+
+    Args:
+        pasta_real: Pasta com as escalas reais, um CSV por dia.
+        pasta_agente: Pasta com as escalas do agente, com os mesmos nomes.
+
+    Returns:
+        Tuplas (dia, caminho_real, caminho_agente), em ordem de dia; o dia é
+        o nome do arquivo sem a extensão.
+
+    Raises:
+        ValueError: Se nenhum par for encontrado.
+    """
+    def csvs(pasta: str) -> Dict[str, str]:
+        return {os.path.splitext(nome)[0]: os.path.join(pasta, nome)
+                for nome in os.listdir(pasta) if nome.lower().endswith('.csv')}
+
+    reais, agentes = csvs(pasta_real), csvs(pasta_agente)
+    dias = sorted(reais.keys() & agentes.keys())
+    if not dias:
+        raise ValueError(f"Nenhum par de escalas com o mesmo nome em '{pasta_real}' e '{pasta_agente}'.")
+    return [(dia, reais[dia], agentes[dia]) for dia in dias]
+
+
+def _comparar_par(par: Tuple[str, str, str]) -> Dict[str, Any]:
+    """Lê um par de escalas e calcula os indicadores do dia com a instância compartilhada (motoristas, veículos, linhas)."""
+    dia, caminho_real, caminho_agente = par
+    # Motoristas e veículos lidos como texto: números de carro não viram float em colunas com ausentes
+    tipos = {'Motorista_Alocado': str, 'Veiculo_Alocado': str}
+    escala_real = pd.read_csv(caminho_real, dtype=tipos)
+    escala_agente = pd.read_csv(caminho_agente, dtype=tipos)
+    kpis = schedule_kpis(escala_real, escala_agente, *shared())
+    return {'dia': dia, **kpis}
+
+
+def compare_batch(
+    pasta_real: str,
+    pasta_agente: str,
+    motoristas: pd.DataFrame,
+    veiculos: pd.DataFrame,
+    linhas: pd.DataFrame,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Compara em lote os pares de escalas de duas pastas (ver schedule_pairs).
+
+    Cada processo lê os seus próprios pares, de modo que só os caminhos e os
+    indicadores de cada dia trafegam entre os processos; a instância chega a
+    cada processo uma única vez (ver services/parallel.py).
+
+    Args:
+        pasta_real: Pasta com as escalas reais.
+        pasta_agente: Pasta com as escalas do agente.
+        motoristas: DataFrame pré-processado de motoristas.
+        veiculos: DataFrame de veículos.
+        linhas: DataFrame pré-processado de todas as linhas das escalas.
+        workers: Número máximo de processos. 1 processa em sequência no
+            próprio processo; None usa o padrão do executor.
+
+    Returns:
+        DataFrame com as colunas de COLUNAS_KPI, uma linha por dia, em ordem de dia.
+    """
+    pares = schedule_pairs(pasta_real, pasta_agente)
+    instancia = (motoristas, veiculos, linhas)
+    resultados = map_shared(_comparar_par, pares, instancia, workers)
+    return pd.DataFrame(resultados, columns=list(COLUNAS_KPI))
+
+
+def write_kpis(kpis: pd.DataFrame, caminho: str) -> None:
+    """
+    Grava o agregado do modo em lote em um único arquivo colunar ``.npz`` (um array por coluna).
+
+    Args:
+        kpis: DataFrame devolvido por compare_batch.
+        caminho: Caminho do arquivo (a extensão .npz é acrescentada se faltar).
+    """
+    colunas = {coluna: (kpis[coluna].to_numpy(dtype=str) if kpis[coluna].dtype == object else kpis[coluna].to_numpy())
+               for coluna in kpis.columns}
+    np.savez(caminho, **colunas)
+
+
+def read_kpis(caminho: str) -> pd.DataFrame:
+    """
+    Lê o agregado gravado por write_kpis.
+
+    Args:
+        caminho: Caminho do arquivo .npz.
+
+    Returns:
+        O DataFrame dos indicadores, com as colunas na ordem gravada.
+    """
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        return pd.DataFrame({coluna: arquivo[coluna] for coluna in arquivo.files})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara escalas reais com as escalas geradas pelo agente.")
+    parser.add_argument('real', nargs='?', help="Escala real (CSV) ou, com --batch, a pasta das escalas reais.")
+    parser.add_argument('agente', nargs='?', help="Escala do agente (CSV) ou, com --batch, a pasta das escalas do agente.")
+    parser.add_argument('--batch', action='store_true',
+                        help="Compara os CSVs de mesmo nome (um por dia) das duas pastas e grava os indicadores de cada dia.")
+    parser.add_argument('--output', default='data/kpis_validacao.npz', metavar='NPZ',
+                        help="Modo em lote: arquivo colunar com os indicadores por dia.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Modo em lote: processos usados (1 mantém a execução serial).")
+    parser.add_argument('--snapshot', default='data/snapshot', metavar='PASTA',
+                        help="Pasta do snapshot colunar dos dados pré-processados, usado quando está atualizado em "
+                             "relação aos CSVs.")
+    args = parser.parse_args()
+
+    if args.real is None or args.agente is None:
+        parser.print_usage()
+        return
+    if not args.batch:
+        compare_scales(args.real, args.agente)
+        return
+
+    fontes = ('data/motoristas.csv', 'data/veiculos.csv', 'data/linhas.csv')
+    motoristas, veiculos, linhas, _ = load_preprocessed(fontes, args.snapshot)
+    kpis = compare_batch(args.real, args.agente, motoristas, veiculos, linhas, workers=args.workers)
+    write_kpis(kpis, args.output)
+    print(kpis.to_string(index=False))
+    print(f"\nIndicadores de {len(kpis)} dia(s) salvos em '{args.output}'.")
+
+
+if __name__ == "__main__":
+    # Exemplos de uso:
+    #   python validation_tool.py data/escala_real.csv data/escala_agente.csv
+    #   python validation_tool.py --batch data/escalas_reais data/escalas_agente --workers 4
+    main()